@@ -0,0 +1,3 @@
+"""
+Benchmarks for Questions Extractor.
+"""
@@ -0,0 +1,181 @@
+"""
+Benchmark for the per-page latency saved by the code-driven select and save agents.
+
+Runs pipeline_loop_agent's select -> (stand-in for extractor, structure and tagging) ->
+save loop over N synthetic pages through an ADK Runner with FileSelectorAgent and
+SaveAgent, against a fake Supabase that answers after --db-latency seconds. The LLM
+agents they replace spend two Flash round trips per step on top of the same tool work
+(the function call, then the reply to the tool response); their per-page cost is
+reported as the measured direct time plus those round trips at --flash-latency, or at the
+mean recorded Flash latency of a service cassette (--cassette, see utils.record_replay).
+
+Usage:
+    python -m benchmarks.bench_direct_agents --pages 50 --flash-latency 1.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+from google.adk.agents import BaseAgent, LoopAgent, SequentialAgent
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from questions_extractor_agent.batching import OCR_MODEL
+from questions_extractor_agent.direct_agents import FileSelectorAgent, SaveAgent
+from questions_extractor_agent.tools import database_tools
+
+# Model round trips an LlmAgent needs for one tool call: the call, then the final reply
+ROUND_TRIPS_PER_STEP = 2
+LLM_STEPS_REPLACED = 2  # file_selector_agent and save_agent
+
+
+class StandInStagesAgent(BaseAgent):
+    """
+    Stands in for extractor, structure and tagging: writes a one-question tagged test set.
+    """
+
+    async def _run_async_impl(self, ctx: Any) -> Any:
+        file_name = ctx.session.state["file_to_process"]
+        ctx.session.state["tagging_result"] = {
+            "status": "success",
+            "tagged_test_set": {
+                "test_forms": [{"name": file_name}],
+                "questions": [{"part_id": 1, "passage_set_id": 1, "number": 101, "stem": "..."}],
+            },
+        }
+        return
+        yield
+
+
+class FakeSupabase:
+    """
+    Fake Supabase client whose queries take db_latency seconds.
+    """
+
+    def __init__(self, db_latency: float):
+        self.db_latency = db_latency
+
+    def table(self, name: str) -> Any:
+        def upsert(row: Dict[str, Any], on_conflict: Any = None) -> Any:
+            def execute() -> Any:
+                time.sleep(self.db_latency)
+                return SimpleNamespace(data=[{**row, "id": 1}])
+
+            return SimpleNamespace(execute=execute)
+
+        return SimpleNamespace(upsert=upsert)
+
+
+def recorded_flash_latency(cassette_path: Path) -> Optional[float]:
+    """Returns the mean latency of the Flash calls in a service cassette."""
+    latencies = []
+    with open(cassette_path, encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry["service"] == "gemini" and entry["label"] == OCR_MODEL:
+                latencies.append(entry["latency_seconds"])
+    return statistics.mean(latencies) if latencies else None
+
+
+async def _run_loop(num_pages: int, input_dir: Path) -> float:
+    paths = []
+    for page_number in range(1, num_pages + 1):
+        page = input_dir / f"exam-{page_number}.jpg"
+        page.write_bytes(f"page {page_number}".encode())
+        paths.append(str(page))
+
+    # One iteration per page: the loop ends on its own instead of on the selector's
+    # escalation, which abandons the agents' generators mid-span and leaves OpenTelemetry
+    # to detach their contexts from another task (a "different Context" traceback)
+    loop = LoopAgent(
+        name="pipeline_loop_agent",
+        max_iterations=num_pages,
+        sub_agents=[
+            SequentialAgent(
+                name="pipeline_sequential_agent",
+                sub_agents=[
+                    FileSelectorAgent(name="file_selector_agent"),
+                    StandInStagesAgent(name="stages"),
+                    SaveAgent(name="save_agent"),
+                ],
+            )
+        ],
+    )
+    session_service = InMemorySessionService()
+    runner = Runner(
+        app_name="bench",
+        agent=loop,
+        artifact_service=InMemoryArtifactService(),
+        session_service=session_service,
+    )
+    session = session_service.create_session(
+        app_name="bench", user_id="bench", state={"files": dict.fromkeys(paths, "")}
+    )
+
+    start = time.perf_counter()
+    async for _ in runner.run_async(
+        user_id="bench",
+        session_id=session.id,
+        new_message=types.Content(role="user", parts=[types.Part(text="start")]),
+    ):
+        pass
+    seconds = time.perf_counter() - start
+
+    files = session_service.get_session(
+        app_name="bench", user_id="bench", session_id=session.id
+    ).state["files"]
+    if set(files.values()) != {"done"}:
+        raise RuntimeError(f"Not every page was saved: {files}")
+    return seconds
+
+
+def main(num_pages: int, db_latency: float, flash_latency: float) -> None:
+    """
+    Runs the direct agents over num_pages pages and prints the per-page comparison.
+
+    Args:
+        num_pages (int): Pages per run.
+        db_latency (float): Seconds per Supabase query.
+        flash_latency (float): Seconds per Flash round trip of the LLM agents.
+    """
+    database_tools.get_supabase_client = lambda: FakeSupabase(db_latency)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["ARTIFACT_STORE_DIR"] = str(Path(tmp_dir) / "artifacts")
+        os.environ["FILE_LEDGER_PATH"] = ""
+        seconds = asyncio.run(_run_loop(num_pages, Path(tmp_dir)))
+
+    direct = seconds / num_pages
+    hops = LLM_STEPS_REPLACED * ROUND_TRIPS_PER_STEP * flash_latency
+    llm = direct + hops
+    print(
+        f"{num_pages} pages, Supabase {db_latency * 1000:.0f} ms/query, "
+        f"Flash {flash_latency:.2f} s/round trip"
+    )
+    print(f"{'select + save':>24} {'s/page':>8}")
+    print(f"{'code-driven agents':>24} {direct:>8.3f}")
+    print(f"{'LLM agents':>24} {llm:>8.3f}")
+    print(f"saved {hops:.2f} s/page ({hops / llm:.0%} of the select and save time)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--db-latency", type=float, default=0.02)
+    parser.add_argument("--flash-latency", type=float, default=1.2)
+    parser.add_argument("--cassette", type=Path)
+    args = parser.parse_args()
+
+    flash_latency = args.flash_latency
+    if args.cassette is not None:
+        flash_latency = recorded_flash_latency(args.cassette) or flash_latency
+    main(args.pages, args.db_latency, flash_latency)
@@ -0,0 +1,116 @@
+"""
+Benchmark for concurrent, rate-limited page OCR calls against a fake model endpoint.
+
+The fake endpoint answers after a fixed latency and, like the Gemini API, rejects calls
+beyond its quota with 429 (checked over a sliding one-second window). Pages are sent
+through ModelCallExecutor at growing concurrency, with the client-side limit set to
+HEADROOM of the quota and a short burst: throughput should scale with concurrency until
+it reaches the limit and then stay there without 429s. The last row runs the same load
+without the limiter.
+
+Usage:
+    python -m benchmarks.bench_model_executor --pages 120 --latency 0.2 --rpm 3000
+"""
+
+import argparse
+import asyncio
+import collections
+import time
+from typing import Deque, Dict, List
+
+from utils.model_executor import ModelCallExecutor
+
+BENCH_MODEL = "fake-flash"
+# Fraction of the endpoint quota configured as the client-side limit
+HEADROOM = 0.9
+BURST_SECONDS = 0.1
+
+
+class FakeRateLimitError(Exception):
+    """The fake endpoint's quota error; carries the HTTP status like genai's APIError."""
+
+    code = 429
+
+
+class FakeModelEndpoint:
+    """
+    In-process stand-in for a model endpoint with a fixed latency and an RPM quota.
+    """
+
+    def __init__(self, latency_seconds: float, rpm: int):
+        self.latency_seconds = latency_seconds
+        self.requests_per_second = rpm / 60
+        self._accepted: Deque[float] = collections.deque()
+        self.rejected = 0
+
+    async def generate(self) -> str:
+        """Accepts the call if the last second holds fewer calls than the quota allows."""
+        now = time.monotonic()
+        while self._accepted and self._accepted[0] <= now - 1.0:
+            self._accepted.popleft()
+        if len(self._accepted) >= self.requests_per_second:
+            self.rejected += 1
+            await asyncio.sleep(0.005)
+            raise FakeRateLimitError("429 RESOURCE_EXHAUSTED")
+        self._accepted.append(now)
+        await asyncio.sleep(self.latency_seconds)
+        return "OCR text"
+
+
+async def _run(
+    num_pages: int, concurrency: int, latency_seconds: float, rpm: int, limited: bool
+) -> Dict[str, float]:
+    endpoint = FakeModelEndpoint(latency_seconds, rpm)
+    executor = ModelCallExecutor(
+        limits={BENCH_MODEL: {"rpm": int(rpm * HEADROOM)}} if limited else {},
+        max_concurrency=concurrency,
+        max_retries=10,
+        base_delay_seconds=0.05,
+        max_delay_seconds=1.0,
+        burst_seconds=BURST_SECONDS,
+    )
+    start = time.perf_counter()
+    results = await executor.map(BENCH_MODEL, [endpoint.generate] * num_pages)
+    elapsed = time.perf_counter() - start
+    return {
+        "pages_per_second": num_pages / elapsed,
+        "rejected": endpoint.rejected,
+        "failed": sum(1 for result in results if isinstance(result, BaseException)),
+    }
+
+
+def main(
+    num_pages: int, concurrencies: List[int], latency_seconds: float, rpm: int
+) -> None:
+    """
+    Runs the benchmark for each concurrency level and prints a table.
+
+    Args:
+        num_pages (int): Pages sent per run.
+        concurrencies (List[int]): Concurrency levels to benchmark.
+        latency_seconds (float): Fake endpoint latency per call.
+        rpm (int): Endpoint quota in requests per minute.
+    """
+    print(
+        f"quota: {rpm} RPM = {rpm / 60:.1f} pages/s, client limit {rpm * HEADROOM / 60:.1f} "
+        f"pages/s, latency {latency_seconds * 1000:.0f} ms"
+    )
+    print(f"{'concurrency':>12} {'limiter':>8} {'pages/s':>9} {'429s':>6} {'failed':>7}")
+    runs = [(concurrency, True) for concurrency in concurrencies]
+    runs.append((max(concurrencies), False))
+    for concurrency, limited in runs:
+        result = asyncio.run(_run(num_pages, concurrency, latency_seconds, rpm, limited))
+        print(
+            f"{concurrency:>12} {'on' if limited else 'off':>8} "
+            f"{result['pages_per_second']:>9.1f} {result['rejected']:>6} {result['failed']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=120)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--rpm", type=int, default=3000)
+    args = parser.parse_args()
+    main(args.pages, args.concurrency, args.latency, args.rpm)
@@ -0,0 +1,125 @@
+"""
+Benchmark for per-question latency of batched OCR and structuring requests.
+
+A fake Gemini client answers each request after `overhead + per_page * pages` seconds (the
+fixed per-call cost plus time that grows with the pages in the request), scaled down by
+--time-scale so the run is quick. Pages go through ocr_pages and structure_pages at each
+batch size, with --concurrency requests in flight, and the simulated seconds per question
+are compared with the PRD's 3 s/question KPI.
+
+Usage:
+    python -m benchmarks.bench_page_batching --pages 24 --batch-sizes 1 2 4 8
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+from typing import Any, List
+
+from google.genai import types
+
+from questions_extractor_agent.batching import (
+    OCR_MODEL,
+    STRUCTURE_MODEL,
+    ocr_pages,
+    structure_pages,
+)
+from utils.model_executor import ModelCallExecutor
+
+KPI_SECONDS_PER_QUESTION = 3.0
+
+# Simulated latency model (seconds): fixed cost per call and cost per page in the call
+LATENCY = {
+    OCR_MODEL: {"overhead": 2.0, "per_page": 0.8},
+    STRUCTURE_MODEL: {"overhead": 4.0, "per_page": 1.5},
+}
+
+
+class FakeModels:
+    """
+    Stand-in for client.aio.models with the latency model above.
+    """
+
+    def __init__(self, time_scale: float):
+        self.time_scale = time_scale
+
+    async def generate_content(self, model: str, contents: List[types.Part], config: Any) -> Any:
+        latency = LATENCY[model]
+        markers = [part for part in contents[1:] if part.text and part.text.startswith("Page ")]
+        await asyncio.sleep(
+            (latency["overhead"] + latency["per_page"] * len(markers)) * self.time_scale
+        )
+
+        pages = []
+        for page_index, _ in enumerate(markers):
+            if model == OCR_MODEL:
+                pages.append({"page_index": page_index, "text": "101. ..."})
+            else:
+                pages.append({"page_index": page_index, "test_set_json": "{}"})
+        return SimpleNamespace(text=json.dumps({"pages": pages}))
+
+
+async def _run(num_pages: int, batch_size: int, concurrency: int, time_scale: float) -> float:
+    client = SimpleNamespace(aio=SimpleNamespace(models=FakeModels(time_scale)))
+    executor = ModelCallExecutor(limits={}, max_concurrency=concurrency)
+    images = {
+        f"page-{i}.jpeg": types.Part.from_bytes(data=b"page", mime_type="image/jpeg")
+        for i in range(num_pages)
+    }
+
+    start = time.perf_counter()
+    texts, _ = await ocr_pages(executor, client, images, batch_size)
+    await structure_pages(executor, client, texts, batch_size)
+    return (time.perf_counter() - start) / time_scale
+
+
+def main(
+    num_pages: int,
+    batch_sizes: List[int],
+    questions_per_page: int,
+    concurrency: int,
+    time_scale: float,
+) -> None:
+    """
+    Runs the benchmark for each batch size and prints a table.
+
+    Args:
+        num_pages (int): Pages per run.
+        batch_sizes (List[int]): Batch sizes to benchmark.
+        questions_per_page (int): Questions on each page (Part 5 pages hold about 5).
+        concurrency (int): Requests in flight at once.
+        time_scale (float): Real seconds per simulated second.
+    """
+    num_questions = num_pages * questions_per_page
+    print(
+        f"{num_pages} pages, {num_questions} questions, concurrency {concurrency}, "
+        f"KPI {KPI_SECONDS_PER_QUESTION:.1f} s/question"
+    )
+    print(f"{'batch size':>10} {'requests':>9} {'total s':>9} {'s/question':>11} {'KPI':>5}")
+    for batch_size in batch_sizes:
+        seconds = asyncio.run(_run(num_pages, batch_size, concurrency, time_scale))
+        per_question = seconds / num_questions
+        requests = 2 * -(-num_pages // batch_size)
+        verdict = "ok" if per_question <= KPI_SECONDS_PER_QUESTION else "miss"
+        print(
+            f"{batch_size:>10} {requests:>9} {seconds:>9.1f} {per_question:>11.2f} {verdict:>5}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=24)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--questions-per-page", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--time-scale", type=float, default=0.01)
+    args = parser.parse_args()
+    main(
+        args.pages,
+        args.batch_sizes,
+        args.questions_per_page,
+        args.concurrency,
+        args.time_scale,
+    )
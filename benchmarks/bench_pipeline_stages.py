@@ -0,0 +1,95 @@
+"""
+Benchmark for staged pipeline execution against the sequential per-page loop.
+
+Each stage is simulated by a sleep of its per-page latency (Flash OCR, Pro structuring, Pro
+tagging, Supabase save), scaled down by --time-scale. N pages are run one page at a time
+through all stages (the loop agent's order), then through run_stages with one worker per
+stage, then with the per-stage concurrency from --concurrency. The pipelined runs should
+approach N times the slowest stage's latency (divided by its workers) instead of N times
+the sum of all stages.
+
+Usage:
+    python -m benchmarks.bench_pipeline_stages --pages 40 --concurrency 1 3 2 1
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+from questions_extractor_agent.pipeline import Stage, run_stages
+
+# Simulated latency per page and stage (seconds)
+STAGE_LATENCY = {"ocr": 3.0, "structure": 8.0, "tag": 6.0, "save": 1.0}
+
+
+def _stages(time_scale: float, concurrency: List[int]) -> List[Stage]:
+    stages = []
+    for (name, latency), workers in zip(STAGE_LATENCY.items(), concurrency):
+
+        async def run(key: str, value: None, latency: float = latency) -> None:
+            await asyncio.sleep(latency * time_scale)
+
+        stages.append(Stage(name, run, workers))
+    return stages
+
+
+async def _sequential(num_pages: int, time_scale: float) -> None:
+    stages = _stages(time_scale, [1] * len(STAGE_LATENCY))
+    for page_index in range(num_pages):
+        for stage in stages:
+            await stage.run(f"page-{page_index}", None)
+
+
+async def _pipelined(num_pages: int, time_scale: float, concurrency: List[int]) -> None:
+    items = ((f"page-{page_index}", None) for page_index in range(num_pages))
+    await run_stages(items, _stages(time_scale, concurrency))
+
+
+def _timed(coroutine, time_scale: float) -> float:
+    start = time.perf_counter()
+    asyncio.run(coroutine)
+    return (time.perf_counter() - start) / time_scale
+
+
+def main(num_pages: int, concurrency: List[int], time_scale: float) -> None:
+    """
+    Runs the three schedules and prints a table.
+
+    Args:
+        num_pages (int): Pages per run.
+        concurrency (List[int]): Workers per stage (ocr, structure, tag, save).
+        time_scale (float): Real seconds per simulated second.
+    """
+    stage_sum = sum(STAGE_LATENCY.values())
+    slowest = max(STAGE_LATENCY.values())
+    balanced = max(
+        latency / workers for latency, workers in zip(STAGE_LATENCY.values(), concurrency)
+    )
+    runs: Dict[str, float] = {
+        "sequential": _timed(_sequential(num_pages, time_scale), time_scale),
+        "pipelined, 1 worker/stage": _timed(
+            _pipelined(num_pages, time_scale, [1] * len(STAGE_LATENCY)), time_scale
+        ),
+        f"pipelined, workers {concurrency}": _timed(
+            _pipelined(num_pages, time_scale, concurrency), time_scale
+        ),
+    }
+
+    print(f"{num_pages} pages, stage latencies {STAGE_LATENCY} s")
+    print(
+        f"bounds: sum of stages {num_pages * stage_sum:.0f} s, slowest stage "
+        f"{num_pages * slowest:.0f} s, slowest stage per worker {num_pages * balanced:.0f} s"
+    )
+    print(f"{'schedule':>32} {'total s':>9} {'s/page':>8}")
+    for name, seconds in runs.items():
+        print(f"{name:>32} {seconds:>9.1f} {seconds / num_pages:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, nargs=4, default=[1, 3, 2, 1])
+    parser.add_argument("--time-scale", type=float, default=0.002)
+    args = parser.parse_args()
+    main(args.pages, args.concurrency, args.time_scale)
@@ -0,0 +1,307 @@
+"""
+Benchmark for the extraction flow replayed offline from a service cassette.
+
+Drives select_file, ocr_batch, structure_batch and save_test_set over a folder of page
+images with Gemini and Supabase answered from a cassette (see utils.record_replay), and
+reports pages per second at each replay latency scale and injected error rate.
+
+A cassette of real calls is made by running once with --record (needs credentials) and
+is then replayed from the same --input-dir. --synthetic N records against in-process fake
+endpoints instead (N generated pages, latencies set by --fake-latency-scale), so the
+benchmark runs on a laptop with no network or credentials at all.
+
+Usage:
+    python -m benchmarks.bench_replay_pipeline --synthetic 24
+    python -m benchmarks.bench_replay_pipeline --record --input-dir input/exam --cassette c.jsonl
+    python -m benchmarks.bench_replay_pipeline --input-dir input/exam --cassette c.jsonl \\
+        --latency-scales 1 0.5 0 --error-rates 0 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from itertools import count
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from google.genai import types
+from PIL import Image, ImageDraw
+
+from questions_extractor_agent.batching import OCR_MODEL
+from questions_extractor_agent.tools import batch_pages, database_tools
+from questions_extractor_agent.tools.batch_pages import ocr_batch, structure_batch
+from questions_extractor_agent.tools.database_tools import save_test_set
+from questions_extractor_agent.tools.select_file import select_file
+from utils.genai import StandInGenaiClient
+from utils.record_replay import (
+    SERVICE_CASSETTE_MODE_RECORD,
+    SERVICE_CASSETTE_MODE_REPLAY,
+    Cassette,
+    reset_service_cassettes,
+)
+from utils.supabase import StandInSupabaseClient
+
+QUESTIONS_PER_PAGE = 5
+PAGE_EXTENSIONS = {".png", ".jpg", ".jpeg"}
+
+# Simulated latency of the fake endpoints (seconds, before --fake-latency-scale)
+FAKE_LATENCY = {
+    "ocr": {"overhead": 2.0, "per_page": 0.8},
+    "structure": {"overhead": 4.0, "per_page": 1.5},
+    "supabase": {"overhead": 0.05, "per_page": 0.0},
+}
+
+
+class BenchToolContext:
+    """
+    Minimal stand-in for ToolContext with state and in-memory artifacts.
+    """
+
+    def __init__(self):
+        self.state: Dict[str, Any] = {}
+        self.actions = self
+        self.escalate = False
+        self.artifacts: Dict[str, Any] = {}
+
+    def save_artifact(self, name: str, content: Any) -> int:
+        self.artifacts[name] = content
+        return 1
+
+    def load_artifact(self, name: str) -> Any:
+        return self.artifacts.get(name)
+
+
+class FakeModels:
+    """
+    Fake client.aio.models: one page entry per "Page {i}" marker, after the fake latency.
+    """
+
+    def __init__(self, latency_scale: float):
+        self.latency_scale = latency_scale
+        self.question_numbers = count(101)
+
+    async def generate_content(self, model: str, contents: List[types.Part], config: Any) -> Any:
+        stage = "ocr" if model == OCR_MODEL else "structure"
+        markers = [part for part in contents[1:] if part.text and part.text.startswith("Page ")]
+        latency = FAKE_LATENCY[stage]
+        await asyncio.sleep(
+            (latency["overhead"] + latency["per_page"] * len(markers)) * self.latency_scale
+        )
+
+        pages = []
+        for page_index, _ in enumerate(markers):
+            if stage == "ocr":
+                pages.append({"page_index": page_index, "text": "101. The meeting was -------."})
+            else:
+                test_set_json = json.dumps(self._test_set())
+                pages.append({"page_index": page_index, "test_set_json": test_set_json})
+        return types.GenerateContentResponse(
+            candidates=[
+                types.Candidate(
+                    content=types.Content(
+                        role="model", parts=[types.Part(text=json.dumps({"pages": pages}))]
+                    )
+                )
+            ]
+        )
+
+    def _test_set(self) -> Dict[str, Any]:
+        return {
+            "test_forms": [{"name": "Synthetic Test"}],
+            "sections": [{"label": "Reading", "order_no": 1}],
+            "parts": [
+                {
+                    "section_label": "Reading",
+                    "label": "Part 5",
+                    "question_format": "short_blank",
+                    "order_no": 1,
+                }
+            ],
+            "questions": [
+                {"part_label": "Part 5", "number": next(self.question_numbers), "stem": "-------"}
+                for _ in range(QUESTIONS_PER_PAGE)
+            ],
+        }
+
+
+class FakeSupabase:
+    """
+    Fake Supabase client: upserted rows come back with a new id after the fake latency.
+    """
+
+    def __init__(self, latency_scale: float):
+        self.latency_scale = latency_scale
+        self.ids = count(1)
+
+    def table(self, table_name: str) -> Any:
+        rows = []
+
+        def upsert(row: Dict[str, Any], on_conflict: Any = None) -> Any:
+            rows.append(row)
+            return query
+
+        def execute() -> Any:
+            time.sleep(FAKE_LATENCY["supabase"]["overhead"] * self.latency_scale)
+            data = [{**row, "id": next(self.ids)} for row in rows]
+            return SimpleNamespace(data=data, count=None)
+
+        query = SimpleNamespace(upsert=upsert, execute=execute)
+        return query
+
+
+def make_pages(input_dir: Path, num_pages: int) -> None:
+    """Writes num_pages distinct page images into input_dir."""
+    for page_number in range(1, num_pages + 1):
+        image = Image.new("L", (400, 560), 255)
+        ImageDraw.Draw(image).text((40, 40 + page_number), f"Page {page_number}", fill=0)
+        image.save(input_dir / f"exam-{page_number}.png")
+
+
+def run_flow(input_dir: Path, batch_size: int) -> Dict[str, int]:
+    """
+    Runs select_file, ocr_batch, structure_batch and save_test_set over every page.
+
+    Args:
+        input_dir (Path): Folder of page images.
+        batch_size (int): Pages per select_file batch and per model request.
+
+    Returns:
+        Dict[str, int]: Number of pages saved and failed.
+    """
+    tool_context = BenchToolContext()
+    page_paths = sorted(path for path in input_dir.iterdir() if path.suffix.lower() in PAGE_EXTENSIONS)
+    tool_context.state["files"] = dict.fromkeys(map(str, page_paths), "")
+
+    while True:
+        select_file(tool_context, batch_size)
+        if tool_context.escalate:
+            break
+        asyncio.run(ocr_batch(tool_context, batch_size))
+        asyncio.run(structure_batch(tool_context, batch_size))
+
+        selected = set(tool_context.state["file_paths_to_process"])
+        for file_path, test_set in tool_context.state.get("structure_results", {}).items():
+            if file_path in selected:
+                tool_context.state["file_paths_to_process"] = [file_path]
+                save_test_set(test_set, tool_context)
+
+    statuses = list(tool_context.state["files"].values())
+    return {"done": statuses.count("done"), "failed": statuses.count("failed")}
+
+
+def record_synthetic(
+    input_dir: Path, cassette_path: Path, batch_size: int, latency_scale: float
+) -> None:
+    """Records a run of the flow against the fake endpoints."""
+    cassette = Cassette(cassette_path, mode=SERVICE_CASSETTE_MODE_RECORD)
+    fake_models = FakeModels(latency_scale)
+    fake_supabase = FakeSupabase(latency_scale)
+
+    def genai_client() -> StandInGenaiClient:
+        fake_client = SimpleNamespace(models=None, aio=SimpleNamespace(models=fake_models))
+        return StandInGenaiClient(cassette, fake_client)
+
+    def supabase_client() -> StandInSupabaseClient:
+        return StandInSupabaseClient(cassette, fake_supabase)
+
+    live_clients = (batch_pages.get_genai_client, database_tools.get_supabase_client)
+    batch_pages.get_genai_client = genai_client
+    database_tools.get_supabase_client = supabase_client
+    try:
+        run_flow(input_dir, batch_size)
+    finally:
+        batch_pages.get_genai_client, database_tools.get_supabase_client = live_clients
+
+
+def main(
+    input_dir: Path,
+    cassette_path: Path,
+    batch_size: int,
+    latency_scales: List[float],
+    error_rates: List[float],
+    error_code: int,
+    record: bool,
+) -> None:
+    """
+    Optionally records the cassette, then replays the flow for each setting and prints a table.
+
+    Args:
+        input_dir (Path): Folder of page images.
+        cassette_path (Path): The cassette file.
+        batch_size (int): Pages per batch.
+        latency_scales (List[float]): Replay latency scales to benchmark.
+        error_rates (List[float]): Injected error rates to benchmark.
+        error_code (int): HTTP status of injected errors (429 exercises the retry path).
+        record (bool): Whether to record the cassette from the live services first.
+    """
+    if record:
+        os.environ["SERVICE_CASSETTE_MODE"] = SERVICE_CASSETTE_MODE_RECORD
+        os.environ["SERVICE_CASSETTE_PATH"] = str(cassette_path)
+        reset_service_cassettes()
+        start = time.perf_counter()
+        outcome = run_flow(input_dir, batch_size)
+        print(f"recorded {outcome} in {time.perf_counter() - start:.1f} s to {cassette_path}")
+
+    print(
+        f"{'latency x':>9} {'error rate':>10} {'seconds':>8} {'pages/s':>8} "
+        f"{'done':>5} {'failed':>6}"
+    )
+    for latency_scale in latency_scales:
+        for error_rate in error_rates:
+            os.environ.update(
+                SERVICE_CASSETTE_MODE=SERVICE_CASSETTE_MODE_REPLAY,
+                SERVICE_CASSETTE_PATH=str(cassette_path),
+                REPLAY_LATENCY_SCALE=str(latency_scale),
+                REPLAY_ERROR_RATE=str(error_rate),
+                REPLAY_ERROR_CODE=str(error_code),
+            )
+            reset_service_cassettes()
+            start = time.perf_counter()
+            outcome = run_flow(input_dir, batch_size)
+            seconds = time.perf_counter() - start
+            pages = outcome["done"] + outcome["failed"]
+            print(
+                f"{latency_scale:>9.2f} {error_rate:>10.2f} {seconds:>8.2f} "
+                f"{pages / seconds:>8.1f} {outcome['done']:>5} {outcome['failed']:>6}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--input-dir", type=Path)
+    parser.add_argument("--cassette", type=Path)
+    parser.add_argument("--record", action="store_true")
+    parser.add_argument("--synthetic", type=int, default=0, metavar="PAGES")
+    parser.add_argument("--fake-latency-scale", type=float, default=0.05)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--latency-scales", type=float, nargs="+", default=[1.0, 0.5, 0.0])
+    parser.add_argument("--error-rates", type=float, nargs="+", default=[0.0, 0.05])
+    parser.add_argument("--error-code", type=int, default=429)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["ARTIFACT_STORE_DIR"] = str(Path(tmp_dir) / "artifacts")
+        os.environ["FILE_LEDGER_PATH"] = ""
+        input_dir, cassette_path = args.input_dir, args.cassette
+        if args.synthetic:
+            input_dir = input_dir or Path(tmp_dir) / "pages"
+            input_dir.mkdir(parents=True, exist_ok=True)
+            cassette_path = cassette_path or Path(tmp_dir) / "services.jsonl"
+            make_pages(input_dir, args.synthetic)
+            record_synthetic(input_dir, cassette_path, args.batch_size, args.fake_latency_scale)
+        if input_dir is None or cassette_path is None:
+            parser.error("--input-dir and --cassette are required without --synthetic")
+
+        main(
+            input_dir,
+            cassette_path,
+            args.batch_size,
+            args.latency_scales,
+            args.error_rates,
+            args.error_code,
+            args.record,
+        )
@@ -0,0 +1,116 @@
+"""
+Benchmark for select_file selection cost as the file queue grows.
+
+Fills state["files"] with N small page files and times select_file across the whole run,
+comparing against the previous linear scan of state["files"]. With the status-bucketed
+queue the per-selection cost should stay flat as N grows; what remains is hashing the
+claimed page (artifacts are only stored when a stage loads them).
+
+With --session-copies, state["files"] and state["file_info"] are replaced by deep copies
+before every call, as a session service does when it loads the session (once per run, in
+practice), so select_file has to build a queue for each new map. This is the worst case:
+a queue is only reused for the map object it indexes, so every copy costs an O(N) build.
+
+Usage:
+    python -m benchmarks.bench_select_file --sizes 500 1000 2000 5000
+    python -m benchmarks.bench_select_file --session-copies
+"""
+
+import argparse
+import copy
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from questions_extractor_agent.tools.select_file import select_file
+
+
+class BenchToolContext:
+    """
+    Minimal stand-in for ToolContext that carries state and a no-op artifact store.
+    """
+
+    def __init__(self):
+        self.state: Dict[str, Any] = {}
+        self.actions = self
+
+    def save_artifact(self, name: str, content: Any) -> int:
+        return 1
+
+
+def _linear_scan_select(files: Dict[str, str]) -> str:
+    """The previous selection strategy: scan state["files"] from the start."""
+    for file_path, status in files.items():
+        if status == "":
+            files[file_path] = "in-progress"
+            return file_path
+    return ""
+
+
+def bench_size(num_files: int, input_dir: Path, session_copies: bool) -> Dict[str, float]:
+    """
+    Selects every file of an N-file queue with select_file and with the linear scan.
+
+    Args:
+        num_files (int): Number of queued pages.
+        input_dir (Path): Directory the page files are written to.
+        session_copies (bool): Whether to copy the file maps before every select_file call.
+
+    Returns:
+        Dict[str, float]: Mean microseconds per selection for both strategies.
+    """
+    paths = []
+    for i in range(num_files):
+        page = input_dir / f"exam-{num_files}-{i}.jpg"
+        page.write_bytes(f"page {i} of {num_files}".encode())
+        paths.append(str(page))
+
+    tool_context = BenchToolContext()
+    tool_context.state["files"] = dict.fromkeys(paths, "")
+    tool_context.state["file_info"] = {}
+    queue_seconds = 0.0
+    for _ in range(num_files):
+        if session_copies:
+            for key in ("files", "file_info"):
+                tool_context.state[key] = copy.deepcopy(tool_context.state[key])
+        start = time.perf_counter()
+        select_file(tool_context)
+        queue_seconds += time.perf_counter() - start
+
+    files = dict.fromkeys(paths, "")
+    start = time.perf_counter()
+    for _ in range(num_files):
+        _linear_scan_select(files)
+    scan_seconds = time.perf_counter() - start
+
+    return {
+        "queue_us": queue_seconds / num_files * 1e6,
+        "scan_us": scan_seconds / num_files * 1e6,
+    }
+
+
+def main(sizes: List[int], session_copies: bool) -> None:
+    """
+    Runs the benchmark for each queue size and prints a table.
+
+    Args:
+        sizes (List[int]): Queue sizes to benchmark.
+        session_copies (bool): Whether to copy the file maps before every select_file call.
+    """
+    print(f"{'files':>8} {'select_file us/call':>20} {'linear scan us/call':>20}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["ARTIFACT_STORE_DIR"] = str(Path(tmp_dir) / "artifacts")
+        os.environ["FILE_LEDGER_PATH"] = ""
+        for num_files in sizes:
+            result = bench_size(num_files, Path(tmp_dir), session_copies)
+            print(f"{num_files:>8} {result['queue_us']:>20.1f} {result['scan_us']:>20.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000, 5000])
+    parser.add_argument("--session-copies", action="store_true")
+    args = parser.parse_args()
+    main(args.sizes, args.session_copies)
@@ -0,0 +1,107 @@
+"""
+Benchmark for split_pdf_pages rasterization throughput.
+
+Builds a synthetic multi-page PDF with reportlab and reports pages per second for
+each worker count, against the roadmap target of any 100-page PDF split within 60 s.
+
+Usage:
+    python -m benchmarks.bench_split_pdf_pages --pages 100 --workers 1 2 4
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from questions_extractor_agent.tools.split_pdf_pages import split_pdf_pages
+
+# Roadmap Week 4 target: any 100-page PDF split within 60 s
+TARGET_SECONDS_PER_100_PAGES = 60.0
+
+
+class BenchToolContext:
+    """
+    Minimal stand-in for ToolContext that only carries state.
+    """
+
+    def __init__(self):
+        self.state: Dict[str, Any] = {}
+
+
+def build_synthetic_pdf(file_path: Path, num_pages: int) -> None:
+    """
+    Writes a PDF with `num_pages` text-heavy pages resembling a TOEIC Part 5 sheet.
+
+    Args:
+        file_path (Path): Where to write the PDF.
+        num_pages (int): Number of pages to generate.
+    """
+    c = canvas.Canvas(str(file_path), pagesize=letter)
+    for page in range(num_pages):
+        y = 740
+        for question in range(10):
+            number = 101 + page * 10 + question
+            c.drawString(60, y, f"{number}. The manager asked the team to ------- the report.")
+            y -= 18
+            for label in "ABCD":
+                c.drawString(80, y, f"({label}) option {label.lower()}")
+                y -= 14
+        c.showPage()
+    c.save()
+
+
+def run(num_pages: int, worker_counts: List[int]) -> None:
+    """
+    Splits the synthetic PDF once per worker count and prints the throughput.
+
+    Args:
+        num_pages (int): Number of pages in the synthetic PDF.
+        worker_counts (List[int]): Worker counts to benchmark.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = Path(temp_dir) / "bench.pdf"
+        build_synthetic_pdf(pdf_path, num_pages)
+
+        print(f"pages={num_pages} cpu_count={os.cpu_count()}")
+        print(f"{'workers':>8} {'seconds':>9} {'pages/s':>9} {'100p est. (s)':>14}")
+        for workers in worker_counts:
+            # A fresh render cache per run, so every worker count renders every page
+            os.environ["RENDER_CACHE_DIR"] = str(Path(temp_dir) / f"render-cache-{workers}")
+            tool_context = BenchToolContext()
+            start = time.perf_counter()
+            result = split_pdf_pages(str(pdf_path), tool_context, workers=workers)
+            elapsed = time.perf_counter() - start
+
+            if result["status"] != "success":
+                print(f"{workers:>8} error: {result['message']}")
+                continue
+
+            pages_per_second = len(result["files"]) / elapsed
+            per_100_pages = 100 / pages_per_second
+            verdict = "ok" if per_100_pages <= TARGET_SECONDS_PER_100_PAGES else "SLOW"
+            print(
+                f"{workers:>8} {elapsed:>9.2f} {pages_per_second:>9.2f} "
+                f"{per_100_pages:>14.1f} {verdict}"
+            )
+
+            # Remove the generated JPEGs so every run starts from the same state
+            for file_path in result["files"]:
+                os.remove(file_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+    )
+    args = parser.parse_args()
+    run(args.pages, args.workers)
@@ -0,0 +1,242 @@
+"""
+Comparison of the fused structure-and-tag stage against separate structuring and tagging.
+
+Runs a folder of page texts (OCR output or text-layer .txt files) through both paths at
+--batch-size pages per request: structure_pages then tag_pages, which re-sends every test
+set to the tagging model, and structure_and_tag_pages, one Pro request per batch. Reports
+per path the wall time per page, the model requests and tokens (from each response's
+usage_metadata), and how well the fused tags agree with the two-stage tags: per question,
+the Jaccard similarity of the two tag sets and the share of questions with the same tags.
+
+The Gemini client is get_genai_client(), so a service cassette replays recorded calls
+(see utils.record_replay). --fake answers from an in-process fake with simulated
+latencies and token counts instead, so the harness also runs without credentials.
+
+Usage:
+    python -m benchmarks.compare_fused_stage --input-dir output/exam --batch-size 2
+    python -m benchmarks.compare_fused_stage --fake 12
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Set, Tuple
+
+from google.genai import types
+
+from questions_extractor_agent.batching import (
+    structure_and_tag_pages,
+    structure_pages,
+    tag_pages,
+)
+from utils.genai import get_genai_client
+from utils.model_executor import ModelCallExecutor
+
+QUESTIONS_PER_PAGE = 5
+TAG_LEVELS = ["Grammar", "Vocabulary", "Reading"]
+
+# Simulated latency of the fake Pro requests (seconds, before --fake-latency-scale)
+FAKE_LATENCY = {"overhead": 6.0, "per_page": 2.0}
+
+
+class TokenCountingModels:
+    """
+    Wraps client.aio.models and sums the requests and tokens of its responses.
+    """
+
+    def __init__(self, models: Any):
+        self.models = models
+        self.requests = 0
+        self.tokens = 0
+
+    async def generate_content(self, model: str, contents: List[types.Part], config: Any) -> Any:
+        response = await self.models.generate_content(
+            model=model, contents=contents, config=config
+        )
+        self.requests += 1
+        usage = getattr(response, "usage_metadata", None)
+        self.tokens += getattr(usage, "total_token_count", None) or 0
+        return response
+
+
+class FakeProModels:
+    """
+    Fake client.aio.models answering structuring, tagging and fused requests.
+
+    Each page becomes QUESTIONS_PER_PAGE questions, tagged by question number. Requests
+    take the overhead plus a per-page latency, and count a token per 4 characters sent
+    and returned.
+    """
+
+    def __init__(self, latency_scale: float):
+        self.latency_scale = latency_scale
+
+    async def generate_content(self, model: str, contents: List[types.Part], config: Any) -> Any:
+        pages = []
+        for part in contents[1:]:
+            marker, body = part.text.split("\n", 1)
+            page_index = int(marker[5:-1])
+            schema = config.response_schema.__name__
+            if schema == "BatchTaggedResponse":
+                pages.append({"page_index": page_index, "test_set": _tag(_structure(body))})
+            elif contents[0].text.startswith("Structure"):
+                test_set_json = json.dumps(_structure(body))
+                pages.append({"page_index": page_index, "test_set_json": test_set_json})
+            else:
+                test_set_json = json.dumps(_tag(json.loads(body)))
+                pages.append({"page_index": page_index, "test_set_json": test_set_json})
+
+        latency = FAKE_LATENCY["overhead"] + FAKE_LATENCY["per_page"] * len(pages)
+        await asyncio.sleep(latency * self.latency_scale)
+        text = json.dumps({"pages": pages})
+        sent = sum(len(part.text or "") for part in contents)
+        usage = SimpleNamespace(total_token_count=(sent + len(text)) // 4)
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+
+def _structure(text: str) -> Dict[str, Any]:
+    return {
+        "test_forms": [{"name": text[:40]}],
+        "questions": [
+            {"part_label": "Part 5", "number": number, "stem": text[:80]}
+            for number in range(101, 101 + QUESTIONS_PER_PAGE)
+        ],
+    }
+
+
+def _tag(test_set: Dict[str, Any]) -> Dict[str, Any]:
+    question_tags = []
+    for question in test_set.get("questions", []):
+        level1 = TAG_LEVELS[question["number"] % len(TAG_LEVELS)]
+        question_tags.append(
+            {
+                "question_key": f"{question['part_label']}_{question['number']}",
+                "tag_key": f"{level1}__",
+            }
+        )
+    tags = [{"level1": level1} for level1 in TAG_LEVELS]
+    return {**test_set, "tags": tags, "question_tags": question_tags}
+
+
+def question_tag_sets(test_set: Dict[str, Any]) -> Dict[str, Set[str]]:
+    """
+    Collects the tags of each question of a tagged test set.
+
+    Args:
+        test_set (Dict[str, Any]): A tagged test set, linked by question_key and tag_key or
+                                   by question_id and tag_id.
+
+    Returns:
+        Dict[str, Set[str]]: Tag keys per question key.
+    """
+    tag_keys = {
+        str(index): "_".join(tag.get(level) or "" for level in ("level1", "level2", "level3"))
+        for index, tag in enumerate(test_set.get("tags", []), start=1)
+    }
+    tags: Dict[str, Set[str]] = {}
+    for row in test_set.get("question_tags", []):
+        question = row.get("question_key") or str(row.get("question_id"))
+        tag = row.get("tag_key") or tag_keys.get(str(row.get("tag_id")), "")
+        tags.setdefault(question, set()).add(tag)
+    return tags
+
+
+def tag_agreement(
+    reference: Dict[str, Dict[str, Any]], candidate: Dict[str, Dict[str, Any]]
+) -> Tuple[float, float]:
+    """
+    Compares the question tags of two sets of tagged test sets.
+
+    Args:
+        reference (Dict[str, Dict[str, Any]]): Tagged test set per page (two-stage path).
+        candidate (Dict[str, Dict[str, Any]]): Tagged test set per page (fused path).
+
+    Returns:
+        Tuple[float, float]: Mean Jaccard similarity of the tag sets per question, and the
+                             share of questions with identical tags.
+    """
+    scores = []
+    for page, test_set in reference.items():
+        candidate_tags = question_tag_sets(candidate.get(page, {}))
+        for question, tags in question_tag_sets(test_set).items():
+            other = candidate_tags.get(question, set())
+            scores.append(len(tags & other) / len(tags | other) if tags | other else 1.0)
+    if not scores:
+        return 0.0, 0.0
+    return statistics.mean(scores), sum(score == 1.0 for score in scores) / len(scores)
+
+
+async def _two_stage(
+    executor: ModelCallExecutor, client: Any, texts: Dict[str, str], batch_size: int
+) -> Dict[str, Dict[str, Any]]:
+    test_sets, _ = await structure_pages(executor, client, texts, batch_size)
+    tagged, _ = await tag_pages(executor, client, test_sets, batch_size)
+    return tagged
+
+
+async def _fused(
+    executor: ModelCallExecutor, client: Any, texts: Dict[str, str], batch_size: int
+) -> Dict[str, Dict[str, Any]]:
+    tagged, _ = await structure_and_tag_pages(executor, client, texts, batch_size)
+    return tagged
+
+
+def main(texts: Dict[str, str], batch_size: int, client: Any) -> None:
+    """
+    Runs both paths over the page texts and prints the comparison.
+
+    Args:
+        texts (Dict[str, str]): Text per page name.
+        batch_size (int): Pages per request.
+        client (Any): A google.genai.Client (or stand-in).
+    """
+    runs = {}
+    for name, path in (("structure + tag", _two_stage), ("fused", _fused)):
+        models = TokenCountingModels(client.aio.models)
+        counted = SimpleNamespace(aio=SimpleNamespace(models=models))
+        start = time.perf_counter()
+        tagged = asyncio.run(path(ModelCallExecutor(limits={}), counted, texts, batch_size))
+        seconds = time.perf_counter() - start
+        runs[name] = (tagged, seconds, models)
+
+    num_pages = len(texts)
+    print(f"{num_pages} pages, {batch_size} pages/request")
+    print(f"{'path':>16} {'s/page':>8} {'requests':>9} {'tokens/page':>12} {'tagged':>7}")
+    for name, (tagged, seconds, models) in runs.items():
+        print(
+            f"{name:>16} {seconds / num_pages:>8.2f} {models.requests:>9} "
+            f"{models.tokens / num_pages:>12.0f} {len(tagged):>7}"
+        )
+    jaccard, exact = tag_agreement(runs["structure + tag"][0], runs["fused"][0])
+    print(f"tag agreement: Jaccard {jaccard:.2f}, identical tags {exact:.0%} of questions")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--input-dir", type=Path)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--fake", type=int, default=0, metavar="PAGES")
+    parser.add_argument("--fake-latency-scale", type=float, default=0.05)
+    args = parser.parse_args()
+
+    if args.fake:
+        page_texts = {
+            f"exam-{page}.txt": f"Page {page} questions 101-{100 + QUESTIONS_PER_PAGE}"
+            for page in range(1, args.fake + 1)
+        }
+        genai_client = SimpleNamespace(
+            aio=SimpleNamespace(models=FakeProModels(args.fake_latency_scale))
+        )
+    else:
+        if args.input_dir is None:
+            parser.error("--input-dir is required without --fake")
+        page_texts = {
+            path.name: path.read_text(encoding="utf-8")
+            for path in sorted(args.input_dir.glob("*.txt"))
+        }
+        genai_client = get_genai_client()
+    main(page_texts, args.batch_size, genai_client)
@@ -0,0 +1,219 @@
+"""
+Disk-backed artifact service for the questions_extractor_agent pipeline.
+
+ADK's InMemoryArtifactService keeps every saved Part, page images included, resident for
+the whole session. LocalArtifactService keeps artifact payloads on disk instead: inline
+data is written once to the content-addressed ArtifactStore and each artifact version is
+a small JSON record pointing at its blob. Only a bounded LRU of recently loaded artifacts
+is held in RAM. load_artifact() returns the inline Part ADK expects, which holds a copy of
+the payload; open_artifact() maps the payload instead, for readers that only scan it.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+from google.adk.artifacts.base_artifact_service import BaseArtifactService
+from google.genai import types
+
+from utils.artifact_store import ArtifactStore, get_artifact_store
+from utils.paths import PROJECT_ROOT
+
+DEFAULT_ARTIFACT_SERVICE_DIR = PROJECT_ROOT / ".cache" / "artifact_service"
+DEFAULT_MAX_HOT_BYTES = 64 * 1024 * 1024  # 64 MB
+
+
+class LocalArtifactService(BaseArtifactService):
+    """
+    Artifact service that stores versions on disk and caches a bounded hot set in memory.
+    """
+
+    def __init__(
+        self,
+        root_dir: Union[str, Path] = DEFAULT_ARTIFACT_SERVICE_DIR,
+        store: Optional[ArtifactStore] = None,
+        max_hot_bytes: int = DEFAULT_MAX_HOT_BYTES,
+    ):
+        """
+        Args:
+            root_dir: Directory that holds the artifact version records.
+            store: Blob store for the payloads; defaults to get_artifact_store().
+            max_hot_bytes: Total payload size of the loaded artifacts kept in memory.
+        """
+        self.root_dir = Path(root_dir)
+        self.store = store or get_artifact_store()
+        self.max_hot_bytes = max_hot_bytes
+
+        # (artifact dir, version) -> (Part, payload bytes), least recently used first
+        self._hot: "OrderedDict[Tuple[str, int], Tuple[types.Part, int]]" = OrderedDict()
+        self._hot_bytes = 0
+        self._lock = threading.Lock()
+
+    def _artifact_dir(self, app_name: str, user_id: str, session_id: str, filename: str) -> Path:
+        """Returns the directory holding an artifact's versions (user: names are per user)."""
+        if filename.startswith("user:"):
+            return self.root_dir / app_name / user_id / "user" / filename
+        return self.root_dir / app_name / user_id / session_id / filename
+
+    @staticmethod
+    def _versions(artifact_dir: Path) -> List[int]:
+        """Returns the stored versions of an artifact in ascending order."""
+        if not artifact_dir.is_dir():
+            return []
+        return sorted(int(path.stem) for path in artifact_dir.glob("*.json"))
+
+    def _remember(self, key: Tuple[str, int], part: types.Part, size: int) -> None:
+        """Adds a loaded artifact to the hot set and evicts beyond max_hot_bytes."""
+        if size > self.max_hot_bytes:
+            return
+        with self._lock:
+            if key in self._hot:
+                return
+            self._hot[key] = (part, size)
+            self._hot_bytes += size
+            while self._hot_bytes > self.max_hot_bytes:
+                _, (_, evicted_size) = self._hot.popitem(last=False)
+                self._hot_bytes -= evicted_size
+
+    def _forget(self, artifact_dir: Path) -> None:
+        """Drops every hot-set entry of an artifact."""
+        with self._lock:
+            for key in [key for key in self._hot if key[0] == str(artifact_dir)]:
+                _, size = self._hot.pop(key)
+                self._hot_bytes -= size
+
+    def save_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        artifact: types.Part,
+    ) -> int:
+        artifact_dir = self._artifact_dir(app_name, user_id, session_id, filename)
+        artifact_dir.mkdir(parents=True, exist_ok=True)
+
+        # Payloads go to the blob store; the record keeps the rest of the Part
+        if artifact.inline_data is not None and artifact.inline_data.data is not None:
+            digest, _ = self.store.put_bytes(artifact.inline_data.data)
+            record = {"blob": digest, "mime_type": artifact.inline_data.mime_type}
+        else:
+            record = {"part": artifact.model_dump(mode="json", exclude_none=True)}
+
+        with self._lock:
+            versions = self._versions(artifact_dir)
+            version = versions[-1] + 1 if versions else 0
+            fd, staging_path = tempfile.mkstemp(dir=artifact_dir, prefix=".staging-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(record, f)
+            os.replace(staging_path, artifact_dir / f"{version}.json")
+        return version
+
+    def _read_record(
+        self, app_name: str, user_id: str, session_id: str, filename: str, version: Optional[int]
+    ) -> Optional[Tuple[Tuple[str, int], dict]]:
+        """Returns the hot-set key and the stored record of an artifact version."""
+        artifact_dir = self._artifact_dir(app_name, user_id, session_id, filename)
+        if version is None:
+            versions = self._versions(artifact_dir)
+            if not versions:
+                return None
+            version = versions[-1]
+
+        record_path = artifact_dir / f"{version}.json"
+        if not record_path.is_file():
+            return None
+        with open(record_path, encoding="utf-8") as f:
+            return (str(artifact_dir), version), json.load(f)
+
+    def load_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        version: Optional[int] = None,
+    ) -> Optional[types.Part]:
+        found = self._read_record(app_name, user_id, session_id, filename, version)
+        if found is None:
+            return None
+        key, record = found
+
+        with self._lock:
+            if key in self._hot:
+                self._hot.move_to_end(key)
+                return self._hot[key][0]
+
+        if "blob" not in record:
+            part = types.Part.model_validate(record["part"])
+            self._remember(key, part, 0)
+            return part
+
+        data = self.store.read(record["blob"])
+        part = types.Part(inline_data=types.Blob(data=data, mime_type=record["mime_type"]))
+        self._remember(key, part, len(data))
+        return part
+
+    @contextmanager
+    def open_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        version: Optional[int] = None,
+    ) -> Iterator[Optional[memoryview]]:
+        """
+        Maps an artifact's payload into memory as a zero-copy buffer.
+
+        The mapping is closed when the with block exits.
+
+        Args:
+            app_name: The app name.
+            user_id: The user ID.
+            session_id: The session ID.
+            filename: The filename of the artifact.
+            version: The version to open; the latest if None.
+
+        Yields:
+            Optional[memoryview]: The payload, or None if the artifact does not exist or has
+                                  no binary payload.
+        """
+        found = self._read_record(app_name, user_id, session_id, filename, version)
+        if found is None or "blob" not in found[1]:
+            yield None
+            return
+        with self.store.open(found[1]["blob"]) as view:
+            yield view
+
+    def list_artifact_keys(self, *, app_name: str, user_id: str, session_id: str) -> List[str]:
+        filenames = []
+        for scope_dir in (
+            self.root_dir / app_name / user_id / session_id,
+            self.root_dir / app_name / user_id / "user",
+        ):
+            if scope_dir.is_dir():
+                filenames.extend(path.name for path in scope_dir.iterdir() if path.is_dir())
+        return sorted(filenames)
+
+    def delete_artifact(
+        self, *, app_name: str, user_id: str, session_id: str, filename: str
+    ) -> None:
+        # Blobs are shared between artifacts and are left in the store
+        artifact_dir = self._artifact_dir(app_name, user_id, session_id, filename)
+        self._forget(artifact_dir)
+        shutil.rmtree(artifact_dir, ignore_errors=True)
+
+    def list_versions(
+        self, *, app_name: str, user_id: str, session_id: str, filename: str
+    ) -> List[int]:
+        return self._versions(self._artifact_dir(app_name, user_id, session_id, filename))
@@ -0,0 +1,430 @@
+"""
+Multi-page batched Gemini requests for the questions_extractor_agent pipeline.
+
+Every model call carries a fixed cost (request setup, queueing, time to first token) that
+dominates on small pages such as a single Part 5 scan. Batching packs several page images
+(OCR), several OCR texts (structuring, or structuring and tagging fused) or several test
+sets (tagging) into one structured-output request. Each page is
+introduced by a "Page {i}" marker and the response schema returns one entry per page_index,
+so the results are split back out and attributed to the file they came from. Pages missing
+from a batch response are retried on their own.
+
+Requests go through ModelCallExecutor (see utils.model_executor), so batches of one model
+run concurrently within its rate limits.
+"""
+
+import asyncio
+import json
+from typing import Any, Callable, Dict, List, Sequence, Tuple, Type
+
+from google.genai import types
+from pydantic import BaseModel, Field, ValidationError
+
+from questions_extractor_agent.schemas import BatchTaggedResponse
+from utils.model_executor import ModelCallExecutor
+from utils.rate_limiter import estimate_request_tokens
+
+DEFAULT_PAGE_BATCH_SIZE = 4
+
+OCR_MODEL = "gemini-2.5-flash-preview-05-20"
+STRUCTURE_MODEL = "gemini-2.5-pro-preview-05-06"
+TAG_MODEL = "gemini-2.5-pro-preview-05-06"
+
+# Response budget per page
+OCR_OUTPUT_TOKENS_PER_PAGE = 1024
+STRUCTURE_OUTPUT_TOKENS_PER_PAGE = 4096
+TAG_OUTPUT_TOKENS_PER_PAGE = 4096
+FUSED_OUTPUT_TOKENS_PER_PAGE = 6144
+
+OCR_PROMPT = (
+    "Transcribe the text of each page image below exactly as printed, keeping question "
+    "numbers, blanks and choice labels. Return one entry per page with its page_index."
+)
+STRUCTURE_PROMPT = (
+    "Structure the test questions of each page text below into a test set with the tables "
+    "test_forms, sections, parts, passage_sets, passages, questions and choices. Return one "
+    "entry per page with its page_index and the test set as a JSON object string."
+)
+TAG_PROMPT = (
+    "Tag the questions of each test set below with their skills. Add the tables tags "
+    "(level1, level2, level3) and question_tags to the test set and keep every other table "
+    "unchanged. Return one entry per page with its page_index and the tagged test set as a "
+    "JSON object string."
+)
+FUSED_PROMPT = (
+    "Structure the test questions of each page text below into a test set and tag each "
+    "question with its skills in the same answer: fill test_forms, sections, parts, "
+    "passage_sets, passages, questions and choices, plus tags (level1, level2, level3) and "
+    "question_tags linking every question to its tags. Return one entry per page with its "
+    "page_index and the tagged test set."
+)
+
+
+class PageText(BaseModel):
+    page_index: int = Field(..., description="Index of the page in the request (0-based)")
+    text: str = Field(..., description="Verbatim text of the page")
+
+
+class BatchOcrResponse(BaseModel):
+    pages: List[PageText] = Field(..., description="One entry per page image")
+
+
+class PageTestSet(BaseModel):
+    page_index: int = Field(..., description="Index of the page in the request (0-based)")
+    test_set_json: str = Field(
+        ..., description="The page's test set as a JSON object (tables as keys, rows as lists)"
+    )
+
+
+class BatchStructureResponse(BaseModel):
+    pages: List[PageTestSet] = Field(..., description="One entry per page text")
+
+
+def chunk(items: Sequence[Any], batch_size: int) -> List[Sequence[Any]]:
+    """
+    Splits items into consecutive batches of at most batch_size.
+
+    Args:
+        items (Sequence[Any]): Items in order.
+        batch_size (int): Maximum batch size (at least 1).
+
+    Returns:
+        List[Sequence[Any]]: The batches in order.
+    """
+    batch_size = max(batch_size, 1)
+    return [items[start : start + batch_size] for start in range(0, len(items), batch_size)]
+
+
+def build_ocr_contents(images: Sequence[types.Part]) -> List[types.Part]:
+    """
+    Builds the contents of a batched OCR request.
+
+    Args:
+        images (Sequence[types.Part]): One inline image Part per page.
+
+    Returns:
+        List[types.Part]: The prompt, then a "Page {i}" marker before each image.
+    """
+    contents = [types.Part(text=OCR_PROMPT)]
+    for page_index, image in enumerate(images):
+        contents.append(types.Part(text=f"Page {page_index}:"))
+        contents.append(image)
+    return contents
+
+
+def build_structure_contents(texts: Sequence[str]) -> List[types.Part]:
+    """
+    Builds the contents of a batched structuring request.
+
+    Args:
+        texts (Sequence[str]): One OCR text per page.
+
+    Returns:
+        List[types.Part]: The prompt, then each text under a "Page {i}" marker.
+    """
+    contents = [types.Part(text=STRUCTURE_PROMPT)]
+    for page_index, text in enumerate(texts):
+        contents.append(types.Part(text=f"Page {page_index}:\n{text}"))
+    return contents
+
+
+def build_fused_contents(texts: Sequence[str]) -> List[types.Part]:
+    """
+    Builds the contents of a batched structure-and-tag request.
+
+    Args:
+        texts (Sequence[str]): One OCR text per page.
+
+    Returns:
+        List[types.Part]: The prompt, then each text under a "Page {i}" marker.
+    """
+    contents = [types.Part(text=FUSED_PROMPT)]
+    for page_index, text in enumerate(texts):
+        contents.append(types.Part(text=f"Page {page_index}:\n{text}"))
+    return contents
+
+
+def build_tag_contents(test_sets: Sequence[Dict[str, Any]]) -> List[types.Part]:
+    """
+    Builds the contents of a batched tagging request.
+
+    Args:
+        test_sets (Sequence[Dict[str, Any]]): One structured test set per page.
+
+    Returns:
+        List[types.Part]: The prompt, then each test set as JSON under a "Page {i}" marker.
+    """
+    contents = [types.Part(text=TAG_PROMPT)]
+    for page_index, test_set in enumerate(test_sets):
+        contents.append(types.Part(text=f"Page {page_index}:\n{json.dumps(test_set)}"))
+    return contents
+
+
+def split_batch_response(
+    response_text: str, num_pages: int, schema: Type[BaseModel], field: str
+) -> Dict[int, Any]:
+    """
+    Splits a batched structured-output response into per-page results.
+
+    Args:
+        response_text (str): The response JSON.
+        num_pages (int): Number of pages in the request.
+        schema (Type[BaseModel]): The response schema (e.g. BatchOcrResponse).
+        field (str): The per-page result field ("text", "test_set_json" or "test_set").
+
+    Returns:
+        Dict[int, Any]: Result per page_index. Indexes outside the request are dropped, and
+                        for a repeated index the first entry wins. Unparseable responses
+                        yield no pages.
+    """
+    try:
+        parsed = schema.model_validate_json(response_text or "")
+    except ValidationError:
+        return {}
+
+    results = {}
+    for page in parsed.pages:
+        if 0 <= page.page_index < num_pages and page.page_index not in results:
+            results[page.page_index] = getattr(page, field)
+    return results
+
+
+async def _run_batches(
+    executor: ModelCallExecutor,
+    client: Any,
+    model: str,
+    pages: Dict[str, Any],
+    batch_size: int,
+    build_contents: Callable[[Sequence[Any]], List[types.Part]],
+    schema: Type[BaseModel],
+    field: str,
+    estimate_tokens: Callable[[Sequence[Any]], int],
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Sends pages in batched requests and attributes the results to their keys.
+
+    Returns:
+        Tuple[Dict[str, Any], Dict[str, str]]: Result per key, and error per key that got none.
+    """
+    config = types.GenerateContentConfig(
+        response_mime_type="application/json", response_schema=schema
+    )
+
+    async def send(batch_keys: Sequence[str]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        items = [pages[key] for key in batch_keys]
+        contents = build_contents(items)
+        try:
+            response = await executor.call(
+                model,
+                lambda: client.aio.models.generate_content(
+                    model=model, contents=contents, config=config
+                ),
+                estimate_tokens(items),
+            )
+        except Exception as e:
+            return {}, {key: str(e) for key in batch_keys}
+
+        by_index = split_batch_response(response.text, len(batch_keys), schema, field)
+        results = {batch_keys[index]: value for index, value in by_index.items()}
+        missing = {
+            key: "missing from the batch response" for key in batch_keys if key not in results
+        }
+        return results, missing
+
+    keys = list(pages)
+    batch_results = await asyncio.gather(*(send(batch) for batch in chunk(keys, batch_size)))
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    for batch_result, batch_errors in batch_results:
+        results.update(batch_result)
+        errors.update(batch_errors)
+
+    # Retry pages the model skipped or mixed up, one page per request
+    if errors and batch_size > 1:
+        retry_results = await asyncio.gather(*(send([key]) for key in errors))
+        errors = {}
+        for batch_result, batch_errors in retry_results:
+            results.update(batch_result)
+            errors.update(batch_errors)
+
+    # Keep the caller's page order
+    return {key: results[key] for key in keys if key in results}, errors
+
+
+async def ocr_pages(
+    executor: ModelCallExecutor,
+    client: Any,
+    images: Dict[str, types.Part],
+    batch_size: int = DEFAULT_PAGE_BATCH_SIZE,
+    model: str = OCR_MODEL,
+) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Transcribes page images, batch_size pages per request.
+
+    Args:
+        executor (ModelCallExecutor): Executor that runs and rate-limits the requests.
+        client (Any): A google.genai.Client.
+        images (Dict[str, types.Part]): Inline image Part per page key (e.g. filename).
+        batch_size (int): Pages per request.
+        model (str): The OCR model.
+
+    Returns:
+        Tuple[Dict[str, str], Dict[str, str]]: Text per page key, and error per page key
+                                               that could not be transcribed.
+    """
+    return await _run_batches(
+        executor,
+        client,
+        model,
+        images,
+        batch_size,
+        build_ocr_contents,
+        BatchOcrResponse,
+        "text",
+        lambda items: estimate_request_tokens(
+            OCR_PROMPT,
+            num_images=len(items),
+            max_output_tokens=OCR_OUTPUT_TOKENS_PER_PAGE * len(items),
+        ),
+    )
+
+
+async def structure_pages(
+    executor: ModelCallExecutor,
+    client: Any,
+    texts: Dict[str, str],
+    batch_size: int = DEFAULT_PAGE_BATCH_SIZE,
+    model: str = STRUCTURE_MODEL,
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    """
+    Structures page texts into test sets, batch_size pages per request.
+
+    Args:
+        executor (ModelCallExecutor): Executor that runs and rate-limits the requests.
+        client (Any): A google.genai.Client.
+        texts (Dict[str, str]): OCR text per page key (e.g. filename).
+        batch_size (int): Pages per request.
+        model (str): The structuring model.
+
+    Returns:
+        Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]: Test set per page key, and error per
+                                                          page key that could not be structured.
+    """
+    test_set_json, errors = await _run_batches(
+        executor,
+        client,
+        model,
+        texts,
+        batch_size,
+        build_structure_contents,
+        BatchStructureResponse,
+        "test_set_json",
+        lambda items: estimate_request_tokens(
+            STRUCTURE_PROMPT + "".join(items),
+            max_output_tokens=STRUCTURE_OUTPUT_TOKENS_PER_PAGE * len(items),
+        ),
+    )
+
+    return _parse_test_sets(test_set_json, errors)
+
+
+async def tag_pages(
+    executor: ModelCallExecutor,
+    client: Any,
+    test_sets: Dict[str, Dict[str, Any]],
+    batch_size: int = DEFAULT_PAGE_BATCH_SIZE,
+    model: str = TAG_MODEL,
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    """
+    Adds tags and question_tags to structured test sets, batch_size pages per request.
+
+    Args:
+        executor (ModelCallExecutor): Executor that runs and rate-limits the requests.
+        client (Any): A google.genai.Client.
+        test_sets (Dict[str, Dict[str, Any]]): Test set per page key (e.g. filename).
+        batch_size (int): Pages per request.
+        model (str): The tagging model.
+
+    Returns:
+        Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]: Tagged test set per page key, and
+                                                          error per page key that could not
+                                                          be tagged.
+    """
+    test_set_json, errors = await _run_batches(
+        executor,
+        client,
+        model,
+        test_sets,
+        batch_size,
+        build_tag_contents,
+        BatchStructureResponse,
+        "test_set_json",
+        lambda items: estimate_request_tokens(
+            TAG_PROMPT + "".join(json.dumps(item) for item in items),
+            max_output_tokens=TAG_OUTPUT_TOKENS_PER_PAGE * len(items),
+        ),
+    )
+    return _parse_test_sets(test_set_json, errors)
+
+
+async def structure_and_tag_pages(
+    executor: ModelCallExecutor,
+    client: Any,
+    texts: Dict[str, str],
+    batch_size: int = DEFAULT_PAGE_BATCH_SIZE,
+    model: str = STRUCTURE_MODEL,
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    """
+    Structures page texts into tagged test sets in one request per batch, instead of a
+    structuring request followed by a tagging request that re-sends the test set.
+
+    The response schema is the combined TaggedTestSet of questions_extractor_agent.schemas.
+
+    Args:
+        executor (ModelCallExecutor): Executor that runs and rate-limits the requests.
+        client (Any): A google.genai.Client.
+        texts (Dict[str, str]): OCR text per page key (e.g. filename).
+        batch_size (int): Pages per request.
+        model (str): The structuring model.
+
+    Returns:
+        Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]: Tagged test set per page key, and
+                                                          error per page key that could not
+                                                          be structured.
+    """
+    tagged, errors = await _run_batches(
+        executor,
+        client,
+        model,
+        texts,
+        batch_size,
+        build_fused_contents,
+        BatchTaggedResponse,
+        "test_set",
+        lambda items: estimate_request_tokens(
+            FUSED_PROMPT + "".join(items),
+            max_output_tokens=FUSED_OUTPUT_TOKENS_PER_PAGE * len(items),
+        ),
+    )
+    return {key: test_set.model_dump(exclude_none=True) for key, test_set in tagged.items()}, errors
+
+
+def _parse_test_sets(
+    test_set_json: Dict[str, str], errors: Dict[str, str]
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+    """
+    Parses the test_set_json string of each page, adding an error for pages that do not
+    hold a JSON object.
+    """
+    test_sets = {}
+    for key, value in test_set_json.items():
+        try:
+            test_set = json.loads(value)
+        except json.JSONDecodeError as e:
+            errors[key] = f"test set is not valid JSON: {e}"
+            continue
+        if not isinstance(test_set, dict):
+            errors[key] = "test set is not a JSON object"
+            continue
+        test_sets[key] = test_set
+    return test_sets, errors
@@ -0,0 +1,217 @@
+"""
+Agent callbacks for the questions_extractor_agent pipeline.
+"""
+
+import json
+from typing import Any, Callable, Dict, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from questions_extractor_agent.direct_agents import extract_test_set
+from utils.genai import config_to_json
+from utils.stage_cache import StageCache, get_stage_cache, hash_value
+from utils.tag_index import get_tag_confidence_threshold, get_tag_index
+
+
+def skip_ocr_for_text_layer(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """
+    before_model_callback for extractor_agent that skips OCR for text-layer pages.
+
+    select_file sets state["ocr_skipped"] and fills state["extractor_result"] when the
+    selected page came from a PDF text layer. Returning a response here makes ADK skip
+    the extractor's model call and use the page text as its output instead.
+
+    Args:
+        callback_context (CallbackContext): ADK CallbackContext for accessing state.
+        llm_request (LlmRequest): The request that would have been sent to the model.
+
+    Returns:
+        Optional[LlmResponse]: The page text as the model response, or None to run OCR.
+    """
+    if not callback_context.state.get("ocr_skipped"):
+        return None
+
+    return LlmResponse(
+        content=types.Content(
+            role="model",
+            parts=[types.Part(text=callback_context.state.get("extractor_result", ""))],
+        )
+    )
+
+
+def skip_tagging_for_indexed_questions(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """
+    before_model_callback for tagging_agent that reuses the tags of similar saved questions.
+
+    When a tag index is configured (TAG_INDEX_PATH, see utils.tag_index) and every question
+    of state["structure_result"] has a confident suggestion, the tagged test set is returned
+    as the model response, so ADK skips the tagging model call. state["tagged_from_index"]
+    records whether the page was tagged from the index.
+
+    Args:
+        callback_context (CallbackContext): ADK CallbackContext for accessing state.
+        llm_request (LlmRequest): The request that would have been sent to the model.
+
+    Returns:
+        Optional[LlmResponse]: The tagging output, or None to call the tagging model.
+    """
+    callback_context.state["tagged_from_index"] = False
+    tag_index = get_tag_index()
+    test_set = extract_test_set(callback_context.state.get("structure_result"))
+    if tag_index is None or test_set is None:
+        return None
+
+    tagged_test_set = tag_index.tag_test_set(test_set, get_tag_confidence_threshold())
+    if tagged_test_set is None:
+        return None
+
+    callback_context.state["tagged_from_index"] = True
+    output = {"status": "success", "tagged_test_set": tagged_test_set}
+    return LlmResponse(
+        content=types.Content(role="model", parts=[types.Part(text=json.dumps(output))])
+    )
+
+
+# State key holding each stage's input; its hash is part of the stage cache key
+STAGE_INPUT_KEYS = {
+    "extractor": "content_hashes",
+    "structure": "extractor_result",
+    "tagging": "structure_result",
+}
+
+
+def chain_before_model_callbacks(
+    *callbacks: Callable[[CallbackContext, LlmRequest], Optional[LlmResponse]],
+) -> Callable[[CallbackContext, LlmRequest], Optional[LlmResponse]]:
+    """
+    Combines before_model_callbacks: the first one that returns a response wins.
+
+    Example:
+        before_model_callback=chain_before_model_callbacks(
+            skip_ocr_for_text_layer, extractor_cache.before_model
+        )
+    """
+
+    def before_model(
+        callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        for callback in callbacks:
+            response = callback(callback_context, llm_request)
+            if response is not None:
+                return response
+        return None
+
+    return before_model
+
+
+def _generation_config(llm_request: LlmRequest) -> Dict[str, Any]:
+    """Returns the parts of a request's config that affect the model output."""
+    # The system instruction is part of the config, so prompt edits change the key
+    return config_to_json(llm_request.config, exclude={"tools"})
+
+
+class StageOutputCache:
+    """
+    before/after model callbacks that memoize a stage's final model response on disk.
+
+    The key (see StageCache.make_key) is the hash of the stage input in state (see
+    STAGE_INPUT_KEYS), the model, the prompt version and the generation config, including
+    the system instruction, so editing a stage's instruction also invalidates its entries.
+    On a hit the cached response is returned before the model is called, so the stage
+    finishes (and stores its output_key) without a model call or tool round trip. Only
+    final responses are stored; function calls are not.
+
+    Usage:
+        structure_cache = StageOutputCache("structure", prompt_version="v3")
+        LlmAgent(
+            ...,
+            before_model_callback=structure_cache.before_model,
+            after_model_callback=structure_cache.after_model,
+        )
+    """
+
+    def __init__(
+        self,
+        stage: str,
+        prompt_version: str,
+        input_key: Optional[str] = None,
+        cache: Optional[StageCache] = None,
+    ):
+        """
+        Args:
+            stage: Stage name ("extractor", "structure" or "tagging").
+            prompt_version: Version of the stage's prompt; bump it to invalidate old outputs.
+            input_key: State key holding the stage input; defaults to STAGE_INPUT_KEYS[stage].
+            cache: Disk cache for the outputs; defaults to get_stage_cache().
+        """
+        self.stage = stage
+        self.prompt_version = prompt_version
+        self.input_key = input_key or STAGE_INPUT_KEYS[stage]
+        self.cache = cache or get_stage_cache()
+        self.hits = 0
+        self.misses = 0
+        # invocation id -> key of the model call in flight
+        self._pending: Dict[str, str] = {}
+
+    def make_key(self, callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[str]:
+        """
+        Builds the cache key of a model call, or None if the stage input is not in state.
+        """
+        stage_input = callback_context.state.get(self.input_key)
+        if not stage_input:
+            return None
+        return StageCache.make_key(
+            self.stage,
+            hash_value(stage_input),
+            llm_request.model or "",
+            self.prompt_version,
+            _generation_config(llm_request),
+        )
+
+    def before_model(
+        self, callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> Optional[LlmResponse]:
+        """
+        before_model_callback: returns the cached output, or None to call the model.
+        """
+        key = self.make_key(callback_context, llm_request)
+        if key is None:
+            return None
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            self._pending.pop(callback_context.invocation_id, None)
+            return LlmResponse(content=types.Content.model_validate(cached))
+
+        self.misses += 1
+        self._pending[callback_context.invocation_id] = key
+        return None
+
+    def after_model(
+        self, callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> Optional[LlmResponse]:
+        """
+        after_model_callback: stores a final response under the key of its request.
+        """
+        key = self._pending.get(callback_context.invocation_id)
+        content = llm_response.content
+        if (
+            key is None
+            or llm_response.partial
+            or llm_response.error_code
+            or content is None
+            or not content.parts
+            or any(part.function_call for part in content.parts)
+        ):
+            return None
+
+        self.cache.put(key, content.model_dump(mode="json", exclude_none=True))
+        del self._pending[callback_context.invocation_id]
+        return None
@@ -0,0 +1,141 @@
+"""
+Code-driven (non-LLM) agents for the deterministic steps of the pipeline loop.
+
+file_selector_agent and save_agent are LlmAgents whose only job is to call select_file (or
+exit_loop) and save_test_set with arguments that are already in state, which costs two
+Gemini Flash round trips per step. FileSelectorAgent and SaveAgent call the tools directly
+and are drop-in replacements inside pipeline_loop_agent: they write the same state keys
+and output keys, and FileSelectorAgent escalates when no file is left, like exit_loop.
+"""
+
+import json
+import re
+from typing import Any, AsyncGenerator, Dict, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.adk.tools import ToolContext
+from google.genai import types
+
+from questions_extractor_agent.tools.database_tools import save_test_set
+from questions_extractor_agent.tools.select_file import select_file
+from utils.scheduling import SCHEDULING_POLICY_FIFO
+
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+class _ToolActions:
+    """
+    tool_context.actions as the pipeline tools use it: the ADK EventActions (escalate,
+    state_delta ...) plus save_artifact and load_artifact of the ToolContext.
+    """
+
+    def __init__(self, tool_context: ToolContext):
+        object.__setattr__(self, "_tool_context", tool_context)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._tool_context.actions, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._tool_context.actions, name, value)
+
+    def save_artifact(self, name: str, content: types.Part) -> int:
+        return self._tool_context.save_artifact(name, content)
+
+    def load_artifact(self, name: str) -> Optional[types.Part]:
+        return self._tool_context.load_artifact(name)
+
+
+class _DirectToolContext:
+    """
+    The context the tools receive when an agent calls them without a model.
+    """
+
+    def __init__(self, ctx: InvocationContext):
+        self.tool_context = ToolContext(ctx)
+        self.state = self.tool_context.state
+        self.actions = _ToolActions(self.tool_context)
+
+
+def _event(
+    agent: BaseAgent, ctx: InvocationContext, tool_context: _DirectToolContext, result: Any
+) -> Event:
+    """Builds the agent's single event, carrying the tool's state delta and actions."""
+    # FileQueue updates state["files"] in place; re-assign it so the change is in the delta
+    if "files" in tool_context.state:
+        tool_context.state["files"] = tool_context.state["files"]
+    return Event(
+        invocation_id=ctx.invocation_id,
+        author=agent.name,
+        branch=ctx.branch,
+        content=types.Content(role="model", parts=[types.Part(text=json.dumps(result))]),
+        actions=tool_context.tool_context.actions,
+    )
+
+
+def extract_test_set(value: Any) -> Optional[Dict[str, Any]]:
+    """
+    Extracts the test set from a structure or tagging agent output.
+
+    The output may be the output_schema dict ({"status", "tagged_test_set"} or
+    {"status", "test_set"}), the bare test set, or either one as JSON text, optionally in a
+    ```json code fence.
+
+    Args:
+        value (Any): The state value written by the agent's output_key.
+
+    Returns:
+        Optional[Dict[str, Any]]: The test set, or None if the value holds none.
+    """
+    if isinstance(value, str):
+        try:
+            value = json.loads(_CODE_FENCE.sub("", value.strip()))
+        except json.JSONDecodeError:
+            return None
+    if not isinstance(value, dict):
+        return None
+
+    for key in ("tagged_test_set", "test_set"):
+        if isinstance(value.get(key), dict):
+            return value[key]
+    return value if "test_forms" in value else None
+
+
+class FileSelectorAgent(BaseAgent):
+    """
+    Non-LLM file_selector_agent: calls select_file on context.state["files"] and ends the
+    loop (escalate) when no unprocessed file is left.
+    """
+
+    batch_size: int = 1
+    policy: str = SCHEDULING_POLICY_FIFO
+    output_key: Optional[str] = "file_selector_result"
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        tool_context = _DirectToolContext(ctx)
+        result = select_file(tool_context, self.batch_size, self.policy)
+        if self.output_key:
+            tool_context.state[self.output_key] = result
+        yield _event(self, ctx, tool_context, result)
+
+
+class SaveAgent(BaseAgent):
+    """
+    Non-LLM save_agent: calls save_test_set with the test set in
+    context.state["tagging_result"].
+    """
+
+    input_key: str = "tagging_result"
+    output_key: Optional[str] = "save_result"
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        tool_context = _DirectToolContext(ctx)
+        test_set = extract_test_set(tool_context.state.get(self.input_key))
+        if test_set is None:
+            # save_test_set reports the missing test set and marks the files failed
+            test_set = {}
+        result = save_test_set(test_set, tool_context)
+        if self.output_key:
+            tool_context.state[self.output_key] = result
+        yield _event(self, ctx, tool_context, result)
@@ -0,0 +1,177 @@
+"""
+Staged (pipelined) execution of the per-page steps of the questions_extractor_agent pipeline.
+
+The sequential loop runs select -> OCR -> structure -> tag -> save for one page before the
+next page starts, so each model or the database idles while the others work and a page
+costs the sum of all stage latencies. Here every stage has its own workers and the stages
+are connected by bounded queues. Page N+1 is transcribed while page N is being structured,
+and a run over many pages approaches the time of its slowest stage instead of the sum. A
+full queue blocks the stage in front of it, so a slow stage throttles the work taken in
+rather than letting intermediate results pile up in memory.
+"""
+
+import asyncio
+import time
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, Optional, Tuple, Union
+
+# Queue slots per worker of the stage a queue feeds, unless a stage sets its own size
+DEFAULT_QUEUE_SLOTS_PER_WORKER = 2
+
+# Marks the end of a queue; every worker of the next stage receives one
+_END = object()
+
+
+class Stage:
+    """
+    One step of a staged pipeline: an async function applied to every item, with its own
+    number of workers.
+
+    Statistics are collected while the pipeline runs: busy_seconds is the summed run time
+    of the stage's calls, so busy_seconds / concurrency is the stage's share of the wall
+    time and the largest share marks the bottleneck.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run: Callable[[str, Any], Awaitable[Any]],
+        concurrency: int = 1,
+        queue_size: Optional[int] = None,
+    ):
+        """
+        Args:
+            name: Stage name, used in error messages and statistics.
+            run: Async function (key, value) -> value for the next stage.
+            concurrency: Number of items the stage works on at once.
+            queue_size: Capacity of the queue in front of the stage; defaults to
+                        DEFAULT_QUEUE_SLOTS_PER_WORKER per worker.
+        """
+        self.name = name
+        self.run = run
+        self.concurrency = max(concurrency, 1)
+        self.queue_size = queue_size or DEFAULT_QUEUE_SLOTS_PER_WORKER * self.concurrency
+        self.busy_seconds = 0.0
+        self.completed = 0
+        self.failed = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the stage's statistics.
+        """
+        return {
+            "concurrency": self.concurrency,
+            "completed": self.completed,
+            "failed": self.failed,
+            "busy_seconds": round(self.busy_seconds, 3),
+        }
+
+
+async def _iterate(
+    items: Union[Iterable[Tuple[str, Any]], AsyncIterable[Tuple[str, Any]]],
+) -> AsyncIterable[Tuple[str, Any]]:
+    """Iterates over a sync or an async iterable."""
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+async def run_stages(
+    items: Union[Iterable[Tuple[str, Any]], AsyncIterable[Tuple[str, Any]]],
+    stages: Iterable[Stage],
+    on_result: Optional[Callable[[str, Any], None]] = None,
+    on_error: Optional[Callable[[str, str], None]] = None,
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Runs keyed items through the stages, each stage working on different items at once.
+
+    Items are taken from the iterable only when the first stage's queue has room, so a
+    generator that claims work (e.g. the next unprocessed file) claims it just in time. An
+    async iterable can do blocking claims off the event loop. An item whose stage raises is
+    dropped with the error; the other items carry on.
+
+    If the iterable itself raises, no more items are taken in, the stages finish the items
+    they already have, and the error is raised. If a stage's callback raises or the run is
+    cancelled, every stage is cancelled.
+
+    Args:
+        items (Union[Iterable[Tuple[str, Any]], AsyncIterable[Tuple[str, Any]]]): Unique
+            keys with their first stage's input, e.g. file paths as both.
+        stages (Iterable[Stage]): The stages in order.
+        on_result (Optional[Callable[[str, Any], None]]): Called with each item that passed
+                                                          the last stage, as it finishes.
+        on_error (Optional[Callable[[str, str], None]]): Called with each dropped item's key
+                                                         and error, as it fails.
+
+    Returns:
+        Tuple[Dict[str, Any], Dict[str, str]]: Output of the last stage per key, and error
+                                               per key of the dropped items.
+    """
+    stages = list(stages)
+    queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in stages]
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+
+    async def work(index: int) -> None:
+        stage = stages[index]
+        next_queue = queues[index + 1] if index + 1 < len(stages) else None
+        while True:
+            item = await queues[index].get()
+            if item is _END:
+                return
+
+            key, value = item
+            start = time.perf_counter()
+            try:
+                value = await stage.run(key, value)
+            except Exception as e:
+                stage.failed += 1
+                errors[key] = f"{stage.name}: {str(e)}"
+                if on_error is not None:
+                    on_error(key, errors[key])
+                continue
+            finally:
+                stage.busy_seconds += time.perf_counter() - start
+
+            stage.completed += 1
+            if next_queue is not None:
+                await next_queue.put((key, value))
+            else:
+                results[key] = value
+                if on_result is not None:
+                    on_result(key, value)
+
+    async def run_stage(index: int) -> None:
+        await asyncio.gather(*(work(index) for _ in range(stages[index].concurrency)))
+        # Let the next stage's workers finish once this stage has drained
+        if index + 1 < len(stages):
+            for _ in range(stages[index + 1].concurrency):
+                await queues[index + 1].put(_END)
+
+    async def end_feed() -> None:
+        for _ in range(stages[0].concurrency):
+            await queues[0].put(_END)
+
+    async def feed() -> None:
+        try:
+            async for item in _iterate(items):
+                await queues[0].put(item)
+        except Exception:
+            # Let the stages drain the items already taken in before the error is raised
+            await end_feed()
+            raise
+        await end_feed()
+
+    feeder = asyncio.ensure_future(feed())
+    stage_tasks = [asyncio.ensure_future(run_stage(index)) for index in range(len(stages))]
+    try:
+        await asyncio.gather(*stage_tasks)
+        await feeder
+    finally:
+        # gather() leaves the other tasks running when one of them fails
+        for task in (feeder, *stage_tasks):
+            task.cancel()
+        await asyncio.gather(feeder, *stage_tasks, return_exceptions=True)
+    return results, errors
@@ -0,0 +1,132 @@
+"""
+Structured-output schemas for the model stages, derived from the table models in models.py.
+
+save_test_set takes the test set tables without database ids: each row is a models.py row
+minus its generated id, foreign keys may be left out when a temporary link field names the
+parent instead (e.g. a part's section_label), and save_test_set resolves those links in
+dependency order. The schemas below build exactly that shape from models.py, so a change
+to a table model reaches the model stages' response schemas too. JSONB columns (metadata,
+attributes) are left out, as structured output cannot describe free-form objects.
+"""
+
+from typing import Any, Dict, List, Optional, Type
+
+from pydantic import BaseModel, Field, create_model
+
+import models
+
+# Temporary link fields per table, resolved by save_test_set (see _upsert_test_set)
+LINK_FIELDS: Dict[str, Dict[str, str]] = {
+    "parts": {"section_label": "Label of the section this part belongs to"},
+    "passage_sets": {"part_label": "Label of the part this passage set belongs to"},
+    "passages": {
+        "passage_set_key": "Passage set as '{part_id}_{order_no}' of the passage set",
+    },
+    "questions": {
+        "part_label": "Label of the part this question belongs to",
+        "passage_set_key": "Passage set as '{part_id}_{order_no}' of the passage set",
+    },
+    "choices": {"question_key": "Question as '{part_label}_{number}' of the question"},
+    "question_tags": {
+        "question_key": "Question as '{part_label}_{number}' of the question",
+        "tag_key": "Tag as '{level1}_{level2}_{level3}' (empty levels left empty)",
+    },
+}
+
+# Foreign keys that may be replaced by a link field
+FOREIGN_KEYS = {"test_id", "section_id", "part_id", "passage_set_id", "question_id", "tag_id"}
+
+
+def _is_json_object(annotation: Any) -> bool:
+    """Checks whether a field annotation is a (possibly Optional) dict."""
+    return annotation is dict or getattr(annotation, "__origin__", None) is dict or any(
+        _is_json_object(arg) for arg in getattr(annotation, "__args__", ())
+    )
+
+
+def output_row_model(table: str, model: Type[BaseModel]) -> Type[BaseModel]:
+    """
+    Derives the model-output row of a table from its models.py model.
+
+    Args:
+        table (str): Table name (e.g. "questions").
+        model (Type[BaseModel]): The table's models.py model.
+
+    Returns:
+        Type[BaseModel]: The row model without id and JSONB fields, with optional foreign
+                         keys and the table's link fields.
+    """
+    fields: Dict[str, Any] = {}
+    for name, field in model.model_fields.items():
+        if name == "id" or _is_json_object(field.annotation):
+            continue
+        if name in FOREIGN_KEYS:
+            fields[name] = (Optional[int], Field(None, description=field.description))
+        else:
+            fields[name] = (field.annotation, field)
+    for name, description in LINK_FIELDS.get(table, {}).items():
+        fields[name] = (Optional[str], Field(None, description=description))
+    return create_model(f"{model.__name__}Row", **fields)
+
+
+TABLE_MODELS: Dict[str, Type[BaseModel]] = {
+    "test_forms": models.TestForm,
+    "sections": models.Section,
+    "parts": models.Part,
+    "passage_sets": models.PassageSet,
+    "passages": models.Passage,
+    "questions": models.Question,
+    "choices": models.Choice,
+    "tags": models.Tag,
+    "question_tags": models.QuestionTag,
+}
+
+STRUCTURE_TABLES = [
+    "test_forms",
+    "sections",
+    "parts",
+    "passage_sets",
+    "passages",
+    "questions",
+    "choices",
+]
+TAG_TABLES = ["tags", "question_tags"]
+
+
+def test_set_model(name: str, tables: List[str]) -> Type[BaseModel]:
+    """
+    Builds a test set model with one list of output rows per table.
+
+    Args:
+        name (str): Name of the model.
+        tables (List[str]): The tables in save_test_set's dependency order.
+
+    Returns:
+        Type[BaseModel]: The test set model.
+    """
+    fields = {
+        table: (List[output_row_model(table, TABLE_MODELS[table])], Field(default_factory=list))
+        for table in tables
+    }
+    return create_model(name, **fields)
+
+
+TaggedTestSet = test_set_model("TaggedTestSet", STRUCTURE_TABLES + TAG_TABLES)
+
+
+class PageTaggedTestSet(BaseModel):
+    page_index: int = Field(..., description="Index of the page in the request (0-based)")
+    test_set: TaggedTestSet = Field(..., description="The page's test set with its tags")
+
+
+class BatchTaggedResponse(BaseModel):
+    pages: List[PageTaggedTestSet] = Field(..., description="One entry per page text")
+
+
+class FusedStageOutput(BaseModel):
+    """
+    output_schema of a fused structure-and-tag agent; same shape as tagging_agent's output.
+    """
+
+    status: str = Field(..., description="success or error")
+    tagged_test_set: TaggedTestSet = Field(..., description="The tagged test set")
@@ -2,11 +2,20 @@
 Tools for the questions_extractor_agent.
 """
 
+from questions_extractor_agent.tools.batch_pages import (
+    ocr_batch,
+    structure_batch,
+    structure_question_blocks,
+)
 from questions_extractor_agent.tools.database_tools import save_test_set
 from questions_extractor_agent.tools.exit_loop import exit_loop
 from questions_extractor_agent.tools.list_files import list_files
 from questions_extractor_agent.tools.load_artifact import load_artifact
+from questions_extractor_agent.tools.pipeline_pages import run_page_pipeline
+from questions_extractor_agent.tools.preprocess_pages import preprocess_pages
+from questions_extractor_agent.tools.segment_questions import segment_questions
 from questions_extractor_agent.tools.select_file import select_file
+from questions_extractor_agent.tools.split_pdf_batch import split_pdf_batch
 from questions_extractor_agent.tools.split_pdf_pages import split_pdf_pages
 
 __all__ = [
@@ -14,6 +23,13 @@ __all__ = [
     "load_artifact",
     "exit_loop",
     "list_files",
+    "ocr_batch",
+    "preprocess_pages",
+    "run_page_pipeline",
+    "segment_questions",
     "select_file",
+    "split_pdf_batch",
     "split_pdf_pages",
+    "structure_batch",
+    "structure_question_blocks",
 ]
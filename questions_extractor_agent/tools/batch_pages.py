@@ -0,0 +1,336 @@
+"""
+Tools for transcribing and structuring the selected pages (or their question blocks) in
+multi-page model requests.
+"""
+
+import math
+import os
+from typing import Any, Dict, List, Union
+
+from google.adk.tools import ToolContext
+from google.genai import types
+
+from questions_extractor_agent.batching import (
+    DEFAULT_PAGE_BATCH_SIZE,
+    OCR_MODEL,
+    STRUCTURE_MODEL,
+    ocr_pages,
+    structure_pages,
+)
+from questions_extractor_agent.tools.select_file import FILE_STATUS_FAILED, load_file_artifact
+from utils.artifact_store import ArtifactStore, get_artifact_store
+from utils.file_ledger import get_file_ledger
+from utils.file_manifest import settle_files
+from utils.file_queue import get_file_queue
+from utils.genai import get_genai_client
+from utils.model_executor import get_model_executor
+
+
+def _selected_pages(tool_context: ToolContext) -> List[str]:
+    """
+    Returns the paths of the files chosen by select_file, in selection order.
+
+    Pages are keyed by path throughout: files of different folders can share a filename.
+    """
+    return list(tool_context.state.get("file_paths_to_process") or [])
+
+
+def _inline_image(artifact: Any, store: ArtifactStore) -> types.Part:
+    """
+    Turns a page artifact saved by select_file (or preprocess_pages) into an inline image Part.
+
+    Args:
+        artifact (Any): The loaded artifact.
+        store (ArtifactStore): The store that blob references point into.
+
+    Returns:
+        types.Part: The page image with its bytes inline.
+
+    Raises:
+        ValueError: If the artifact carries no image.
+    """
+    file_data = getattr(artifact, "file_data", None)
+    digest = ArtifactStore.digest_from_uri(getattr(file_data, "file_uri", None))
+    if digest is not None:
+        return types.Part.from_bytes(data=store.read(digest), mime_type=file_data.mime_type)
+    if getattr(artifact, "inline_data", None) is not None:
+        return artifact
+    raise ValueError("artifact carries no page image")
+
+
+def _record_page_failures(tool_context: ToolContext, errors: Dict[str, str]) -> None:
+    """
+    Marks pages without a result as failed and drops them from the selected batch, so
+    save_test_set only records the outcome of the remaining pages.
+
+    Args:
+        tool_context (ToolContext): ADK ToolContext holding the selected files.
+        errors (Dict[str, str]): Error per failed file path.
+    """
+    if not errors:
+        return
+
+    selected = _selected_pages(tool_context)
+    queue = get_file_queue(tool_context.state)
+    failed_paths = {}
+    for file_path in selected:
+        if file_path in errors:
+            queue.set_status(file_path, FILE_STATUS_FAILED)
+            failed_paths[file_path] = errors[file_path]
+
+    remaining = [file_path for file_path in selected if file_path not in errors]
+    tool_context.state["files_to_process"] = [os.path.basename(path) for path in remaining]
+    tool_context.state["file_paths_to_process"] = remaining
+
+    ledger = get_file_ledger()
+    if ledger is not None:
+        with ledger:
+            for file_path, error in failed_paths.items():
+                ledger.fail(file_path, error)
+    settle_files(failed_paths)
+
+
+async def ocr_batch(
+    tool_context: ToolContext,
+    batch_size: int = DEFAULT_PAGE_BATCH_SIZE,
+    model: str = OCR_MODEL,
+) -> Dict[str, Union[str, int, List[str], Dict[str, str]]]:
+    """
+    Transcribes the pages chosen by select_file, batch_size page images per model request.
+
+    Runs after select_file (with batch_size > 1) in place of one extractor call per page.
+    Text-layer pages keep their text. The text of every page is stored in
+    context.state["extractor_results"] (path as key, selection order) and joined in
+    context.state["extractor_result"]; context.state["ocr_skipped"] is set so the extractor's
+    own model call is bypassed. Pages that could not be transcribed are marked failed and
+    removed from the selected batch.
+
+    Args:
+        tool_context (ToolContext): ADK ToolContext holding the selected files.
+        batch_size (int): Page images per OCR request.
+        model (str): The OCR model.
+
+    Returns:
+        Dict[str, Union[str, int, List[str], Dict[str, str]]]: A dictionary containing:
+            - status: "success" or "error"
+            - message: A string describing the success or error
+            - pages: Paths of the pages that have text, in selection order
+            - requests: Number of batched OCR requests sent
+            - errors: Error per page that could not be transcribed
+    """
+    selected = _selected_pages(tool_context)
+    text_layers = tool_context.state.get("text_layers", {})
+
+    store = get_artifact_store()
+    images = {}
+    errors = {}
+    for file_path in selected:
+        if file_path in text_layers:
+            continue
+        file_name = os.path.basename(file_path)
+        try:
+            artifact = load_file_artifact(tool_context, file_name, file_path)
+            images[file_path] = _inline_image(artifact, store)
+        except Exception as e:
+            errors[file_path] = f"Error loading artifact '{file_name}': {str(e)}"
+
+    texts: Dict[str, str] = {}
+    if images:
+        try:
+            texts, ocr_errors = await ocr_pages(
+                get_model_executor(), get_genai_client(), images, batch_size, model
+            )
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": f"Error transcribing pages: {str(e)}",
+                "pages": [],
+                "requests": 0,
+                "errors": {},
+            }
+        errors.update(ocr_errors)
+
+    extractor_results = {
+        file_path: text_layers[file_path] if file_path in text_layers else texts[file_path]
+        for file_path in selected
+        if file_path in text_layers or file_path in texts
+    }
+    tool_context.state["extractor_results"] = extractor_results
+    tool_context.state["extractor_result"] = "\n\n".join(extractor_results.values())
+    tool_context.state["ocr_skipped"] = True
+    _record_page_failures(tool_context, errors)
+
+    num_requests = math.ceil(len(images) / max(batch_size, 1))
+    return {
+        "status": "success" if extractor_results else "error",
+        "message": (
+            f"Transcribed {len(texts)} page images in {num_requests} requests "
+            f"({len(extractor_results) - len(texts)} text-layer pages, {len(errors)} failed)"
+        ),
+        "pages": list(extractor_results),
+        "requests": num_requests,
+        "errors": errors,
+    }
+
+
+async def structure_batch(
+    tool_context: ToolContext,
+    batch_size: int = DEFAULT_PAGE_BATCH_SIZE,
+    model: str = STRUCTURE_MODEL,
+) -> Dict[str, Union[str, int, List[str], Dict[str, str]]]:
+    """
+    Structures the transcribed pages into test sets, batch_size page texts per model request.
+
+    Reads context.state["extractor_results"] (from ocr_batch) and stores one test set per page
+    in context.state["structure_results"] (path as key, selection order). Pages that could
+    not be structured are marked failed and removed from the selected batch.
+
+    Args:
+        tool_context (ToolContext): ADK ToolContext holding the page texts.
+        batch_size (int): Page texts per structuring request.
+        model (str): The structuring model.
+
+    Returns:
+        Dict[str, Union[str, int, List[str], Dict[str, str]]]: A dictionary containing:
+            - status: "success" or "error"
+            - message: A string describing the success or error
+            - pages: Paths of the pages that have a test set, in selection order
+            - requests: Number of batched structuring requests sent
+            - errors: Error per page that could not be structured
+    """
+    texts = dict(tool_context.state.get("extractor_results") or {})
+    if not texts:
+        return {
+            "status": "error",
+            "message": "No page texts to structure; run ocr_batch first",
+            "pages": [],
+            "requests": 0,
+            "errors": {},
+        }
+
+    try:
+        test_sets, errors = await structure_pages(
+            get_model_executor(), get_genai_client(), texts, batch_size, model
+        )
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Error structuring pages: {str(e)}",
+            "pages": [],
+            "requests": 0,
+            "errors": {},
+        }
+
+    tool_context.state["structure_results"] = test_sets
+    _record_page_failures(tool_context, errors)
+
+    num_requests = math.ceil(len(texts) / max(batch_size, 1))
+    return {
+        "status": "success" if test_sets else "error",
+        "message": (
+            f"Structured {len(test_sets)} of {len(texts)} pages in {num_requests} requests"
+        ),
+        "pages": list(test_sets),
+        "requests": num_requests,
+        "errors": errors,
+    }
+
+
+async def structure_question_blocks(
+    tool_context: ToolContext,
+    batch_size: int = DEFAULT_PAGE_BATCH_SIZE,
+    ocr_model: str = OCR_MODEL,
+    structure_model: str = STRUCTURE_MODEL,
+) -> Dict[str, Union[str, int, List[str], Dict[str, str]]]:
+    """
+    Transcribes and structures the question blocks found by segment_questions, batch_size
+    block crops (then block texts) per model request.
+
+    Every block is an independent request item, so the blocks of one dense page are spread
+    over concurrent requests instead of waiting on one large page request. The test set of
+    every block is stored in context.state["block_results"] (block_id as key, page order),
+    and each of its passages carries the block's "block_id", which save_test_set turns into
+    the block's page and bbox. A page with a block that could not be transcribed or
+    structured is marked failed and removed from the selected batch.
+
+    Args:
+        tool_context (ToolContext): ADK ToolContext holding context.state["question_blocks"].
+        batch_size (int): Block crops (or texts) per request.
+        ocr_model (str): The OCR model.
+        structure_model (str): The structuring model.
+
+    Returns:
+        Dict[str, Union[str, int, List[str], Dict[str, str]]]: A dictionary containing:
+            - status: "success" or "error"
+            - message: A string describing the success or error
+            - blocks: IDs of the blocks that have a test set, in page order
+            - requests: Number of batched requests sent (OCR and structuring)
+            - errors: Error per block that could not be transcribed or structured
+    """
+    question_blocks = tool_context.state.get("question_blocks") or {}
+    if not question_blocks:
+        return {
+            "status": "error",
+            "message": "No question blocks to structure; run segment_questions first",
+            "blocks": [],
+            "requests": 0,
+            "errors": {},
+        }
+
+    store = get_artifact_store()
+    images = {}
+    errors = {}
+    for block_id, block in question_blocks.items():
+        try:
+            artifact = tool_context.actions.load_artifact(name=block["artifact"])
+            images[block_id] = _inline_image(artifact, store)
+        except Exception as e:
+            errors[block_id] = f"Error loading artifact '{block['artifact']}': {str(e)}"
+
+    executor = get_model_executor()
+    client = get_genai_client()
+    test_sets: Dict[str, Dict[str, Any]] = {}
+    texts: Dict[str, str] = {}
+    try:
+        if images:
+            texts, ocr_errors = await ocr_pages(executor, client, images, batch_size, ocr_model)
+            errors.update(ocr_errors)
+        if texts:
+            test_sets, structure_errors = await structure_pages(
+                executor, client, texts, batch_size, structure_model
+            )
+            errors.update(structure_errors)
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Error structuring question blocks: {str(e)}",
+            "blocks": [],
+            "requests": 0,
+            "errors": {},
+        }
+
+    for block_id, test_set in test_sets.items():
+        for passage in test_set.get("passages") or []:
+            passage.setdefault("block_id", block_id)
+    tool_context.state["block_results"] = test_sets
+    _record_page_failures(
+        tool_context,
+        {
+            question_blocks[block_id]["source_file"]: f"Block '{block_id}': {error}"
+            for block_id, error in errors.items()
+        },
+    )
+
+    num_requests = math.ceil(len(images) / max(batch_size, 1)) + math.ceil(
+        len(texts) / max(batch_size, 1)
+    )
+    return {
+        "status": "success" if test_sets else "error",
+        "message": (
+            f"Structured {len(test_sets)} of {len(question_blocks)} question blocks in "
+            f"{num_requests} requests ({len(errors)} failed)"
+        ),
+        "blocks": list(test_sets),
+        "requests": num_requests,
+        "errors": errors,
+    }
@@ -6,7 +6,12 @@ from typing import Dict, Any, List, Optional, Union
 
 from google.adk.tools import ToolContext
 
+from questions_extractor_agent.tools.select_file import FILE_STATUS_DONE, FILE_STATUS_FAILED
+from utils.file_ledger import get_file_ledger
+from utils.file_manifest import settle_files
+from utils.file_queue import get_file_queue
 from utils.supabase import get_supabase_client
+from utils.tag_index import get_tag_index, tag_key
 
 
 def save_test_set(test_set: Dict[str, Any], tool_context: ToolContext) -> Dict[str, Any]:
@@ -15,6 +20,9 @@ def save_test_set(test_set: Dict[str, Any], tool_context: ToolContext) -> Dict[s
 
     This function saves the provided test set data to Supabase, handling the relationships
     between tables and enforcing onConflict constraints for questions and choices.
+    The outcome is recorded for the files selected by select_file
+    (context.state["file_paths_to_process"]): their entries in context.state["files"] (and in
+    the file ledger, when configured) become "done" or "failed".
 
     Args:
         test_set (Dict[str, Any]): A dictionary containing the structured test data
@@ -59,6 +67,82 @@ def save_test_set(test_set: Dict[str, Any], tool_context: ToolContext) -> Dict[s
         # }
         ```
     """
+    result = _upsert_test_set(test_set, tool_context.state.get("question_blocks", {}))
+    _record_file_outcome(tool_context, result)
+    return result
+
+
+def _record_file_outcome(tool_context: ToolContext, result: Dict[str, Any]) -> None:
+    """
+    Marks the files being processed as done or failed according to the upsert result.
+
+    Args:
+        tool_context (ToolContext): ADK ToolContext holding state["file_paths_to_process"]
+                                    (or state["file_path_to_process"]).
+        result (Dict[str, Any]): The result returned by _upsert_test_set.
+    """
+    file_paths = tool_context.state.get("file_paths_to_process")
+    if not file_paths:
+        file_path = tool_context.state.get("file_path_to_process")
+        file_paths = [file_path] if file_path else []
+    if not file_paths:
+        return
+
+    succeeded = result["status"] == "success"
+    files = tool_context.state.get("files", {})
+    queue = get_file_queue(tool_context.state)
+    for file_path in file_paths:
+        if file_path in files:
+            queue.set_status(file_path, FILE_STATUS_DONE if succeeded else FILE_STATUS_FAILED)
+
+    ledger = get_file_ledger()
+    if ledger is not None:
+        with ledger:
+            for file_path in file_paths:
+                if succeeded:
+                    ledger.complete(file_path)
+                else:
+                    ledger.fail(file_path, result["message"])
+    settle_files(file_paths)
+
+
+def _update_tag_index(
+    question_stems: Dict[Any, str],
+    tag_rows: Dict[Any, Dict[str, Any]],
+    question_tags: List[Dict[str, Any]],
+) -> None:
+    """
+    Adds the saved questions and their tags to the tag index, when one is configured.
+
+    Args:
+        question_stems (Dict[Any, str]): Stem per saved question ID.
+        tag_rows (Dict[Any, Dict[str, Any]]): Tag row per saved tag ID.
+        question_tags (List[Dict[str, Any]]): The saved question_tags (with resolved IDs).
+    """
+    tag_index = get_tag_index()
+    if tag_index is None:
+        return
+
+    tags_by_question: Dict[Any, List[Dict[str, Any]]] = {}
+    for question_tag in question_tags:
+        tag = tag_rows.get(question_tag.get("tag_id"))
+        if tag is not None and question_tag.get("question_id") in question_stems:
+            tags_by_question.setdefault(question_tag["question_id"], []).append(tag)
+    tag_index.update(
+        (question_id, question_stems[question_id], tags)
+        for question_id, tags in tags_by_question.items()
+    )
+
+
+def _upsert_test_set(
+    test_set: Dict[str, Any], question_blocks: Dict[str, Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Upserts the test set tables in dependency order and returns the save_test_set result.
+
+    question_blocks (from segment_questions) resolves the temporary "block_id" field of
+    passages into page and bbox entries of passages.metadata.
+    """
     try:
         # Get Supabase client
         supabase = get_supabase_client()
@@ -159,6 +243,16 @@ def save_test_set(test_set: Dict[str, Any], tool_context: ToolContext) -> Dict[s
             if "passage_set_id" not in passage and "passage_set_key" in passage:
                 passage["passage_set_id"] = passage_set_id_map.get(passage["passage_set_key"])
                 del passage["passage_set_key"]  # Remove the temporary field
+
+            if "block_id" in passage:
+                block = question_blocks.get(passage.pop("block_id"))  # Remove the temporary field
+                if block is not None:
+                    passage["metadata"] = {
+                        **(passage.get("metadata") or {}),
+                        "source_file": block["source_file"],
+                        "page": block["page"],
+                        "bbox": block["bbox"],
+                    }
             
             passage_response = supabase.table("passages").upsert(passage).execute()
             
@@ -176,15 +270,16 @@ def save_test_set(test_set: Dict[str, Any], tool_context: ToolContext) -> Dict[s
         # 6. Upsert questions with onConflict=["part_id", "number"]
         questions = test_set.get("questions", [])
         question_id_map = {}  # To store the IDs of the inserted questions
+        question_stems = {}  # Stem per question ID, for the tag index
         
         for question in questions:
             if "passage_set_id" not in question and "passage_set_key" in question:
                 question["passage_set_id"] = passage_set_id_map.get(question["passage_set_key"])
                 del question["passage_set_key"]  # Remove the temporary field
             
-            if "part_id" not in question and "part_label" in question:
-                question["part_id"] = part_id_map.get(question["part_label"])
-                del question["part_label"]  # Remove the temporary field
+            part_label = question.pop("part_label", None)  # Remove the temporary field
+            if "part_id" not in question and part_label is not None:
+                question["part_id"] = part_id_map.get(part_label)
             
             question_response = (
                 supabase.table("questions")
@@ -196,6 +291,10 @@ def save_test_set(test_set: Dict[str, Any], tool_context: ToolContext) -> Dict[s
                 rows_upserted += len(question_response.data)
                 for q in question_response.data:
                     question_id_map[f"{q['part_id']}_{q['number']}"] = q["id"]
+                    if part_label is not None:
+                        # Structured output only knows the part by its label
+                        question_id_map[f"{part_label}_{q['number']}"] = q["id"]
+                    question_stems[q["id"]] = q.get("stem", question.get("stem", ""))
             else:
                 return {
                     "status": "error",
@@ -230,6 +329,7 @@ def save_test_set(test_set: Dict[str, Any], tool_context: ToolContext) -> Dict[s
         # 8. Upsert tags
         tags = test_set.get("tags", [])
         tag_id_map = {}  # To store the IDs of the inserted tags
+        tag_rows = {}  # Tag per tag ID, for the tag index
         
         for tag in tags:
             tag_response = supabase.table("tags").upsert(tag).execute()
@@ -237,7 +337,8 @@ def save_test_set(test_set: Dict[str, Any], tool_context: ToolContext) -> Dict[s
             if tag_response.data:
                 rows_upserted += len(tag_response.data)
                 for t in tag_response.data:
-                    tag_id_map[f"{t['level1']}_{t.get('level2', '')}_{t.get('level3', '')}"] = t["id"]
+                    tag_id_map[tag_key(t)] = t["id"]
+                    tag_rows[t["id"]] = t
             else:
                 return {
                     "status": "error",
@@ -268,6 +369,8 @@ def save_test_set(test_set: Dict[str, Any], tool_context: ToolContext) -> Dict[s
                     "rows_upserted": rows_upserted
                 }
         
+        _update_tag_index(question_stems, tag_rows, question_tags)
+        
         return {
             "status": "success",
             "message": f"Successfully upserted {rows_upserted} rows of test data",
@@ -2,27 +2,56 @@
 Tool for listing files in a directory.
 """
 
+from contextlib import nullcontext
 from pathlib import Path
 from typing import Dict, Union
 
 from google.adk.tools import ToolContext
 
+from utils.file_queue import admit_files
+from utils.file_manifest import get_file_manifest
+from utils.scan import iter_files
+
 
 def list_files(
-    dir_path: str, tool_context: ToolContext
+    dir_path: str,
+    tool_context: ToolContext,
+    recursive: bool = False,
+    pattern: str = "",
+    incremental: bool = False,
 ) -> Dict[str, Union[str, Dict[str, str]]]:
     """
-    Lists all file paths directly under the specified directory (non-recursively).
+    Lists all file paths under the specified directory (non-recursively by default).
+
+    In incremental mode every file is checked against a persistent manifest of path, size,
+    mtime and content hash, and only files that are new or whose content changed since the
+    previous scan are listed. Unchanged files are recognised from their stat alone, without
+    being read. A file stays pending in the manifest until it is done or failed, so files
+    left unfinished by an earlier run (e.g. one that crashed) are listed again, unless they
+    are already in tool_context.state["files"].
+
+    Each listed file is described cheaply (byte size, page count from the PDF cross-reference
+    table or image header, test form) into tool_context.state["file_info"] for scheduling.
+    Files over the PRD limits (10 MB / 100 pages) are rejected up front: they are marked
+    "failed" in tool_context.state["files"] and reported under "rejected" instead of "files".
+
+    When a file ledger is configured (FILE_LEDGER_PATH), the listed files are also registered
+    there; files the ledger already knows keep their status.
 
     Args:
         dir_path (str): Path to the directory to list files from.
         tool_context (ToolContext): ADK ToolContext for storing the file information.
+        recursive (bool): Whether to include files in nested subdirectories.
+        pattern (str): fnmatch-style file name filter such as "*.pdf" ("" lists every file).
+        incremental (bool): Whether to skip files already recorded unchanged in the manifest.
 
     Returns:
         Dict[str, Union[str, Dict[str, str]]]: A dictionary containing:
             - status: "success" or "error"
             - message: A string describing the success or error
             - files: A dictionary of the files found (filename as key, "" as value)
+            - rejected: A dictionary of the files rejected by preflight (filename as key,
+                        reason as value)
     """
     directory = Path(dir_path)
 
@@ -42,14 +71,33 @@ def list_files(
             "files": {},
         }
 
-    # List files (non-recursively)
+    # List files
     found_files = {}
+    num_unchanged = 0
     try:
-        # Get only files, not directories
-        for item in directory.iterdir():
-            if item.is_file():
+        manifest = get_file_manifest() if incremental else None
+        known_files = tool_context.state.get("files", {})
+
+        with manifest.locked() if manifest is not None else nullcontext():
+            for entry in iter_files(str(directory.absolute()), recursive, pattern):
+                # Only new or changed files, and files an earlier run left unfinished, are
+                # listed in incremental mode
+                if (
+                    manifest is not None
+                    and not manifest.refresh(entry.path, entry.stat())
+                    and not (manifest.is_pending(entry.path) and entry.path not in known_files)
+                ):
+                    num_unchanged += 1
+                    continue
+
                 # Use absolute path for the key
-                found_files[str(item.absolute())] = ""
+                found_files[entry.path] = ""
+
+        # Store the files in the tool_context.state and the ledger (when configured); files
+        # over the PRD limits are rejected here, before any rendering or LLM work
+        rejected = admit_files(tool_context.state, found_files, manifest)
+        for file_path in rejected:
+            del found_files[file_path]
     except Exception as e:
         return {
             "status": "error",
@@ -57,17 +105,15 @@ def list_files(
             "files": {},
         }
 
-    # Initialize files dict in tool_context if it doesn't exist
-    if "files" not in tool_context.state:
-        tool_context.state["files"] = {}
-
-    # Store the files in the tool_context.state
-    for file_path, value in found_files.items():
-        tool_context.state["files"][file_path] = value
-
     # Return the result
+    unchanged_note = f" ({num_unchanged} unchanged files skipped)" if incremental else ""
+    rejected_note = f" ({len(rejected)} files rejected by preflight)" if rejected else ""
     return {
         "status": "success",
-        "message": f"Successfully listed {len(found_files)} files in '{dir_path}'",
+        "message": (
+            f"Successfully listed {len(found_files)} files in '{dir_path}'"
+            f"{unchanged_note}{rejected_note}"
+        ),
         "files": found_files,
+        "rejected": rejected,
     }
@@ -2,7 +2,11 @@
 Tool for loading artifacts from the tool context.
 """
 
-from typing import Dict, Union, Optional
+from typing import Any, Dict, Union, Optional
+
+from questions_extractor_agent.tools.select_file import load_file_artifact
+from utils.artifact_store import ArtifactStore, get_artifact_store
+from utils.file_info import MAX_FILE_BYTES
 
 # Import google.adk.tools or a mock if it's not available
 try:
@@ -14,26 +18,96 @@ except ImportError:
         pass
 
 
+def _payload_size(artifact_content: Any, store: ArtifactStore) -> Optional[int]:
+    """
+    Returns the payload size of a loaded artifact without reading the payload.
+
+    Args:
+        artifact_content (Any): The loaded artifact.
+        store (ArtifactStore): The store that blob references point into.
+
+    Returns:
+        Optional[int]: The size in bytes, or None if the artifact carries no binary payload.
+    """
+    if isinstance(artifact_content, (bytes, bytearray, memoryview)):
+        return len(artifact_content)
+
+    file_data = getattr(artifact_content, "file_data", None)
+    digest = ArtifactStore.digest_from_uri(getattr(file_data, "file_uri", None))
+    if digest is not None:
+        return store.size(digest)
+
+    inline_data = getattr(artifact_content, "inline_data", None)
+    if isinstance(getattr(inline_data, "data", None), bytes):
+        return len(inline_data.data)
+    return None
+
+
+def _describe_blob_reference(artifact_content: Any, store: ArtifactStore) -> Any:
+    """
+    Replaces a `cas://sha256/{hash}` file_data reference with a description of its blob.
+
+    Args:
+        artifact_content (Any): The loaded artifact.
+        store (ArtifactStore): The store that blob references point into.
+
+    Returns:
+        Any: The blob's file_uri, mime_type and size_bytes for store references, the artifact
+             unchanged otherwise.
+    """
+    file_data = getattr(artifact_content, "file_data", None)
+    digest = ArtifactStore.digest_from_uri(getattr(file_data, "file_uri", None))
+    if digest is None:
+        return artifact_content
+    return {
+        "file_uri": file_data.file_uri,
+        "mime_type": file_data.mime_type,
+        "size_bytes": store.size(digest),
+    }
+
+
 def load_artifact(
-    filename: str, tool_context: ToolContext
-) -> Dict[str, Union[str, Optional[bytes]]]:
+    filename: str, tool_context: ToolContext, max_bytes: int = MAX_FILE_BYTES
+) -> Dict[str, Union[str, Dict[str, Any], Optional[bytes]]]:
     """
     Load binary content of an artifact previously saved using save_artifact.
 
+    Artifacts that reference a blob in the content-addressed artifact store (as saved by
+    load_file_artifact) are returned as a description of the blob (file_uri, mime_type and
+    size_bytes), so the result stays JSON-serializable and the payload is not read. Artifacts
+    larger than max_bytes are refused before they are read.
+
     Args:
         filename (str): Name of the artifact to load.
         tool_context (ToolContext): ADK ToolContext for accessing artifacts.
+        max_bytes (int): Size limit of the artifact payload (defaults to the 10 MB PRD limit).
 
     Returns:
-        Dict[str, Union[str, Optional[bytes]]]: A dictionary containing:
+        Dict[str, Union[str, Dict[str, Any], Optional[bytes]]]: A dictionary containing:
             - status: "success" or "error"
             - message: A string describing the success or error
-            - content: The binary content of the artifact (if successful), None otherwise
+            - content: The binary content of the artifact, or the blob description for store
+                       references (if successful), None otherwise
             - artifact_version: A string identifier for the artifact version (if successful)
     """
     try:
-        # Attempt to load the artifact using the context.actions.load_artifact method
-        artifact_content = tool_context.actions.load_artifact(name=filename)
+        # Load the artifact; a selected file is saved as one on first load
+        artifact_content = load_file_artifact(tool_context, filename)
+
+        # Enforce the size limit before the payload is read
+        store = get_artifact_store()
+        size = _payload_size(artifact_content, store)
+        if size is not None and size > max_bytes:
+            return {
+                "status": "error",
+                "message": (
+                    f"Artifact '{filename}' is {size} bytes, over the {max_bytes} byte limit"
+                ),
+                "content": None,
+                "artifact_version": None
+            }
+
+        artifact_content = _describe_blob_reference(artifact_content, store)
         
         return {
             "status": "success",
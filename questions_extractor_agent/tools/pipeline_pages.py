@@ -0,0 +1,300 @@
+"""
+Tool for processing all unprocessed files as a staged pipeline.
+"""
+
+import asyncio
+import mimetypes
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+from google.adk.tools import ToolContext
+from google.genai import types
+
+from questions_extractor_agent.batching import (
+    OCR_MODEL,
+    STRUCTURE_MODEL,
+    TAG_MODEL,
+    ocr_pages,
+    structure_and_tag_pages,
+    structure_pages,
+    tag_pages,
+)
+from questions_extractor_agent.pipeline import Stage, run_stages
+from questions_extractor_agent.tools.database_tools import _upsert_test_set
+from questions_extractor_agent.tools.select_file import (
+    FILE_STATUS_DONE,
+    FILE_STATUS_FAILED,
+    FILE_STATUS_IN_PROGRESS,
+    FILE_STATUS_UNPROCESSED,
+)
+from questions_extractor_agent.tools.split_pdf_pages import TEXT_LAYER_SUFFIX
+from utils.file_ledger import FileLedger, get_file_ledger
+from utils.file_manifest import settle_files
+from utils.file_queue import get_file_queue
+from utils.genai import get_genai_client
+from utils.model_executor import get_model_executor
+from utils.scheduling import SCHEDULING_POLICIES, SCHEDULING_POLICY_FIFO
+from utils.tag_index import get_tag_confidence_threshold, get_tag_index
+
+
+async def _claim_files(
+    tool_context: ToolContext,
+    policy: str,
+    ledger: Optional[FileLedger],
+    ledger_lock: asyncio.Lock,
+) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Claims unprocessed files one at a time, as the pipeline has room for them.
+
+    Ledger claims are SQLite transactions that may wait for other workers' locks, so they
+    run in a worker thread instead of blocking the event loop, on the run's ledger
+    connection (ledger_lock keeps them apart from the outcome updates). The session state's
+    queue is only touched on the event loop.
+
+    Yields:
+        Tuple[str, str]: The path of each claimed file, as the item key and the OCR input.
+    """
+    queue = get_file_queue(tool_context.state)
+
+    if ledger is not None and not queue.in_ledger:
+        # Files registered only in the session state join the ledger first
+        file_paths = queue.paths(FILE_STATUS_UNPROCESSED)
+        async with ledger_lock:
+            await asyncio.to_thread(ledger.add, file_paths, dict(queue.file_info))
+        queue.in_ledger = True
+
+    while True:
+        if ledger is not None:
+            async with ledger_lock:
+                file_path = await asyncio.to_thread(ledger.claim, policy=policy)
+        else:
+            file_path = queue.claim(policy)
+        if file_path is None:
+            return
+
+        queue.set_status(file_path, FILE_STATUS_IN_PROGRESS)
+        yield file_path, file_path
+
+
+def _record_outcomes(ledger: Optional[FileLedger], outcomes: List[Tuple[str, str]]) -> None:
+    """
+    Marks files done (or failed with an error) in the file ledger and settles them in the
+    file manifest, one manifest update for the whole batch.
+
+    Args:
+        ledger (Optional[FileLedger]): The run's ledger connection, if one is configured.
+        outcomes (List[Tuple[str, str]]): (file path, error) per finished file; the error is
+                                          empty for files that were saved.
+    """
+    if ledger is not None:
+        for file_path, error in outcomes:
+            if error:
+                ledger.fail(file_path, error)
+            else:
+                ledger.complete(file_path)
+    settle_files([file_path for file_path, _ in outcomes])
+
+
+async def run_page_pipeline(
+    tool_context: ToolContext,
+    ocr_concurrency: int = 4,
+    structure_concurrency: int = 4,
+    tag_concurrency: int = 4,
+    save_concurrency: int = 2,
+    policy: str = SCHEDULING_POLICY_FIFO,
+    fuse_structure_and_tag: bool = False,
+) -> Dict[str, Union[str, float, List[str], Dict[str, Any]]]:
+    """
+    Processes every unprocessed file in context.state["files"] as a staged pipeline.
+
+    An alternative to the per-page loop (select_file -> extractor -> structure -> tagging ->
+    save_test_set): the OCR, structuring, tagging and save stages each work on their own
+    pages at once, connected by bounded queues (see questions_extractor_agent.pipeline), so
+    page N+1 is transcribed while page N is structured. Files are claimed (from the file
+    ledger when configured) only as the OCR stage has room, and each file is marked "done"
+    or "failed" in the session state as soon as it finishes; the ledger and the file
+    manifest are updated in a worker thread, with the files that finished meanwhile
+    batched into one update. Text-layer pages skip OCR. Per-stage statistics
+    are stored in context.state["pipeline_stats"]. With fuse_structure_and_tag, one Pro
+    request per page structures and tags the text (a "structure_and_tag" stage using
+    structure_concurrency) instead of separate structuring and tagging requests. When a tag
+    index is configured (TAG_INDEX_PATH, see utils.tag_index), pages whose questions all
+    resemble saved questions are tagged from the index without a tagging request.
+
+    Args:
+        tool_context (ToolContext): ADK ToolContext holding context.state["files"].
+        ocr_concurrency (int): Pages transcribed at once.
+        structure_concurrency (int): Pages structured at once.
+        tag_concurrency (int): Pages tagged at once.
+        save_concurrency (int): Test sets upserted to Supabase at once.
+        policy (str): Scheduling policy that picks the next file ("fifo", "sjf" or "fair").
+        fuse_structure_and_tag (bool): Whether to structure and tag in a single request.
+
+    Returns:
+        Dict[str, Union[str, float, List[str], Dict[str, Any]]]: A dictionary containing:
+            - status: "success" or "error"
+            - message: A string describing the success or error
+            - done: Paths of the files saved, in completion order
+            - errors: Error per path of the files that failed
+            - stages: Statistics per stage (concurrency, completed, failed, busy_seconds)
+            - seconds: Wall time of the run
+            - tagged_from_index: Paths of the files tagged from the tag index
+    """
+    if policy not in SCHEDULING_POLICIES:
+        return {
+            "status": "error",
+            "message": (
+                f"Unknown scheduling policy '{policy}'. "
+                f"Available policies: {', '.join(SCHEDULING_POLICIES)}"
+            ),
+            "done": [],
+            "errors": {},
+            "stages": {},
+            "seconds": 0.0,
+            "tagged_from_index": [],
+        }
+
+    executor = get_model_executor()
+    client = get_genai_client()
+    question_blocks = tool_context.state.get("question_blocks", {})
+    tag_index = get_tag_index()
+    tag_threshold = get_tag_confidence_threshold()
+    tagged_from_index: List[str] = []
+
+    # Items are keyed by file path, so same-named pages from different folders stay apart
+    async def ocr(file_path: str, _: str) -> str:
+        if file_path.endswith(TEXT_LAYER_SUFFIX):
+            with open(file_path, encoding="utf-8") as f:
+                return f.read()
+        with open(file_path, "rb") as f:
+            mime_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+            image = types.Part.from_bytes(data=f.read(), mime_type=mime_type)
+        texts, errors = await ocr_pages(executor, client, {file_path: image}, 1, OCR_MODEL)
+        if file_path not in texts:
+            raise RuntimeError(errors.get(file_path, "no transcription"))
+        return texts[file_path]
+
+    async def structure(file_path: str, text: str) -> Dict[str, Any]:
+        test_sets, errors = await structure_pages(
+            executor, client, {file_path: text}, 1, STRUCTURE_MODEL
+        )
+        if file_path not in test_sets:
+            raise RuntimeError(errors.get(file_path, "no test set"))
+        return test_sets[file_path]
+
+    async def tag(file_path: str, test_set: Dict[str, Any]) -> Dict[str, Any]:
+        if tag_index is not None:
+            tagged_test_set = tag_index.tag_test_set(test_set, tag_threshold)
+            if tagged_test_set is not None:
+                tagged_from_index.append(file_path)
+                return tagged_test_set
+        tagged, errors = await tag_pages(executor, client, {file_path: test_set}, 1, TAG_MODEL)
+        if file_path not in tagged:
+            raise RuntimeError(errors.get(file_path, "no tagged test set"))
+        return tagged[file_path]
+
+    async def structure_and_tag(file_path: str, text: str) -> Dict[str, Any]:
+        tagged, errors = await structure_and_tag_pages(
+            executor, client, {file_path: text}, 1, STRUCTURE_MODEL
+        )
+        if file_path not in tagged:
+            raise RuntimeError(errors.get(file_path, "no tagged test set"))
+        return tagged[file_path]
+
+    async def save(file_path: str, test_set: Dict[str, Any]) -> int:
+        # The Supabase client is synchronous; upsert off the event loop
+        result = await asyncio.to_thread(_upsert_test_set, test_set, question_blocks)
+        if result["status"] != "success":
+            raise RuntimeError(result["message"])
+        return result["rows_upserted"]
+
+    if fuse_structure_and_tag:
+        model_stages = [Stage("structure_and_tag", structure_and_tag, structure_concurrency)]
+    else:
+        model_stages = [
+            Stage("structure", structure, structure_concurrency),
+            Stage("tag", tag, tag_concurrency),
+        ]
+    stages = [
+        Stage("ocr", ocr, ocr_concurrency),
+        *model_stages,
+        Stage("save", save, save_concurrency),
+    ]
+
+    queue = get_file_queue(tool_context.state)
+    done: List[str] = []
+    errors: Dict[str, str] = {}
+    # Outcomes not yet in the ledger and manifest, and the task writing them
+    unrecorded: List[Tuple[str, str]] = []
+    recorder: Optional[asyncio.Future] = None
+    record_errors: List[str] = []
+
+    async def record(ledger: Optional[FileLedger], ledger_lock: asyncio.Lock) -> None:
+        # Files finishing while a batch is written form the next batch
+        while unrecorded:
+            outcomes = unrecorded[:]
+            unrecorded.clear()
+            try:
+                async with ledger_lock:
+                    await asyncio.to_thread(_record_outcomes, ledger, outcomes)
+            except Exception as e:
+                record_errors.append(str(e))
+
+    def on_outcome(file_path: str, error: str) -> None:
+        nonlocal recorder
+        queue.set_status(file_path, FILE_STATUS_FAILED if error else FILE_STATUS_DONE)
+        unrecorded.append((file_path, error))
+        if recorder is None or recorder.done():
+            recorder = asyncio.ensure_future(record(ledger, ledger_lock))
+
+    def on_result(file_path: str, _: int) -> None:
+        done.append(file_path)
+        on_outcome(file_path, "")
+
+    def on_error(file_path: str, error: str) -> None:
+        errors[file_path] = error
+        on_outcome(file_path, error)
+
+    start = time.perf_counter()
+    pipeline_error = None
+    ledger = None
+    ledger_lock = asyncio.Lock()
+    try:
+        ledger = await asyncio.to_thread(get_file_ledger)
+        try:
+            await run_stages(
+                _claim_files(tool_context, policy, ledger, ledger_lock),
+                stages,
+                on_result,
+                on_error,
+            )
+        finally:
+            # Write the outcomes still in flight
+            if recorder is not None:
+                await recorder
+            await record(ledger, ledger_lock)
+    except Exception as e:
+        # The pipeline stopped early; the files finished until then are recorded
+        pipeline_error = f"Error running the page pipeline: {str(e)}"
+    finally:
+        if ledger is not None:
+            await asyncio.to_thread(ledger.close)
+    seconds = time.perf_counter() - start
+    if pipeline_error is None and record_errors:
+        pipeline_error = f"Error recording file outcomes: {record_errors[0]}"
+
+    stats = {stage.name: stage.stats() for stage in stages}
+    tool_context.state["pipeline_stats"] = stats
+    message = (
+        f"Processed {len(done) + len(errors)} files in {seconds:.1f} s "
+        f"({len(done)} saved, {len(errors)} failed)"
+    )
+    return {
+        "status": "success" if pipeline_error is None and (done or not errors) else "error",
+        "message": message if pipeline_error is None else f"{pipeline_error}. {message}",
+        "done": done,
+        "errors": errors,
+        "stages": stats,
+        "seconds": seconds,
+        "tagged_from_index": tagged_from_index,
+    }
@@ -0,0 +1,108 @@
+"""
+Tool for preprocessing the selected page images before OCR.
+"""
+
+import os
+from typing import Dict, Union
+
+from google.adk.tools import ToolContext
+from google.genai import types
+from PIL import Image
+
+from utils.artifact_store import ArtifactStore, get_artifact_store
+from utils.file_info import IMAGE_EXTENSIONS
+from utils.image_preprocess import (
+    DEFAULT_TARGET_LONG_EDGE,
+    encode_image,
+    preprocess_image,
+)
+
+
+def preprocess_pages(
+    tool_context: ToolContext,
+    target_long_edge: int = DEFAULT_TARGET_LONG_EDGE,
+    use_binarization: bool = True,
+) -> Dict[str, Union[str, int, Dict[str, Dict[str, int]]]]:
+    """
+    Crops, normalizes, downscales and binarizes the page images chosen by select_file.
+
+    Runs between select_file and the extractor. For each image in
+    context.state["file_paths_to_process"] the cleaned page is stored in the artifact
+    store and saved as a new version of the page's artifact, so load_artifact hands the
+    extractor the smaller image, and its hash replaces the page's entry in
+    context.state["content_hashes"]. Text-layer pages are left alone, as is any page
+    whose cleaned version would not be smaller than the original.
+
+    Args:
+        tool_context (ToolContext): ADK ToolContext holding the selected files.
+        target_long_edge (int): Maximum length of the page's long edge in pixels.
+        use_binarization (bool): Whether to reduce pages to black and white.
+
+    Returns:
+        Dict[str, Union[str, int, Dict[str, Dict[str, int]]]]: A dictionary containing:
+            - status: "success" or "error"
+            - message: A string describing the success or error
+            - pages: Per preprocessed page (path as key): original_bytes,
+                     processed_bytes and bytes_saved
+            - bytes_saved: Total bytes saved over all pages
+    """
+    file_paths = tool_context.state.get("file_paths_to_process") or []
+    image_paths = [
+        file_path
+        for file_path in file_paths
+        if os.path.splitext(file_path)[1].lower() in IMAGE_EXTENSIONS
+    ]
+
+    artifact_store = get_artifact_store()
+    content_hashes = tool_context.state.get("content_hashes") or {}
+    pages = {}
+    try:
+        for file_path in image_paths:
+            file_name = os.path.basename(file_path)
+            original_bytes = os.path.getsize(file_path)
+
+            with Image.open(file_path) as image:
+                processed = preprocess_image(image, target_long_edge, use_binarization)
+            data, mime_type = encode_image(processed)
+
+            # Keep the original artifact when cleaning does not make the page smaller
+            if len(data) >= original_bytes:
+                pages[file_path] = {
+                    "original_bytes": original_bytes,
+                    "processed_bytes": original_bytes,
+                    "bytes_saved": 0,
+                }
+                continue
+
+            content_hash, _ = artifact_store.put_bytes(data)
+            tool_context.actions.save_artifact(
+                name=file_name,
+                content=types.Part(
+                    file_data=types.FileData(
+                        file_uri=ArtifactStore.uri(content_hash), mime_type=mime_type
+                    )
+                ),
+            )
+            content_hashes[file_path] = content_hash
+            pages[file_path] = {
+                "original_bytes": original_bytes,
+                "processed_bytes": len(data),
+                "bytes_saved": original_bytes - len(data),
+            }
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Error preprocessing page images: {str(e)}",
+            "pages": pages,
+            "bytes_saved": sum(page["bytes_saved"] for page in pages.values()),
+        }
+
+    bytes_saved = sum(page["bytes_saved"] for page in pages.values())
+    tool_context.state["preprocess_result"] = pages
+    tool_context.state["content_hashes"] = content_hashes
+    return {
+        "status": "success",
+        "message": f"Preprocessed {len(pages)} page images, saving {bytes_saved} bytes",
+        "pages": pages,
+        "bytes_saved": bytes_saved,
+    }
@@ -0,0 +1,95 @@
+"""
+Tool for splitting the selected page images into question blocks.
+"""
+
+import mimetypes
+import os
+from typing import Any, Dict, Union
+
+import numpy as np
+from google.adk.tools import ToolContext
+from google.genai import types
+from PIL import Image
+
+from utils.artifact_store import ArtifactStore, get_artifact_store
+from utils.file_info import IMAGE_EXTENSIONS, get_page_number
+from utils.image_preprocess import encode_image
+from utils.layout import find_question_blocks
+
+
+def segment_questions(
+    tool_context: ToolContext, min_block_gap: int = 0
+) -> Dict[str, Union[str, Dict[str, Dict[str, Any]]]]:
+    """
+    Finds the question blocks on the page images chosen by select_file and saves each as a crop.
+
+    Blocks are found with row and column projection profiles (see utils.layout), so a Part 5
+    page with 8-10 questions becomes 8-10 small, independent images that
+    structure_question_blocks OCRs and structures in concurrent requests instead of one large
+    request. Every crop is stored in the artifact store and saved as an artifact named
+    `{page stem}-block-{k}`. The blocks are recorded in
+    context.state["question_blocks"] with their source file, page number and bbox; a passage
+    that carries a "block_id" is given that page and bbox in its metadata by save_test_set.
+
+    Args:
+        tool_context (ToolContext): ADK ToolContext holding the selected files.
+        min_block_gap (int): Smallest vertical gap in pixels between two questions. 0 derives
+                             it from the page's line spacing.
+
+    Returns:
+        Dict[str, Union[str, Dict[str, Dict[str, Any]]]]: A dictionary containing:
+            - status: "success" or "error"
+            - message: A string describing the success or error
+            - blocks: Per block (block_id as key): artifact, source_file, page and
+                      bbox ([left, top, right, bottom] in page pixels)
+    """
+    file_paths = tool_context.state.get("file_paths_to_process") or []
+    image_paths = [
+        file_path
+        for file_path in file_paths
+        if os.path.splitext(file_path)[1].lower() in IMAGE_EXTENSIONS
+    ]
+
+    artifact_store = get_artifact_store()
+    blocks = {}
+    try:
+        for file_path in image_paths:
+            with Image.open(file_path) as image:
+                gray = np.asarray(image.convert("L"))
+            page_stem = os.path.splitext(os.path.basename(file_path))[0]
+
+            for index, (left, top, right, bottom) in enumerate(
+                find_question_blocks(gray, min_block_gap or None), start=1
+            ):
+                data, mime_type = encode_image(Image.fromarray(gray[top:bottom, left:right]))
+                content_hash, _ = artifact_store.put_bytes(data)
+
+                block_id = f"{page_stem}-block-{index}"
+                artifact_name = f"{block_id}{mimetypes.guess_extension(mime_type)}"
+                tool_context.actions.save_artifact(
+                    name=artifact_name,
+                    content=types.Part(
+                        file_data=types.FileData(
+                            file_uri=ArtifactStore.uri(content_hash), mime_type=mime_type
+                        )
+                    ),
+                )
+                blocks[block_id] = {
+                    "artifact": artifact_name,
+                    "source_file": file_path,
+                    "page": get_page_number(file_path) or 1,
+                    "bbox": [left, top, right, bottom],
+                }
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Error segmenting page images: {str(e)}",
+            "blocks": blocks,
+        }
+
+    tool_context.state["question_blocks"] = blocks
+    return {
+        "status": "success",
+        "message": f"Found {len(blocks)} question blocks on {len(image_paths)} page images",
+        "blocks": blocks,
+    }
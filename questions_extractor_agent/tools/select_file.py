@@ -1,35 +1,204 @@
 """
-Tool for selecting an unprocessed file and saving it as an artifact.
+Tool for selecting unprocessed files and saving them as artifacts when first loaded.
 """
 
+import mimetypes
 import os
-from typing import Dict, Union
+from typing import Dict, List, Optional, Union
 
 from google.adk.tools import ToolContext
 from google.genai import types
 
-FILE_STATUS_UNPROCESSED = ""
-FILE_STATUS_IN_PROGRESS = "in-progress"
+from questions_extractor_agent.tools.split_pdf_pages import TEXT_LAYER_SUFFIX
+from utils.artifact_store import ArtifactStore, get_artifact_store
+from utils.file_ledger import (
+    STATUS_DONE,
+    STATUS_FAILED,
+    STATUS_IN_PROGRESS,
+    STATUS_SKIPPED,
+    STATUS_UNPROCESSED,
+    get_file_ledger,
+)
+from utils.file_manifest import settle_files
+from utils.file_queue import get_file_queue
+from utils.hashing import hash_file
+from utils.scheduling import SCHEDULING_POLICIES, SCHEDULING_POLICY_FIFO
+
+FILE_STATUS_UNPROCESSED = STATUS_UNPROCESSED
+FILE_STATUS_IN_PROGRESS = STATUS_IN_PROGRESS
+FILE_STATUS_DONE = STATUS_DONE
+FILE_STATUS_FAILED = STATUS_FAILED
+FILE_STATUS_SKIPPED = STATUS_SKIPPED
+
+
+def _save_file_artifact(
+    tool_context: ToolContext, file_path: str, artifact_store: ArtifactStore
+) -> types.Part:
+    """
+    Stores a selected file's bytes in the artifact store and saves an artifact pointing at them.
+
+    Args:
+        tool_context (ToolContext): ADK ToolContext for saving the artifact.
+        file_path (str): The selected file path.
+        artifact_store (ArtifactStore): The content-addressed store for the page bytes.
+
+    Returns:
+        types.Part: The saved artifact; it only carries the file path if the file could not
+                    be read.
+    """
+    try:
+        content_hash, _ = artifact_store.put_file(file_path)
+    except OSError:
+        content_hash = None
+
+    if content_hash is None:
+        # Create an artifact representing the file path
+        artifact_part = types.Part(text=file_path)
+    else:
+        # Reference the stored blob; identical pages share it
+        mime_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+        artifact_part = types.Part(
+            file_data=types.FileData(
+                file_uri=ArtifactStore.uri(content_hash), mime_type=mime_type
+            )
+        )
+
+    # Save the artifact
+    tool_context.actions.save_artifact(name=os.path.basename(file_path), content=artifact_part)
+    return artifact_part
+
+
+def load_file_artifact(
+    tool_context: ToolContext, file_name: str, file_path: Optional[str] = None
+) -> Optional[types.Part]:
+    """
+    Loads the artifact of a file, saving it first if the file was selected but not saved yet.
+
+    select_file only hashes the files it claims. A selected file is copied into the artifact
+    store and saved as an artifact the first time a stage loads it, so claims whose bytes are
+    never read (duplicate and text-layer pages, for instance) cost no store write.
+
+    Artifacts are named by basename, which pages of different folders can share. An artifact
+    whose blob is not the selected file's content (context.state["content_hashes"]) belongs to
+    another file of the same name and is replaced by this file's.
+
+    Args:
+        tool_context (ToolContext): ADK ToolContext holding the selected files.
+        file_name (str): The artifact name (the file's basename).
+        file_path (Optional[str]): The selected file; defaults to the first selected file
+                                   named file_name.
+
+    Returns:
+        Optional[types.Part]: The artifact, or None if there is none and the file is not part
+                              of the selected batch.
+    """
+    if file_path is None:
+        file_paths = tool_context.state.get("file_paths_to_process") or []
+        file_path = next(
+            (path for path in file_paths if os.path.basename(path) == file_name), None
+        )
+
+    artifact = tool_context.actions.load_artifact(name=file_name)
+    if artifact is not None:
+        content_hash = (tool_context.state.get("content_hashes") or {}).get(file_path)
+        file_data = getattr(artifact, "file_data", None)
+        digest = ArtifactStore.digest_from_uri(getattr(file_data, "file_uri", None))
+        if content_hash is None or digest is None or digest == content_hash:
+            return artifact
+
+    if file_path is None:
+        return artifact
+    return _save_file_artifact(tool_context, file_path, get_artifact_store())
 
 
 def select_file(
-    tool_context: ToolContext,
-) -> Dict[str, Union[str, Dict[str, Union[str, int]]]]:
+    tool_context: ToolContext, batch_size: int = 1, policy: str = SCHEDULING_POLICY_FIFO
+) -> Dict[str, Union[str, Dict[str, Union[str, int]], List[Dict[str, Union[str, int]]]]]:
     """
-    Selects an unprocessed file from context.state["files"] and saves it as an artifact.
+    Selects an unprocessed file from context.state["files"] for the next pipeline step.
     If no unprocessed files are available, sets context.actions.escalate=True to exit the loop.
 
+    Text-layer pages written by split_pdf_pages (`{stem}-{n}.txt`) need no OCR: their text is
+    stored directly in context.state["extractor_result"] and context.state["ocr_skipped"] is set
+    so the extractor step can be bypassed.
+
+    When a file ledger is configured (FILE_LEDGER_PATH), the file is claimed atomically from
+    the ledger instead, so parallel workers never pick the same file and a crashed run resumes
+    where it stopped. Unprocessed files that are only in context.state["files"] are added to
+    the ledger on the first selection from that map; after that a selection costs one claim
+    transaction, independent of the number of files. The claimed path is stored in context.state["file_path_to_process"] so
+    save_test_set can record the outcome.
+
+    With batch_size > 1, up to batch_size files are claimed at once (in one ledger transaction
+    when a ledger is configured), so downstream stages can work on several pages per loop
+    iteration. The whole batch is listed in
+    context.state["files_to_process"] and context.state["file_paths_to_process"], and the text
+    of text-layer pages in context.state["text_layers"] (path as key). OCR is skipped only
+    when every page of the batch has a text layer; extractor_result then holds their texts in
+    order. file_to_process and file_path_to_process name the first file of the batch. A
+    text-layer page whose text cannot be read is marked failed and dropped from the batch;
+    an error is returned if no page of the batch is left.
+
+    Each selected file is only hashed here. Its artifact is saved on first use by
+    load_file_artifact: the bytes are stored once per distinct content in the artifact store
+    (ARTIFACT_STORE_DIR) and the artifact is a `cas://sha256/{hash}` file_data reference to
+    that blob, which load_artifact resolves. Content hashes seen in this session are kept in
+    context.state["page_hashes"]; a page whose content was already selected is reported with
+    "duplicate_of" and listed in context.state["duplicates"] (path as key, original path as
+    value), so it can be skipped before any model call. The hash of each selected file is
+    stored in context.state["content_hashes"] (path as key) as the extractor's cache input.
+    Pages are keyed by path because files of different folders can share a filename.
+
+    The scheduling policy decides which unprocessed file goes next: "fifo" (listing order),
+    "sjf" (shortest job first by page count and byte size from context.state["file_info"]) or
+    "fair" (round-robin across test forms). With a file ledger, the ledger's claim query
+    applies the same policy to the descriptions the files were registered with.
+
     Args:
         tool_context (ToolContext): ADK ToolContext for accessing state and actions.
+        batch_size (int): Maximum number of files to claim in this call.
+        policy (str): Scheduling policy: "fifo", "sjf" or "fair".
 
     Returns:
-        Dict[str, Union[str, Dict[str, Union[str, int]]]]: A dictionary containing:
+        Dict[str, Union[str, Dict[str, Union[str, int]], List[Dict[str, Union[str, int]]]]]:
+        A dictionary containing:
             - status: "success" or "error"
             - message: A string describing the success or error
-            - file_metadata: Dictionary with filename and page_count (if success)
+            - file_metadata: Dictionary with filename, page_count, content_hash and (for duplicate
+                             pages) duplicate_of of the first file (if success)
+            - files_metadata: List of file_metadata for every claimed file (if batch_size > 1)
     """
-    # Check if files exist in the state
-    if "files" not in tool_context.state or not tool_context.state["files"]:
+    batch_size = max(batch_size, 1)
+
+    # Check if the scheduling policy exists
+    if policy not in SCHEDULING_POLICIES:
+        return {
+            "status": "error",
+            "message": (
+                f"Unknown scheduling policy '{policy}'. "
+                f"Available policies: {', '.join(SCHEDULING_POLICIES)}"
+            ),
+        }
+
+    # Status-bucketed index of state["files"]; selection does not scan the map
+    queue = get_file_queue(tool_context.state)
+
+    ledger = get_file_ledger()
+    if ledger is not None:
+        with ledger:
+            # Files put straight into the session state join the ledger once per queue;
+            # list_files, the PDF splitters and the input watcher register their own files
+            if not queue.in_ledger:
+                ledger.add(queue.paths(FILE_STATUS_UNPROCESSED), queue.file_info)
+                queue.in_ledger = True
+            claimed_files = ledger.claim_many(batch_size, policy=policy)
+            has_files = bool(claimed_files) or not ledger.is_empty()
+    else:
+        claimed_files = queue.claim_many(batch_size, policy)
+        has_files = len(queue) > 0
+
+    # Check if any files are known at all
+    if not has_files:
         # No files are available, set escalate to True to exit the loop
         tool_context.actions.escalate = True
         return {
@@ -37,42 +206,103 @@ def select_file(
             "message": "No files available for processing",
         }
 
-    # Look for the first unprocessed file
-    unprocessed_file = None
-    for file_path, status in tool_context.state["files"].items():
-        if status == FILE_STATUS_UNPROCESSED:  # Empty string indicates unprocessed file
-            unprocessed_file = file_path
-            break
-
     # If no unprocessed files are found, set escalate to True to exit the loop
-    if unprocessed_file is None:
+    if not claimed_files:
         tool_context.actions.escalate = True
         return {
             "status": "error",
             "message": "No unprocessed files available",
         }
 
-    # Mark the file as in-progress to prevent reprocessing
-    tool_context.state["files"][unprocessed_file] = FILE_STATUS_IN_PROGRESS
+    # Mark the files as in-progress to prevent reprocessing (mirrors ledger claims)
+    for file_path in claimed_files:
+        queue.set_status(file_path, FILE_STATUS_IN_PROGRESS)
 
-    # Set the file to process in the state
-    file_name = os.path.basename(unprocessed_file)
-    tool_context.state["file_to_process"] = file_name
+    # Hash each file, recognise duplicate pages and collect the text of text-layer pages
+    # Updated in place (copying it would cost O(pages seen) per call) and re-assigned below
+    page_hashes = tool_context.state.get("page_hashes") or {}
+    content_hashes = {}
+    duplicates = {}
+    text_layers = {}
+    unreadable = {}
+    for file_path in claimed_files:
+        is_text_layer = file_path.endswith(TEXT_LAYER_SUFFIX)
+        try:
+            content_hash = hash_file(file_path)
+            if is_text_layer:
+                with open(file_path, encoding="utf-8") as f:
+                    text_layers[file_path] = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            # A text-layer page is nothing but its text; other pages fail when loaded
+            if is_text_layer:
+                unreadable[file_path] = f"Error reading text layer '{file_path}': {str(e)}"
+                continue
+            content_hash = None
+        if content_hash is not None:
+            content_hashes[file_path] = content_hash
+            original = page_hashes.setdefault(content_hash, file_path)
+            if original != file_path:
+                duplicates[file_path] = original
 
-    # Create an artifact representing the file path
-    # This is just storing the path as text, not the actual file content
-    file_path_part = types.Part(text=unprocessed_file)
+    # Fail unreadable text-layer pages and drop them from the batch
+    if unreadable:
+        for file_path in unreadable:
+            queue.set_status(file_path, FILE_STATUS_FAILED)
+        ledger = get_file_ledger()
+        if ledger is not None:
+            with ledger:
+                for file_path, error in unreadable.items():
+                    ledger.fail(file_path, error)
+        settle_files(unreadable)
+        claimed_files = [file_path for file_path in claimed_files if file_path not in unreadable]
+        if not claimed_files:
+            return {
+                "status": "error",
+                "message": "; ".join(unreadable.values()),
+            }
 
-    # Save the artifact
-    tool_context.actions.save_artifact(name=file_name, content=file_path_part)
+    # Set the files to process in the state
+    file_names = [os.path.basename(file_path) for file_path in claimed_files]
+    tool_context.state["file_to_process"] = file_names[0]
+    tool_context.state["file_path_to_process"] = claimed_files[0]
+    tool_context.state["files_to_process"] = file_names
+    tool_context.state["file_paths_to_process"] = claimed_files
 
-    # Get page count (assume 1 for non-PDF files)
-    page_count = 1
-    # For actual implementation, you might want to determine page count for PDFs, etc.
+    tool_context.state["page_hashes"] = page_hashes
+    tool_context.state["content_hashes"] = content_hashes
+    tool_context.state["duplicates"] = duplicates
+    tool_context.state["text_layers"] = text_layers
+
+    # Batches made only of text-layer pages go straight to structuring
+    if len(text_layers) == len(claimed_files):
+        tool_context.state["extractor_result"] = "\n\n".join(text_layers.values())
+        tool_context.state["ocr_skipped"] = True
+    else:
+        tool_context.state["ocr_skipped"] = False
+
+    # Page counts were determined when the files were listed (1 if unknown)
+    files_metadata = []
+    for file_name, file_path in zip(file_names, claimed_files):
+        file_metadata = {
+            "filename": file_name,
+            "page_count": queue.file_info.get(file_path, {}).get("pages") or 1,
+        }
+        if file_path in content_hashes:
+            file_metadata["content_hash"] = content_hashes[file_path]
+        if file_path in duplicates:
+            file_metadata["duplicate_of"] = duplicates[file_path]
+        files_metadata.append(file_metadata)
 
     # Return success with file metadata
+    if batch_size == 1:
+        return {
+            "status": "success",
+            "message": f"Successfully selected file: {file_names[0]}",
+            "file_metadata": files_metadata[0],
+        }
     return {
         "status": "success",
-        "message": f"Successfully selected file: {file_name}",
-        "file_metadata": {"filename": file_name, "page_count": page_count},
+        "message": f"Successfully selected {len(file_names)} files: {', '.join(file_names)}",
+        "file_metadata": files_metadata[0],
+        "files_metadata": files_metadata,
     }
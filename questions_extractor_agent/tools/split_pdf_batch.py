@@ -0,0 +1,161 @@
+"""
+Tool for splitting every PDF listed in the tool context concurrently.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Tuple, Union
+
+from google.adk.tools import ToolContext
+
+from questions_extractor_agent.tools.select_file import FILE_STATUS_FAILED
+from questions_extractor_agent.tools.split_pdf_pages import (
+    DEFAULT_ENCODING_PROFILE,
+    DEFAULT_RENDER_CHUNK_SIZE,
+    _pages_to_process,
+    split_pdf_into_state,
+)
+from utils.file_ledger import get_file_ledger
+from utils.file_manifest import record_pages, settle_files
+from utils.file_queue import get_file_queue
+
+# Upper bound on concurrently split PDFs when max_workers is 0.
+DEFAULT_MAX_BATCH_WORKERS = 8
+
+
+def _split_one(file_path: str) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """
+    Splits a single PDF into a private state dict.
+
+    Args:
+        file_path (str): Path to the PDF file to split.
+
+    Returns:
+        Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]: The result of split_pdf_pages for
+        that file, and the file_info descriptions of its pages.
+    """
+    state: Dict[str, Any] = {}
+    try:
+        result = split_pdf_into_state(
+            file_path,
+            state=state,
+            chunk_size=DEFAULT_RENDER_CHUNK_SIZE,
+            workers=1,
+            use_cache=True,
+            use_text_layer=True,
+            profile=DEFAULT_ENCODING_PROFILE,
+        )
+    except Exception as e:
+        result = {
+            "status": "error",
+            "message": f"Error processing PDF file '{file_path}': {str(e)}",
+            "files": {},
+        }
+    return result, state.get("file_info", {})
+
+
+def split_pdf_batch(
+    tool_context: ToolContext, max_workers: int = 0
+) -> Dict[str, Union[str, Dict[str, str]]]:
+    """
+    Splits every unprocessed PDF in tool_context.state["files"] concurrently.
+
+    This is the batch counterpart of calling split_pdf_pages once per PDF after list_files.
+    PDFs are split in a bounded thread pool (rasterization runs in poppler subprocesses, so
+    threads keep every core busy). Each successfully split PDF is replaced in
+    tool_context.state["files"] by its page files at the same position, so the resulting order
+    is deterministic regardless of which split finishes first. A failing PDF stays in the
+    state marked "failed" (in the ledger and manifest too) and is reported without aborting
+    the others. When a file ledger is configured (FILE_LEDGER_PATH), the same replacement is
+    recorded there in the same order.
+
+    Args:
+        tool_context (ToolContext): ADK ToolContext holding the list_files result in state["files"].
+        max_workers (int): Maximum number of PDFs split at once. 0 uses one per CPU core,
+                           capped at DEFAULT_MAX_BATCH_WORKERS.
+
+    Returns:
+        Dict[str, Union[str, Dict[str, str]]]: A dictionary containing:
+            - status: "success" if at least one PDF was split (or there were none), "error" otherwise
+            - message: A string describing the success or error
+            - files: A dictionary of the generated page files (filename as key, "" as value)
+            - failures: A dictionary of PDFs that could not be split (filename as key, message as value)
+    """
+    files = tool_context.state.get("files", {})
+    pdf_paths = [
+        file_path
+        for file_path, status in files.items()
+        if file_path.lower().endswith(".pdf") and status == ""
+    ]
+
+    if not pdf_paths:
+        return {
+            "status": "success",
+            "message": "No PDF files to split",
+            "files": {},
+            "failures": {},
+        }
+
+    if max_workers <= 0:
+        max_workers = min(os.cpu_count() or 1, DEFAULT_MAX_BATCH_WORKERS)
+
+    # map() returns results in submission order, which keeps the merge deterministic
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(pdf_paths))) as executor:
+        split_results = dict(zip(pdf_paths, executor.map(_split_one, pdf_paths)))
+    results = {file_path: result for file_path, (result, _) in split_results.items()}
+
+    # Rebuild the file map, replacing each split PDF with its pages in place
+    generated_files = {}
+    failures = {}
+    merged_files = {}
+    file_info = dict(tool_context.state.get("file_info", {}))
+    for file_path, status in files.items():
+        result = results.get(file_path)
+        if result is None:
+            merged_files[file_path] = status
+        elif result["status"] == "success":
+            merged_files.update(result["files"])
+            generated_files.update(result["files"])
+            file_info.update(split_results[file_path][1])
+        else:
+            merged_files[file_path] = status
+            failures[file_path] = result["message"]
+    tool_context.state["files"] = merged_files
+    tool_context.state["file_info"] = file_info
+    queue = get_file_queue(tool_context.state)
+    for file_path in failures:
+        queue.set_status(file_path, FILE_STATUS_FAILED)
+
+    # Mirror the replacement in the ledger, PDF by PDF in listing order
+    ledger = get_file_ledger()
+    if ledger is not None:
+        with ledger:
+            for file_path in pdf_paths:
+                if file_path in failures:
+                    ledger.fail(file_path, failures[file_path])
+                else:
+                    ledger.expand(
+                        file_path,
+                        results[file_path]["files"],
+                        results[file_path]["skipped"],
+                        split_results[file_path][1],
+                    )
+    record_pages(
+        {
+            file_path: _pages_to_process(results[file_path])
+            for file_path in pdf_paths
+            if file_path not in failures
+        }
+    )
+    settle_files(failures)
+
+    num_split = len(pdf_paths) - len(failures)
+    return {
+        "status": "success" if num_split > 0 else "error",
+        "message": (
+            f"Split {num_split} of {len(pdf_paths)} PDF files into "
+            f"{len(generated_files)} pages ({len(failures)} failed)"
+        ),
+        "files": generated_files,
+        "failures": failures,
+    }
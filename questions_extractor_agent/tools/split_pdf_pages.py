@@ -1,31 +1,409 @@
 """
-Tool for splitting PDF pages into JPEG images.
+Tool for splitting PDF pages into page images (or text files for pages with a usable text layer).
 """
 
+import heapq
 import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, Union
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 import PyPDF2
 from google.adk.tools import ToolContext
 from pdf2image import convert_from_path
+from PIL import Image
+
+from utils.file_info import get_test_form_key, preflight_error
+from utils.file_ledger import STATUS_SKIPPED, get_file_ledger
+from utils.file_manifest import record_pages
+from utils.file_queue import get_file_queue
+from utils.page_classifier import get_page_classifier
+from utils.render_cache import get_render_cache
+
+# Number of pages rendered per poppler call. Only this many page images are
+# held in memory at once, so peak memory stays flat regardless of page count.
+DEFAULT_RENDER_CHUNK_SIZE = 4
+
+# Named encoding profiles for page images. Each profile sets the render DPI, the
+# color mode ("RGB", grayscale "L" or bilevel "1"), the output format and quality, and
+# an optional cap on the longer edge in pixels. A profile is part of the render cache
+# key, so changing one invalidates previously cached pages.
+ENCODING_PROFILES: Dict[str, Dict[str, Any]] = {
+    # pdf2image / PIL defaults: 200 DPI color JPEG at quality 75
+    "default": {
+        "dpi": 200,
+        "mode": "RGB",
+        "format": "JPEG",
+        "quality": 75,
+        "max_long_edge": None,
+    },
+    # Black-and-white exam pages: grayscale carries all the information OCR needs
+    "grayscale": {
+        "dpi": 150,
+        "mode": "L",
+        "format": "JPEG",
+        "quality": 70,
+        "max_long_edge": 2000,
+    },
+    # Clean printed text: 1-bit PNG compresses far better than JPEG. Gray levels above
+    # `threshold` become paper, the rest ink; no dithering, whose noise defeats PNG
+    # compression and blurs strokes for OCR
+    "bilevel": {
+        "dpi": 200,
+        "mode": "1",
+        "format": "PNG",
+        "quality": None,
+        "max_long_edge": 2200,
+        "threshold": 160,
+    },
+    # Smallest payload for upload-bound runs
+    "webp": {
+        "dpi": 150,
+        "mode": "L",
+        "format": "WEBP",
+        "quality": 60,
+        "max_long_edge": 1600,
+    },
+}
+DEFAULT_ENCODING_PROFILE = "default"
+
+IMAGE_SUFFIXES = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+
+# Pages whose embedded text passes these checks are written as text files and skip
+# rasterization and OCR entirely.
+TEXT_LAYER_SUFFIX = ".txt"
+MIN_TEXT_LAYER_CHARS = 50
+MIN_TEXT_LAYER_PRINTABLE_RATIO = 0.95
+
+
+def _extract_text_layer(page: PyPDF2.PageObject) -> Optional[str]:
+    """
+    Returns a page's embedded text if it is usable in place of OCR.
+
+    A text layer is considered usable when it has at least MIN_TEXT_LAYER_CHARS
+    non-whitespace characters and nearly all of them are printable, which rules out
+    scanned pages and fonts without a proper Unicode mapping.
+
+    Args:
+        page (PyPDF2.PageObject): The page to inspect.
+
+    Returns:
+        Optional[str]: The page text, or None if the page needs to be rendered and OCR'd.
+    """
+    try:
+        text = page.extract_text() or ""
+    except Exception:
+        return None
+
+    visible = "".join(text.split())
+    if len(visible) < MIN_TEXT_LAYER_CHARS:
+        return None
+
+    printable = sum(1 for ch in visible if ch.isprintable() and ch != "\ufffd")
+    if printable / len(visible) < MIN_TEXT_LAYER_PRINTABLE_RATIO:
+        return None
+
+    return text
+
+
+def _page_windows(page_numbers: List[int], chunk_size: int) -> List[Tuple[int, int]]:
+    """
+    Groups sorted page numbers into contiguous windows of at most `chunk_size` pages.
+
+    Args:
+        page_numbers (List[int]): Sorted 1-based page numbers to render.
+        chunk_size (int): Maximum number of pages per window.
+
+    Returns:
+        List[Tuple[int, int]]: Inclusive (first_page, last_page) windows in page order.
+    """
+    chunk_size = max(1, chunk_size)
+    windows = []
+    for page_number in page_numbers:
+        if windows:
+            window_start, window_end = windows[-1]
+            if (
+                page_number == window_end + 1
+                and page_number - window_start < chunk_size
+            ):
+                windows[-1] = (window_start, page_number)
+                continue
+        windows.append((page_number, page_number))
+    return windows
+
+
+def _iter_page_images(
+    file_path: str, windows: List[Tuple[int, int]], profile: Dict[str, Any]
+) -> Iterator[Tuple[int, Image.Image]]:
+    """
+    Renders a PDF window by window and yields the page images one by one.
+
+    Args:
+        file_path (str): Path to the PDF file to render.
+        windows (List[Tuple[int, int]]): Inclusive page windows, one poppler call each.
+        profile (Dict[str, Any]): Encoding profile providing the render DPI and color mode.
+
+    Yields:
+        Tuple[int, Image.Image]: The 1-based page number and its rendered image.
+    """
+    for window_start, window_end in windows:
+        images = convert_from_path(
+            file_path,
+            dpi=profile["dpi"],
+            grayscale=profile["mode"] != "RGB",
+            first_page=window_start,
+            last_page=window_end,
+        )
+        for offset, image in enumerate(images):
+            yield window_start + offset, image
+        # Drop the window before rendering the next one
+        del images
+
+
+def _save_page_image(
+    image: Image.Image, output_path: Path, profile: Dict[str, Any]
+) -> None:
+    """
+    Encodes a rendered page according to an encoding profile and writes it to disk.
+
+    Args:
+        image (Image.Image): The rendered page.
+        output_path (Path): Destination file.
+        profile (Dict[str, Any]): Encoding profile (color mode, format, quality, max_long_edge,
+                                  and threshold for bilevel pages).
+    """
+    # Bilevel pages are resized in grayscale and thresholded last
+    bilevel = profile["mode"] == "1"
+    mode = "L" if bilevel else profile["mode"]
+    encoded = image if image.mode == mode else image.convert(mode)
+
+    max_long_edge = profile["max_long_edge"]
+    if max_long_edge and max(encoded.size) > max_long_edge:
+        # thumbnail() resizes in place and keeps the aspect ratio
+        encoded.thumbnail((max_long_edge, max_long_edge), Image.LANCZOS)
+
+    if bilevel:
+        threshold = profile["threshold"]
+        gray = encoded
+        encoded = gray.point([0] * (threshold + 1) + [255] * (255 - threshold), "1")
+        if gray is not image:
+            gray.close()
+
+    save_kwargs: Dict[str, Any] = {"optimize": True} if profile["format"] != "WEBP" else {}
+    if profile["quality"] is not None:
+        save_kwargs["quality"] = profile["quality"]
+    encoded.save(str(output_path), profile["format"], **save_kwargs)
+
+    if encoded is not image:
+        encoded.close()
+
+
+def _iter_saved_pages(
+    file_path: str, windows: List[Tuple[int, int]], profile: Dict[str, Any]
+) -> Iterator[Tuple[int, str]]:
+    """
+    Renders page windows, saves each page as `{stem}-{n}.{ext}` next to the PDF and yields its path.
+
+    Args:
+        file_path (str): Path to the PDF file to render.
+        windows (List[Tuple[int, int]]): Inclusive page windows, one poppler call each.
+        profile (Dict[str, Any]): Encoding profile for the saved images.
+
+    Yields:
+        Tuple[int, str]: The page number and absolute path of each saved image, in page order.
+    """
+    pdf_path = Path(file_path)
+    suffix = IMAGE_SUFFIXES[profile["format"]]
+    for page_number, image in _iter_page_images(file_path, windows, profile):
+        # Create output filename with format: {original_filename_without_ext}-{page_number}.{ext}
+        output_path = pdf_path.parent / f"{pdf_path.stem}-{page_number}{suffix}"
+
+        # Encode the image and release its pixel buffer right away
+        _save_page_image(image, output_path, profile)
+        image.close()
+
+        yield page_number, str(output_path.absolute())
+
+
+def _iter_text_pages(
+    file_path: str, text_pages: Dict[int, str]
+) -> Iterator[Tuple[int, str]]:
+    """
+    Writes each text-layer page as `{stem}-{n}.txt` next to the PDF and yields its path.
+
+    Args:
+        file_path (str): Path to the source PDF file.
+        text_pages (Dict[int, str]): Page text keyed by 1-based page number.
+
+    Yields:
+        Tuple[int, str]: The page number and absolute path of each text file, in page order.
+    """
+    pdf_path = Path(file_path)
+    for page_number in sorted(text_pages):
+        output_path = pdf_path.parent / f"{pdf_path.stem}-{page_number}{TEXT_LAYER_SUFFIX}"
+        output_path.write_text(text_pages[page_number], encoding="utf-8")
+        yield page_number, str(output_path.absolute())
+
+
+def _render_windows(
+    file_path: str, windows: List[Tuple[int, int]], profile: Dict[str, Any]
+) -> List[Tuple[int, str]]:
+    """
+    Worker entry point for parallel rendering: saves the given windows and returns the image paths.
+
+    Args:
+        file_path (str): Path to the PDF file to render.
+        windows (List[Tuple[int, int]]): Inclusive page windows, one poppler call each.
+        profile (Dict[str, Any]): Encoding profile for the saved images.
+
+    Returns:
+        List[Tuple[int, str]]: Page numbers and absolute paths of the saved images, in page order.
+    """
+    return list(_iter_saved_pages(file_path, windows, profile))
+
+
+def _split_evenly(items: List[int], parts: int) -> List[List[int]]:
+    """
+    Splits a list into at most `parts` contiguous, nearly equal slices.
+
+    Args:
+        items (List[int]): Items to split, e.g. page numbers.
+        parts (int): Desired number of slices.
+
+    Returns:
+        List[List[int]]: Non-empty slices in their original order.
+    """
+    parts = max(1, min(parts, len(items)))
+    base, remainder = divmod(len(items), parts)
+    slices = []
+    start = 0
+    for i in range(parts):
+        size = base + (1 if i < remainder else 0)
+        slices.append(items[start : start + size])
+        start += size
+    return slices
 
 
 def split_pdf_pages(
-    file_path: str, tool_context: ToolContext
-) -> Dict[str, Union[str, Dict[str, str]]]:
+    file_path: str,
+    tool_context: ToolContext,
+    chunk_size: int = DEFAULT_RENDER_CHUNK_SIZE,
+    workers: int = 1,
+    use_cache: bool = True,
+    use_text_layer: bool = True,
+    profile: str = DEFAULT_ENCODING_PROFILE,
+    skip_blank_pages: bool = True,
+) -> Dict[str, Union[str, Dict[str, str], Dict[str, int]]]:
     """
-    Splits a PDF file into individual JPEG images, one per page.
+    Splits a PDF file into individual page images, one per page.
+
+    The named encoding `profile` (see ENCODING_PROFILES) controls the render DPI, color
+    mode, output format and quality, and maximum image size. The bytes written for each
+    page are returned so profiles can be compared against OCR accuracy.
+
+    Pages are rendered in small windows and each image is written and registered in
+    tool_context.state["files"] as soon as it is rendered, so only `chunk_size`
+    page images are held in memory at any time.
+
+    With `workers` > 1 the pages are split into contiguous ranges rendered by a process
+    pool; the `{stem}-{n}.{ext}` files are still registered in page order.
+
+    Rendered pages are stored in an on-disk cache keyed by the PDF content hash and the
+    render parameters. On a cache hit the cached images are copied into place and
+    registered without calling poppler.
+
+    When a file ledger is configured (FILE_LEDGER_PATH), the pages are added to it and the
+    PDF itself is marked done there so it is never selected for OCR. In the file manifest
+    (see list_files' incremental mode) the PDF stays pending until all its pages are done.
+
+    Pages of born-digital PDFs that already carry a usable text layer are written as
+    `{stem}-{n}.txt` instead of being rendered, so select_file can hand their text
+    straight to structuring and the OCR hop is skipped. Only the remaining pages are
+    rendered.
+
+    Each page is classified as it is registered (see utils.page_classifier). Blank and
+    near-blank pages, blank-page notices and pages matching a known non-question template
+    are registered with the "skipped" status and their reason in state["file_info"], so
+    select_file never hands them to the LLM pipeline.
 
     Args:
         file_path (str): Path to the PDF file to split.
         tool_context (ToolContext): ADK ToolContext for storing the file information.
+        chunk_size (int): Number of pages rendered per poppler call.
+        workers (int): Number of rendering processes. 1 renders in-process,
+                       0 uses one process per available CPU core.
+        use_cache (bool): Whether to read from and write to the render cache.
+        use_text_layer (bool): Whether to use embedded page text instead of rendering when usable.
+        profile (str): Name of the encoding profile for page images.
+        skip_blank_pages (bool): Whether to mark pages without question content as skipped.
 
     Returns:
-        Dict[str, Union[str, Dict[str, str]]]: A dictionary containing:
+        Dict[str, Union[str, Dict[str, str], Dict[str, int]]]: A dictionary containing:
             - status: "success" or "error"
             - message: A string describing the success or error
-            - files: A dictionary of the generated JPEG files (filename as key, "" as value)
+            - files: A dictionary of the generated image and text files (filename as key,
+                     "" or "skipped" as value)
+            - page_bytes: Size in bytes of each generated file (filename as key; success only)
+            - skipped: The reason each skipped page was skipped (filename as key; success only)
+    """
+    result = split_pdf_into_state(
+        file_path,
+        tool_context.state,
+        chunk_size,
+        workers,
+        use_cache,
+        use_text_layer,
+        profile,
+        skip_blank_pages,
+    )
+    if result["status"] != "success":
+        return result
+
+    # Register the pages in the ledger (when configured) in place of the PDF itself
+    absolute_path = str(Path(file_path).absolute())
+    try:
+        ledger = get_file_ledger()
+        if ledger is not None:
+            with ledger:
+                ledger.expand(
+                    absolute_path,
+                    result["files"],
+                    result["skipped"],
+                    tool_context.state.get("file_info"),
+                )
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Error recording pages of '{file_path}' in the file ledger: {str(e)}",
+            "files": result["files"],
+        }
+    record_pages({absolute_path: _pages_to_process(result)})
+
+    return result
+
+
+def _pages_to_process(result: Dict[str, Any]) -> List[str]:
+    """Returns the pages of a split_pdf_pages result that were not skipped."""
+    return [page for page, status in result["files"].items() if status != STATUS_SKIPPED]
+
+
+def split_pdf_into_state(
+    file_path: str,
+    state: Dict[str, Any],
+    chunk_size: int,
+    workers: int,
+    use_cache: bool,
+    use_text_layer: bool,
+    profile: str,
+    skip_blank_pages: bool = True,
+) -> Dict[str, Union[str, Dict[str, str], Dict[str, int]]]:
+    """
+    Does the work of split_pdf_pages against a plain state dict, without touching the ledger.
+
+    split_pdf_batch calls this directly so it can register the pages of several PDFs in a
+    deterministic order once they are all split. Arguments and return value are the same as
+    split_pdf_pages, with `state` standing in for tool_context.state.
     """
     pdf_path = Path(file_path)
 
@@ -45,7 +423,20 @@ def split_pdf_pages(
             "files": {},
         }
 
+    # Check if the encoding profile exists
+    if profile not in ENCODING_PROFILES:
+        return {
+            "status": "error",
+            "message": (
+                f"Unknown encoding profile '{profile}'. "
+                f"Available profiles: {', '.join(ENCODING_PROFILES)}"
+            ),
+            "files": {},
+        }
+    encoding = ENCODING_PROFILES[profile]
+
     generated_files = {}
+    skipped_pages = {}
     try:
         # Open the PDF using PyPDF2
         pdf_reader = PyPDF2.PdfReader(file_path)
@@ -58,31 +449,99 @@ def split_pdf_pages(
                 "files": {},
             }
 
-        # Extract the filename without extension
-        file_name_without_ext = pdf_path.stem
+        # Reject PDFs over the PRD limits before rendering anything
+        preflight = preflight_error({"bytes": pdf_path.stat().st_size, "pages": num_pages})
+        if preflight is not None:
+            return {
+                "status": "error",
+                "message": f"PDF file '{file_path}' rejected: {preflight}",
+                "files": {},
+            }
+
+        # Status index of state["files"] (creates the map if it doesn't exist)
+        queue = get_file_queue(state)
 
-        # Convert PDF pages to images using pdf2image
-        images = convert_from_path(file_path)
+        if workers <= 0:
+            workers = os.cpu_count() or 1
 
-        # Initialize files dict in tool_context if it doesn't exist
-        if "files" not in tool_context.state:
-            tool_context.state["files"] = {}
+        # Look the PDF up in the render cache
+        render_params = {**encoding, "text_layer": use_text_layer}
+        render_cache = get_render_cache() if use_cache else None
+        cached_pages = None
+        if render_cache is not None:
+            cache_key = render_cache.make_key(file_path, render_params)
+            cached_pages = render_cache.get(cache_key)
+        cache_hit = cached_pages is not None and len(cached_pages) == num_pages
 
-        # Save each page as a JPEG image
-        for i, image in enumerate(images):
-            # Create output filename with format: {original_filename_without_ext}-{page_number}.jpg
-            output_filename = f"{file_name_without_ext}-{i+1}.jpg"
-            output_path = pdf_path.parent / output_filename
+        if cache_hit:
+            # Copy the cached pages to their usual paths instead of rendering
+            saved_pages = []
+            for page_number, cached_page in cached_pages.items():
+                output_path = (
+                    pdf_path.parent / f"{pdf_path.stem}-{page_number}{cached_page.suffix}"
+                )
+                shutil.copyfile(cached_page, output_path)
+                saved_pages.append((page_number, str(output_path.absolute())))
+        else:
+            # Pick out pages whose text layer makes rasterization and OCR unnecessary
+            text_pages = {}
+            if use_text_layer:
+                for page_number, page in enumerate(pdf_reader.pages, start=1):
+                    text = _extract_text_layer(page)
+                    if text is not None:
+                        text_pages[page_number] = text
+            image_pages = [n for n in range(1, num_pages + 1) if n not in text_pages]
 
-            # Save the image as JPEG
-            image.save(str(output_path), "JPEG")
+            if workers == 1 or len(image_pages) <= 1:
+                # Render pages window by window in this process
+                saved_images = _iter_saved_pages(
+                    file_path, _page_windows(image_pages, chunk_size), encoding
+                )
+            else:
+                # Render contiguous page slices in parallel; map() yields them in page order
+                page_slices = _split_evenly(image_pages, workers)
+                with ProcessPoolExecutor(max_workers=len(page_slices)) as executor:
+                    saved_images = [
+                        saved_page
+                        for slice_pages in executor.map(
+                            _render_windows,
+                            [file_path] * len(page_slices),
+                            [_page_windows(pages, chunk_size) for pages in page_slices],
+                            [encoding] * len(page_slices),
+                        )
+                        for saved_page in slice_pages
+                    ]
 
-            # Store the absolute path in the generated_files dictionary
-            absolute_path = str(output_path.absolute())
-            generated_files[absolute_path] = ""
+            # Interleave text and image pages so files are registered in page order
+            saved_pages = heapq.merge(
+                _iter_text_pages(file_path, text_pages), saved_images
+            )
+
+        classifier = get_page_classifier() if skip_blank_pages else None
+        page_files = {}
+        for page_number, absolute_path in saved_pages:
+            page_files[page_number] = absolute_path
+
+            # Store the file in the state, described for scheduling
+            info = {
+                "bytes": os.path.getsize(absolute_path),
+                "pages": 1,
+                "test_form": get_test_form_key(absolute_path),
+            }
+            skip_reason = classifier.classify_file(absolute_path) if classifier else None
+            if skip_reason is None:
+                generated_files[absolute_path] = ""
+                queue.add(absolute_path, info)
+            else:
+                # Keep the page listed, but out of the LLM pipeline
+                info["skip_reason"] = skip_reason
+                skipped_pages[absolute_path] = skip_reason
+                generated_files[absolute_path] = STATUS_SKIPPED
+                queue.add(absolute_path, info)
+                queue.set_status(absolute_path, STATUS_SKIPPED)
 
-            # Store the file in the tool_context.state
-            tool_context.state["files"][absolute_path] = ""
+        if render_cache is not None and not cache_hit:
+            render_cache.put(cache_key, page_files)
 
     except Exception as e:
         return {
@@ -92,8 +551,19 @@ def split_pdf_pages(
         }
 
     # Return the result
+    page_bytes = {path: os.path.getsize(path) for path in generated_files}
+    num_text_pages = sum(1 for path in generated_files if path.endswith(TEXT_LAYER_SUFFIX))
+    num_images = len(generated_files) - num_text_pages
+    cache_note = " (render cache hit)" if cache_hit else ""
+    skip_note = f", {len(skipped_pages)} pages skipped" if skipped_pages else ""
     return {
         "status": "success",
-        "message": f"Successfully split PDF '{file_path}' into {len(generated_files)} JPEG images",
+        "message": (
+            f"Successfully split PDF '{file_path}' into {num_images} page images "
+            f"and {num_text_pages} text-layer pages using the '{profile}' profile "
+            f"({sum(page_bytes.values())} bytes){skip_note}{cache_note}"
+        ),
         "files": generated_files,
+        "page_bytes": page_bytes,
+        "skipped": skipped_pages,
     }
@@ -0,0 +1,72 @@
+"""
+Tests for the disk-backed artifact service.
+"""
+
+from google.genai import types
+
+from questions_extractor_agent.artifact_service import LocalArtifactService
+from utils.artifact_store import ArtifactStore
+
+SCOPE = {"app_name": "app", "user_id": "user", "session_id": "session"}
+
+
+def make_service(tmp_path, max_hot_bytes=1024):
+    """
+    Creates a service with its records and blobs under tmp_path.
+    """
+    return LocalArtifactService(
+        tmp_path / "records", ArtifactStore(tmp_path / "blobs"), max_hot_bytes
+    )
+
+
+def image_part(data):
+    """
+    Creates an inline JPEG Part.
+    """
+    return types.Part(inline_data=types.Blob(data=data, mime_type="image/jpeg"))
+
+
+def test_versions_round_trip_through_disk(tmp_path):
+    """Test that saved versions are loaded back, also by a fresh service instance."""
+    service = make_service(tmp_path)
+    assert service.save_artifact(filename="page-1.jpg", artifact=image_part(b"v0"), **SCOPE) == 0
+    assert service.save_artifact(filename="page-1.jpg", artifact=image_part(b"v1"), **SCOPE) == 1
+    service.save_artifact(filename="note", artifact=types.Part(text="hello"), **SCOPE)
+
+    reloaded = make_service(tmp_path)
+    assert reloaded.load_artifact(filename="page-1.jpg", **SCOPE).inline_data.data == b"v1"
+    assert reloaded.load_artifact(filename="page-1.jpg", version=0, **SCOPE).inline_data.data == b"v0"
+    assert reloaded.load_artifact(filename="note", **SCOPE).text == "hello"
+    assert reloaded.load_artifact(filename="missing", **SCOPE) is None
+    assert reloaded.list_versions(filename="page-1.jpg", **SCOPE) == [0, 1]
+    assert reloaded.list_artifact_keys(**SCOPE) == ["note", "page-1.jpg"]
+
+    reloaded.delete_artifact(filename="note", **SCOPE)
+    assert reloaded.list_artifact_keys(**SCOPE) == ["page-1.jpg"]
+
+
+def test_payloads_are_memory_mapped_and_deduplicated(tmp_path):
+    """Test that identical payloads share a blob and open_artifact returns a zero-copy view."""
+    service = make_service(tmp_path)
+    service.save_artifact(filename="a.jpg", artifact=image_part(b"same page"), **SCOPE)
+    service.save_artifact(filename="b.jpg", artifact=image_part(b"same page"), **SCOPE)
+
+    with service.open_artifact(filename="b.jpg", **SCOPE) as view:
+        assert isinstance(view, memoryview)
+        assert view.readonly
+        assert view == b"same page"
+    with service.open_artifact(filename="missing.jpg", **SCOPE) as view:
+        assert view is None
+    assert len([p for p in (tmp_path / "blobs" / "blobs").rglob("*") if p.is_file()]) == 1
+
+
+def test_hot_set_is_bounded(tmp_path):
+    """Test that only max_hot_bytes of loaded payloads stay in memory."""
+    service = make_service(tmp_path, max_hot_bytes=10)
+    for name in ("a.jpg", "b.jpg", "c.jpg"):
+        service.save_artifact(filename=name, artifact=image_part(name.encode() * 2), **SCOPE)
+        service.load_artifact(filename=name, **SCOPE)
+
+    # Each payload is 10 bytes, so only the most recent one is kept
+    assert service._hot_bytes == 10
+    assert [key[0].rsplit("/", 1)[-1] for key in service._hot] == ["c.jpg"]
@@ -0,0 +1,186 @@
+"""
+Tests for multi-page batched model requests.
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+from typing import Any, List
+
+from google.genai import types
+
+from questions_extractor_agent.batching import (
+    BatchOcrResponse,
+    build_ocr_contents,
+    build_structure_contents,
+    chunk,
+    ocr_pages,
+    split_batch_response,
+    structure_and_tag_pages,
+    structure_pages,
+    tag_pages,
+)
+from utils.model_executor import ModelCallExecutor
+
+
+class FakeModels:
+    """
+    Fake client.aio.models that answers batched requests from the page markers.
+
+    OCR pages are "transcribed" to their image bytes; structured pages become a test set
+    holding their text. Pages listed in `drop` are left out of batched responses.
+    """
+
+    def __init__(self, drop=()):
+        self.requests: List[Any] = []
+        self.drop = set(drop)
+
+    async def generate_content(self, model, contents, config):
+        self.requests.append(contents)
+        pages = []
+        page_index = None
+        for part in contents[1:]:
+            if part.inline_data is not None:
+                value = part.inline_data.data.decode()
+                pages.append({"page_index": page_index, "text": value})
+            elif part.text.startswith("Page ") and part.text.endswith(":"):
+                page_index = int(part.text[5:-1])
+            else:
+                marker, text = part.text.split("\n", 1)
+                page_index = int(marker[5:-1])
+                if config.response_schema.__name__ == "BatchTaggedResponse":
+                    test_set = {"test_forms": [{"name": text}], "tags": [{"level1": "Grammar"}]}
+                    pages.append({"page_index": page_index, "test_set": test_set})
+                else:
+                    pages.append(
+                        {"page_index": page_index, "test_set_json": json.dumps({"text": text})}
+                    )
+        if len(pages) > 1:
+            pages = [page for page in pages if page.get("text", "") not in self.drop]
+        # Answer in reverse order: attribution must rely on page_index
+        return SimpleNamespace(text=json.dumps({"pages": pages[::-1]}))
+
+
+def make_client(drop=()):
+    return SimpleNamespace(aio=SimpleNamespace(models=FakeModels(drop)))
+
+
+def image_part(name):
+    return types.Part.from_bytes(data=name.encode(), mime_type="image/jpeg")
+
+
+def test_chunk():
+    """Test that items are split into ordered batches."""
+    assert chunk([1, 2, 3, 4, 5], 2) == [[1, 2], [3, 4], [5]]
+    assert chunk([1, 2], 0) == [[1], [2]]
+
+
+def test_build_contents_marks_each_page():
+    """Test that every page follows a "Page {i}" marker."""
+    contents = build_ocr_contents([image_part("a"), image_part("b")])
+    assert [part.text for part in contents[1::2]] == ["Page 0:", "Page 1:"]
+
+    contents = build_structure_contents(["first", "second"])
+    assert contents[2].text == "Page 1:\nsecond"
+
+
+def test_split_batch_response():
+    """Test that entries are keyed by page_index, ignoring stray and repeated indexes."""
+    response = json.dumps(
+        {
+            "pages": [
+                {"page_index": 1, "text": "b"},
+                {"page_index": 0, "text": "a"},
+                {"page_index": 1, "text": "duplicate"},
+                {"page_index": 7, "text": "stray"},
+            ]
+        }
+    )
+    assert split_batch_response(response, 2, BatchOcrResponse, "text") == {0: "a", 1: "b"}
+    assert split_batch_response("not json", 2, BatchOcrResponse, "text") == {}
+
+
+def test_ocr_pages_batches_and_attributes_results():
+    """Test that pages are sent batch_size at a time and results map back to their files."""
+    client = make_client()
+    images = {f"page-{i}.jpg": image_part(f"text {i}") for i in range(5)}
+
+    texts, errors = asyncio.run(
+        ocr_pages(ModelCallExecutor(limits={}), client, images, batch_size=2)
+    )
+
+    assert len(client.aio.models.requests) == 3
+    assert list(texts) == list(images)
+    assert texts == {f"page-{i}.jpg": f"text {i}" for i in range(5)}
+    assert errors == {}
+
+
+def test_ocr_pages_retries_pages_missing_from_a_batch():
+    """Test that a page the model left out is retried on its own."""
+    client = make_client(drop={"text 1"})
+    images = {f"page-{i}.jpg": image_part(f"text {i}") for i in range(3)}
+
+    texts, errors = asyncio.run(
+        ocr_pages(ModelCallExecutor(limits={}), client, images, batch_size=3)
+    )
+
+    assert len(client.aio.models.requests) == 2
+    assert texts["page-1.jpg"] == "text 1"
+    assert errors == {}
+
+
+def test_ocr_pages_reports_failed_requests():
+    """Test that a failed request is reported for each of its pages."""
+
+    async def failing_generate_content(**kwargs):
+        raise RuntimeError("model unavailable")
+
+    client = SimpleNamespace(
+        aio=SimpleNamespace(models=SimpleNamespace(generate_content=failing_generate_content))
+    )
+    texts, errors = asyncio.run(
+        ocr_pages(ModelCallExecutor(limits={}), client, {"a.jpg": image_part("a")})
+    )
+    assert texts == {}
+    assert errors == {"a.jpg": "model unavailable"}
+
+
+def test_structure_pages_parses_test_sets():
+    """Test that each page's test set JSON is parsed and attributed to its page."""
+    client = make_client()
+    test_sets, errors = asyncio.run(
+        structure_pages(
+            ModelCallExecutor(limits={}), client, {"a.jpg": "101. ...", "b.jpg": "102. ..."}
+        )
+    )
+    assert len(client.aio.models.requests) == 1
+    assert test_sets == {"a.jpg": {"text": "101. ..."}, "b.jpg": {"text": "102. ..."}}
+    assert errors == {}
+
+
+def test_tag_pages_sends_test_sets_as_json():
+    """Test that each page's test set is sent as JSON and the tagged test set parsed."""
+    client = make_client()
+    test_set = {"questions": [{"number": 101, "stem": "-------"}]}
+    tagged, errors = asyncio.run(
+        tag_pages(ModelCallExecutor(limits={}), client, {"a.jpg": test_set}, batch_size=2)
+    )
+    assert client.aio.models.requests[0][1].text == f"Page 0:\n{json.dumps(test_set)}"
+    assert tagged == {"a.jpg": {"text": json.dumps(test_set)}}
+    assert errors == {}
+
+
+def test_structure_and_tag_pages_returns_tagged_test_sets():
+    """Test that one request structures and tags a batch of pages into plain dicts."""
+    client = make_client()
+    tagged, errors = asyncio.run(
+        structure_and_tag_pages(
+            ModelCallExecutor(limits={}), client, {"a.jpg": "page a", "b.jpg": "page b"}
+        )
+    )
+    assert len(client.aio.models.requests) == 1
+    assert list(tagged) == ["a.jpg", "b.jpg"]
+    assert tagged["b.jpg"]["test_forms"] == [{"name": "page b"}]
+    assert tagged["b.jpg"]["tags"] == [{"level1": "Grammar"}]
+    assert tagged["b.jpg"]["questions"] == []
+    assert errors == {}
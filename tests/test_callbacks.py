@@ -0,0 +1,126 @@
+"""
+Tests for the agent callbacks.
+"""
+
+import json
+from types import SimpleNamespace
+
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from questions_extractor_agent.callbacks import (
+    StageOutputCache,
+    chain_before_model_callbacks,
+    skip_ocr_for_text_layer,
+    skip_tagging_for_indexed_questions,
+)
+from utils.stage_cache import StageCache
+from utils.tag_index import TagIndex
+
+STRUCTURE_MODEL = "gemini-2.5-pro-preview-05-06"
+
+
+def make_context(state, invocation_id="invocation-1"):
+    return SimpleNamespace(state=state, invocation_id=invocation_id)
+
+
+def make_request(instruction="Structure the questions."):
+    return LlmRequest(
+        model=STRUCTURE_MODEL,
+        config=types.GenerateContentConfig(system_instruction=instruction, temperature=0),
+    )
+
+
+def make_response(text):
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+
+def test_stage_output_cache_hit_skips_model(tmp_path):
+    """Test that a repeated stage input is answered from the cache."""
+    cache = StageOutputCache("structure", "v1", cache=StageCache(tmp_path))
+    state = {"extractor_result": "101. The meeting was -------."}
+
+    assert cache.before_model(make_context(state), make_request()) is None
+    cache.after_model(make_context(state), make_response('{"questions": []}'))
+
+    response = cache.before_model(make_context(state, "invocation-2"), make_request())
+
+    assert response.content.parts[0].text == '{"questions": []}'
+    assert response.content.role == "model"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_stage_output_cache_misses_when_prompt_changes(tmp_path):
+    """Test that a new input, prompt version or instruction is not answered from the cache."""
+    disk_cache = StageCache(tmp_path)
+    cache = StageOutputCache("structure", "v1", cache=disk_cache)
+    state = {"extractor_result": "101. The meeting was -------."}
+    cache.before_model(make_context(state), make_request())
+    cache.after_model(make_context(state), make_response('{"questions": []}'))
+
+    other_input = {"extractor_result": "102. Please submit the form -------."}
+    assert cache.before_model(make_context(other_input), make_request()) is None
+    assert cache.before_model(make_context(state), make_request("Be brief.")) is None
+    bumped = StageOutputCache("structure", "v2", cache=disk_cache)
+    assert bumped.before_model(make_context(state), make_request()) is None
+
+
+def test_stage_output_cache_does_not_store_function_calls(tmp_path):
+    """Test that tool calls and missing inputs are never cached."""
+    cache = StageOutputCache("structure", "v1", cache=StageCache(tmp_path))
+    state = {"extractor_result": "101. The meeting was -------."}
+
+    cache.before_model(make_context(state), make_request())
+    cache.after_model(
+        make_context(state),
+        LlmResponse(
+            content=types.Content(
+                role="model",
+                parts=[types.Part(function_call=types.FunctionCall(name="save_test_set"))],
+            )
+        ),
+    )
+
+    assert cache.before_model(make_context(state), make_request()) is None
+    assert cache.before_model(make_context({}), make_request()) is None
+    assert not list(tmp_path.rglob("*.json"))
+
+
+def test_chain_before_model_callbacks_returns_first_response(tmp_path):
+    """Test that the text-layer bypass runs before the stage cache."""
+    cache = StageOutputCache("extractor", "v1", cache=StageCache(tmp_path))
+    before_model = chain_before_model_callbacks(skip_ocr_for_text_layer, cache.before_model)
+    state = {"content_hashes": {"exam-1.jpg": "ab"}, "ocr_skipped": True, "extractor_result": "text"}
+
+    response = before_model(make_context(state), make_request())
+
+    assert response.content.parts[0].text == "text"
+    assert cache.misses == 0
+
+    state["ocr_skipped"] = False
+    assert before_model(make_context(state), make_request()) is None
+    assert cache.misses == 1
+
+
+def test_skip_tagging_for_indexed_questions(tmp_path, monkeypatch):
+    """Test that familiar questions are tagged from the tag index without the model."""
+    stem = "The manager ------- the quarterly report yesterday."
+    tag_index = TagIndex(tmp_path / "tag_index.jsonl")
+    for question_id in range(1, 4):
+        tag_index.add(question_id, stem, [{"level1": "Grammar"}])
+    monkeypatch.setenv("TAG_INDEX_PATH", str(tmp_path / "tag_index.jsonl"))
+
+    question = {"part_label": "Part 5", "number": 101, "stem": stem}
+    state = {"structure_result": {"status": "success", "test_set": {"questions": [question]}}}
+    response = skip_tagging_for_indexed_questions(make_context(state), make_request())
+
+    output = json.loads(response.content.parts[0].text)
+    assert output["tagged_test_set"]["question_tags"] == [
+        {"question_key": "Part 5_101", "tag_key": "Grammar__"}
+    ]
+    assert state["tagged_from_index"] is True
+
+    unfamiliar = {"part_label": "Part 5", "number": 102, "stem": "Shipping is ------- for members."}
+    state = {"structure_result": {"test_forms": [], "questions": [question, unfamiliar]}}
+    assert skip_tagging_for_indexed_questions(make_context(state), make_request()) is None
+    assert state["tagged_from_index"] is False
@@ -0,0 +1,167 @@
+"""
+Tests for the code-driven file selection and save agents.
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from google.adk.agents import BaseAgent, LoopAgent, SequentialAgent
+from google.adk.artifacts import InMemoryArtifactService
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from questions_extractor_agent.direct_agents import (
+    FileSelectorAgent,
+    SaveAgent,
+    extract_test_set,
+)
+from questions_extractor_agent.tools import database_tools
+
+
+@pytest.fixture(autouse=True)
+def isolated_stores(tmp_path, monkeypatch):
+    """
+    Keeps the artifact store of each test in its own temporary directory, without a ledger.
+    """
+    monkeypatch.setenv("ARTIFACT_STORE_DIR", str(tmp_path / "artifacts"))
+    monkeypatch.delenv("FILE_LEDGER_PATH", raising=False)
+
+
+class FakeSupabase:
+    """
+    Fake Supabase client that keeps the upserted test form names.
+    """
+
+    def __init__(self):
+        self.test_forms = []
+
+    def table(self, name):
+        def upsert(row, on_conflict=None):
+            if name == "test_forms":
+                self.test_forms.append(row["name"])
+            return SimpleNamespace(execute=lambda: SimpleNamespace(data=[{**row, "id": 1}]))
+
+        return SimpleNamespace(upsert=upsert)
+
+
+class FakeTaggingAgent(BaseAgent):
+    """
+    Stands in for extractor, structure and tagging: writes a tagging_result per page.
+    """
+
+    async def _run_async_impl(self, ctx):
+        file_name = ctx.session.state["file_to_process"]
+        ctx.session.state["tagging_result"] = json.dumps(
+            {"status": "success", "tagged_test_set": {"test_forms": [{"name": file_name}]}}
+        )
+        return
+        yield
+
+
+def run_loop(state):
+    """Runs select -> tagging stand-in -> save in a loop and returns the final session state."""
+    loop = LoopAgent(
+        name="pipeline_loop_agent",
+        sub_agents=[
+            SequentialAgent(
+                name="pipeline_sequential_agent",
+                sub_agents=[
+                    FileSelectorAgent(name="file_selector_agent"),
+                    FakeTaggingAgent(name="tagging_agent"),
+                    SaveAgent(name="save_agent"),
+                ],
+            )
+        ],
+        max_iterations=10,
+    )
+    session_service = InMemorySessionService()
+    runner = Runner(
+        app_name="questions_extractor",
+        agent=loop,
+        artifact_service=InMemoryArtifactService(),
+        session_service=session_service,
+    )
+    session = session_service.create_session(
+        app_name="questions_extractor", user_id="user", state=state
+    )
+
+    async def run():
+        events = []
+        async for event in runner.run_async(
+            user_id="user",
+            session_id=session.id,
+            new_message=types.Content(role="user", parts=[types.Part(text="start")]),
+        ):
+            events.append(event)
+        return events
+
+    events = asyncio.run(run())
+    final = session_service.get_session(
+        app_name="questions_extractor", user_id="user", session_id=session.id
+    )
+    return events, final
+
+
+def test_agents_process_every_file_without_a_model(tmp_path, monkeypatch):
+    """
+    Test that the loop selects, saves and marks every file done, then exits by escalation.
+    """
+    supabase = FakeSupabase()
+    monkeypatch.setattr(database_tools, "get_supabase_client", lambda: supabase)
+    paths = []
+    for i in range(1, 4):
+        page = tmp_path / f"exam-{i}.jpg"
+        page.write_bytes(f"page {i}".encode())
+        paths.append(str(page))
+
+    events, session = run_loop({"files": dict.fromkeys(paths, "")})
+
+    assert supabase.test_forms == ["exam-1.jpg", "exam-2.jpg", "exam-3.jpg"]
+    assert session.state["files"] == dict.fromkeys(paths, "done")
+    assert session.state["save_result"]["status"] == "success"
+    assert events[-1].author == "file_selector_agent"
+    assert events[-1].actions.escalate
+    # Selection only hashes the pages; no stage loaded them, so no artifact was saved
+    assert not any(event.actions.artifact_delta for event in events)
+
+
+def test_save_agent_marks_files_failed_without_a_test_set(tmp_path, monkeypatch):
+    """
+    Test that an unusable tagging_result is reported and the file marked failed.
+    """
+    monkeypatch.setattr(database_tools, "get_supabase_client", lambda: FakeSupabase())
+    page = tmp_path / "exam-1.jpg"
+    page.write_bytes(b"page")
+    monkeypatch.setattr(
+        FakeTaggingAgent,
+        "_run_async_impl",
+        _write_tagging_result("I could not tag this page."),
+    )
+
+    _, session = run_loop({"files": {str(page): ""}})
+
+    assert session.state["files"] == {str(page): "failed"}
+    assert session.state["save_result"]["status"] == "error"
+
+
+def _write_tagging_result(value):
+    async def run(self, ctx):
+        ctx.session.state["tagging_result"] = value
+        return
+        yield
+
+    return run
+
+
+def test_extract_test_set():
+    """Test that the test set is found in every output shape the agents produce."""
+    test_set = {"test_forms": [{"name": "Form A"}]}
+    assert extract_test_set({"status": "success", "tagged_test_set": test_set}) == test_set
+    assert extract_test_set({"status": "success", "test_set": test_set}) == test_set
+    assert extract_test_set(test_set) == test_set
+    assert extract_test_set("```json\n" + json.dumps(test_set) + "\n```") == test_set
+    assert extract_test_set("not json") is None
+    assert extract_test_set({"status": "error"}) is None
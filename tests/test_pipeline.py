@@ -0,0 +1,147 @@
+"""
+Tests for staged pipeline execution.
+"""
+
+import asyncio
+import time
+
+from questions_extractor_agent.pipeline import Stage, run_stages
+
+
+def sleep_stage(name, seconds, concurrency=1, active=None):
+    """A stage that waits `seconds` and appends its name to the value."""
+
+    async def run(key, value):
+        if active is not None:
+            active[name] = active.get(name, 0) + 1
+            active["max"] = max(active.get("max", 0), active[name])
+        await asyncio.sleep(seconds)
+        if active is not None:
+            active[name] -= 1
+        return value + [name]
+
+    return Stage(name, run, concurrency)
+
+
+def test_run_stages_passes_items_through_every_stage():
+    """Test that each item goes through all stages in order and results are keyed."""
+    stages = [sleep_stage("ocr", 0), sleep_stage("structure", 0), sleep_stage("save", 0)]
+    items = [(f"page-{i}", []) for i in range(5)]
+
+    results, errors = asyncio.run(run_stages(items, stages))
+
+    assert errors == {}
+    assert results == {f"page-{i}": ["ocr", "structure", "save"] for i in range(5)}
+    assert [stage.completed for stage in stages] == [5, 5, 5]
+
+
+def test_run_stages_overlaps_stages():
+    """Test that the stages work on different pages at once instead of one page at a time."""
+    stages = [sleep_stage("ocr", 0.02), sleep_stage("structure", 0.05), sleep_stage("tag", 0.03)]
+    items = [(f"page-{i}", []) for i in range(10)]
+
+    start = time.perf_counter()
+    asyncio.run(run_stages(items, stages))
+    elapsed = time.perf_counter() - start
+
+    # Sequential: 10 * 0.10 s; pipelined: about 10 * 0.05 s (the slowest stage) plus fill
+    assert elapsed < 0.8
+    assert stages[1].busy_seconds >= 0.5
+
+
+def test_run_stages_respects_stage_concurrency():
+    """Test that a stage never works on more items than its concurrency."""
+    active = {}
+    stages = [sleep_stage("structure", 0.01, concurrency=3, active=active)]
+
+    asyncio.run(run_stages(((f"page-{i}", []) for i in range(12)), stages))
+
+    assert active["max"] == 3
+
+
+def test_run_stages_bounds_the_queues():
+    """Test that items are taken in only as the first queue has room."""
+    taken = []
+
+    def items():
+        for i in range(20):
+            taken.append(i)
+            yield f"page-{i}", []
+
+    async def slow(key, value):
+        # Everything taken so far is waiting in the queue, or in this worker
+        assert len(taken) - stage.completed <= stage.queue_size + 2
+        await asyncio.sleep(0.001)
+        return value
+
+    stage = Stage("ocr", slow, concurrency=1, queue_size=2)
+    results, _ = asyncio.run(run_stages(items(), [stage]))
+    assert len(results) == 20
+
+
+def test_run_stages_drops_failed_items():
+    """Test that a failing item is reported with its stage and the others finish."""
+
+    async def structure(key, value):
+        if key == "page-1":
+            raise ValueError("not a test page")
+        return value
+
+    failures = {}
+    results, errors = asyncio.run(
+        run_stages(
+            [("page-0", 0), ("page-1", 1), ("page-2", 2)],
+            [Stage("structure", structure)],
+            on_error=lambda key, error: failures.update({key: error}),
+        )
+    )
+
+    assert results == {"page-0": 0, "page-2": 2}
+    assert errors == {"page-1": "structure: not a test page"}
+    assert failures == errors
+
+
+def test_run_stages_drains_the_stages_when_the_items_fail():
+    """Test that a failing (async) item source ends the run cleanly and raises its error."""
+    results = {}
+
+    async def items():
+        for i in range(3):
+            await asyncio.sleep(0)
+            yield f"page-{i}", [i]
+        raise OSError("ledger is locked")
+
+    async def run():
+        stages = [sleep_stage("ocr", 0.01, concurrency=2), sleep_stage("save", 0.01)]
+        try:
+            await asyncio.wait_for(run_stages(items(), stages, on_result=results.__setitem__), 5)
+        except OSError as e:
+            error = e
+        # No stage task is left running
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+        return error
+
+    error = asyncio.run(run())
+
+    assert str(error) == "ledger is locked"
+    assert sorted(results) == ["page-0", "page-1", "page-2"]
+
+
+def test_run_stages_cancels_the_stages_when_a_callback_fails():
+    """Test that an error outside the stages cancels every other task."""
+
+    def on_result(key, value):
+        raise RuntimeError("database is down")
+
+    async def run():
+        items = ((f"page-{i}", []) for i in range(100))
+        try:
+            stages = [sleep_stage("ocr", 0.001, concurrency=2)]
+            await asyncio.wait_for(run_stages(items, stages, on_result), 5)
+        except RuntimeError as e:
+            error = e
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+        return error
+
+    error = asyncio.run(run())
+    assert str(error) == "database is down"
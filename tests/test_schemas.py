@@ -0,0 +1,43 @@
+"""
+Tests for the structured-output schemas derived from models.py.
+"""
+
+import models
+from questions_extractor_agent import schemas
+
+
+def test_output_row_model_drops_id_and_json_fields():
+    """Test that the generated id and JSONB columns are not part of the output rows."""
+    row = schemas.output_row_model("questions", models.Question)
+    assert "id" not in row.model_fields
+    assert "attributes" not in row.model_fields
+    assert {"number", "stem", "difficulty"} <= set(row.model_fields)
+
+
+def test_output_row_model_makes_foreign_keys_optional_and_adds_link_fields():
+    """Test that foreign keys may be left out in favour of the table's link fields."""
+    row = schemas.output_row_model("questions", models.Question)
+    question = row(number=101, stem="-------", part_label="Part 5", passage_set_key="1_1")
+    assert question.part_id is None
+    assert question.passage_set_id is None
+    assert row.model_fields["part_id"].description == "Redundant storage: FK → parts.id"
+
+
+def test_tagged_test_set_covers_structure_and_tag_tables():
+    """Test that the fused test set has every table save_test_set takes, defaulting empty."""
+    assert list(schemas.TaggedTestSet.model_fields) == (
+        schemas.STRUCTURE_TABLES + schemas.TAG_TABLES
+    )
+    test_set = schemas.TaggedTestSet.model_validate(
+        {
+            "tags": [{"level1": "Grammar"}],
+            "question_tags": [{"question_key": "1_101", "tag_key": "Grammar__"}],
+        }
+    )
+    assert test_set.model_dump(exclude_none=True) == {
+        **{table: [] for table in schemas.STRUCTURE_TABLES},
+        "tags": [{"level1": "Grammar"}],
+        "question_tags": [{"question_key": "1_101", "tag_key": "Grammar__"}],
+    }
+    # The response schema can be sent to the model
+    assert "pages" in schemas.BatchTaggedResponse.model_json_schema()["properties"]
@@ -0,0 +1,263 @@
+"""
+Tests for the ocr_batch and structure_batch tools.
+"""
+
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+from typing import Any, Dict
+
+import pytest
+
+from questions_extractor_agent.tools import batch_pages
+from google.genai import types
+
+from questions_extractor_agent.tools.batch_pages import (
+    ocr_batch,
+    structure_batch,
+    structure_question_blocks,
+)
+from utils.file_queue import get_file_queue
+from utils.hashing import hash_file
+
+
+@pytest.fixture(autouse=True)
+def isolated_artifact_store(tmp_path, monkeypatch):
+    """
+    Keeps the artifact store of each test in its own temporary directory.
+    """
+    monkeypatch.setenv("ARTIFACT_STORE_DIR", str(tmp_path / "artifacts"))
+
+
+class MockToolContext:
+    """
+    Mock implementation of ToolContext for testing.
+    """
+
+    def __init__(self):
+        self.state: Dict[str, Any] = {}
+        self.actions = MockActions()
+
+
+class MockActions:
+    """
+    Mock implementation of ToolContext.actions for testing.
+    """
+
+    def __init__(self):
+        self.saved_artifacts: Dict[str, Any] = {}
+
+    def save_artifact(self, name: str, content: Any) -> int:
+        self.saved_artifacts[name] = content
+        return 1
+
+    def load_artifact(self, name: str) -> Any:
+        return self.saved_artifacts.get(name)
+
+
+class FakeModels:
+    """
+    Fake client.aio.models: "transcribes" each image to its bytes and structures each text
+    into {"text": ...}. Images whose bytes are in `fail` are left out of every response.
+    """
+
+    def __init__(self, fail=()):
+        self.requests = []
+        self.fail = set(fail)
+
+    async def generate_content(self, model, contents, config):
+        self.requests.append(contents)
+        pages = []
+        page_index = None
+        for part in contents[1:]:
+            if part.inline_data is not None:
+                text = part.inline_data.data.decode()
+                if text not in self.fail:
+                    pages.append({"page_index": page_index, "text": text})
+            elif part.text.endswith(":"):
+                page_index = int(part.text[5:-1])
+            else:
+                marker, text = part.text.split("\n", 1)
+                pages.append(
+                    {"page_index": int(marker[5:-1]), "test_set_json": json.dumps({"text": text})}
+                )
+        return SimpleNamespace(text=json.dumps({"pages": pages}))
+
+
+def select_pages(tool_context, tmp_path, names, text_layers=None):
+    """
+    Mimics select_file with batch_size > 1: writes each page (a name relative to tmp_path)
+    with its expected text as its bytes and registers the files as in-progress. Their
+    artifacts are saved on first load.
+    """
+    queue = get_file_queue(tool_context.state)
+    paths = [str(tmp_path / name) for name in names]
+    for name, path in zip(names, paths):
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(f"text of {name}".encode())
+        queue.add(path)
+        queue.claim()
+    tool_context.state["files_to_process"] = [os.path.basename(path) for path in paths]
+    tool_context.state["file_paths_to_process"] = paths
+    tool_context.state["content_hashes"] = {path: hash_file(path) for path in paths}
+    tool_context.state["text_layers"] = {
+        str(tmp_path / name): text for name, text in (text_layers or {}).items()
+    }
+    return paths
+
+
+def use_fake_client(monkeypatch, fail=()):
+    models = FakeModels(fail)
+    client = SimpleNamespace(aio=SimpleNamespace(models=models))
+    monkeypatch.setattr(batch_pages, "get_genai_client", lambda: client)
+    return models
+
+
+def test_ocr_batch_transcribes_pages_in_batches(tmp_path, monkeypatch):
+    """
+    Test that image pages are sent batch_size at a time, text-layer pages keep their text,
+    and every text is attributed to its file.
+    """
+    models = use_fake_client(monkeypatch)
+    tool_context = MockToolContext()
+    names = ["exam-1.jpg", "exam-2.txt", "exam-3.jpg", "exam-4.jpg"]
+    paths = select_pages(tool_context, tmp_path, names, text_layers={"exam-2.txt": "layer text"})
+
+    result = asyncio.run(ocr_batch(tool_context, batch_size=2))
+
+    assert result["status"] == "success"
+    assert result["requests"] == 2
+    assert len(models.requests) == 2
+    assert tool_context.state["extractor_results"] == {
+        paths[0]: "text of exam-1.jpg",
+        paths[1]: "layer text",
+        paths[2]: "text of exam-3.jpg",
+        paths[3]: "text of exam-4.jpg",
+    }
+    assert tool_context.state["extractor_result"].startswith("text of exam-1.jpg\n\nlayer text")
+    assert tool_context.state["ocr_skipped"] is True
+
+
+def test_ocr_batch_marks_failed_pages(tmp_path, monkeypatch):
+    """
+    Test that a page without a transcription is marked failed and dropped from the batch.
+    """
+    use_fake_client(monkeypatch, fail={"text of exam-2.jpg"})
+    tool_context = MockToolContext()
+    paths = select_pages(tool_context, tmp_path, ["exam-1.jpg", "exam-2.jpg"])
+
+    result = asyncio.run(ocr_batch(tool_context, batch_size=2))
+
+    assert result["status"] == "success"
+    assert list(result["errors"]) == [paths[1]]
+    assert tool_context.state["files"][paths[1]] == "failed"
+    assert tool_context.state["files"][paths[0]] == "in-progress"
+    assert tool_context.state["files_to_process"] == ["exam-1.jpg"]
+    assert tool_context.state["file_paths_to_process"] == [paths[0]]
+
+
+def test_ocr_batch_keeps_same_named_pages_apart(tmp_path, monkeypatch):
+    """
+    Test that pages with the same filename in different folders are each transcribed from
+    their own image, and a failure only fails its own page.
+    """
+    use_fake_client(monkeypatch, fail={"text of b/exam-1.jpg"})
+    tool_context = MockToolContext()
+    paths = select_pages(tool_context, tmp_path, ["a/exam-1.jpg", "b/exam-1.jpg", "c/exam-1.jpg"])
+
+    result = asyncio.run(ocr_batch(tool_context, batch_size=3))
+
+    assert tool_context.state["extractor_results"] == {
+        paths[0]: "text of a/exam-1.jpg",
+        paths[2]: "text of c/exam-1.jpg",
+    }
+    assert list(result["errors"]) == [paths[1]]
+    assert tool_context.state["files"] == {
+        paths[0]: "in-progress",
+        paths[1]: "failed",
+        paths[2]: "in-progress",
+    }
+    assert tool_context.state["file_paths_to_process"] == [paths[0], paths[2]]
+
+
+def test_structure_batch_stores_a_test_set_per_page(tmp_path, monkeypatch):
+    """
+    Test that page texts are structured in batches and attributed to their files.
+    """
+    models = use_fake_client(monkeypatch)
+    tool_context = MockToolContext()
+    paths = select_pages(tool_context, tmp_path, ["a/exam-1.jpg", "b/exam-1.jpg", "exam-3.jpg"])
+    tool_context.state["extractor_results"] = {
+        paths[0]: "101. one",
+        paths[1]: "102. two",
+        paths[2]: "103. three",
+    }
+
+    result = asyncio.run(structure_batch(tool_context, batch_size=3))
+
+    assert result["status"] == "success"
+    assert len(models.requests) == 1
+    assert tool_context.state["structure_results"] == {
+        paths[0]: {"text": "101. one"},
+        paths[1]: {"text": "102. two"},
+        paths[2]: {"text": "103. three"},
+    }
+
+
+def test_structure_batch_without_texts():
+    """
+    Test that structure_batch reports an error when there is nothing to structure.
+    """
+    result = asyncio.run(structure_batch(MockToolContext()))
+    assert result["status"] == "error"
+    assert "ocr_batch" in result["message"]
+
+
+def test_structure_question_blocks_runs_every_block_as_its_own_item(tmp_path, monkeypatch):
+    """
+    Test that block crops are transcribed and structured in batches, attributed to their
+    blocks, and that a failed block fails its page.
+    """
+    models = use_fake_client(monkeypatch, fail={"103. three"})
+    tool_context = MockToolContext()
+    paths = select_pages(tool_context, tmp_path, ["exam-1.jpg", "exam-2.jpg"])
+    block_texts = {
+        "exam-1-block-1": (paths[0], "101. one"),
+        "exam-1-block-2": (paths[0], "102. two"),
+        "exam-2-block-1": (paths[1], "103. three"),
+    }
+    tool_context.state["question_blocks"] = {}
+    for block_id, (file_path, text) in block_texts.items():
+        tool_context.actions.save_artifact(
+            f"{block_id}.jpg", types.Part.from_bytes(data=text.encode(), mime_type="image/jpeg")
+        )
+        tool_context.state["question_blocks"][block_id] = {
+            "artifact": f"{block_id}.jpg",
+            "source_file": file_path,
+            "page": 1,
+            "bbox": [0, 0, 10, 10],
+        }
+
+    result = asyncio.run(structure_question_blocks(tool_context, batch_size=2))
+
+    assert result["status"] == "success"
+    # Two OCR requests for the three crops, one structuring request for the two texts
+    assert result["requests"] == 3
+    assert len(models.requests) == 4  # plus the retry of the block left out of its batch
+    assert tool_context.state["block_results"] == {
+        "exam-1-block-1": {"text": "101. one"},
+        "exam-1-block-2": {"text": "102. two"},
+    }
+    assert list(result["errors"]) == ["exam-2-block-1"]
+    assert tool_context.state["files"][paths[1]] == "failed"
+    assert tool_context.state["file_paths_to_process"] == [paths[0]]
+
+
+def test_structure_question_blocks_without_blocks():
+    """
+    Test that structure_question_blocks reports an error when no blocks were found.
+    """
+    result = asyncio.run(structure_question_blocks(MockToolContext()))
+    assert result["status"] == "error"
+    assert "segment_questions" in result["message"]
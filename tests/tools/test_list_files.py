@@ -2,12 +2,15 @@
 Tests for the list_files tool.
 """
 
+import os
 import tempfile
 from pathlib import Path
 from typing import Any, Dict
 
 
+from questions_extractor_agent.tools.database_tools import _record_file_outcome
 from questions_extractor_agent.tools.list_files import list_files
+from utils.file_manifest import settle_files
 
 
 class MockToolContext:
@@ -161,3 +164,110 @@ def test_list_files_not_a_directory():
             or "files" not in tool_context.state
             or len(tool_context.state["files"]) == 0
         )
+
+
+def test_list_files_recursive_with_pattern():
+    """
+    Test list_files in recursive mode with a file name filter.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        (root / "top.pdf").write_text("pdf")
+        (root / "notes.txt").write_text("text")
+        (root / "form_a" / "part5").mkdir(parents=True)
+        (root / "form_a" / "part5" / "nested.pdf").write_text("pdf")
+        (root / "form_a" / "nested.txt").write_text("text")
+
+        tool_context = MockToolContext()
+        result = list_files(temp_dir, tool_context, recursive=True, pattern="*.pdf")
+
+        assert result["status"] == "success"
+        assert list(result["files"].keys()) == [
+            str((root / "top.pdf").absolute()),
+            str((root / "form_a" / "part5" / "nested.pdf").absolute()),
+        ]
+
+
+def test_list_files_incremental_lists_only_new_or_changed(tmp_path, monkeypatch):
+    """
+    Test that an incremental re-scan only lists files that are new or whose content changed.
+    """
+    monkeypatch.setenv("FILE_MANIFEST_PATH", str(tmp_path / "manifest.json"))
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    unchanged = input_dir / "unchanged.jpg"
+    touched = input_dir / "touched.jpg"
+    edited = input_dir / "edited.jpg"
+    unchanged.write_text("a")
+    touched.write_text("b")
+    edited.write_text("c")
+
+    first = list_files(str(input_dir), MockToolContext(), incremental=True)
+    assert len(first["files"]) == 3
+    # The listed files are processed
+    settle_files(first["files"])
+
+    # Same content with a new mtime is not a change; different content is
+    os.utime(touched, ns=(1, 1))
+    edited.write_text("c, revised")
+    added = input_dir / "added.jpg"
+    added.write_text("d")
+
+    tool_context = MockToolContext()
+    second = list_files(str(input_dir), tool_context, incremental=True)
+
+    assert second["status"] == "success"
+    assert set(second["files"].keys()) == {
+        str(edited.absolute()),
+        str(added.absolute()),
+    }
+    assert "2 unchanged files skipped" in second["message"]
+    assert set(tool_context.state["files"].keys()) == set(second["files"].keys())
+
+
+def test_list_files_incremental_relists_unfinished_files(tmp_path, monkeypatch):
+    """
+    Test that files a crashed run never finished are listed again, and finished ones are not.
+    """
+    monkeypatch.setenv("FILE_MANIFEST_PATH", str(tmp_path / "manifest.json"))
+    monkeypatch.delenv("FILE_LEDGER_PATH", raising=False)
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    finished = input_dir / "finished.jpg"
+    crashed = input_dir / "crashed.jpg"
+    finished.write_text("a")
+    crashed.write_text("b")
+
+    tool_context = MockToolContext()
+    list_files(str(input_dir), tool_context, incremental=True)
+    # A re-scan in the same session does not queue the files again
+    same_session = list_files(str(input_dir), tool_context, incremental=True)
+    assert same_session["files"] == {}
+
+    tool_context.state["file_paths_to_process"] = [str(finished.absolute())]
+    _record_file_outcome(tool_context, {"status": "success", "message": ""})
+
+    # The run crashes before crashed.jpg is processed; a new session lists it again
+    restarted = list_files(str(input_dir), MockToolContext(), incremental=True)
+    assert list(restarted["files"]) == [str(crashed.absolute())]
+
+
+def test_list_files_preflight_rejects_oversized_files():
+    """
+    Test that files over the 10 MB limit are rejected and marked failed.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        small = Path(temp_dir) / "small.jpg"
+        small.write_text("small")
+        large = Path(temp_dir) / "large.pdf"
+        with open(large, "wb") as f:
+            f.truncate(11 * 1024 * 1024)
+
+        tool_context = MockToolContext()
+        result = list_files(temp_dir, tool_context)
+
+        assert result["status"] == "success"
+        assert list(result["files"]) == [str(small.absolute())]
+        assert "over the" in result["rejected"][str(large.absolute())]
+        assert tool_context.state["files"][str(large.absolute())] == "failed"
+        assert tool_context.state["file_info"][str(small.absolute())]["bytes"] == 5
@@ -90,6 +90,47 @@ def test_load_artifact_nonexistent():
     assert tool_context.actions.called_with == "nonexistent_artifact"
 
 
+def test_load_artifact_resolves_artifact_store_reference(tmp_path, monkeypatch):
+    """
+    Test that an artifact referencing the content-addressed store is described, not read.
+    """
+    import json
+
+    from google.genai import types
+
+    from utils.artifact_store import ArtifactStore
+
+    monkeypatch.setenv("ARTIFACT_STORE_DIR", str(tmp_path))
+    digest, _ = ArtifactStore(tmp_path).put_bytes(b"page image bytes")
+    reference = types.Part(
+        file_data=types.FileData(file_uri=ArtifactStore.uri(digest), mime_type="image/jpeg")
+    )
+    tool_context = MockToolContext(content=reference)
+
+    result = load_artifact("page-1.jpg", tool_context)
+
+    assert result["status"] == "success"
+    assert result["content"] == {
+        "file_uri": f"cas://sha256/{digest}",
+        "mime_type": "image/jpeg",
+        "size_bytes": len(b"page image bytes"),
+    }
+    json.dumps(result)
+
+
+def test_load_artifact_size_limit():
+    """
+    Test that artifacts over the size limit are refused.
+    """
+    tool_context = MockToolContext(content=b"x" * 11)
+
+    result = load_artifact("large_artifact", tool_context, max_bytes=10)
+
+    assert result["status"] == "error"
+    assert "over the 10 byte limit" in result["message"]
+    assert result["content"] is None
+
+
 # Run the tests when executed directly
 if __name__ == "__main__":
     test_load_artifact_success()
@@ -0,0 +1,326 @@
+"""
+Tests for the run_page_pipeline tool.
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from questions_extractor_agent.schemas import STRUCTURE_TABLES, TaggedTestSet
+from questions_extractor_agent.tools import database_tools, pipeline_pages
+from questions_extractor_agent.tools.pipeline_pages import run_page_pipeline
+from utils.file_ledger import FileLedger
+from utils.model_executor import ModelCallExecutor
+from utils.tag_index import TagIndex
+
+
+class MockToolContext:
+    """
+    Mock implementation of ToolContext for testing.
+    """
+
+    def __init__(self):
+        self.state: Dict[str, Any] = {}
+
+
+class FakeModels:
+    """
+    Fake client.aio.models for single-page requests: OCR returns the image bytes as text,
+    structuring turns the text into a test set named after it, tagging adds one tag, and a
+    fused structure-and-tag request does both.
+    Images whose bytes are in `fail` get no transcription.
+    """
+
+    def __init__(self, fail=()):
+        self.models: List[str] = []
+        self.fail = set(fail)
+
+    async def generate_content(self, model, contents, config):
+        self.models.append(model)
+        prompt, marker = contents[0].text, contents[1].text
+        if marker == "Page 0:":
+            text = contents[2].inline_data.data.decode()
+            pages = [] if text in self.fail else [{"page_index": 0, "text": text}]
+        elif config.response_schema.__name__ == "BatchTaggedResponse":
+            test_set = {
+                "test_forms": [{"name": marker.split("\n", 1)[1]}],
+                "tags": [{"level1": "Grammar"}],
+            }
+            pages = [{"page_index": 0, "test_set": test_set}]
+        elif prompt.startswith("Structure"):
+            test_set = {"test_forms": [{"name": marker.split("\n", 1)[1]}]}
+            pages = [{"page_index": 0, "test_set_json": json.dumps(test_set)}]
+        else:
+            test_set = json.loads(marker.split("\n", 1)[1])
+            test_set["tags"] = [{"level1": "Grammar"}]
+            pages = [{"page_index": 0, "test_set_json": json.dumps(test_set)}]
+        return SimpleNamespace(text=json.dumps({"pages": pages}))
+
+
+class FakeSupabase:
+    """
+    Fake Supabase client that keeps upserted rows per table.
+    """
+
+    def __init__(self):
+        self.rows: Dict[str, List[Dict[str, Any]]] = {}
+
+    def table(self, name):
+        rows = self.rows.setdefault(name, [])
+
+        def upsert(row, on_conflict=None):
+            def execute():
+                rows.append(row)
+                return SimpleNamespace(data=[{**row, "id": len(rows)}])
+
+            return SimpleNamespace(execute=execute)
+
+        return SimpleNamespace(upsert=upsert)
+
+
+def use_fakes(monkeypatch, fail=()):
+    models = FakeModels(fail)
+    client = SimpleNamespace(aio=SimpleNamespace(models=models))
+    supabase = FakeSupabase()
+    monkeypatch.setattr(pipeline_pages, "get_genai_client", lambda: client)
+    # No rate limits, so the test does not wait for the Pro request quota
+    monkeypatch.setattr(pipeline_pages, "get_model_executor", lambda: ModelCallExecutor(limits={}))
+    monkeypatch.setattr(database_tools, "get_supabase_client", lambda: supabase)
+    monkeypatch.delenv("FILE_LEDGER_PATH", raising=False)
+    monkeypatch.delenv("TAG_INDEX_PATH", raising=False)
+    return models, supabase
+
+
+def test_run_page_pipeline_processes_every_file(tmp_path, monkeypatch):
+    """
+    Test that every file is transcribed, structured, tagged and saved, and marked done.
+    """
+    models, supabase = use_fakes(monkeypatch)
+    files = {}
+    for i in range(1, 4):
+        page = tmp_path / f"exam-{i}.jpg"
+        page.write_bytes(f"page {i}".encode())
+        files[str(page)] = ""
+    text_layer = tmp_path / "exam-4.txt"
+    text_layer.write_text("page 4", encoding="utf-8")
+    files[str(text_layer)] = ""
+
+    tool_context = MockToolContext()
+    tool_context.state["files"] = files
+
+    result = asyncio.run(run_page_pipeline(tool_context, ocr_concurrency=2))
+
+    assert result["status"] == "success"
+    assert sorted(result["done"]) == sorted(files)
+    assert set(tool_context.state["files"].values()) == {"done"}
+    assert sorted(row["name"] for row in supabase.rows["test_forms"]) == [
+        "page 1",
+        "page 2",
+        "page 3",
+        "page 4",
+    ]
+    assert len(supabase.rows["tags"]) == 4
+    # The text-layer page needs no OCR call
+    assert models.models.count("gemini-2.5-flash-preview-05-20") == 3
+    stats = tool_context.state["pipeline_stats"]
+    assert [stats[name]["completed"] for name in ("ocr", "structure", "tag", "save")] == [4] * 4
+
+
+def test_run_page_pipeline_with_fused_structure_and_tag(tmp_path, monkeypatch):
+    """
+    Test that the fused mode makes one Pro request per page and saves the tagged test sets.
+    """
+    models, supabase = use_fakes(monkeypatch)
+    paths = []
+    for i in range(1, 3):
+        page = tmp_path / f"exam-{i}.txt"
+        page.write_text(f"page {i}", encoding="utf-8")
+        paths.append(str(page))
+    tool_context = MockToolContext()
+    tool_context.state["files"] = dict.fromkeys(paths, "")
+
+    result = asyncio.run(run_page_pipeline(tool_context, fuse_structure_and_tag=True))
+
+    assert sorted(result["done"]) == paths
+    assert models.models == ["gemini-2.5-pro-preview-05-06"] * 2
+    assert len(supabase.rows["tags"]) == 2
+    assert list(tool_context.state["pipeline_stats"]) == ["ocr", "structure_and_tag", "save"]
+
+
+def test_run_page_pipeline_tags_familiar_pages_from_index(tmp_path, monkeypatch):
+    """
+    Test that pages whose questions are in the tag index skip the tagging request.
+    """
+    models, supabase = use_fakes(monkeypatch)
+    tag_index = TagIndex(tmp_path / "tag_index.jsonl")
+    for question_id in range(1, 4):
+        tag_index.add(question_id, "The manager ------- the report.", [{"level1": "Grammar"}])
+    monkeypatch.setenv("TAG_INDEX_PATH", str(tmp_path / "tag_index.jsonl"))
+
+    async def structure_pages(executor, client, texts, batch_size, model):
+        # The structuring model's output: rows link to their parents by label, not by id
+        test_set = TaggedTestSet.model_validate(
+            {
+                "test_forms": [{"name": "exam"}],
+                "parts": [{"label": "Part 5", "question_format": "short_blank", "order_no": 5}],
+                "questions": [
+                    {"part_label": "Part 5", "number": 101, "stem": next(iter(texts.values()))}
+                ],
+            }
+        ).model_dump(exclude_none=True, include=set(STRUCTURE_TABLES))
+        return {key: test_set for key in texts}, {}
+
+    monkeypatch.setattr(pipeline_pages, "structure_pages", structure_pages)
+    paths = []
+    for i, text in enumerate(["The manager ------- the report.", "Shipping is -------."]):
+        page = tmp_path / f"exam-{i + 1}.txt"
+        page.write_text(text, encoding="utf-8")
+        paths.append(str(page))
+    tool_context = MockToolContext()
+    tool_context.state["files"] = dict.fromkeys(paths, "")
+
+    result = asyncio.run(run_page_pipeline(tool_context))
+
+    assert sorted(result["done"]) == paths
+    assert result["tagged_from_index"] == [paths[0]]
+    # Only the unfamiliar page is sent to the tagging model
+    assert len(models.models) == 1
+    # The index's question_tags are linked to the saved question
+    question_ids = [
+        question_id
+        for question_id, row in enumerate(supabase.rows["questions"], start=1)
+        if row["stem"] == "The manager ------- the report."
+    ]
+    assert supabase.rows["question_tags"][0]["question_id"] == question_ids[0]
+
+
+def test_run_page_pipeline_marks_failed_files(tmp_path, monkeypatch):
+    """
+    Test that a page that fails a stage is marked failed while the others are saved.
+    """
+    use_fakes(monkeypatch, fail={"page 2"})
+    tool_context = MockToolContext()
+    paths = []
+    for i in range(1, 4):
+        page = tmp_path / f"exam-{i}.jpg"
+        page.write_bytes(f"page {i}".encode())
+        paths.append(str(page))
+    tool_context.state["files"] = dict.fromkeys(paths, "")
+
+    result = asyncio.run(run_page_pipeline(tool_context))
+
+    assert sorted(result["done"]) == [paths[0], paths[2]]
+    assert list(result["errors"]) == [paths[1]]
+    assert result["errors"][paths[1]].startswith("ocr: ")
+    assert tool_context.state["files"][paths[1]] == "failed"
+    assert tool_context.state["pipeline_stats"]["ocr"]["failed"] == 1
+
+
+def test_run_page_pipeline_keeps_same_named_files_apart(tmp_path, monkeypatch):
+    """
+    Test that pages with the same filename in different folders are each processed.
+    """
+    _, supabase = use_fakes(monkeypatch)
+    paths = []
+    for folder in ("exam-a", "exam-b"):
+        (tmp_path / folder).mkdir()
+        page = tmp_path / folder / "page-1.txt"
+        page.write_text(f"{folder} page 1", encoding="utf-8")
+        paths.append(str(page))
+    tool_context = MockToolContext()
+    tool_context.state["files"] = dict.fromkeys(paths, "")
+
+    result = asyncio.run(run_page_pipeline(tool_context))
+
+    assert sorted(result["done"]) == paths
+    assert tool_context.state["files"] == dict.fromkeys(paths, "done")
+    assert sorted(row["name"] for row in supabase.rows["test_forms"]) == [
+        "exam-a page 1",
+        "exam-b page 1",
+    ]
+
+
+def test_run_page_pipeline_reports_failed_claims(tmp_path, monkeypatch):
+    """
+    Test that a ledger error while claiming ends the run with the finished files recorded.
+    """
+    use_fakes(monkeypatch)
+    monkeypatch.setenv("FILE_LEDGER_PATH", str(tmp_path / "ledger.sqlite"))
+    paths = []
+    for i in range(1, 4):
+        page = tmp_path / f"exam-{i}.txt"
+        page.write_text(f"page {i}", encoding="utf-8")
+        paths.append(str(page))
+    tool_context = MockToolContext()
+    tool_context.state["files"] = dict.fromkeys(paths, "")
+
+    claims = []
+    original_claim = FileLedger.claim
+
+    def claim(self, worker=None, policy="fifo"):
+        if len(claims) == 2:
+            raise sqlite3.OperationalError("database is locked")
+        claims.append(original_claim(self, worker, policy))
+        return claims[-1]
+
+    monkeypatch.setattr(FileLedger, "claim", claim)
+
+    result = asyncio.run(run_page_pipeline(tool_context))
+
+    assert result["status"] == "error"
+    assert "database is locked" in result["message"]
+    assert sorted(result["done"]) == paths[:2]
+    assert tool_context.state["files"] == {paths[0]: "done", paths[1]: "done", paths[2]: ""}
+
+
+def test_run_page_pipeline_records_outcomes_off_the_event_loop(tmp_path, monkeypatch):
+    """
+    Test that ledger and manifest updates run in worker threads on the run's one ledger
+    connection, and that every file's outcome reaches the ledger.
+    """
+    use_fakes(monkeypatch)
+    monkeypatch.setenv("FILE_LEDGER_PATH", str(tmp_path / "ledger.sqlite"))
+    monkeypatch.setenv("FILE_MANIFEST_PATH", str(tmp_path / "manifest.json"))
+    paths = []
+    for i in range(1, 7):
+        page = tmp_path / f"exam-{i}.txt"
+        page.write_text(f"page {i}", encoding="utf-8")
+        paths.append(str(page))
+    tool_context = MockToolContext()
+    tool_context.state["files"] = dict.fromkeys(paths, "")
+
+    ledgers = []
+    monkeypatch.setattr(
+        pipeline_pages,
+        "get_file_ledger",
+        lambda: ledgers.append(FileLedger(tmp_path / "ledger.sqlite")) or ledgers[-1],
+    )
+    batches = []
+    record_outcomes = pipeline_pages._record_outcomes
+
+    def recording_thread(ledger, outcomes):
+        batches.append((threading.current_thread(), len(outcomes)))
+        record_outcomes(ledger, outcomes)
+
+    monkeypatch.setattr(pipeline_pages, "_record_outcomes", recording_thread)
+
+    result = asyncio.run(run_page_pipeline(tool_context))
+
+    assert result["status"] == "success"
+    assert len(ledgers) == 1
+    assert all(thread is not threading.main_thread() for thread, _ in batches)
+    assert sum(size for _, size in batches) == len(paths)
+    with FileLedger(tmp_path / "ledger.sqlite") as ledger:
+        assert ledger.statuses() == dict.fromkeys(paths, "done")
+
+
+def test_run_page_pipeline_with_unknown_policy():
+    """
+    Test that an unknown scheduling policy is reported.
+    """
+    result = asyncio.run(run_page_pipeline(MockToolContext(), policy="lifo"))
+    assert result["status"] == "error"
+    assert "lifo" in result["message"]
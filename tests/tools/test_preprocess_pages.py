@@ -0,0 +1,86 @@
+"""
+Tests for the preprocess_pages tool.
+"""
+
+from typing import Any, Dict
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from questions_extractor_agent.tools.preprocess_pages import preprocess_pages
+
+
+@pytest.fixture(autouse=True)
+def isolated_artifact_store(tmp_path, monkeypatch):
+    """
+    Keeps the artifact store of each test in its own temporary directory.
+    """
+    monkeypatch.setenv("ARTIFACT_STORE_DIR", str(tmp_path / "artifacts"))
+
+
+class MockToolContext:
+    """
+    Mock implementation of ToolContext for testing.
+    """
+
+    def __init__(self):
+        self.state: Dict[str, Any] = {}
+        self.actions = MockActions()
+
+
+class MockActions:
+    """
+    Mock implementation of ToolContext.actions for testing.
+    """
+
+    def __init__(self):
+        self.saved_artifacts: Dict[str, Any] = {}
+
+    def save_artifact(self, name: str, content: Any) -> int:
+        self.saved_artifacts[name] = content
+        return 1
+
+
+def test_preprocess_pages_replaces_artifacts_with_smaller_pages(tmp_path):
+    """
+    Test that page images are cleaned, re-saved as artifacts and the savings are reported.
+    """
+    rng = np.random.default_rng(0)
+    page = rng.integers(200, 240, size=(2200, 1700), dtype=np.uint8)  # noisy paper
+    page[300:1800, 200:1500] = rng.integers(0, 60, size=(1500, 1300), dtype=np.uint8)
+    page_path = tmp_path / "exam-1.jpg"
+    Image.fromarray(page).save(page_path, quality=95)
+    text_path = tmp_path / "exam-2.txt"
+    text_path.write_text("101. The meeting was -------.")
+
+    tool_context = MockToolContext()
+    tool_context.state["file_paths_to_process"] = [str(page_path), str(text_path)]
+
+    result = preprocess_pages(tool_context, target_long_edge=800)
+
+    assert result["status"] == "success"
+    assert list(result["pages"]) == [str(page_path)]
+    stats = result["pages"][str(page_path)]
+    assert stats["original_bytes"] == page_path.stat().st_size
+    assert stats["bytes_saved"] == stats["original_bytes"] - stats["processed_bytes"] > 0
+    assert result["bytes_saved"] == stats["bytes_saved"]
+
+    artifact = tool_context.actions.saved_artifacts["exam-1.jpg"]
+    assert artifact.file_data.file_uri.startswith("cas://sha256/")
+    assert artifact.file_data.mime_type == "image/png"
+    assert tool_context.state["content_hashes"] == {
+        str(page_path): artifact.file_data.file_uri.removeprefix("cas://sha256/")
+    }
+    assert tool_context.state["preprocess_result"] == result["pages"]
+
+
+def test_preprocess_pages_without_selection():
+    """
+    Test that nothing happens when no files are selected.
+    """
+    tool_context = MockToolContext()
+    result = preprocess_pages(tool_context)
+    assert result["status"] == "success"
+    assert result["pages"] == {}
+    assert result["bytes_saved"] == 0
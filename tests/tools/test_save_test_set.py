@@ -6,6 +6,7 @@ import pytest
 from unittest.mock import MagicMock, patch
 
 from questions_extractor_agent.tools.database_tools import save_test_set
+from utils.tag_index import TagIndex
 
 
 class MockToolContext:
@@ -289,4 +290,70 @@ def test_save_test_set_general_exception(mock_supabase_client):
             
             assert result["status"] == "error"
             assert "Error upserting test data" in result["message"]
-            assert result["rows_upserted"] == 0
\ No newline at end of file
+            assert result["rows_upserted"] == 0
+
+def test_save_test_set_records_file_outcome(mock_supabase_client, sample_test_set):
+    """
+    Test that save_test_set marks the selected files as done or failed.
+    """
+    with patch('questions_extractor_agent.tools.database_tools.get_supabase_client',
+               return_value=mock_supabase_client):
+        tool_context = MockToolContext()
+        tool_context.state["files"] = {
+            "/path/to/page-1.jpg": "in-progress",
+            "/path/to/page-2.jpg": "in-progress",
+            "/path/to/page-3.jpg": "in-progress",
+        }
+        tool_context.state["file_paths_to_process"] = ["/path/to/page-1.jpg", "/path/to/page-2.jpg"]
+
+        save_test_set(sample_test_set, tool_context)
+        assert tool_context.state["files"]["/path/to/page-1.jpg"] == "done"
+        assert tool_context.state["files"]["/path/to/page-2.jpg"] == "done"
+
+        tool_context.state["file_paths_to_process"] = ["/path/to/page-3.jpg"]
+        save_test_set({}, tool_context)
+        assert tool_context.state["files"]["/path/to/page-3.jpg"] == "failed"
+
+
+def test_save_test_set_resolves_question_block_metadata(mock_supabase_client, sample_test_set):
+    """
+    Test that a passage's block_id is replaced by the block's page and bbox in its metadata.
+    """
+    with patch('questions_extractor_agent.tools.database_tools.get_supabase_client',
+               return_value=mock_supabase_client):
+        tool_context = MockToolContext()
+        tool_context.state["question_blocks"] = {
+            "exam-3-block-2": {
+                "artifact": "exam-3-block-2.jpg",
+                "source_file": "/input/exam-3.jpg",
+                "page": 3,
+                "bbox": [40, 310, 1580, 520],
+            }
+        }
+        sample_test_set["passages"][0]["block_id"] = "exam-3-block-2"
+
+        result = save_test_set(sample_test_set, tool_context)
+
+        assert result["status"] == "success"
+        passage = mock_supabase_client.table("passages").data[0]
+        assert "block_id" not in passage
+        assert passage["metadata"]["page"] == 3
+        assert passage["metadata"]["bbox"] == [40, 310, 1580, 520]
+
+
+def test_save_test_set_updates_tag_index(
+    mock_supabase_client, sample_test_set, tmp_path, monkeypatch
+):
+    """
+    Test that the saved questions and their tags are added to the tag index.
+    """
+    monkeypatch.setenv("TAG_INDEX_PATH", str(tmp_path / "tag_index.jsonl"))
+    with patch('questions_extractor_agent.tools.database_tools.get_supabase_client',
+               return_value=mock_supabase_client):
+        result = save_test_set(sample_test_set, MockToolContext())
+
+    assert result["status"] == "success"
+    tag_index = TagIndex(tmp_path / "tag_index.jsonl")
+    assert len(tag_index) == 1
+    tags, _ = tag_index.suggest("What is the answer?")
+    assert tags == [{"level1": "Grammar", "level2": "Verb Tenses", "level3": None}]
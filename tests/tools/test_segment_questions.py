@@ -0,0 +1,66 @@
+"""
+Tests for the segment_questions tool.
+"""
+
+from typing import Any, Dict
+
+import pytest
+from PIL import Image
+
+from questions_extractor_agent.tools.segment_questions import segment_questions
+from tests.utils.test_layout import make_part5_page
+
+
+@pytest.fixture(autouse=True)
+def isolated_artifact_store(tmp_path, monkeypatch):
+    """
+    Keeps the artifact store of each test in its own temporary directory.
+    """
+    monkeypatch.setenv("ARTIFACT_STORE_DIR", str(tmp_path / "artifacts"))
+
+
+class MockToolContext:
+    """
+    Mock implementation of ToolContext for testing.
+    """
+
+    def __init__(self):
+        self.state: Dict[str, Any] = {}
+        self.actions = MockActions()
+
+
+class MockActions:
+    """
+    Mock implementation of ToolContext.actions for testing.
+    """
+
+    def __init__(self):
+        self.saved_artifacts: Dict[str, Any] = {}
+
+    def save_artifact(self, name: str, content: Any) -> int:
+        self.saved_artifacts[name] = content
+        return 1
+
+
+def test_segment_questions_saves_a_crop_per_block(tmp_path):
+    """
+    Test that each question block becomes an artifact with page and bbox metadata.
+    """
+    page_path = tmp_path / "exam-4.png"
+    Image.fromarray(make_part5_page(num_questions=4)).save(page_path)
+
+    tool_context = MockToolContext()
+    tool_context.state["file_paths_to_process"] = [str(page_path)]
+
+    result = segment_questions(tool_context)
+
+    assert result["status"] == "success"
+    assert list(result["blocks"]) == [f"exam-4-block-{k}" for k in range(1, 5)]
+    block = result["blocks"]["exam-4-block-1"]
+    assert block["page"] == 4
+    assert block["source_file"] == str(page_path)
+    assert block["bbox"] == [74, 34, 706, 138]
+    assert sorted(tool_context.actions.saved_artifacts) == [
+        f"exam-4-block-{k}.jpg" for k in range(1, 5)
+    ]
+    assert tool_context.state["question_blocks"] == result["blocks"]
@@ -8,7 +8,16 @@ from typing import Any, Dict, Optional
 
 import pytest
 
-from questions_extractor_agent.tools.select_file import select_file
+from questions_extractor_agent.tools.select_file import load_file_artifact, select_file
+from utils.file_ledger import FileLedger
+
+
+@pytest.fixture(autouse=True)
+def isolated_artifact_store(tmp_path, monkeypatch):
+    """
+    Keeps the artifact store of each test in its own temporary directory.
+    """
+    monkeypatch.setenv("ARTIFACT_STORE_DIR", str(tmp_path / "artifacts"))
 
 
 class MockToolContext:
@@ -85,8 +94,8 @@ def test_select_file_with_unprocessed_files():
     # Check that file_to_process was set in the state
     assert "file_to_process" in tool_context.state
     
-    # Check that save_artifact was called
-    assert len(saved_artifacts) == 1
+    # Artifacts are only saved once a stage loads the file
+    assert len(saved_artifacts) == 0
     
     # Verify that escalate was not set
     assert not tool_context.actions.escalate
@@ -196,4 +205,254 @@ def test_select_file_with_no_files_key():
     assert len(saved_artifacts) == 0
     
     # Verify that escalate was set to True
-    assert tool_context.actions.escalate
\ No newline at end of file
+    assert tool_context.actions.escalate
+
+def test_select_file_with_text_layer_page():
+    """
+    Test that selecting a text-layer page puts its text in state and marks OCR as skipped.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        text_path = Path(temp_dir) / "exam-1.txt"
+        text_path.write_text("101. The report is due ------- Friday.", encoding="utf-8")
+        image_path = str(Path(temp_dir) / "exam-2.jpg")
+
+        tool_context = MockToolContext()
+        tool_context.state["files"] = {str(text_path): "", image_path: ""}
+
+        result = select_file(tool_context)
+
+        assert result["status"] == "success"
+        assert tool_context.state["file_to_process"] == "exam-1.txt"
+        assert tool_context.state["ocr_skipped"] is True
+        assert tool_context.state["extractor_result"] == "101. The report is due ------- Friday."
+
+        # The next page is an image and goes through OCR as usual
+        result = select_file(tool_context)
+
+        assert result["status"] == "success"
+        assert tool_context.state["file_to_process"] == "exam-2.jpg"
+        assert tool_context.state["ocr_skipped"] is False
+
+
+def test_select_file_fails_unreadable_text_layer_page(tmp_path, monkeypatch):
+    """
+    Test that a text-layer page that cannot be read is failed everywhere and dropped from
+    the batch, instead of aborting the selection.
+    """
+    monkeypatch.setenv("FILE_LEDGER_PATH", str(tmp_path / "ledger.sqlite"))
+    monkeypatch.setenv("FILE_MANIFEST_PATH", str(tmp_path / "manifest.json"))
+    missing_path = str(tmp_path / "exam-1.txt")
+    binary_path = tmp_path / "exam-2.txt"
+    binary_path.write_bytes(b"\xff\xfe\x00 not utf-8")
+    text_path = tmp_path / "exam-3.txt"
+    text_path.write_text("103. text", encoding="utf-8")
+
+    tool_context = MockToolContext()
+    tool_context.state["files"] = {missing_path: "", str(binary_path): "", str(text_path): ""}
+
+    result = select_file(tool_context)
+
+    assert result["status"] == "error"
+    assert "exam-1.txt" in result["message"]
+    assert tool_context.state["files"][missing_path] == "failed"
+    with FileLedger(tmp_path / "ledger.sqlite") as ledger:
+        assert ledger.get(missing_path)["status"] == "failed"
+
+    result = select_file(tool_context, batch_size=2)
+
+    assert result["status"] == "success"
+    assert tool_context.state["file_paths_to_process"] == [str(text_path)]
+    assert tool_context.state["text_layers"] == {str(text_path): "103. text"}
+    assert tool_context.state["files"][str(binary_path)] == "failed"
+    with FileLedger(tmp_path / "ledger.sqlite") as ledger:
+        assert "Error reading text layer" in ledger.get(str(binary_path))["error"]
+
+
+def test_select_file_with_ledger(tmp_path, monkeypatch):
+    """
+    Test that with a file ledger configured, sessions sharing it never select the same file.
+    """
+    monkeypatch.setenv("FILE_LEDGER_PATH", str(tmp_path / "ledger.sqlite"))
+
+    first_context = MockToolContext()
+    first_context.state["files"] = {"/path/to/file1.jpg": "", "/path/to/file2.jpg": ""}
+    second_context = MockToolContext()
+
+    first = select_file(first_context)
+    second = select_file(second_context)
+    third = select_file(second_context)
+
+    assert first["file_metadata"]["filename"] == "file1.jpg"
+    assert first_context.state["file_path_to_process"] == "/path/to/file1.jpg"
+    assert first_context.state["files"]["/path/to/file1.jpg"] == "in-progress"
+    assert second["file_metadata"]["filename"] == "file2.jpg"
+    assert third["status"] == "error"
+    assert "No unprocessed files available" in third["message"]
+    assert second_context.actions.escalate
+
+
+def test_select_file_with_ledger_registers_session_files_once(tmp_path, monkeypatch):
+    """
+    Test that selections from a ledger do not re-register or count the files every time.
+    """
+    monkeypatch.setenv("FILE_LEDGER_PATH", str(tmp_path / "ledger.sqlite"))
+    added = []
+    original_add = FileLedger.add
+    monkeypatch.setattr(
+        FileLedger, "add", lambda self, paths, file_info=None: added.append(list(paths)) or 0
+    )
+    monkeypatch.setattr(FileLedger, "counts", None)  # a GROUP BY over the whole ledger
+    tool_context = MockToolContext()
+    tool_context.state["files"] = {f"/path/to/file{i}.jpg": "" for i in range(1, 4)}
+    with FileLedger(tmp_path / "ledger.sqlite") as ledger:
+        original_add(ledger, tool_context.state["files"])
+
+    results = [select_file(tool_context) for _ in range(4)]
+
+    assert [result["status"] for result in results] == ["success"] * 3 + ["error"]
+    assert "No unprocessed files available" in results[-1]["message"]
+    assert len(added) == 1
+
+
+def test_select_file_with_ledger_follows_the_policy(tmp_path, monkeypatch):
+    """
+    Test that claims from a file ledger follow the scheduling policy.
+    """
+    monkeypatch.setenv("FILE_LEDGER_PATH", str(tmp_path / "ledger.sqlite"))
+    tool_context = MockToolContext()
+    tool_context.state["files"] = {"/path/to/exam.pdf": "", "/path/to/page.jpg": ""}
+    tool_context.state["file_info"] = {
+        "/path/to/exam.pdf": {"bytes": 500_000, "pages": 12, "test_form": "exam"},
+        "/path/to/page.jpg": {"bytes": 80_000, "pages": 1, "test_form": "page"},
+    }
+
+    first = select_file(tool_context, policy="sjf")
+    second = select_file(tool_context, policy="sjf")
+
+    assert first["file_metadata"]["filename"] == "page.jpg"
+    assert second["file_metadata"]["filename"] == "exam.pdf"
+
+
+def test_select_file_batch():
+    """
+    Test that batch mode claims several files at once.
+    """
+    tool_context = MockToolContext()
+    saved = []
+    tool_context.actions.save_artifact = lambda name, content: saved.append(name) or 1
+    tool_context.state["files"] = {f"/path/to/file{i}.jpg": "" for i in range(1, 6)}
+
+    result = select_file(tool_context, batch_size=3)
+
+    assert result["status"] == "success"
+    assert [m["filename"] for m in result["files_metadata"]] == [
+        "file1.jpg",
+        "file2.jpg",
+        "file3.jpg",
+    ]
+    assert saved == []
+    assert tool_context.state["file_paths_to_process"] == [
+        "/path/to/file1.jpg",
+        "/path/to/file2.jpg",
+        "/path/to/file3.jpg",
+    ]
+    assert tool_context.state["ocr_skipped"] is False
+    assert list(tool_context.state["files"].values()) == ["in-progress"] * 3 + [""] * 2
+
+    # The remainder of the queue forms a smaller batch
+    result = select_file(tool_context, batch_size=3)
+    assert [m["filename"] for m in result["files_metadata"]] == ["file4.jpg", "file5.jpg"]
+
+
+def test_select_file_shortest_job_first():
+    """
+    Test that the sjf policy selects the smallest file and reports its page count.
+    """
+    tool_context = MockToolContext()
+    tool_context.state["files"] = {"/path/to/exam.pdf": "", "/path/to/page.jpg": ""}
+    tool_context.state["file_info"] = {
+        "/path/to/exam.pdf": {"bytes": 500_000, "pages": 12, "test_form": "exam"},
+        "/path/to/page.jpg": {"bytes": 80_000, "pages": 1, "test_form": "page"},
+    }
+
+    first = select_file(tool_context, policy="sjf")
+    second = select_file(tool_context, policy="sjf")
+
+    assert first["file_metadata"] == {"filename": "page.jpg", "page_count": 1}
+    assert second["file_metadata"] == {"filename": "exam.pdf", "page_count": 12}
+
+    unknown = select_file(tool_context, policy="lifo")
+    assert unknown["status"] == "error"
+    assert "Unknown scheduling policy" in unknown["message"]
+
+
+def test_select_file_stores_pages_by_content(tmp_path):
+    """
+    Test that duplicate pages are recognised and their bytes stored once per content when
+    their artifacts are loaded.
+    """
+    cover = tmp_path / "exam-1.jpg"
+    cover.write_bytes(b"cover page bytes")
+    repeated_cover = tmp_path / "exam-9.jpg"
+    repeated_cover.write_bytes(b"cover page bytes")
+
+    tool_context = MockToolContext()
+    saved_artifacts = {}
+    tool_context.actions.save_artifact = lambda name, content: saved_artifacts.update({name: content}) or 1
+    tool_context.actions.load_artifact = lambda name: saved_artifacts.get(name)
+    tool_context.state["files"] = {str(cover): "", str(repeated_cover): ""}
+
+    first = select_file(tool_context)
+
+    # Nothing is stored until the page is loaded
+    assert saved_artifacts == {}
+    assert not (tmp_path / "artifacts").exists()
+    cover_part = load_file_artifact(tool_context, "exam-1.jpg")
+    assert saved_artifacts == {"exam-1.jpg": cover_part}
+    assert load_file_artifact(tool_context, "exam-1.jpg") is cover_part
+
+    second = select_file(tool_context)
+
+    content_hash = first["file_metadata"]["content_hash"]
+    assert second["file_metadata"]["content_hash"] == content_hash
+    assert "duplicate_of" not in first["file_metadata"]
+    assert second["file_metadata"]["duplicate_of"] == str(cover)
+    assert tool_context.state["duplicates"] == {str(repeated_cover): str(cover)}
+    assert tool_context.state["content_hashes"] == {str(repeated_cover): content_hash}
+
+    # Both artifacts reference the same single blob
+    part = load_file_artifact(tool_context, "exam-9.jpg")
+    assert part.file_data.file_uri == cover_part.file_data.file_uri
+    assert part.file_data.file_uri == f"cas://sha256/{content_hash}"
+    assert part.file_data.mime_type == "image/jpeg"
+    assert len(list((tmp_path / "artifacts" / "blobs").rglob("*"))) == 2  # one dir, one blob
+
+
+def test_load_file_artifact_replaces_same_named_artifact_of_another_folder(tmp_path):
+    """
+    Test that a page does not get the artifact saved for a same-named page of another folder.
+    """
+    pages = []
+    for folder in ("a", "b"):
+        (tmp_path / folder).mkdir()
+        page = tmp_path / folder / "exam-1.jpg"
+        page.write_bytes(f"page of folder {folder}".encode())
+        pages.append(page)
+
+    tool_context = MockToolContext()
+    saved_artifacts = {}
+    tool_context.actions.save_artifact = lambda name, content: saved_artifacts.update({name: content}) or 1
+    tool_context.actions.load_artifact = lambda name: saved_artifacts.get(name)
+    tool_context.state["files"] = {str(page): "" for page in pages}
+
+    select_file(tool_context)
+    first = load_file_artifact(tool_context, "exam-1.jpg")
+    select_file(tool_context)
+    second = load_file_artifact(tool_context, "exam-1.jpg")
+
+    assert first.file_data.file_uri != second.file_data.file_uri
+    content_hash = tool_context.state["content_hashes"][str(pages[1])]
+    assert second.file_data.file_uri == f"cas://sha256/{content_hash}"
+
+    # Files outside the selected batch have no artifact
+    assert load_file_artifact(tool_context, "other.jpg") is None
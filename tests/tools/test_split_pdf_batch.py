@@ -0,0 +1,189 @@
+"""
+Tests for the split_pdf_batch tool.
+"""
+
+import tempfile
+from pathlib import Path
+from typing import Any, Dict
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from questions_extractor_agent.tools.split_pdf_batch import split_pdf_batch
+from utils.file_ledger import FileLedger
+from utils.file_manifest import FileManifest
+
+
+class MockToolContext:
+    """
+    Mock implementation of ToolContext for testing.
+    """
+
+    def __init__(self):
+        self.state: Dict[str, Any] = {}
+
+
+@pytest.fixture(autouse=True)
+def isolated_render_cache(tmp_path, monkeypatch):
+    """
+    Points the render cache at a per-test directory so tests never share cached pages.
+    """
+    monkeypatch.setenv("RENDER_CACHE_DIR", str(tmp_path / "render-cache"))
+
+
+def create_test_pdf(file_path, num_pages):
+    """
+    Creates a test PDF file with the specified number of short (image-only) pages.
+    """
+    c = canvas.Canvas(str(file_path), pagesize=letter)
+    for i in range(num_pages):
+        c.drawString(100, 700, f"Page {i + 1}")
+        c.showPage()
+    c.save()
+
+
+def make_page_image():
+    """
+    Creates a small rendered page with some ink on it, so it is not classified as blank.
+    """
+    image = Image.new("RGB", (10, 10), "white")
+    image.paste((0, 0, 0), (2, 2, 8, 8))
+    return image
+
+
+def fake_convert_from_path(path, first_page=None, last_page=None, **kwargs):
+    """
+    Stand-in for pdf2image.convert_from_path that returns small rendered pages.
+    """
+    return [make_page_image() for _ in range(first_page, last_page + 1)]
+
+
+def test_split_pdf_batch_replaces_pdfs_with_pages_in_order():
+    """
+    Test that every PDF is split and replaced in place by its pages, while a broken PDF
+    is reported without stopping the others.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        directory = Path(temp_dir)
+        create_test_pdf(directory / "a.pdf", 2)
+        create_test_pdf(directory / "c.pdf", 3)
+        (directory / "broken.pdf").write_bytes(b"not really a pdf")
+        (directory / "b.jpg").write_bytes(b"jpeg")
+
+        tool_context = MockToolContext()
+        tool_context.state["files"] = {
+            str(directory / "a.pdf"): "",
+            str(directory / "b.jpg"): "",
+            str(directory / "broken.pdf"): "",
+            str(directory / "c.pdf"): "",
+        }
+
+        with patch(
+            "questions_extractor_agent.tools.split_pdf_pages.convert_from_path",
+            side_effect=fake_convert_from_path,
+        ):
+            result = split_pdf_batch(tool_context, max_workers=3)
+
+        assert result["status"] == "success"
+        assert "Split 2 of 3 PDF files into 5 pages (1 failed)" in result["message"]
+        assert list(result["failures"].keys()) == [str(directory / "broken.pdf")]
+
+        assert list(tool_context.state["files"].keys()) == [
+            str(directory / "a-1.jpg"),
+            str(directory / "a-2.jpg"),
+            str(directory / "b.jpg"),
+            str(directory / "broken.pdf"),
+            str(directory / "c-1.jpg"),
+            str(directory / "c-2.jpg"),
+            str(directory / "c-3.jpg"),
+        ]
+        assert tool_context.state["files"][str(directory / "broken.pdf")] == "failed"
+        assert all(
+            status == ""
+            for file_path, status in tool_context.state["files"].items()
+            if file_path != str(directory / "broken.pdf")
+        )
+        assert len(result["files"]) == 5
+
+
+def test_split_pdf_batch_fails_unsplittable_pdfs_everywhere(tmp_path, monkeypatch):
+    """
+    Test that a PDF that cannot be split is failed in the ledger and settled in the
+    manifest, so neither hands it out again.
+    """
+    monkeypatch.setenv("FILE_LEDGER_PATH", str(tmp_path / "ledger.sqlite"))
+    monkeypatch.setenv("FILE_MANIFEST_PATH", str(tmp_path / "manifest.json"))
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"not really a pdf")
+    manifest = FileManifest(tmp_path / "manifest.json")
+    manifest.refresh(str(broken), broken.stat())
+    manifest.save()
+
+    tool_context = MockToolContext()
+    tool_context.state["files"] = {str(broken): ""}
+    with FileLedger(tmp_path / "ledger.sqlite") as ledger:
+        ledger.add(tool_context.state["files"])
+
+    result = split_pdf_batch(tool_context)
+
+    assert result["status"] == "error"
+    assert tool_context.state["files"] == {str(broken): "failed"}
+    with FileLedger(tmp_path / "ledger.sqlite") as ledger:
+        record = ledger.get(str(broken))
+        assert record["status"] == "failed"
+        assert record["error"] == result["failures"][str(broken)]
+    assert not FileManifest(tmp_path / "manifest.json").is_pending(str(broken))
+
+
+def test_split_pdf_batch_registers_page_descriptions_in_the_ledger(tmp_path, monkeypatch):
+    """
+    Test that the ledger gets each page's description, so its "fair" and "sjf" claims
+    tell the test forms and page sizes apart.
+    """
+    monkeypatch.setenv("FILE_LEDGER_PATH", str(tmp_path / "ledger.sqlite"))
+    monkeypatch.setenv("FILE_MANIFEST_PATH", str(tmp_path / "manifest.json"))
+    create_test_pdf(tmp_path / "a.pdf", 3)
+    create_test_pdf(tmp_path / "c.pdf", 2)
+    tool_context = MockToolContext()
+    tool_context.state["files"] = {str(tmp_path / "a.pdf"): "", str(tmp_path / "c.pdf"): ""}
+    with FileLedger(tmp_path / "ledger.sqlite") as ledger:
+        ledger.add(tool_context.state["files"])
+
+    with patch(
+        "questions_extractor_agent.tools.split_pdf_pages.convert_from_path",
+        side_effect=fake_convert_from_path,
+    ):
+        split_pdf_batch(tool_context, max_workers=2)
+
+    with FileLedger(tmp_path / "ledger.sqlite") as ledger:
+        record = ledger.get(str(tmp_path / "a-1.jpg"))
+        assert record["test_form"] == "a"
+        assert record["pages"] == 1
+        assert record["bytes"] == (tmp_path / "a-1.jpg").stat().st_size
+
+        # Round-robin across the two test forms instead of one form after the other
+        claimed = ledger.claim_many(5, policy="fair")
+    assert [Path(path).name for path in claimed] == [
+        "a-1.jpg",
+        "c-1.jpg",
+        "a-2.jpg",
+        "c-2.jpg",
+        "a-3.jpg",
+    ]
+
+
+def test_split_pdf_batch_without_pdfs():
+    """
+    Test split_pdf_batch when no PDFs are listed.
+    """
+    tool_context = MockToolContext()
+    tool_context.state["files"] = {"/path/to/page.jpg": ""}
+
+    result = split_pdf_batch(tool_context)
+
+    assert result["status"] == "success"
+    assert result["files"] == {}
+    assert tool_context.state["files"] == {"/path/to/page.jpg": ""}
@@ -7,14 +7,22 @@ import tempfile
 from pathlib import Path
 from typing import Any, Dict
 
+import numpy as np
 import PyPDF2
 import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
 from PIL import Image
 from PyPDF2 import PdfWriter
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
 
-from questions_extractor_agent.tools.split_pdf_pages import split_pdf_pages
+from questions_extractor_agent.tools.split_pdf_pages import (
+    ENCODING_PROFILES,
+    _save_page_image,
+    split_pdf_pages,
+)
+from utils.file_ledger import FileLedger
 
 
 class MockToolContext:
@@ -26,6 +34,16 @@ class MockToolContext:
         self.state: Dict[str, Any] = {}
 
 
+@pytest.fixture(autouse=True)
+def isolated_render_cache(tmp_path, monkeypatch):
+    """
+    Points the render cache at a per-test directory so tests never share cached pages.
+    """
+    cache_dir = tmp_path / "render-cache"
+    monkeypatch.setenv("RENDER_CACHE_DIR", str(cache_dir))
+    return cache_dir
+
+
 def create_test_pdf(file_path, num_pages=1):
     """
     Creates a test PDF file with the specified number of pages.
@@ -58,6 +76,48 @@ def create_test_pdf(file_path, num_pages=1):
         pdf_writer.write(output_file)
 
 
+def create_text_pdf(file_path, page_lines):
+    """
+    Creates a PDF whose pages carry the given lines as a real text layer.
+
+    Args:
+        file_path (str): Path where the PDF should be created
+        page_lines (list): One list of text lines per page
+    """
+    c = canvas.Canvas(str(file_path), pagesize=letter)
+    for lines in page_lines:
+        y = 700
+        for line in lines:
+            c.drawString(72, y, line)
+            y -= 16
+        c.showPage()
+    c.save()
+
+
+def make_page_image():
+    """
+    Creates a small rendered page with some ink on it, so it is not classified as blank.
+    """
+    image = Image.new("RGB", (10, 10), "white")
+    image.paste((0, 0, 0), (2, 2, 8, 8))
+    return image
+
+
+def make_fake_convert_from_path(render_calls):
+    """
+    Creates a stand-in for pdf2image.convert_from_path that records the requested page windows.
+
+    Args:
+        render_calls (list): List that receives a (first_page, last_page) tuple per call
+    """
+
+    def fake_convert_from_path(path, first_page=None, last_page=None, **kwargs):
+        render_calls.append((first_page, last_page))
+        return [make_page_image() for _ in range(first_page, last_page + 1)]
+
+    return fake_convert_from_path
+
+
 def test_split_pdf_pages_with_multi_page_pdf():
     """
     Test split_pdf_pages with a multi-page PDF.
@@ -127,6 +187,266 @@ def test_split_pdf_pages_with_single_page_pdf():
         assert tool_context.state["files"][file_path] == ""
 
 
+def test_split_pdf_pages_renders_in_windows():
+    """
+    Test that split_pdf_pages renders pages in bounded windows instead of all at once.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = Path(temp_dir) / "test_windowed.pdf"
+        create_test_pdf(pdf_path, num_pages=5)
+
+        tool_context = MockToolContext()
+        render_calls = []
+
+        with patch(
+            "questions_extractor_agent.tools.split_pdf_pages.convert_from_path",
+            side_effect=make_fake_convert_from_path(render_calls),
+        ):
+            result = split_pdf_pages(str(pdf_path), tool_context, chunk_size=2)
+
+        # Each poppler call covers at most chunk_size pages
+        assert render_calls == [(1, 2), (3, 4), (5, 5)]
+
+        assert result["status"] == "success"
+        assert list(result["files"].keys()) == [
+            str((Path(temp_dir) / f"test_windowed-{i}.jpg").absolute())
+            for i in range(1, 6)
+        ]
+        for file_path in result["files"].keys():
+            assert Path(file_path).exists()
+            assert tool_context.state["files"][file_path] == ""
+
+
+def test_split_pdf_pages_parallel_keeps_page_order():
+    """
+    Test that parallel rendering covers every page once and registers files in page order.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = Path(temp_dir) / "test_parallel.pdf"
+        create_test_pdf(pdf_path, num_pages=7)
+
+        tool_context = MockToolContext()
+        render_calls = []
+
+        # Threads stand in for worker processes so the patched renderer is shared
+        with patch(
+            "questions_extractor_agent.tools.split_pdf_pages.convert_from_path",
+            side_effect=make_fake_convert_from_path(render_calls),
+        ), patch(
+            "questions_extractor_agent.tools.split_pdf_pages.ProcessPoolExecutor",
+            ThreadPoolExecutor,
+        ):
+            result = split_pdf_pages(
+                str(pdf_path), tool_context, chunk_size=2, workers=3
+            )
+
+        assert result["status"] == "success"
+        expected_files = [
+            str((Path(temp_dir) / f"test_parallel-{i}.jpg").absolute())
+            for i in range(1, 8)
+        ]
+        assert list(result["files"].keys()) == expected_files
+        assert list(tool_context.state["files"].keys()) == expected_files
+
+        # Ranges 1-3, 4-5 and 6-7 are each rendered in windows of at most 2 pages
+        assert sorted(render_calls) == [(1, 2), (3, 3), (4, 5), (6, 7)]
+
+
+def test_split_pdf_pages_reuses_render_cache():
+    """
+    Test that splitting the same PDF again is served from the render cache without rendering.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = Path(temp_dir) / "test_cached.pdf"
+        create_test_pdf(pdf_path, num_pages=3)
+
+        render_calls = []
+        with patch(
+            "questions_extractor_agent.tools.split_pdf_pages.convert_from_path",
+            side_effect=make_fake_convert_from_path(render_calls),
+        ):
+            first_result = split_pdf_pages(str(pdf_path), MockToolContext())
+
+            # Remove the page images so the second run has to restore them
+            for file_path in first_result["files"].keys():
+                os.remove(file_path)
+            render_calls.clear()
+
+            tool_context = MockToolContext()
+            second_result = split_pdf_pages(str(pdf_path), tool_context)
+
+        assert render_calls == []
+        assert second_result["status"] == "success"
+        assert "render cache hit" in second_result["message"]
+        assert list(second_result["files"].keys()) == list(first_result["files"].keys())
+        for file_path in second_result["files"].keys():
+            assert Path(file_path).exists()
+            assert tool_context.state["files"][file_path] == ""
+
+
+def test_split_pdf_pages_uses_text_layer_instead_of_rendering():
+    """
+    Test that pages with a usable text layer are written as text and only the rest are rendered.
+    """
+    question_lines = [
+        "101. The manager asked the team to ------- the quarterly report.",
+        "(A) review (B) reviewing (C) reviewed (D) reviews",
+    ]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = Path(temp_dir) / "test_text_layer.pdf"
+        # Page 2 has too little text to be trusted and must go through OCR
+        create_text_pdf(pdf_path, [question_lines, ["2"], question_lines])
+
+        tool_context = MockToolContext()
+        render_calls = []
+        with patch(
+            "questions_extractor_agent.tools.split_pdf_pages.convert_from_path",
+            side_effect=make_fake_convert_from_path(render_calls),
+        ):
+            result = split_pdf_pages(str(pdf_path), tool_context)
+
+        assert render_calls == [(2, 2)]
+        assert result["status"] == "success"
+        assert "1 page images and 2 text-layer pages" in result["message"]
+
+        expected_files = [
+            str((Path(temp_dir) / name).absolute())
+            for name in [
+                "test_text_layer-1.txt",
+                "test_text_layer-2.jpg",
+                "test_text_layer-3.txt",
+            ]
+        ]
+        assert list(result["files"].keys()) == expected_files
+        assert list(tool_context.state["files"].keys()) == expected_files
+        assert "quarterly report" in Path(expected_files[0]).read_text(encoding="utf-8")
+
+
+def test_split_pdf_pages_marks_blank_pages_skipped(tmp_path, monkeypatch):
+    """
+    Test that blank pages are registered as skipped, with their reason, in the state and
+    the ledger, and that skip_blank_pages=False keeps them.
+    """
+    monkeypatch.setenv("FILE_LEDGER_PATH", str(tmp_path / "ledger.sqlite"))
+    monkeypatch.setenv("SKIP_PAGE_TEMPLATE_DIR", str(tmp_path / "no-templates"))
+    pdf_path = tmp_path / "test_blank.pdf"
+    create_test_pdf(pdf_path, num_pages=3)
+
+    def fake_convert_from_path(path, first_page=None, last_page=None, **kwargs):
+        # Page 2 is blank
+        return [
+            Image.new("RGB", (10, 10), "white") if page_number == 2 else make_page_image()
+            for page_number in range(first_page, last_page + 1)
+        ]
+
+    tool_context = MockToolContext()
+    with patch(
+        "questions_extractor_agent.tools.split_pdf_pages.convert_from_path",
+        side_effect=fake_convert_from_path,
+    ):
+        result = split_pdf_pages(str(pdf_path), tool_context, use_cache=False)
+        kept_result = split_pdf_pages(
+            str(pdf_path), MockToolContext(), use_cache=False, skip_blank_pages=False
+        )
+
+    blank_page = str((tmp_path / "test_blank-2.jpg").absolute())
+    assert result["status"] == "success"
+    assert "1 pages skipped" in result["message"]
+    assert list(result["skipped"]) == [blank_page]
+    assert result["skipped"][blank_page].startswith("blank page")
+    assert list(tool_context.state["files"].values()) == ["", "skipped", ""]
+    assert tool_context.state["file_info"][blank_page]["skip_reason"] == result["skipped"][blank_page]
+
+    ledger_entry = FileLedger(tmp_path / "ledger.sqlite").get(blank_page)
+    assert ledger_entry["status"] == "skipped"
+    assert ledger_entry["error"].startswith("blank page")
+
+    assert kept_result["skipped"] == {}
+    assert list(kept_result["files"].values()) == ["", "", ""]
+
+
+@pytest.mark.parametrize(
+    "profile, suffix, image_format, mode",
+    [
+        ("default", ".jpg", "JPEG", "RGB"),
+        ("grayscale", ".jpg", "JPEG", "L"),
+        ("bilevel", ".png", "PNG", "1"),
+        # WebP has no grayscale mode; the gray pixels are stored as RGB
+        ("webp", ".webp", "WEBP", "RGB"),
+    ],
+)
+def test_split_pdf_pages_encoding_profiles(profile, suffix, image_format, mode):
+    """
+    Test that each encoding profile controls the output format, color mode and size, and
+    that the bytes written per page are reported.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = Path(temp_dir) / "test_profile.pdf"
+        create_test_pdf(pdf_path, num_pages=2)
+
+        def fake_convert_from_path(path, first_page=None, last_page=None, **kwargs):
+            # Large enough to exceed every profile's max_long_edge
+            return [
+                Image.new("RGB", (1700, 2400), "white")
+                for _ in range(first_page, last_page + 1)
+            ]
+
+        tool_context = MockToolContext()
+        with patch(
+            "questions_extractor_agent.tools.split_pdf_pages.convert_from_path",
+            side_effect=fake_convert_from_path,
+        ):
+            result = split_pdf_pages(str(pdf_path), tool_context, profile=profile)
+
+        assert result["status"] == "success"
+        assert f"'{profile}' profile" in result["message"]
+
+        max_long_edge = ENCODING_PROFILES[profile]["max_long_edge"] or 2400
+        for file_path in result["files"].keys():
+            assert file_path.endswith(suffix)
+            with Image.open(file_path) as img:
+                assert img.format == image_format
+                assert img.mode == mode
+                assert max(img.size) <= max_long_edge
+            assert result["page_bytes"][file_path] == os.path.getsize(file_path)
+
+
+def test_bilevel_profile_thresholds_without_dithering(tmp_path):
+    """
+    Test that the bilevel profile maps gray levels to paper or ink by its threshold,
+    instead of dithering them into a noisy pixel pattern.
+    """
+    page = Image.new("L", (100, 100), 240)
+    page.paste(200, (0, 0, 50, 100))  # light gray: paper
+    page.paste(100, (50, 0, 100, 50))  # dark gray: ink
+    output_path = tmp_path / "page.png"
+
+    _save_page_image(page, output_path, ENCODING_PROFILES["bilevel"])
+
+    with Image.open(output_path) as saved:
+        assert saved.mode == "1"
+        pixels = np.asarray(saved.convert("L"))
+    assert (pixels[:, :50] == 255).all()
+    assert (pixels[:50, 50:] == 0).all()
+    assert (pixels[50:, 50:] == 255).all()
+
+
+def test_split_pdf_pages_unknown_profile():
+    """
+    Test split_pdf_pages with an encoding profile that does not exist.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = Path(temp_dir) / "test_unknown_profile.pdf"
+        create_test_pdf(pdf_path, num_pages=1)
+
+        tool_context = MockToolContext()
+        result = split_pdf_pages(str(pdf_path), tool_context, profile="tiny")
+
+        assert result["status"] == "error"
+        assert "Unknown encoding profile 'tiny'" in result["message"]
+        assert len(result["files"]) == 0
+
+
 def test_split_pdf_pages_nonexistent_file():
     """
     Test split_pdf_pages with a non-existent file.
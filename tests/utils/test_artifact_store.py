@@ -0,0 +1,41 @@
+"""
+Tests for the content-addressed artifact store.
+"""
+
+import hashlib
+
+import pytest
+
+from utils.artifact_store import ArtifactStore
+
+
+def test_put_file_and_bytes_deduplicate(tmp_path):
+    """Test that identical content is stored once under its SHA-256 digest."""
+    store = ArtifactStore(tmp_path / "store")
+    page = tmp_path / "page.jpg"
+    page.write_bytes(b"page bytes")
+
+    digest, is_new = store.put_file(page)
+    assert digest == hashlib.sha256(b"page bytes").hexdigest()
+    assert is_new
+    assert store.put_bytes(b"page bytes") == (digest, False)
+    assert store.read(digest) == b"page bytes"
+    assert not list((tmp_path / "store").glob(".staging-*"))
+
+
+def test_uri_round_trip():
+    """Test that reference URIs map back to their digest."""
+    assert ArtifactStore.digest_from_uri(ArtifactStore.uri("ab" * 32)) == "ab" * 32
+    assert ArtifactStore.digest_from_uri("gs://bucket/page.jpg") is None
+
+
+def test_open_maps_the_blob_until_the_block_exits(tmp_path):
+    """Test that open() yields a read-only view that is released when the block exits."""
+    store = ArtifactStore(tmp_path / "store")
+    digest, _ = store.put_bytes(b"page bytes")
+
+    with store.open(digest) as view:
+        assert view.readonly
+        assert view == b"page bytes"
+    with pytest.raises(ValueError):
+        bytes(view)
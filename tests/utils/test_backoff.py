@@ -6,7 +6,7 @@ import time
 import unittest
 from unittest.mock import MagicMock, patch
 
-from utils.backoff import exponential_backoff
+from utils.backoff import backoff_delay, exponential_backoff
 
 
 class TestExponentialBackoff(unittest.TestCase):
@@ -163,6 +163,14 @@ class TestExponentialBackoff(unittest.TestCase):
         self.assertEqual(result, "success")
         self.assertEqual(counter["count"], 2)  # Function called twice
 
+    def test_backoff_delay(self):
+        """Test that the delay doubles per attempt, is capped, and jitter adds at most 25%."""
+        self.assertEqual(backoff_delay(0, 1.0, 60.0, jitter=False), 1.0)
+        self.assertEqual(backoff_delay(3, 1.0, 60.0, jitter=False), 8.0)
+        self.assertEqual(backoff_delay(10, 1.0, 60.0, jitter=False), 60.0)
+        delay = backoff_delay(2, 1.0, 60.0, jitter=True)
+        self.assertTrue(4.0 <= delay <= 5.0)
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
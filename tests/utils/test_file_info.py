@@ -0,0 +1,50 @@
+"""
+Tests for the file info utility.
+"""
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+from utils.file_info import (
+    MAX_FILE_BYTES,
+    describe_file,
+    get_test_form_key,
+    preflight_error,
+)
+
+
+def test_describe_file_counts_pdf_pages(tmp_path):
+    """Test that PDF pages are counted without rendering."""
+    pdf_path = tmp_path / "toeic_form1.pdf"
+    c = canvas.Canvas(str(pdf_path), pagesize=letter)
+    for _ in range(3):
+        c.drawString(72, 700, "101. The report is due -------.")
+        c.showPage()
+    c.save()
+
+    info = describe_file(str(pdf_path))
+    assert info["pages"] == 3
+    assert info["bytes"] == pdf_path.stat().st_size
+    assert info["test_form"] == "toeic_form1"
+
+
+def test_describe_file_tolerates_unparseable_files(tmp_path):
+    """Test that a file whose pages cannot be counted is described with pages=None."""
+    broken = tmp_path / "broken.pdf"
+    broken.write_text("not a pdf")
+    assert describe_file(str(broken))["pages"] is None
+
+
+def test_test_form_key_groups_split_pages():
+    """Test that pages written by split_pdf_pages map to their source PDF."""
+    assert get_test_form_key("/in/toeic_form1-12.jpg") == "toeic_form1"
+    assert get_test_form_key("/in/toeic_form1-3.txt") == "toeic_form1"
+    assert get_test_form_key("/in/scan.png") == "scan"
+
+
+def test_preflight_error():
+    """Test the PRD size and page limits."""
+    assert preflight_error({"bytes": 1000, "pages": 100}) is None
+    assert preflight_error({"bytes": 1000, "pages": None}) is None
+    assert "page limit" in preflight_error({"bytes": 1000, "pages": 101})
+    assert "byte limit" in preflight_error({"bytes": MAX_FILE_BYTES + 1, "pages": None})
@@ -0,0 +1,190 @@
+"""
+Tests for the file ledger utility.
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from utils.file_ledger import (
+    STATUS_DONE,
+    STATUS_FAILED,
+    STATUS_IN_PROGRESS,
+    STATUS_UNPROCESSED,
+    FileLedger,
+)
+
+
+def test_claim_in_insertion_order_and_record_outcomes(tmp_path):
+    """Test the unprocessed -> in-progress -> done/failed transitions."""
+    ledger = FileLedger(tmp_path / "ledger.sqlite")
+    assert ledger.add(["/in/b.jpg", "/in/a.jpg"]) == 2
+    assert ledger.add(["/in/a.jpg"]) == 0
+
+    assert ledger.claim(worker="w1") == "/in/b.jpg"
+    assert ledger.claim(worker="w1") == "/in/a.jpg"
+    assert ledger.claim(worker="w1") is None
+
+    ledger.complete("/in/b.jpg")
+    ledger.fail("/in/a.jpg", "Supabase timeout")
+
+    done = ledger.get("/in/b.jpg")
+    assert done["status"] == STATUS_DONE
+    assert done["attempts"] == 1
+    assert done["worker"] == "w1"
+    assert done["duration_seconds"] >= 0
+
+    failed = ledger.get("/in/a.jpg")
+    assert failed["status"] == STATUS_FAILED
+    assert failed["error"] == "Supabase timeout"
+
+    assert ledger.statuses() == {"/in/b.jpg": STATUS_DONE, "/in/a.jpg": STATUS_FAILED}
+
+
+def test_claim_many_claims_a_batch_in_order(tmp_path):
+    """Test that claim_many hands out up to `count` files in one claim."""
+    ledger = FileLedger(tmp_path / "ledger.sqlite")
+    ledger.add([f"/in/page-{i}.jpg" for i in range(5)])
+
+    assert ledger.claim_many(3, worker="w1") == ["/in/page-0.jpg", "/in/page-1.jpg", "/in/page-2.jpg"]
+    assert ledger.claim_many(3, worker="w1") == ["/in/page-3.jpg", "/in/page-4.jpg"]
+    assert ledger.claim_many(3, worker="w1") == []
+    assert ledger.paths(STATUS_IN_PROGRESS) == [f"/in/page-{i}.jpg" for i in range(5)]
+
+
+def test_claims_follow_the_scheduling_policy(tmp_path):
+    """Test that "sjf" and "fair" order claims by the descriptions files were added with."""
+    ledger = FileLedger(tmp_path / "ledger.sqlite")
+    ledger.add(
+        ["/in/a.pdf", "/in/a-1.jpg", "/in/a-2.jpg", "/in/b-1.jpg", "/in/c-1.jpg"],
+        {
+            "/in/a.pdf": {"pages": 12, "bytes": 500_000, "test_form": "a"},
+            "/in/a-1.jpg": {"pages": 1, "bytes": 90_000, "test_form": "a"},
+            "/in/a-2.jpg": {"pages": 1, "bytes": 70_000, "test_form": "a"},
+            "/in/b-1.jpg": {"pages": 1, "bytes": 80_000, "test_form": "b"},
+            "/in/c-1.jpg": {"pages": 1, "bytes": 60_000, "test_form": "c"},
+        },
+    )
+    assert ledger.claim_many(2, policy="sjf") == ["/in/c-1.jpg", "/in/a-2.jpg"]
+    assert ledger.claim(policy="sjf") == "/in/b-1.jpg"
+
+    fair = FileLedger(tmp_path / "fair.sqlite")
+    paths = ["/in/a-1.jpg", "/in/a-2.jpg", "/in/a-3.jpg", "/in/b-1.jpg", "/in/c-1.jpg"]
+    fair.add(paths, {path: {"test_form": path[4]} for path in paths})
+    assert fair.claim_many(2, policy="fair") == ["/in/a-1.jpg", "/in/b-1.jpg"]
+    # The least recently claimed form goes next
+    assert fair.claim(policy="fair") == "/in/c-1.jpg"
+    assert fair.claim_many(3, policy="fair") == ["/in/a-2.jpg", "/in/a-3.jpg"]
+
+    with pytest.raises(ValueError):
+        fair.claim(policy="lifo")
+
+
+def test_ledgers_from_before_file_descriptions_are_migrated(tmp_path):
+    """Test that a ledger without the description columns gains them on open."""
+    ledger_path = tmp_path / "ledger.sqlite"
+    with sqlite3.connect(ledger_path) as conn:
+        conn.execute(
+            "CREATE TABLE files (path TEXT PRIMARY KEY, status TEXT NOT NULL DEFAULT '', "
+            "attempts INTEGER NOT NULL DEFAULT 0, added_at REAL NOT NULL, claimed_at REAL, "
+            "finished_at REAL, duration_seconds REAL, worker TEXT, error TEXT)"
+        )
+        conn.execute("INSERT INTO files (path, added_at) VALUES ('/in/old.jpg', 0)")
+    conn.close()
+
+    ledger = FileLedger(ledger_path)
+    ledger.add(["/in/new.jpg"], {"/in/new.jpg": {"pages": 1, "bytes": 10}})
+    assert ledger.get("/in/new.jpg")["bytes"] == 10
+    # Files without a description count as one small page
+    assert ledger.claim_many(2, policy="sjf") == ["/in/old.jpg", "/in/new.jpg"]
+
+
+def test_requeue_failed_respects_max_attempts(tmp_path):
+    """Test that failed files are retried until they run out of attempts."""
+    ledger = FileLedger(tmp_path / "ledger.sqlite")
+    ledger.add(["/in/page.jpg"])
+
+    ledger.claim()
+    ledger.fail("/in/page.jpg", "boom")
+    assert ledger.requeue_failed(max_attempts=2) == 1
+    assert ledger.claim() == "/in/page.jpg"
+    ledger.fail("/in/page.jpg", "boom again")
+
+    assert ledger.requeue_failed(max_attempts=2) == 0
+    assert ledger.get("/in/page.jpg")["attempts"] == 2
+
+
+def test_abandoned_claim_is_reclaimed_after_lease(tmp_path):
+    """Test that a claim from a crashed worker is handed out again once its lease expires."""
+    ledger_path = tmp_path / "ledger.sqlite"
+    crashed = FileLedger(ledger_path, lease_seconds=0)
+    crashed.add(["/in/page.jpg"])
+    assert crashed.claim(worker="crashed") == "/in/page.jpg"
+    crashed.close()
+
+    resumed = FileLedger(ledger_path, lease_seconds=0)
+    assert resumed.claim(worker="resumed") == "/in/page.jpg"
+    record = resumed.get("/in/page.jpg")
+    assert record["status"] == STATUS_IN_PROGRESS
+    assert record["attempts"] == 2
+    assert record["worker"] == "resumed"
+
+
+def test_expand_replaces_container_with_children(tmp_path):
+    """Test that an expanded PDF is marked done and its pages become claimable."""
+    ledger = FileLedger(tmp_path / "ledger.sqlite")
+    ledger.add(["/in/exam.pdf"])
+    ledger.expand("/in/exam.pdf", ["/in/exam-1.jpg", "/in/exam-2.jpg"])
+
+    assert ledger.statuses() == {
+        "/in/exam.pdf": STATUS_DONE,
+        "/in/exam-1.jpg": STATUS_UNPROCESSED,
+        "/in/exam-2.jpg": STATUS_UNPROCESSED,
+    }
+
+
+def test_expand_records_child_descriptions_for_sjf(tmp_path):
+    """Test that expanded pages keep their descriptions, so sjf claims the smallest first."""
+    ledger = FileLedger(tmp_path / "ledger.sqlite")
+    ledger.add(["/in/exam.pdf"])
+    ledger.expand(
+        "/in/exam.pdf",
+        ["/in/exam-1.jpg", "/in/exam-2.jpg"],
+        file_info={
+            "/in/exam-1.jpg": {"pages": 1, "bytes": 900, "test_form": "exam"},
+            "/in/exam-2.jpg": {"pages": 1, "bytes": 300, "test_form": "exam"},
+        },
+    )
+
+    assert ledger.get("/in/exam-1.jpg")["bytes"] == 900
+    assert ledger.get("/in/exam-2.jpg")["test_form"] == "exam"
+    assert ledger.claim_many(2, policy="sjf") == ["/in/exam-2.jpg", "/in/exam-1.jpg"]
+
+
+def test_concurrent_workers_never_claim_the_same_file(tmp_path):
+    """Test that parallel workers with their own connections claim disjoint files."""
+    ledger_path = tmp_path / "ledger.sqlite"
+    paths = [f"/in/page-{i}.jpg" for i in range(200)]
+    FileLedger(ledger_path).add(paths)
+
+    claimed = []
+    lock = threading.Lock()
+
+    def worker(name):
+        ledger = FileLedger(ledger_path)
+        while True:
+            path = ledger.claim(worker=name)
+            if path is None:
+                break
+            with lock:
+                claimed.append(path)
+        ledger.close()
+
+    threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed) == sorted(paths)
@@ -0,0 +1,107 @@
+"""
+Tests for the file manifest utility.
+"""
+
+import os
+import threading
+
+from utils.file_manifest import FileManifest, settle_files
+
+
+def test_refresh_detects_new_and_changed_files(tmp_path):
+    """Test that refresh reports new files and content changes but not mtime-only changes."""
+    manifest = FileManifest(tmp_path / "manifest.json")
+    page = tmp_path / "page.jpg"
+    page.write_bytes(b"v1")
+
+    assert manifest.refresh(str(page), page.stat()) is True
+    assert manifest.refresh(str(page), page.stat()) is False
+
+    os.utime(page, ns=(1, 1))
+    assert manifest.refresh(str(page), page.stat()) is False
+
+    page.write_bytes(b"v2")
+    assert manifest.refresh(str(page), page.stat()) is True
+
+
+def test_save_and_reload(tmp_path):
+    """Test that a saved manifest is picked up by a new instance."""
+    manifest_path = tmp_path / "cache" / "manifest.json"
+    page = tmp_path / "page.jpg"
+    page.write_bytes(b"content")
+
+    manifest = FileManifest(manifest_path)
+    manifest.refresh(str(page), page.stat())
+    manifest.save()
+
+    reloaded = FileManifest(manifest_path)
+    assert reloaded.entries == manifest.entries
+    assert reloaded.refresh(str(page), page.stat()) is False
+
+
+def test_files_stay_pending_until_settled(tmp_path):
+    """Test that a file is pending until settled, and a split PDF until all its pages are."""
+    manifest = FileManifest(tmp_path / "manifest.json")
+    page = tmp_path / "page.jpg"
+    page.write_bytes(b"jpeg")
+    pdf = tmp_path / "exam.pdf"
+    pdf.write_bytes(b"pdf")
+    manifest.refresh(str(page), page.stat())
+    manifest.refresh(str(pdf), pdf.stat())
+
+    assert manifest.is_pending(str(page))
+    assert manifest.settle([str(page)]) is True
+    assert not manifest.is_pending(str(page))
+
+    manifest.add_pages(str(pdf), ["exam-1.jpg", "exam-2.jpg"])
+    manifest.settle(["exam-1.jpg"])
+    assert manifest.is_pending(str(pdf))
+    manifest.settle(["exam-2.jpg"])
+    assert not manifest.is_pending(str(pdf))
+    assert manifest.settle(["exam-2.jpg"]) is False
+
+
+def test_pages_settle_after_reload(tmp_path):
+    """Test that a reloaded manifest still finds the split file of a settled page."""
+    manifest_path = tmp_path / "manifest.json"
+    pdf = tmp_path / "exam.pdf"
+    pdf.write_bytes(b"pdf")
+    manifest = FileManifest(manifest_path)
+    manifest.refresh(str(pdf), pdf.stat())
+    manifest.add_pages(str(pdf), ["exam-1.jpg", "exam-2.jpg"])
+    manifest.save()
+
+    reloaded = FileManifest(manifest_path)
+    assert reloaded.settle(["exam-2.jpg", "exam-1.jpg"]) is True
+    assert not reloaded.is_pending(str(pdf))
+
+
+def test_locked_updates_never_overwrite_each_other(tmp_path, monkeypatch):
+    """Test that updates through different instances and threads all reach the file."""
+    manifest_path = tmp_path / "manifest.json"
+    monkeypatch.setenv("FILE_MANIFEST_PATH", str(manifest_path))
+    pages = []
+    for i in range(20):
+        page = tmp_path / f"page-{i}.jpg"
+        page.write_bytes(f"page {i}".encode())
+        pages.append(str(page))
+    with FileManifest(manifest_path).locked() as manifest:
+        for page in pages:
+            manifest.refresh(page, os.stat(page))
+
+    # Two instances loaded before either update, as the watcher and a tool would hold them
+    first = FileManifest(manifest_path)
+    second = FileManifest(manifest_path)
+    with first.locked():
+        first.settle(pages[:1])
+    with second.locked():
+        second.settle(pages[1:2])
+
+    threads = [threading.Thread(target=settle_files, args=([page],)) for page in pages[2:]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    reloaded = FileManifest(manifest_path)
+    assert [page for page in pages if reloaded.is_pending(page)] == []
@@ -0,0 +1,74 @@
+"""
+Tests for the file queue utility.
+"""
+
+import copy
+
+from utils.file_queue import FileQueue, get_file_queue
+
+
+def test_claim_follows_listing_order_and_requeue_goes_last():
+    """Test that files are claimed in order and re-queued files move to the back."""
+    files = {"/in/a.jpg": "", "/in/b.jpg": "done", "/in/c.jpg": ""}
+    queue = FileQueue(files)
+
+    assert queue.claim() == "/in/a.jpg"
+    assert files["/in/a.jpg"] == "in-progress"
+
+    queue.requeue("/in/a.jpg")
+    assert queue.claim() == "/in/c.jpg"
+    assert queue.claim() == "/in/a.jpg"
+    assert queue.claim() is None
+    assert queue.paths("in-progress") == ["/in/c.jpg", "/in/a.jpg"]
+    assert len(queue) == 3
+
+
+def test_direct_status_changes_are_noticed():
+    """Test that a status written straight into the map is not claimed again."""
+    files = {"/in/a.jpg": "", "/in/b.jpg": ""}
+    queue = FileQueue(files)
+
+    files["/in/a.jpg"] = "done"
+    assert queue.peek() == "/in/b.jpg"
+    assert queue.paths("done") == ["/in/a.jpg"]
+
+
+def test_get_file_queue_reuses_and_rebuilds():
+    """Test that the queue is cached per files map and rebuilt when the map is replaced or grows."""
+    state = {}
+    queue = get_file_queue(state)
+    queue.add("/in/a.jpg")
+    assert state["files"] == {"/in/a.jpg": ""}
+    assert get_file_queue(state) is queue
+
+    # Files added behind the queue's back
+    state["files"]["/in/b.jpg"] = ""
+    rebuilt = get_file_queue(state)
+    assert rebuilt is not queue
+    assert rebuilt.paths("") == ["/in/a.jpg", "/in/b.jpg"]
+
+    # Map replaced, as split_pdf_batch does
+    state["files"] = {"/in/c.jpg": ""}
+    assert get_file_queue(state).claim() == "/in/c.jpg"
+
+
+def test_get_file_queue_never_shares_a_queue_between_maps():
+    """Test that equal maps, such as a reloaded session copy, each get their own queue."""
+    empty = {}
+    empty_queue = get_file_queue(empty)
+    other = {}
+    assert get_file_queue(other) is not empty_queue
+    get_file_queue(other).add("/in/a.jpg")
+    assert empty["files"] == {}
+
+    state = {}
+    queue = get_file_queue(state)
+    for name in ("a", "b"):
+        queue.add(f"/in/{name}.jpg")
+    loaded = copy.deepcopy(state)
+    copied_queue = get_file_queue(loaded)
+    assert copied_queue is not queue
+    assert copied_queue.claim() == "/in/a.jpg"
+    assert loaded["files"]["/in/a.jpg"] == "in-progress"
+    assert state["files"]["/in/a.jpg"] == ""
+    assert get_file_queue(state) is queue
@@ -0,0 +1,78 @@
+"""
+Tests for the page image preprocessing utility.
+"""
+
+import numpy as np
+from PIL import Image
+
+from utils.image_preprocess import (
+    binarize,
+    crop_margins,
+    downscale,
+    normalize_contrast,
+    otsu_threshold,
+    preprocess_image,
+)
+
+
+def make_page(height=400, width=300):
+    """
+    Creates a faint grey page with a dark text block and an isolated scanner speck.
+    """
+    page = np.full((height, width), 230, dtype=np.uint8)
+    page[100:200, 50:250] = 90  # text block
+    page[5, 5] = 0  # speck in the margin
+    return page
+
+
+def test_crop_margins_ignores_specks():
+    """Test that margins are trimmed to the content plus padding."""
+    cropped = crop_margins(make_page(), padding=4)
+    assert cropped.shape == (108, 208)
+
+
+def test_normalize_contrast_uses_full_range():
+    """Test that a faint page is stretched to black and white."""
+    normalized = normalize_contrast(make_page())
+    assert normalized.min() == 0
+    assert normalized.max() == 255
+
+
+def test_downscale_resizes_to_the_target_long_edge():
+    """Test that the long edge lands exactly on the target and the aspect ratio is kept."""
+    assert downscale(make_page(), 150).shape == (150, 112)
+    assert downscale(make_page(), 399).shape == (399, 299)
+    assert downscale(make_page(height=300, width=400), 250).shape == (188, 250)
+    assert downscale(make_page(), 1000).shape == (400, 300)
+
+
+def test_downscale_keeps_remainder_rows_and_columns():
+    """Test that ink in the last row and column still darkens the downscaled page."""
+    page = np.full((10, 7), 255, dtype=np.uint8)
+    page[9, :] = 0  # ink on the last row only
+    page[:, 6] = 0  # and in the last column only
+
+    small = downscale(page, 4)
+
+    assert small.shape == (4, 3)
+    assert (small[-1, :] < 255).all()
+    assert (small[:, -1] < 255).all()
+    assert small[0, 0] == 255
+
+
+def test_binarize_separates_ink_from_paper():
+    """Test that Otsu puts the threshold between the two intensity levels."""
+    page = make_page()
+    assert 90 <= otsu_threshold(page) < 230
+    binary = binarize(page)
+    assert not binary[150, 150]
+    assert binary[300, 150]
+    assert otsu_threshold(np.full((10, 10), 255, dtype=np.uint8)) == 0
+
+
+def test_preprocess_image_outputs_small_bilevel_page():
+    """Test the full pipeline on a PIL image."""
+    image = Image.fromarray(make_page(2000, 1500)).convert("RGB")
+    processed = preprocess_image(image, target_long_edge=500)
+    assert processed.mode == "1"
+    assert max(processed.size) <= 500
@@ -0,0 +1,207 @@
+"""
+Tests for the input watcher utility.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+from utils.file_ledger import FileLedger
+from utils.file_manifest import FileManifest
+from utils.input_watcher import (
+    _EVENT_HEADER,
+    _IN_Q_OVERFLOW,
+    InputWatcher,
+    enqueue_into_state,
+)
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_polling_waits_until_file_is_stable(tmp_path):
+    """Test that a file is only reported after its size stays unchanged for the debounce period."""
+    clock = FakeClock()
+    watcher = InputWatcher(
+        on_ready=lambda paths: None,
+        directory=tmp_path,
+        debounce_seconds=2.0,
+        use_inotify=False,
+        clock=clock,
+    )
+    assert watcher.mode == "polling"
+
+    upload = tmp_path / "exam.pdf"
+    upload.write_bytes(b"%PDF-1.4 partial")
+    watcher.scan()
+    assert watcher.collect_ready() == []
+
+    # The upload is still growing, which restarts the debounce timer
+    clock.now = 1.5
+    with open(upload, "ab") as f:
+        f.write(b" more data")
+    watcher.scan()
+    clock.now = 3.0
+    assert watcher.collect_ready() == []
+
+    clock.now = 4.0
+    assert watcher.collect_ready() == [str(upload)]
+
+    # Nothing is reported twice
+    watcher.scan()
+    clock.now = 10.0
+    assert watcher.collect_ready() == []
+
+
+def test_manifest_skips_files_processed_after_a_previous_watcher(tmp_path):
+    """Test that a restarted watcher re-reports unfinished files but not processed ones."""
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    page = str(input_dir / "page.jpg")
+    (input_dir / "page.jpg").write_bytes(b"jpeg")
+    manifest_path = tmp_path / "manifest.json"
+
+    def restart_watcher():
+        watcher = InputWatcher(
+            on_ready=lambda paths: None,
+            directory=input_dir,
+            debounce_seconds=0.0,
+            use_inotify=False,
+            manifest=FileManifest(manifest_path),
+        )
+        watcher.scan()
+        return watcher.collect_ready()
+
+    assert restart_watcher() == [page]
+    # The first run stopped before processing the page
+    assert restart_watcher() == [page]
+
+    manifest = FileManifest(manifest_path)
+    manifest.settle([page])
+    manifest.save()
+    assert restart_watcher() == []
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+def test_inotify_picks_up_new_files(tmp_path):
+    """Test that inotify events queue new files without a directory scan."""
+    clock = FakeClock()
+    state = {}
+    watcher = InputWatcher(
+        on_ready=enqueue_into_state(state),
+        directory=tmp_path,
+        pattern="*.jpg",
+        debounce_seconds=1.0,
+        poll_interval_seconds=0.5,
+        clock=clock,
+    )
+    assert watcher.mode == "inotify"
+
+    (tmp_path / "page-1.jpg").write_bytes(b"jpeg")
+    (tmp_path / "notes.txt").write_text("ignored")
+    watcher.wait_for_changes()
+
+    clock.now = 1.0
+    watcher.on_ready(watcher.collect_ready())
+    # The batch waits for the thread owning the state
+    assert state == {}
+    watcher.on_ready.drain()
+    assert state["files"] == {str(tmp_path / "page-1.jpg"): ""}
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+def test_inotify_overflow_rescans_the_directory(tmp_path):
+    """Test that lost events (queue overflow) make the watcher rescan the directory."""
+    clock = FakeClock()
+    watcher = InputWatcher(
+        on_ready=lambda paths: None,
+        directory=tmp_path,
+        debounce_seconds=0.0,
+        poll_interval_seconds=0.1,
+        clock=clock,
+    )
+    assert watcher.mode == "inotify"
+    watcher.scan()
+
+    # The kernel dropped the event of this file and reported an overflow instead
+    (tmp_path / "page-1.jpg").write_bytes(b"jpeg")
+    read_fd, write_fd = os.pipe()
+    os.close(watcher._inotify.fd)
+    watcher._inotify.fd = read_fd
+    os.write(write_fd, _EVENT_HEADER.pack(-1, _IN_Q_OVERFLOW, 0, 0))
+    os.close(write_fd)
+
+    watcher.wait_for_changes()
+    assert watcher.collect_ready() == [str(tmp_path / "page-1.jpg")]
+    watcher._close_inotify()
+
+
+def test_inbox_admits_files_like_list_files(tmp_path, monkeypatch):
+    """Test that arrived files are registered in the ledger and rejected ones are settled."""
+    monkeypatch.setenv("FILE_LEDGER_PATH", str(tmp_path / "ledger.sqlite"))
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    page = input_dir / "page.jpg"
+    page.write_bytes(b"jpeg")
+    large = input_dir / "large.pdf"
+    with open(large, "wb") as f:
+        f.truncate(11 * 1024 * 1024)
+    manifest = FileManifest(tmp_path / "manifest.json")
+
+    state = {}
+    watcher = InputWatcher(
+        on_ready=enqueue_into_state(state, manifest),
+        directory=input_dir,
+        debounce_seconds=0.0,
+        use_inotify=False,
+        manifest=manifest,
+    )
+    watcher.scan()
+    watcher.on_ready(watcher.collect_ready())
+    rejected = watcher.on_ready.drain()
+
+    assert list(rejected) == [str(large)]
+    assert state["files"] == {str(large): "failed", str(page): ""}
+    with FileLedger(tmp_path / "ledger.sqlite") as ledger:
+        assert ledger.statuses() == {str(large): "failed", str(page): ""}
+        assert ledger.get(str(page))["bytes"] == 4
+    # The rejected file is settled, the page is still pending
+    assert not FileManifest(tmp_path / "manifest.json").is_pending(str(large))
+    assert FileManifest(tmp_path / "manifest.json").is_pending(str(page))
+
+
+def test_inbox_hands_batches_to_the_owning_event_loop(tmp_path):
+    """Test that a batch from the watcher thread is added to the state on the loop's thread."""
+    page = tmp_path / "page.jpg"
+    page.write_bytes(b"jpeg")
+
+    async def run():
+        state = {}
+        added_on = []
+        inbox = enqueue_into_state(state, loop=asyncio.get_running_loop())
+        original_drain = inbox.drain
+
+        def drain():
+            added_on.append(threading.get_ident())
+            return original_drain()
+
+        inbox.drain = drain
+        watcher_thread = threading.Thread(target=inbox, args=([str(page)],))
+        watcher_thread.start()
+        watcher_thread.join()
+        await asyncio.sleep(0)
+        return state, added_on
+
+    state, added_on = asyncio.run(run())
+    assert state["files"] == {str(page): ""}
+    assert added_on == [threading.get_ident()]
@@ -0,0 +1,45 @@
+"""
+Tests for the question block layout utility.
+"""
+
+import numpy as np
+
+from utils.layout import find_question_blocks, find_text_lines
+
+
+def make_part5_page(num_questions=3, lines_per_question=5):
+    """
+    Draws a page of question blocks: dark text lines 12 px high, 8 px apart within a
+    question and 40 px apart between questions.
+    """
+    page = np.full((60 + num_questions * 120, 800), 255, dtype=np.uint8)
+    y = 40
+    for _ in range(num_questions):
+        for line in range(lines_per_question):
+            # Stem lines are wider than choice lines
+            right = 700 if line == 0 else 400
+            page[y : y + 12, 80:right] = 0
+            y += 20
+        y += 32
+    return page
+
+
+def test_find_text_lines():
+    """Test that every drawn line is found."""
+    lines = find_text_lines(make_part5_page())
+    assert len(lines) == 15
+    assert lines[0] == (40, 52)
+
+
+def test_find_question_blocks_splits_on_wide_gaps():
+    """Test that lines are grouped into one block per question."""
+    blocks = find_question_blocks(make_part5_page())
+    assert len(blocks) == 3
+    left, top, right, bottom = blocks[0]
+    assert (left, top, right, bottom) == (74, 34, 706, 138)
+    assert blocks[1][1] > blocks[0][3]
+
+
+def test_find_question_blocks_on_blank_page():
+    """Test that a page without ink has no blocks."""
+    assert find_question_blocks(np.full((100, 100), 255, dtype=np.uint8)) == []
@@ -0,0 +1,163 @@
+"""
+Tests for the concurrent model call executor.
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from utils.model_executor import ModelCallExecutor, generate_content_call, is_rate_limit_error
+
+
+class FakeApiError(Exception):
+    """Error carrying an HTTP status like google.genai.errors.APIError."""
+
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class FakeModel:
+    """Fake model endpoint that records concurrency and fails the first calls."""
+
+    def __init__(self, failures=(), latency=0.01, total_tokens=None):
+        self.failures = list(failures)
+        self.latency = latency
+        self.total_tokens = total_tokens
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate(self):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if self.failures:
+                raise self.failures.pop(0)
+            return SimpleNamespace(
+                usage_metadata=SimpleNamespace(total_token_count=self.total_tokens)
+            )
+        finally:
+            self.in_flight -= 1
+
+
+def test_is_rate_limit_error():
+    """Test that only 429s count as rate limit errors."""
+    assert is_rate_limit_error(FakeApiError(429))
+    assert not is_rate_limit_error(FakeApiError(500))
+    assert not is_rate_limit_error(ValueError("bad"))
+
+
+def test_map_runs_calls_concurrently_up_to_the_limit():
+    """Test that calls overlap up to max_concurrency and results keep their order."""
+    model = FakeModel()
+    executor = ModelCallExecutor(limits={}, max_concurrency=4)
+
+    start = time.monotonic()
+    results = asyncio.run(executor.map("model", [model.generate] * 12))
+    elapsed = time.monotonic() - start
+
+    assert len(results) == 12
+    assert model.max_in_flight == 4
+    # 12 calls of 10 ms, 4 at a time: about 30 ms rather than 120 ms
+    assert elapsed < 0.1
+
+
+def test_call_respects_rpm():
+    """Test that the request bucket paces calls to the model's RPM."""
+    model = FakeModel(latency=0)
+    executor = ModelCallExecutor(limits={"model": {"rpm": 6000}}, burst_seconds=0)
+
+    start = time.monotonic()
+    asyncio.run(executor.map("model", [model.generate] * 6))
+    # 100 requests per second: the 5 calls after the first wait 10 ms each
+    assert time.monotonic() - start >= 0.045
+
+
+def test_exhausted_model_does_not_hold_back_other_models():
+    """Test that calls waiting on one model's limits leave the shared slots to other models."""
+    pro = FakeModel(latency=0)
+    flash = FakeModel(latency=0)
+    # One request per second after the first: the pro bucket is exhausted at once
+    executor = ModelCallExecutor(limits={"pro": {"rpm": 60}}, burst_seconds=0, max_concurrency=2)
+
+    async def run():
+        pro_calls = [asyncio.create_task(executor.call("pro", pro.generate)) for _ in range(4)]
+        await asyncio.sleep(0.01)
+        start = time.monotonic()
+        await asyncio.wait_for(executor.call("flash", flash.generate), timeout=0.5)
+        elapsed = time.monotonic() - start
+        for task in pro_calls:
+            task.cancel()
+        await asyncio.gather(*pro_calls, return_exceptions=True)
+        return elapsed
+
+    elapsed = asyncio.run(run())
+    assert flash.calls == 1
+    assert pro.calls == 1
+    assert elapsed < 0.1
+
+
+def test_call_retries_429_with_backoff():
+    """Test that 429s are retried with backoff and pause the model's limiter."""
+    model = FakeModel(failures=[FakeApiError(429), FakeApiError(429)])
+    executor = ModelCallExecutor(limits={"model": {"rpm": 60000}}, base_delay_seconds=0.01)
+
+    with patch("utils.model_executor.backoff_delay", return_value=0.01) as backoff_delay:
+        asyncio.run(executor.call("model", model.generate))
+
+    assert model.calls == 3
+    assert executor.rate_limited_retries == 2
+    assert [call.args[0] for call in backoff_delay.call_args_list] == [0, 1]
+
+
+def test_call_gives_up_after_max_retries():
+    """Test that the last 429 is raised once retries run out."""
+    model = FakeModel(failures=[FakeApiError(429)] * 3)
+    executor = ModelCallExecutor(limits={}, max_retries=2, base_delay_seconds=0.001)
+
+    with pytest.raises(FakeApiError):
+        asyncio.run(executor.call("model", model.generate))
+    assert model.calls == 3
+
+
+def test_call_does_not_retry_other_errors():
+    """Test that non-429 errors are raised at once and reported per call by map()."""
+    model = FakeModel(failures=[FakeApiError(500)])
+    executor = ModelCallExecutor(limits={})
+
+    results = asyncio.run(executor.map("model", [model.generate] * 2))
+    assert model.calls == 2
+    assert sum(isinstance(result, FakeApiError) for result in results) == 1
+
+
+def test_call_charges_tokens_beyond_the_estimate():
+    """Test that usage above the estimate is debited from the token bucket."""
+    model = FakeModel(latency=0, total_tokens=500)
+    executor = ModelCallExecutor(limits={"model": {"tpm": 60000}})
+
+    asyncio.run(executor.call("model", model.generate, estimated_tokens=200))
+    # Capacity 1000 tokens: 200 reserved up front and 300 charged afterwards
+    assert executor.limiter("model").tokens.level() == pytest.approx(500, abs=5)
+
+
+def test_generate_content_call_starts_a_new_request_each_time():
+    """Test that the genai wrapper issues a fresh request per call (needed for retries)."""
+    requests = []
+
+    async def generate_content(**kwargs):
+        requests.append(kwargs)
+        return "response"
+
+    client = SimpleNamespace(
+        aio=SimpleNamespace(models=SimpleNamespace(generate_content=generate_content))
+    )
+    make_call = generate_content_call(client, "model", ["page"])
+    assert asyncio.run(make_call()) == "response"
+    assert asyncio.run(make_call()) == "response"
+    assert requests == [{"model": "model", "contents": ["page"], "config": None}] * 2
@@ -0,0 +1,119 @@
+"""
+Tests for the blank page classifier.
+"""
+
+import numpy as np
+from PIL import Image
+
+from tests.utils.test_layout import make_part5_page
+from utils.page_classifier import (
+    PageClassifier,
+    difference_hash,
+    get_page_classifier,
+    hash_distance,
+    ink_density,
+    load_templates,
+)
+
+
+def make_notice_page():
+    """
+    Draws a page that only carries a single short line, like "This page intentionally
+    left blank".
+    """
+    page = np.full((1100, 850), 255, dtype=np.uint8)
+    page[540:556, 300:550] = 0
+    return page
+
+
+def make_answer_grid():
+    """
+    Draws an answer sheet: rows of bubbles across the whole page.
+    """
+    page = np.full((1100, 850), 255, dtype=np.uint8)
+    for top in range(100, 1000, 30):
+        for left in range(100, 750, 40):
+            page[top : top + 14, left : left + 14] = 0
+    return page
+
+
+def test_ink_density_ignores_the_border():
+    """Test that a dark scanner edge does not count as ink."""
+    page = np.full((1000, 1000), 255, dtype=np.uint8)
+    page[:, :20] = 0
+    assert ink_density(page) == 0.0
+
+    page[500:510, 100:900] = 0
+    assert 0 < ink_density(page) < 0.01
+
+
+def test_classify_blank_page():
+    """Test that an empty page is skipped as blank."""
+    reason = PageClassifier().classify_gray(np.full((1100, 850), 255, dtype=np.uint8))
+    assert reason.startswith("blank page")
+
+
+def test_classify_near_blank_page():
+    """Test that a page with a single short line is skipped as near-blank."""
+    reason = PageClassifier().classify_gray(make_notice_page())
+    assert reason.startswith("near-blank page (1 text lines")
+
+
+def test_classify_question_page_is_kept():
+    """Test that a page of questions is never skipped."""
+    assert PageClassifier().classify_gray(make_part5_page(num_questions=8)) is None
+
+
+def test_difference_hash_is_stable_under_rescaling():
+    """Test that the same page at another resolution hashes to (almost) the same value."""
+    page = make_answer_grid()
+    smaller = np.asarray(Image.fromarray(page).resize((425, 550)))
+    assert hash_distance(difference_hash(page), difference_hash(smaller)) <= 2
+    assert hash_distance(difference_hash(page), difference_hash(make_part5_page(8))) > 6
+
+
+def test_classify_matches_templates(tmp_path):
+    """Test that a page matching a reference image is skipped with the template's name."""
+    Image.fromarray(make_answer_grid()).save(tmp_path / "answer-sheet.png")
+    templates = load_templates(tmp_path)
+    assert list(templates.values()) == ["matches answer-sheet"]
+
+    classifier = PageClassifier(templates)
+    assert classifier.classify_gray(make_answer_grid()) == "matches answer-sheet"
+    assert classifier.classify_gray(make_part5_page(num_questions=8)) is None
+    # Without the template the grid is an ordinary page
+    assert PageClassifier().classify_gray(make_answer_grid()) is None
+
+
+def test_classify_text():
+    """Test that text-layer pages are classified by their content."""
+    classifier = PageClassifier()
+    assert classifier.classify_text("  \n ") == "blank page (empty text layer)"
+    assert classifier.classify_text("This page is intentionally left blank.") == "blank page notice"
+    question = "101. The manager asked the team to ------- the report. (A) review (B) reviews"
+    assert classifier.classify_text(question) is None
+
+
+def test_classify_file(tmp_path):
+    """Test that page files are classified by type and other files are kept."""
+    classifier = PageClassifier()
+    blank_path = tmp_path / "page-1.jpg"
+    Image.fromarray(np.full((1100, 850), 255, dtype=np.uint8)).save(blank_path)
+    text_path = tmp_path / "page-2.txt"
+    text_path.write_text("Intentionally blank", encoding="utf-8")
+    other_path = tmp_path / "notes.csv"
+    other_path.write_text("", encoding="utf-8")
+
+    assert classifier.classify_file(blank_path).startswith("blank page")
+    assert classifier.classify_file(text_path) == "blank page notice"
+    assert classifier.classify_file(other_path) is None
+
+
+def test_get_page_classifier_reads_template_dir(tmp_path, monkeypatch):
+    """Test that SKIP_PAGE_TEMPLATE_DIR selects the reference images."""
+    Image.fromarray(make_answer_grid()).save(tmp_path / "answer-sheet.png")
+    monkeypatch.setenv("SKIP_PAGE_TEMPLATE_DIR", str(tmp_path))
+    assert list(get_page_classifier().templates.values()) == ["matches answer-sheet"]
+
+    monkeypatch.setenv("SKIP_PAGE_TEMPLATE_DIR", str(tmp_path / "missing"))
+    assert get_page_classifier().templates == {}
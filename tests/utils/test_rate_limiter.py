@@ -0,0 +1,112 @@
+"""
+Tests for the model rate limiter.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from utils.rate_limiter import (
+    IMAGE_TOKENS,
+    ModelRateLimiter,
+    TokenBucket,
+    estimate_request_tokens,
+    get_model_rate_limits,
+)
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket_refills_at_its_rate():
+    """Test that a drained bucket refills continuously up to its capacity."""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=5, clock=clock)
+
+    for _ in range(5):
+        assert bucket.try_acquire(1) == 0
+    assert bucket.try_acquire(1) == pytest.approx(0.1)
+
+    clock.now += 0.25
+    assert bucket.level() == pytest.approx(2.5)
+    clock.now += 10
+    assert bucket.level() == 5
+
+
+def test_token_bucket_large_requests_go_into_debt():
+    """Test that a request above capacity waits for a full bucket and then goes into debt."""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=5, clock=clock)
+    bucket.try_acquire(3)
+    assert bucket.try_acquire(8) == pytest.approx(0.3)
+
+    clock.now += 0.31
+    assert bucket.try_acquire(8) == 0
+    assert bucket.level() == pytest.approx(-3, abs=0.2)
+
+    bucket.debit(2)
+    assert bucket.level() == pytest.approx(-5, abs=0.2)
+
+
+def test_token_bucket_acquire_waits():
+    """Test that acquire() paces callers at the bucket's rate."""
+    bucket = TokenBucket(rate=100, capacity=1)
+
+    async def acquire_all():
+        for _ in range(6):
+            await bucket.acquire()
+
+    start = time.monotonic()
+    asyncio.run(acquire_all())
+    assert time.monotonic() - start >= 0.045
+
+
+def test_model_rate_limiter_buckets():
+    """Test that RPM and TPM become per-second buckets with a burst of at least one unit."""
+    limiter = ModelRateLimiter(rpm=600, tpm=6000, burst_seconds=2)
+    assert limiter.requests.rate == 10 and limiter.requests.capacity == 20
+    assert limiter.tokens.rate == 100 and limiter.tokens.capacity == 200
+
+    slow = ModelRateLimiter(rpm=10)
+    assert slow.requests.capacity == 1
+    assert slow.tokens is None
+
+
+def test_model_rate_limiter_pause():
+    """Test that a paused limiter holds back calls until the pause ends."""
+    limiter = ModelRateLimiter(rpm=6000)
+    limiter.pause(0.05)
+
+    start = time.monotonic()
+    asyncio.run(limiter.acquire())
+    assert time.monotonic() - start >= 0.045
+
+
+def test_estimate_request_tokens():
+    """Test the token estimate for text, images and the response budget."""
+    assert estimate_request_tokens("x" * 400, num_images=2, max_output_tokens=100) == (
+        100 + 2 * IMAGE_TOKENS + 100
+    )
+
+
+def test_get_model_rate_limits_overrides(monkeypatch):
+    """Test that MODEL_RATE_LIMITS is merged over the defaults per model."""
+    monkeypatch.setenv(
+        "MODEL_RATE_LIMITS",
+        '{"gemini-2.5-pro-preview-05-06": {"rpm": 5}, "custom-model": {"tpm": 100}}',
+    )
+    limits = get_model_rate_limits()
+    assert limits["gemini-2.5-pro-preview-05-06"] == {"rpm": 5, "tpm": 2_000_000}
+    assert limits["custom-model"] == {"tpm": 100}
+
+    monkeypatch.setenv("MODEL_RATE_LIMITS", "[1]")
+    with pytest.raises(ValueError):
+        get_model_rate_limits()
@@ -0,0 +1,145 @@
+"""
+Tests for recording and replaying Gemini and Supabase calls.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from google.genai import errors, types
+from postgrest.exceptions import APIError
+
+from utils.genai import StandInGenaiClient, get_genai_client
+from utils.record_replay import Cassette, ReplayMissError, get_service_cassette
+from utils.supabase import StandInSupabaseClient, get_supabase_client
+
+MODEL = "gemini-2.5-flash-preview-05-20"
+
+
+def make_response(text):
+    return types.GenerateContentResponse(
+        candidates=[
+            types.Candidate(content=types.Content(role="model", parts=[types.Part(text=text)]))
+        ]
+    )
+
+
+class FakeModels:
+    """Async generate_content that echoes the last content part, or fails on "quota"."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_content(self, model, contents, config=None):
+        self.calls += 1
+        if contents[-1] == "quota":
+            raise errors.ClientError(429, {"error": {"code": 429, "message": "quota"}})
+        return make_response(f"echo {contents[-1]}")
+
+
+class FakeQuery:
+    def __init__(self, table):
+        self.table = table
+        self.rows = []
+
+    def upsert(self, row, on_conflict=None):
+        self.rows.append(row)
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=[{**row, "id": 7} for row in self.rows], count=None)
+
+
+def record_calls(path):
+    cassette = Cassette(path, mode="record")
+    models = FakeModels()
+    client = StandInGenaiClient(
+        cassette, SimpleNamespace(models=None, aio=SimpleNamespace(models=models))
+    )
+    config = types.GenerateContentConfig(temperature=0)
+
+    async def run():
+        first = await client.aio.models.generate_content(
+            model=MODEL, contents=["ocr", "page 1"], config=config
+        )
+        with pytest.raises(errors.ClientError):
+            await client.aio.models.generate_content(model=MODEL, contents=["quota"])
+        return first
+
+    first = asyncio.run(run())
+    supabase = StandInSupabaseClient(cassette, SimpleNamespace(table=FakeQuery))
+    saved = supabase.table("questions").upsert({"number": 101}, on_conflict=["part_id"]).execute()
+    return first, saved, models
+
+
+def test_record_then_replay_offline(tmp_path):
+    """Test that recorded calls are answered from the cassette without the real clients."""
+    path = tmp_path / "services.jsonl"
+    first, saved, models = record_calls(path)
+    assert first.text == "echo page 1"
+    assert saved.data == [{"number": 101, "id": 7}]
+    assert models.calls == 2
+
+    cassette = Cassette(path, mode="replay", latency_scale=0)
+    assert len(cassette) == 3
+    client = StandInGenaiClient(cassette)
+    replayed = asyncio.run(
+        client.aio.models.generate_content(
+            model=MODEL, contents=["ocr", "page 1"], config=types.GenerateContentConfig(temperature=0)
+        )
+    )
+    assert replayed.text == "echo page 1"
+
+    # Recorded errors are raised again
+    with pytest.raises(errors.ClientError) as error:
+        asyncio.run(client.aio.models.generate_content(model=MODEL, contents=["quota"]))
+    assert error.value.code == 429
+
+    supabase = StandInSupabaseClient(cassette)
+    response = supabase.table("questions").upsert({"number": 101}, on_conflict=["part_id"]).execute()
+    assert response.data == [{"number": 101, "id": 7}]
+
+    # A request that differs in any argument was never recorded
+    with pytest.raises(ReplayMissError):
+        supabase.table("questions").upsert({"number": 102}, on_conflict=["part_id"]).execute()
+    with pytest.raises(ReplayMissError):
+        client.models.generate_content(model=MODEL, contents=["ocr", "page 1"])
+
+
+def test_replay_scales_latency_and_injects_errors(tmp_path):
+    """Test that replayed calls wait the scaled latency and fail at the error rate."""
+    path = tmp_path / "services.jsonl"
+    path.write_text(
+        '{"service": "supabase", "key": "k", "label": "tags", "latency_seconds": 2.0, '
+        '"response": {"data": [{"id": 1}], "count": null}}\n'
+    )
+
+    cassette = Cassette(path, mode="replay", latency_scale=0.25)
+    assert cassette.replay_latency(cassette.replay("supabase", "k")) == 0.5
+
+    cassette = Cassette(path, mode="replay", error_rate=0.5, seed=3)
+    same_seed = Cassette(path, mode="replay", error_rate=0.5, seed=3)
+    decisions = [cassette.inject_error() for _ in range(200)]
+    assert 60 < sum(decisions) < 140
+    assert decisions == [same_seed.inject_error() for _ in range(200)]
+
+    record_calls(path)
+    supabase = StandInSupabaseClient(Cassette(path, mode="replay", latency_scale=0, error_rate=1.0))
+    with pytest.raises(APIError) as error:
+        supabase.table("questions").upsert({"number": 101}, on_conflict=["part_id"]).execute()
+    assert error.value.code == "503"
+
+
+def test_factories_return_stand_ins_in_replay_mode(tmp_path, monkeypatch):
+    """Test that replay mode needs no credentials and shares one cassette."""
+    monkeypatch.setenv("SERVICE_CASSETTE_MODE", "replay")
+    monkeypatch.setenv("SERVICE_CASSETTE_PATH", str(tmp_path / "services.jsonl"))
+    monkeypatch.delenv("SUPABASE_URL", raising=False)
+
+    assert isinstance(get_genai_client(), StandInGenaiClient)
+    assert isinstance(get_supabase_client(), StandInSupabaseClient)
+    assert get_service_cassette() is get_service_cassette()
+
+    monkeypatch.setenv("SERVICE_CASSETTE_MODE", "rewind")
+    with pytest.raises(ValueError):
+        get_service_cassette()
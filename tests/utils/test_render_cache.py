@@ -0,0 +1,71 @@
+"""
+Tests for the render cache utility.
+"""
+
+import os
+import time
+from pathlib import Path
+
+from utils.render_cache import RenderCache
+
+
+def write_pages(directory: Path, prefix: str, num_pages: int, size: int):
+    """
+    Writes `num_pages` dummy page files of `size` bytes and returns them keyed by page number.
+    """
+    pages = {}
+    for page_number in range(1, num_pages + 1):
+        path = directory / f"{prefix}-{page_number}.jpg"
+        path.write_bytes(b"x" * size)
+        pages[page_number] = path
+    return pages
+
+
+def test_make_key_depends_on_content_and_params(tmp_path):
+    """Test that the key changes with the file content and with the render parameters."""
+    pdf_a = tmp_path / "a.pdf"
+    pdf_b = tmp_path / "b.pdf"
+    pdf_a.write_bytes(b"same content")
+    pdf_b.write_bytes(b"same content")
+
+    params = {"dpi": 200, "format": "JPEG", "quality": 75}
+    assert RenderCache.make_key(pdf_a, params) == RenderCache.make_key(pdf_b, params)
+    assert RenderCache.make_key(pdf_a, params) != RenderCache.make_key(
+        pdf_a, {**params, "dpi": 300}
+    )
+
+    pdf_b.write_bytes(b"other content")
+    assert RenderCache.make_key(pdf_a, params) != RenderCache.make_key(pdf_b, params)
+
+
+def test_put_and_get_round_trip(tmp_path):
+    """Test that stored pages come back in page order."""
+    cache = RenderCache(tmp_path / "cache", max_bytes=10_000)
+    pages = write_pages(tmp_path, "doc", 12, 10)
+
+    assert cache.get("key") is None
+    cache.put("key", pages)
+
+    cached = cache.get("key")
+    assert list(cached.keys()) == list(range(1, 13))
+    assert [p.name for p in cached.values()] == [f"page-{i}.jpg" for i in range(1, 13)]
+
+
+def test_evicts_least_recently_used_entry(tmp_path):
+    """Test that the size cap evicts the entry that was used least recently."""
+    cache = RenderCache(tmp_path / "cache", max_bytes=250)
+
+    cache.put("first", write_pages(tmp_path, "first", 1, 100))
+    cache.put("second", write_pages(tmp_path, "second", 1, 100))
+
+    # Make "first" the most recently used entry
+    old = time.time() - 100
+    os.utime(tmp_path / "cache" / "second", (old, old))
+    os.utime(tmp_path / "cache" / "first", (old - 50, old - 50))
+    assert cache.get("first") is not None
+
+    cache.put("third", write_pages(tmp_path, "third", 1, 100))
+
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.get("third") is not None
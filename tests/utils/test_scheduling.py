@@ -0,0 +1,60 @@
+"""
+Tests for the scheduling policies.
+"""
+
+import pytest
+
+from utils.file_queue import FileQueue
+from utils.scheduling import create_scheduler
+
+
+def make_queue():
+    """
+    Creates a queue holding a 3-page PDF and pages of two test forms.
+    """
+    file_info = {
+        "/in/big.pdf": {"bytes": 900_000, "pages": 3, "test_form": "big"},
+        "/in/formA-1.jpg": {"bytes": 300_000, "pages": 1, "test_form": "formA"},
+        "/in/formA-2.jpg": {"bytes": 100_000, "pages": 1, "test_form": "formA"},
+        "/in/formB-1.jpg": {"bytes": 200_000, "pages": 1, "test_form": "formB"},
+    }
+    return FileQueue(dict.fromkeys(file_info, ""), file_info)
+
+
+def test_shortest_job_first():
+    """Test that sjf picks by page count, then byte size."""
+    queue = make_queue()
+    assert queue.claim_many(4, "sjf") == [
+        "/in/formA-2.jpg",
+        "/in/formB-1.jpg",
+        "/in/formA-1.jpg",
+        "/in/big.pdf",
+    ]
+
+
+def test_fair_round_robin_across_test_forms():
+    """Test that fair alternates between test forms."""
+    queue = make_queue()
+    assert queue.claim_many(4, "fair") == [
+        "/in/big.pdf",
+        "/in/formA-1.jpg",
+        "/in/formB-1.jpg",
+        "/in/formA-2.jpg",
+    ]
+
+
+def test_policies_see_files_claimed_and_requeued_elsewhere():
+    """Test that a policy skips files claimed by another policy and sees requeued ones."""
+    queue = make_queue()
+    assert queue.claim("sjf") == "/in/formA-2.jpg"
+    assert queue.claim("fifo") == "/in/big.pdf"
+
+    queue.requeue("/in/formA-2.jpg")
+    assert queue.claim_many(4, "sjf") == ["/in/formA-2.jpg", "/in/formB-1.jpg", "/in/formA-1.jpg"]
+    assert queue.claim("fair") is None
+
+
+def test_unknown_policy():
+    """Test that an unknown policy is rejected."""
+    with pytest.raises(ValueError):
+        create_scheduler("lifo")
@@ -0,0 +1,65 @@
+"""
+Tests for the on-disk stage output cache.
+"""
+
+import os
+
+from utils.stage_cache import StageCache, get_stage_cache, hash_value
+
+
+def test_make_key_changes_with_every_component():
+    """Test that the stage, input, model, prompt version and config all change the key."""
+    base = ("structure", "input-hash", "gemini-2.5-pro-preview-05-06", "v1", {"temperature": 0})
+    key = StageCache.make_key(*base)
+
+    assert StageCache.make_key(*base) == key
+    for index, changed in enumerate(
+        ["tagging", "other-input", "gemini-2.5-flash-preview-05-20", "v2", {"temperature": 1}]
+    ):
+        variant = list(base)
+        variant[index] = changed
+        assert StageCache.make_key(*variant) != key
+
+
+def test_put_and_get_round_trip(tmp_path):
+    """Test that stored outputs are returned and unknown keys miss."""
+    cache = StageCache(tmp_path / "stages")
+    key = StageCache.make_key("extractor", hash_value({"exam-1.jpg": "ab"}), "model", "v1")
+
+    assert cache.get(key) is None
+    cache.put(key, {"parts": [{"text": "101. The meeting was -------."}]})
+
+    assert cache.get(key) == {"parts": [{"text": "101. The meeting was -------."}]}
+    assert (tmp_path / "stages" / key[:2] / f"{key}.json").is_file()
+    assert not list((tmp_path / "stages").rglob(".staging-*"))
+
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    """Test that entries beyond the size cap are evicted oldest access first."""
+    cache = StageCache(tmp_path / "stages", max_bytes=10**6)
+    keys = [StageCache.make_key("structure", str(i), "model", "v1") for i in range(3)]
+    for age, key in enumerate(keys):
+        cache.put(key, "x" * 100)
+        entry_path = tmp_path / "stages" / key[:2] / f"{key}.json"
+        os.utime(entry_path, (1000 + age, 1000 + age))
+
+    # Reading the oldest entry makes it the most recently used
+    assert cache.get(keys[0]) is not None
+
+    cache.max_bytes = 250
+    cache.evict()
+
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is not None
+
+
+def test_get_stage_cache_reads_environment(tmp_path, monkeypatch):
+    """Test that the cache location and size cap come from the environment."""
+    monkeypatch.setenv("STAGE_CACHE_DIR", str(tmp_path / "stages"))
+    monkeypatch.setenv("STAGE_CACHE_MAX_BYTES", "1024")
+
+    cache = get_stage_cache()
+
+    assert cache.cache_dir == tmp_path / "stages"
+    assert cache.max_bytes == 1024
@@ -0,0 +1,146 @@
+"""
+Tests for the nearest-neighbour tag index.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from utils.tag_index import (
+    DEFAULT_CONFIDENCE_THRESHOLD,
+    TagIndex,
+    ngram_counts,
+    question_key,
+    tag_key,
+)
+
+GRAMMAR = [{"level1": "Grammar", "level2": "Verb Tenses"}]
+VOCABULARY = [{"level1": "Vocabulary"}]
+
+VERB_STEMS = [
+    "The manager ------- the quarterly report yesterday before the meeting.",
+    "The manager ------- the quarterly report yesterday before the board meeting.",
+    "The manager ------- the quarterly report yesterday after the meeting.",
+]
+NOUN_STEM = "Please submit the completed ------- form to the human resources office."
+
+
+def make_index(path=None):
+    tag_index = TagIndex(path)
+    for question_id, stem in enumerate(VERB_STEMS, start=1):
+        tag_index.add(question_id, stem, GRAMMAR)
+    tag_index.add(4, NOUN_STEM, VOCABULARY)
+    return tag_index
+
+
+def test_ngram_counts_normalizes_case_and_whitespace():
+    """Test that case and whitespace runs do not change the n-gram counts."""
+    assert (ngram_counts("The  Manager\n") == ngram_counts("the manager")).all()
+    assert ngram_counts("abc").sum() == 3  # " ab", "abc", "bc "
+
+
+def test_suggest_returns_tags_of_nearest_questions():
+    """Test that a near-duplicate gets its neighbours' tags with a high confidence."""
+    tags, confidence = make_index().suggest(
+        "The manager ------- the quarterly report yesterday before the staff meeting."
+    )
+    assert [tag_key(tag) for tag in tags] == ["Grammar_Verb Tenses_"]
+    assert confidence > DEFAULT_CONFIDENCE_THRESHOLD
+
+
+def test_suggest_is_not_confident_for_unfamiliar_questions():
+    """Test that an unrelated stem and an empty index give low or no confidence."""
+    _, confidence = make_index().suggest("Shipping costs are ------- for members.")
+    assert confidence < 0.5
+    assert TagIndex().suggest("Anything") == ([], 0.0)
+
+
+def test_add_replaces_question_and_persists_incrementally(tmp_path):
+    """Test that re-adding a question replaces it and that the file reloads the same index."""
+    path = tmp_path / "tag_index.jsonl"
+    tag_index = make_index(path)
+    tag_index.add(4, NOUN_STEM, [{"level1": "Grammar", "level2": "Nouns"}])
+    assert len(tag_index) == 4
+    # The replaced entry is compacted away instead of appended
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 4
+
+    reloaded = TagIndex(path)
+    assert len(reloaded) == 4
+    assert reloaded.suggest(NOUN_STEM, neighbours=1)[0] == [
+        {"level1": "Grammar", "level2": "Nouns", "level3": None}
+    ]
+
+
+def test_update_appends_new_questions_and_compacts_old_files(tmp_path):
+    """Test that new entries are appended and a file with replaced entries is compacted."""
+    path = tmp_path / "tag_index.jsonl"
+    tag_index = make_index(path)
+    tag_index.update([(5, NOUN_STEM, VOCABULARY), (6, VERB_STEMS[0], GRAMMAR)])
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 6
+
+    with open(path, "a", encoding="utf-8") as f:  # as appended by an older index
+        f.write(json.dumps({"question_id": 5, "stem": NOUN_STEM, "tags": GRAMMAR}) + "\n")
+    assert len(TagIndex(path)) == 6
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [entry["question_id"] for entry in lines] == [1, 2, 3, 4, 5, 6]
+    assert lines[4]["tags"] == GRAMMAR
+
+
+def test_indexes_sharing_a_file_keep_each_others_entries(tmp_path):
+    """Test that appends and compactions start from what other indexes saved to the file."""
+    path = tmp_path / "tag_index.jsonl"
+    first = make_index(path)
+    second = TagIndex(path)
+
+    first.add(5, "Shipping costs are ------- for members.", VOCABULARY)
+    # Replacing a question compacts the file, which must keep the first index's entry 5
+    second.add(1, VERB_STEMS[0], VOCABULARY)
+    # After the compaction, the first index re-reads the file before appending
+    first.add(6, NOUN_STEM, GRAMMAR)
+
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [entry["question_id"] for entry in lines] == [1, 2, 3, 4, 5, 6]
+    assert lines[0]["tags"] == [{"level1": "Vocabulary", "level2": None, "level3": None}]
+    assert len(first) == 6
+    assert len(TagIndex(path)) == 6
+
+
+def test_sparse_rows_match_dense_tf_idf():
+    """Test that suggestions equal the cosine similarity of the dense TF-IDF vectors."""
+    tag_index = make_index()
+    query = "The manager ------- the report."
+    counts = np.stack([ngram_counts(stem) for stem in VERB_STEMS + [NOUN_STEM]])
+    idf = np.log(5 / (1 + (counts > 0).sum(axis=0))) + 1
+
+    def weigh(rows):
+        weights = np.where(rows > 0, 1 + np.log(np.maximum(rows, 1)), 0) * idf
+        return weights / np.linalg.norm(weights, axis=-1, keepdims=True)
+
+    similarities = weigh(counts) @ weigh(ngram_counts(query))
+    _, confidence = tag_index.suggest(query, neighbours=1)
+    assert confidence == pytest.approx(similarities.max(), rel=1e-5)
+
+
+def test_tag_test_set_only_when_every_question_is_confident():
+    """Test that a test set is tagged from the index only if all its questions are familiar."""
+    tag_index = make_index()
+    question = {"part_label": "Part 5", "number": 101, "stem": VERB_STEMS[0]}
+    tagged = tag_index.tag_test_set({"questions": [question]})
+
+    assert tagged["tags"] == GRAMMAR
+    assert tagged["question_tags"] == [
+        {"question_key": "Part 5_101", "tag_key": "Grammar_Verb Tenses_"}
+    ]
+
+    unfamiliar = {"part_label": "Part 5", "number": 102, "stem": "Shipping is ------- for members."}
+    assert tag_index.tag_test_set({"questions": [question, unfamiliar]}) is None
+    # Without its part the question_tags cannot be linked to the question
+    assert tag_index.tag_test_set({"questions": [{"number": 101, "stem": VERB_STEMS[0]}]}) is None
+
+
+def test_question_key_matches_save_test_set_links():
+    """Test that questions are keyed by part label, or by part id once it is resolved."""
+    assert question_key({"part_label": "Part 5", "number": 101}) == "Part 5_101"
+    assert question_key({"part_id": 7, "number": 101}) == "7_101"
+    assert question_key({"part_label": "Part 5"}) is None
@@ -0,0 +1,186 @@
+"""
+Utility for storing artifact payloads once per distinct content.
+
+Page bytes are written to `blobs/{hash[:2]}/{hash}` under the store directory, keyed by
+their SHA-256 digest, and artifacts only carry a `cas://sha256/{hash}` reference to the
+blob. Identical pages (repeated cover pages, answer sheets ...) therefore share one blob,
+and a page whose digest was already seen is recognised as a duplicate before any model
+call.
+"""
+
+import hashlib
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Tuple, Union
+
+from utils.paths import PROJECT_ROOT
+
+# Default location; can be overridden with the ARTIFACT_STORE_DIR environment variable.
+DEFAULT_ARTIFACT_STORE_DIR = PROJECT_ROOT / ".cache" / "artifacts"
+
+BLOB_URI_PREFIX = "cas://sha256/"
+
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class ArtifactStore:
+    """
+    Content-addressed blob store on the local disk.
+    """
+
+    def __init__(self, store_dir: Union[str, Path] = DEFAULT_ARTIFACT_STORE_DIR):
+        """
+        Args:
+            store_dir: Directory that holds the blobs.
+        """
+        self.store_dir = Path(store_dir)
+
+    def blob_path(self, digest: str) -> Path:
+        """
+        Returns where the blob with a given digest is stored.
+
+        Args:
+            digest: SHA-256 hex digest of the content.
+
+        Returns:
+            Path: The blob file path (which may not exist).
+        """
+        return self.store_dir / "blobs" / digest[:2] / digest
+
+    def has(self, digest: str) -> bool:
+        """Checks whether a blob is stored."""
+        return self.blob_path(digest).is_file()
+
+    def _commit(self, staging_path: str, digest: str) -> bool:
+        """Moves a staged blob into place unless the content is already stored."""
+        blob_path = self.blob_path(digest)
+        if blob_path.is_file():
+            os.unlink(staging_path)
+            return False
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(staging_path, blob_path)
+        return True
+
+    def put_file(self, file_path: Union[str, Path]) -> Tuple[str, bool]:
+        """
+        Stores a file's content, hashing and copying it in a single pass.
+
+        Args:
+            file_path: Path to the file to store.
+
+        Returns:
+            Tuple[str, bool]: The content digest, and whether the content was new to the store.
+        """
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, staging_path = tempfile.mkstemp(dir=self.store_dir, prefix=".staging-")
+        try:
+            with open(file_path, "rb") as source, os.fdopen(fd, "wb") as staging:
+                for chunk in iter(lambda: source.read(_COPY_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    staging.write(chunk)
+            return digest.hexdigest(), self._commit(staging_path, digest.hexdigest())
+        except BaseException:
+            if os.path.exists(staging_path):
+                os.unlink(staging_path)
+            raise
+
+    def put_bytes(self, data: bytes) -> Tuple[str, bool]:
+        """
+        Stores a payload.
+
+        Args:
+            data: The content to store.
+
+        Returns:
+            Tuple[str, bool]: The content digest, and whether the content was new to the store.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        if self.has(digest):
+            return digest, False
+
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        fd, staging_path = tempfile.mkstemp(dir=self.store_dir, prefix=".staging-")
+        with os.fdopen(fd, "wb") as staging:
+            staging.write(data)
+        return digest, self._commit(staging_path, digest)
+
+    def read(self, digest: str) -> bytes:
+        """
+        Reads a blob.
+
+        Args:
+            digest: SHA-256 hex digest of the content.
+
+        Returns:
+            bytes: The stored content.
+
+        Raises:
+            FileNotFoundError: If no blob has that digest.
+        """
+        return self.blob_path(digest).read_bytes()
+
+    @contextmanager
+    def open(self, digest: str) -> Iterator[memoryview]:
+        """
+        Maps a blob into memory read-only, without copying it into a Python bytes object.
+
+        Pages are loaded lazily by the OS and shared with every other reader of the blob.
+        The mapping is closed when the with block exits, so the view (and any slice of it)
+        must not be used afterwards.
+
+        Args:
+            digest: SHA-256 hex digest of the content.
+
+        Yields:
+            memoryview: A zero-copy view of the stored content.
+
+        Raises:
+            FileNotFoundError: If no blob has that digest.
+        """
+        with open(self.blob_path(digest), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # Empty files cannot be mapped
+                yield memoryview(b"")
+                return
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapping)
+        try:
+            yield view
+        finally:
+            view.release()
+            mapping.close()
+
+    def size(self, digest: str) -> int:
+        """
+        Returns a blob's size in bytes without reading it.
+
+        Raises:
+            FileNotFoundError: If no blob has that digest.
+        """
+        return self.blob_path(digest).stat().st_size
+
+    @staticmethod
+    def uri(digest: str) -> str:
+        """Returns the reference URI that artifacts carry for a blob."""
+        return f"{BLOB_URI_PREFIX}{digest}"
+
+    @staticmethod
+    def digest_from_uri(uri: str) -> Optional[str]:
+        """Returns the digest a reference URI points at, or None for other URIs."""
+        if uri and uri.startswith(BLOB_URI_PREFIX):
+            return uri[len(BLOB_URI_PREFIX) :]
+        return None
+
+
+def get_artifact_store() -> ArtifactStore:
+    """
+    Create an ArtifactStore from the ARTIFACT_STORE_DIR environment variable.
+
+    Returns:
+        ArtifactStore: A store rooted at the configured (or default) directory.
+    """
+    return ArtifactStore(os.getenv("ARTIFACT_STORE_DIR") or DEFAULT_ARTIFACT_STORE_DIR)
@@ -15,6 +15,30 @@ T = TypeVar('T')
 F = TypeVar('F', bound=Callable[..., Any])
 
 
+def backoff_delay(
+    attempt: int,
+    base_delay_seconds: float = 1.0,
+    max_delay_seconds: float = 60.0,
+    jitter: bool = True
+) -> float:
+    """
+    Computes how long to wait before a retry.
+
+    Args:
+        attempt: Zero-based index of the attempt that just failed.
+        base_delay_seconds: Initial delay in seconds (default: 1.0).
+        max_delay_seconds: Maximum delay before jitter in seconds (default: 60.0).
+        jitter: If True, adds up to 25% random jitter to the delay (default: True).
+
+    Returns:
+        float: The delay in seconds.
+    """
+    delay = min(max_delay_seconds, base_delay_seconds * (2 ** attempt))
+    if jitter:
+        delay += random.uniform(0, delay * 0.25)
+    return delay
+
+
 def exponential_backoff(
     target_function: Optional[F] = None,
     *,
@@ -83,13 +107,11 @@ def exponential_backoff(
                 if attempt >= max_retries:
                     raise last_exception
 
-                # Calculate delay using exponential backoff
-                current_delay = min(max_delay_seconds, base_delay_seconds * (2 ** attempt))
-                
-                # Add jitter if enabled
-                if jitter:
-                    current_delay += random.uniform(0, current_delay * 0.25)
-                
+                # Calculate delay using exponential backoff (with jitter if enabled)
+                current_delay = backoff_delay(
+                    attempt, base_delay_seconds, max_delay_seconds, jitter
+                )
+
                 # Wait before retrying
                 time.sleep(current_delay)
             except Exception as e:
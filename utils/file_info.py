@@ -0,0 +1,121 @@
+"""
+Utility for describing input files cheaply at discovery time.
+
+A file's size comes from its stat and its page count from the PDF cross-reference table
+or the image header, so nothing is rendered. The description feeds size-aware scheduling
+and the preflight check against the PRD input limits.
+"""
+
+import os
+import re
+from typing import Any, Dict, Optional
+
+import PyPDF2
+from PIL import Image
+
+# PRD input limits (docs/prd.md, "Max Size")
+MAX_FILE_BYTES = 10 * 1024 * 1024  # 10 MB
+MAX_FILE_PAGES = 100
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".tif", ".tiff", ".gif", ".bmp")
+
+# Page files written by split_pdf_pages are named `{stem}-{n}{suffix}`
+_PAGE_NUMBER_SUFFIX = re.compile(r"-(\d+)$")
+
+
+def get_test_form_key(file_path: str) -> str:
+    """
+    Returns the test form a file belongs to: the source PDF stem for split pages, the
+    file stem otherwise.
+
+    Args:
+        file_path (str): Path to the file.
+
+    Returns:
+        str: The test form key.
+    """
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return _PAGE_NUMBER_SUFFIX.sub("", stem)
+
+
+def get_page_number(file_path: str) -> Optional[int]:
+    """
+    Returns the page number of a page file written by split_pdf_pages.
+
+    Args:
+        file_path (str): Path to the file.
+
+    Returns:
+        Optional[int]: The 1-based page number, or None for files that are not split pages.
+    """
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    match = _PAGE_NUMBER_SUFFIX.search(stem)
+    return int(match.group(1)) if match else None
+
+
+def count_pages(file_path: str) -> int:
+    """
+    Counts the pages of a PDF or (multi-frame) image without rendering it.
+
+    Args:
+        file_path (str): Path to the file.
+
+    Returns:
+        int: The number of pages; 1 for other files.
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == ".pdf":
+        return len(PyPDF2.PdfReader(file_path).pages)
+    if extension in IMAGE_EXTENSIONS:
+        # Image.open only reads the header
+        with Image.open(file_path) as image:
+            return getattr(image, "n_frames", 1)
+    return 1
+
+
+def describe_file(file_path: str) -> Dict[str, Any]:
+    """
+    Describes a file for scheduling and preflight.
+
+    Files over the size limit are not opened, so "pages" is None for them. It is also None
+    for files whose pages cannot be counted (e.g. a damaged PDF); those are left for the
+    later stages to report.
+
+    Args:
+        file_path (str): Path to the file.
+
+    Returns:
+        Dict[str, Any]: A dictionary containing:
+            - bytes: File size in bytes
+            - pages: Page count (None if the file was too large or could not be parsed)
+            - test_form: The test form key (see get_test_form_key)
+    """
+    size = os.path.getsize(file_path)
+    pages = None
+    if size <= MAX_FILE_BYTES:
+        try:
+            pages = count_pages(file_path)
+        except Exception:
+            pass
+    return {
+        "bytes": size,
+        "pages": pages,
+        "test_form": get_test_form_key(file_path),
+    }
+
+
+def preflight_error(info: Dict[str, Any]) -> Optional[str]:
+    """
+    Checks a file description against the PRD input limits.
+
+    Args:
+        info (Dict[str, Any]): The result of describe_file.
+
+    Returns:
+        Optional[str]: Why the file is rejected, or None if it is within limits.
+    """
+    if info["bytes"] > MAX_FILE_BYTES:
+        return f"File is {info['bytes']} bytes, over the {MAX_FILE_BYTES} byte limit"
+    if info["pages"] is not None and info["pages"] > MAX_FILE_PAGES:
+        return f"File has {info['pages']} pages, over the {MAX_FILE_PAGES} page limit"
+    return None
@@ -0,0 +1,409 @@
+"""
+Utility for tracking file processing status in a local SQLite ledger.
+
+The ledger is the concurrency-safe, crash-safe counterpart of the state["files"] map:
+several workers (threads or processes) can claim files from the same ledger, every
+transition is committed to disk, and each file records its attempts, timings and last
+error. Claims use `BEGIN IMMEDIATE` transactions so two workers never claim the same
+file, and a claim whose worker died is handed out again once its lease expires.
+
+Files can be registered with their description (page count, byte size, test form; see
+utils.file_info), so claims follow the same scheduling policies as the FileQueue (see
+utils.scheduling), computed in the claim query itself.
+"""
+
+import os
+import socket
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from utils.scheduling import (
+    SCHEDULING_POLICIES,
+    SCHEDULING_POLICY_FAIR,
+    SCHEDULING_POLICY_FIFO,
+    SCHEDULING_POLICY_SJF,
+)
+
+# Status values, shared with state["files"] (see select_file.FILE_STATUS_*).
+STATUS_UNPROCESSED = ""
+STATUS_IN_PROGRESS = "in-progress"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_SKIPPED = "skipped"
+
+# A claim older than this is considered abandoned by a crashed worker.
+DEFAULT_LEASE_SECONDS = 15 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT '',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    added_at REAL NOT NULL,
+    claimed_at REAL,
+    finished_at REAL,
+    duration_seconds REAL,
+    worker TEXT,
+    error TEXT,
+    pages INTEGER,
+    bytes INTEGER,
+    test_form TEXT
+);
+CREATE INDEX IF NOT EXISTS files_status ON files (status);
+"""
+
+# Columns added after the first ledger version, added to existing ledgers on open
+_DESCRIPTION_COLUMNS = {"pages": "INTEGER", "bytes": "INTEGER", "test_form": "TEXT"}
+
+# Order of the claimable files per scheduling policy (see utils.scheduling). "fair" takes
+# each test form's next file in turn, least recently claimed form first.
+_CLAIM_QUERIES = {
+    SCHEDULING_POLICY_FIFO: (
+        "SELECT path FROM files WHERE status = ? OR (status = ? AND claimed_at < ?) "
+        "ORDER BY rowid LIMIT ?"
+    ),
+    SCHEDULING_POLICY_SJF: (
+        "SELECT path FROM files WHERE status = ? OR (status = ? AND claimed_at < ?) "
+        "ORDER BY COALESCE(pages, 1), COALESCE(bytes, 0), rowid LIMIT ?"
+    ),
+    SCHEDULING_POLICY_FAIR: (
+        "SELECT path FROM ("
+        "  SELECT path, rowid AS arrival,"
+        "    ROW_NUMBER() OVER (PARTITION BY COALESCE(test_form, '') ORDER BY rowid) AS turn,"
+        "    MIN(rowid) OVER (PARTITION BY COALESCE(test_form, '')) AS form_arrival,"
+        "    COALESCE(test_form, '') AS form"
+        "  FROM files WHERE status = ? OR (status = ? AND claimed_at < ?)"
+        ") AS candidates LEFT JOIN ("
+        "  SELECT COALESCE(test_form, '') AS form, MAX(claimed_at) AS last_claimed"
+        "  FROM files GROUP BY 1"
+        ") AS forms USING (form) "
+        "ORDER BY turn, COALESCE(last_claimed, 0), form_arrival, arrival LIMIT ?"
+    ),
+}
+
+
+def default_worker_id() -> str:
+    """
+    Returns an identifier for the current process, recorded with each claim.
+    """
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class FileLedger:
+    """
+    SQLite-backed ledger of file processing status.
+
+    Files are claimed in the order they were added, unless a scheduling policy says otherwise.
+    """
+
+    def __init__(
+        self,
+        ledger_path: Union[str, Path],
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    ):
+        """
+        Args:
+            ledger_path: SQLite database file. Created if it does not exist.
+            lease_seconds: How long a claim stays valid before another worker may take it over.
+        """
+        self.ledger_path = Path(ledger_path)
+        self.lease_seconds = lease_seconds
+        self.ledger_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Autocommit mode; transactions are opened explicitly where atomicity matters
+        self._conn = sqlite3.connect(
+            str(self.ledger_path), timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(files)")}
+        for column, column_type in _DESCRIPTION_COLUMNS.items():
+            if column not in columns:
+                try:
+                    self._conn.execute(f"ALTER TABLE files ADD COLUMN {column} {column_type}")
+                except sqlite3.OperationalError:
+                    # Another worker added it first
+                    pass
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        self._conn.close()
+
+    def __enter__(self) -> "FileLedger":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def add(
+        self, paths: Iterable[str], file_info: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> int:
+        """
+        Registers files as unprocessed. Files already in the ledger keep their status.
+
+        Args:
+            paths: File paths in processing order.
+            file_info: Descriptions by path (the state["file_info"] map), used by the "sjf"
+                       and "fair" policies; files without one count as one small page.
+
+        Returns:
+            int: Number of files that were newly added.
+        """
+        file_info = file_info or {}
+        now = time.time()
+        rows = []
+        for path in paths:
+            info = file_info.get(path, {})
+            rows.append(
+                (
+                    path,
+                    STATUS_UNPROCESSED,
+                    now,
+                    info.get("pages"),
+                    info.get("bytes"),
+                    info.get("test_form"),
+                )
+            )
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO files (path, status, added_at, pages, bytes, test_form) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount
+
+    def expand(
+        self,
+        path: str,
+        children: Iterable[str],
+        skipped: Optional[Dict[str, str]] = None,
+        file_info: Optional[Dict[str, Dict[str, Any]]] = None,
+    ) -> None:
+        """
+        Replaces a container file (e.g. a PDF) by the files generated from it.
+
+        The children are added as unprocessed and the container is marked done, in one
+        transaction, so it is never claimed itself.
+
+        Args:
+            path: The container file path.
+            children: Generated file paths in processing order.
+            skipped: Children that need no processing, mapped to the reason. They are added
+                     as skipped, with the reason as their error.
+            file_info: Descriptions of the children by path, used by the "sjf" and "fair"
+                       policies (as in add).
+        """
+        skipped = skipped or {}
+        file_info = file_info or {}
+        now = time.time()
+        rows = []
+        for child in children:
+            info = file_info.get(child, {})
+            status = STATUS_SKIPPED if child in skipped else STATUS_UNPROCESSED
+            rows.append(
+                (
+                    child,
+                    status,
+                    now,
+                    skipped.get(child),
+                    info.get("pages"),
+                    info.get("bytes"),
+                    info.get("test_form"),
+                )
+            )
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO files "
+                "(path, status, added_at, error, pages, bytes, test_form) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.execute(
+                "UPDATE files SET status = ?, finished_at = ? WHERE path = ?",
+                (STATUS_DONE, now, path),
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def claim(
+        self, worker: Optional[str] = None, policy: str = SCHEDULING_POLICY_FIFO
+    ) -> Optional[str]:
+        """
+        Atomically claims the next unprocessed (or abandoned) file.
+
+        Args:
+            worker: Identifier recorded with the claim; defaults to host:pid.
+            policy: Scheduling policy that picks the file ("fifo", "sjf" or "fair").
+
+        Returns:
+            Optional[str]: The claimed path, or None if nothing is left to claim.
+        """
+        claimed = self.claim_many(1, worker, policy)
+        return claimed[0] if claimed else None
+
+    def claim_many(
+        self, count: int, worker: Optional[str] = None, policy: str = SCHEDULING_POLICY_FIFO
+    ) -> List[str]:
+        """
+        Atomically claims up to `count` unprocessed (or abandoned) files in one transaction.
+
+        Args:
+            count: Maximum number of files to claim.
+            worker: Identifier recorded with the claims; defaults to host:pid.
+            policy: Scheduling policy that picks the files ("fifo", "sjf" or "fair").
+
+        Returns:
+            List[str]: The claimed paths in processing order (empty if nothing is left).
+
+        Raises:
+            ValueError: If the policy is unknown.
+        """
+        if policy not in _CLAIM_QUERIES:
+            raise ValueError(
+                f"Unknown scheduling policy '{policy}'; "
+                f"expected one of {', '.join(SCHEDULING_POLICIES)}"
+            )
+
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self._conn.execute(
+                _CLAIM_QUERIES[policy],
+                (STATUS_UNPROCESSED, STATUS_IN_PROGRESS, now - self.lease_seconds, count),
+            ).fetchall()
+            paths = [row["path"] for row in rows]
+
+            self._conn.executemany(
+                "UPDATE files SET status = ?, attempts = attempts + 1, claimed_at = ?, "
+                "finished_at = NULL, duration_seconds = NULL, worker = ?, error = NULL "
+                "WHERE path = ?",
+                [
+                    (STATUS_IN_PROGRESS, now, worker or default_worker_id(), path)
+                    for path in paths
+                ],
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return paths
+
+    def _finish(self, path: str, status: str, error: Optional[str]) -> bool:
+        """Moves a file to a terminal status and records how long the attempt took."""
+        now = time.time()
+        cursor = self._conn.execute(
+            "UPDATE files SET status = ?, finished_at = ?, "
+            "duration_seconds = CASE WHEN claimed_at IS NULL THEN NULL ELSE ? - claimed_at END, "
+            "error = ? WHERE path = ?",
+            (status, now, now, error, path),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, path: str) -> bool:
+        """
+        Marks a file as successfully processed.
+
+        Args:
+            path: The file path.
+
+        Returns:
+            bool: True if the file is in the ledger.
+        """
+        return self._finish(path, STATUS_DONE, None)
+
+    def fail(self, path: str, error: str) -> bool:
+        """
+        Marks a file as failed and records the error.
+
+        Args:
+            path: The file path.
+            error: Description of the failure.
+
+        Returns:
+            bool: True if the file is in the ledger.
+        """
+        return self._finish(path, STATUS_FAILED, error)
+
+    def requeue_failed(self, max_attempts: int) -> int:
+        """
+        Makes failed files that still have attempts left claimable again.
+
+        Args:
+            max_attempts: Files that already used this many attempts stay failed.
+
+        Returns:
+            int: Number of files requeued.
+        """
+        cursor = self._conn.execute(
+            "UPDATE files SET status = ? WHERE status = ? AND attempts < ?",
+            (STATUS_UNPROCESSED, STATUS_FAILED, max_attempts),
+        )
+        return cursor.rowcount
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns a file's ledger record (status, attempts, timings, worker, error).
+
+        Args:
+            path: The file path.
+
+        Returns:
+            Optional[Dict[str, Any]]: The record, or None if the file is unknown.
+        """
+        row = self._conn.execute("SELECT * FROM files WHERE path = ?", (path,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def statuses(self) -> Dict[str, str]:
+        """
+        Returns the status of every file in processing order, shaped like state["files"].
+        """
+        rows = self._conn.execute("SELECT path, status FROM files ORDER BY rowid")
+        return {row["path"]: row["status"] for row in rows}
+
+    def is_empty(self) -> bool:
+        """
+        Returns whether no file is registered, without counting the files.
+        """
+        return self._conn.execute("SELECT EXISTS (SELECT 1 FROM files)").fetchone()[0] == 0
+
+    def counts(self) -> Dict[str, int]:
+        """
+        Returns the number of files per status.
+        """
+        rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM files GROUP BY status")
+        return {row["status"]: row["n"] for row in rows}
+
+    def paths(self, status: str) -> List[str]:
+        """
+        Returns the paths with a given status in processing order.
+        """
+        rows = self._conn.execute(
+            "SELECT path FROM files WHERE status = ? ORDER BY rowid", (status,)
+        )
+        return [row["path"] for row in rows]
+
+
+def get_file_ledger() -> Optional[FileLedger]:
+    """
+    Open the ledger configured by the FILE_LEDGER_PATH environment variable.
+
+    Returns:
+        Optional[FileLedger]: The ledger, or None when FILE_LEDGER_PATH is not set and the
+                              tools keep status in tool_context.state["files"] only.
+    """
+    ledger_path = os.getenv("FILE_LEDGER_PATH")
+    if not ledger_path:
+        return None
+    return FileLedger(ledger_path)
@@ -0,0 +1,280 @@
+"""
+Utility for tracking which input files have already been seen.
+
+The manifest is a JSON file that maps each file path to its size, modification time and
+content hash. A re-scan compares the current stat against the manifest and only hashes
+files whose size or mtime moved, so unchanged files are skipped without reading them.
+
+A new or changed file stays "pending" in the manifest until it has been processed (done or
+failed, see settle_files), so a file scanned by a run that crashed before finishing it is
+listed again by the next incremental scan. A PDF split into pages is settled once all its
+pages are.
+
+list_files, the input watcher, the PDF splitters and the page tools all update the same
+manifest, so every update runs under FileManifest.locked(): a lock per manifest path within
+the process and an exclusive flock on a `.lock` file next to the manifest across processes.
+The update starts from the manifest as last saved and is written back atomically, so
+concurrent updates never overwrite each other's.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: updates are only serialised within the process
+    fcntl = None
+
+from utils.hashing import hash_file
+from utils.paths import PROJECT_ROOT
+
+# Default location; can be overridden with the FILE_MANIFEST_PATH environment variable.
+DEFAULT_FILE_MANIFEST_PATH = PROJECT_ROOT / ".cache" / "file_manifest.json"
+
+
+class FileManifest:
+    """
+    Persistent record of (size, mtime, content hash) per file path.
+    """
+
+    def __init__(self, manifest_path: Union[str, Path] = DEFAULT_FILE_MANIFEST_PATH):
+        """
+        Args:
+            manifest_path: JSON file that stores the manifest. Created on first save.
+        """
+        self.manifest_path = Path(manifest_path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        # Split file of each page still pending in it, so settling a page is O(1)
+        self._sources: Dict[str, str] = {}
+        # (inode, mtime, size) of the manifest file as last loaded or saved
+        self._file_stat: Optional[Tuple[int, int, int]] = None
+        self._changed = False
+        self.load()
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat_result = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        return (stat_result.st_ino, stat_result.st_mtime_ns, stat_result.st_size)
+
+    def load(self) -> None:
+        """
+        (Re)reads the manifest file if it changed since it was last loaded or saved.
+        """
+        file_stat = self._stat()
+        if file_stat is not None and file_stat == self._file_stat:
+            return
+        self.entries = {}
+        if file_stat is not None:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        self._sources = {
+            page: file_path
+            for file_path, entry in self.entries.items()
+            for page in entry.get("pending_pages") or ()
+        }
+        self._file_stat = file_stat
+        self._changed = False
+
+    @contextmanager
+    def locked(self) -> Iterator["FileManifest"]:
+        """
+        Holds the manifest's lock for an update: reloads the manifest if another writer
+        saved it, yields it, and saves it if the update changed it.
+
+        Yields:
+            FileManifest: This manifest, current as of the lock.
+        """
+        with _path_lock(self.manifest_path):
+            self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            lock_path = self.manifest_path.with_name(self.manifest_path.name + ".lock")
+            with open(lock_path, "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self.load()
+                yield self
+                if self._changed:
+                    self.save()
+
+    def refresh(self, file_path: str, stat_result: os.stat_result) -> bool:
+        """
+        Records the current state of a file and reports whether it is new or changed.
+
+        The content is only hashed when the size or mtime differ from the manifest, and a
+        file that was touched without changing its content is not reported as changed. A new
+        or changed file is recorded as pending until it is settled.
+
+        Args:
+            file_path: Absolute path of the file.
+            stat_result: The file's current stat.
+
+        Returns:
+            bool: True if the file is new or its content changed since the last scan.
+        """
+        entry = self.entries.get(file_path)
+        if (
+            entry is not None
+            and entry["size"] == stat_result.st_size
+            and entry["mtime_ns"] == stat_result.st_mtime_ns
+        ):
+            return False
+
+        content_hash = hash_file(file_path)
+        changed = entry is None or entry["sha256"] != content_hash
+        self._changed = True
+        self.entries[file_path] = {
+            "size": stat_result.st_size,
+            "mtime_ns": stat_result.st_mtime_ns,
+            "sha256": content_hash,
+            "pending": changed or bool(entry.get("pending")),
+        }
+        return changed
+
+    def is_pending(self, file_path: str) -> bool:
+        """
+        Reports whether a scanned file has not been processed (settled) yet.
+
+        Args:
+            file_path: Absolute path of the file.
+
+        Returns:
+            bool: True if the file is in the manifest and still pending.
+        """
+        return bool(self.entries.get(file_path, {}).get("pending"))
+
+    def add_pages(self, file_path: str, page_paths: Iterable[str]) -> None:
+        """
+        Records the pages a file was split into; the file is settled once they all are.
+
+        Args:
+            file_path: Absolute path of the split file (e.g. a PDF).
+            page_paths: Paths of its pages that still have to be processed.
+        """
+        entry = self.entries.get(file_path)
+        if entry is None or not entry.get("pending"):
+            return
+        entry["pending_pages"] = sorted(page_paths)
+        self._changed = True
+        for page in entry["pending_pages"]:
+            self._sources[page] = file_path
+        if not entry["pending_pages"]:
+            self._settle_entry(file_path, entry)
+
+    def _settle_entry(self, file_path: str, entry: Dict[str, Any]) -> None:
+        """Marks a pending entry as processed and forgets its pending pages."""
+        for page in entry.pop("pending_pages", None) or ():
+            self._sources.pop(page, None)
+        entry["pending"] = False
+        self._changed = True
+
+    def settle(self, file_paths: Iterable[str]) -> bool:
+        """
+        Marks files (or pages of a split file) as processed.
+
+        Costs O(1) per path: pages are found through their split file, not by scanning the
+        manifest.
+
+        Args:
+            file_paths: Paths of files that reached "done" or "failed".
+
+        Returns:
+            bool: True if the manifest changed and should be saved.
+        """
+        changed = False
+        for file_path in file_paths:
+            source = self._sources.pop(file_path, None)
+            source_entry = self.entries.get(source) if source is not None else None
+            pending_pages = (source_entry or {}).get("pending_pages")
+            if source_entry is not None and source_entry.get("pending") and pending_pages:
+                if file_path in pending_pages:
+                    pending_pages.remove(file_path)
+                    self._changed = True
+                    changed = True
+                if not pending_pages:
+                    self._settle_entry(source, source_entry)
+
+            entry = self.entries.get(file_path)
+            if entry is not None and entry.get("pending"):
+                self._settle_entry(file_path, entry)
+                changed = True
+        return changed
+
+    def save(self) -> None:
+        """
+        Writes the manifest atomically so a crash never leaves a truncated file.
+        """
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(
+            dir=self.manifest_path.parent, prefix=".manifest-", suffix=".json"
+        )
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(temp_path, self.manifest_path)
+        self._file_stat = self._stat()
+        self._changed = False
+
+
+_path_locks: Dict[str, threading.Lock] = {}
+_manifests: Dict[str, FileManifest] = {}
+_registry_lock = threading.Lock()
+
+
+def _path_lock(manifest_path: Path) -> threading.Lock:
+    """Returns the in-process lock of a manifest path."""
+    with _registry_lock:
+        return _path_locks.setdefault(str(manifest_path.absolute()), threading.Lock())
+
+
+def get_file_manifest() -> FileManifest:
+    """
+    Return the FileManifest at the FILE_MANIFEST_PATH environment variable.
+
+    The manifest is loaded once per path and shared; FileManifest.locked() reloads it when
+    another process saved it in between.
+
+    Returns:
+        FileManifest: The manifest at the configured (or default) path.
+    """
+    manifest_path = os.getenv("FILE_MANIFEST_PATH") or str(DEFAULT_FILE_MANIFEST_PATH)
+    with _registry_lock:
+        if manifest_path not in _manifests:
+            _manifests[manifest_path] = FileManifest(manifest_path)
+        return _manifests[manifest_path]
+
+
+def settle_files(file_paths: Iterable[str]) -> None:
+    """
+    Marks files as processed in the configured manifest (see FileManifest.settle).
+
+    Each call reads (if changed) and writes the whole manifest, so callers settle the files
+    of a batch in one call.
+
+    Args:
+        file_paths: Paths of files that reached "done" or "failed".
+    """
+    file_paths = list(file_paths)
+    if not file_paths:
+        return
+    with get_file_manifest().locked() as manifest:
+        manifest.settle(file_paths)
+
+
+def record_pages(pages_by_file: Dict[str, Iterable[str]]) -> None:
+    """
+    Records the pages split files were replaced by in the configured manifest (see
+    FileManifest.add_pages).
+
+    Args:
+        pages_by_file: Pages still to be processed per split file path.
+    """
+    if not pages_by_file:
+        return
+    with get_file_manifest().locked() as manifest:
+        for file_path, pages in pages_by_file.items():
+            manifest.add_pages(file_path, pages)
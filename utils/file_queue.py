@@ -0,0 +1,334 @@
+"""
+Utility for indexing the state["files"] map by status.
+
+state["files"] maps each file path to its status and is scanned from the beginning to find
+the next unprocessed file, which costs O(N) per selection and O(N²) over a run. FileQueue
+keeps the same files bucketed by status in insertion-ordered buckets, so selecting,
+claiming and re-queueing a file are O(1). Every change is written through to the
+state["files"] map, which stays the serialisable source of truth.
+
+Files can carry a description (size, page count, test form; see utils.file_info) in the
+state["file_info"] map, which the "sjf" and "fair" scheduling policies use to pick the
+next file (see utils.scheduling).
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+from utils.file_info import describe_file, preflight_error
+from utils.file_ledger import (
+    STATUS_FAILED,
+    STATUS_IN_PROGRESS,
+    STATUS_UNPROCESSED,
+    get_file_ledger,
+)
+from utils.file_manifest import FileManifest
+from utils.scheduling import SCHEDULING_POLICY_FIFO, create_scheduler
+
+# Number of state["files"] maps whose queues are kept per process.
+MAX_TRACKED_QUEUES = 16
+
+
+class FileQueue:
+    """
+    Status-bucketed view of a state["files"] map.
+
+    Within a bucket files keep the order in which they entered it, so unprocessed files are
+    claimed in listing order and re-queued files go to the back.
+    """
+
+    def __init__(self, files: Dict[str, str], file_info: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        Args:
+            files: The state["files"] map to index. It is updated in place on every change.
+            file_info: The state["file_info"] map of file descriptions, updated in place.
+        """
+        self.files = files
+        self.file_info = file_info if file_info is not None else {}
+        self._buckets: Dict[str, "OrderedDict[str, None]"] = {}
+        # Indexes of the unprocessed files for the non-FIFO policies, built on first use
+        self._schedulers: Dict[str, Any] = {}
+        for file_path, status in files.items():
+            self._bucket(status)[file_path] = None
+        self._size = len(files)
+        # Whether the unprocessed files were registered in the file ledger (see select_file)
+        self.in_ledger = False
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _bucket(self, status: str) -> "OrderedDict[str, None]":
+        """Returns the bucket for a status, creating it on first use."""
+        bucket = self._buckets.get(status)
+        if bucket is None:
+            bucket = self._buckets[status] = OrderedDict()
+        return bucket
+
+    def is_current(self, files: Dict[str, str], file_info: Dict[str, Dict[str, Any]]) -> bool:
+        """
+        Checks that the queue still indexes `files` and `file_info`.
+
+        Files added or removed without going through the queue change the map's length and
+        make the queue stale. Status changes made directly on the map are tolerated; peek()
+        notices them and moves the file to its actual bucket.
+        """
+        return self.files is files and self.file_info is file_info and self._size == len(files)
+
+    def set_status(self, file_path: str, status: str) -> None:
+        """
+        Sets a file's status, adding the file if it is not known yet.
+
+        Args:
+            file_path: The file path.
+            status: The new status; the file moves to the back of that bucket.
+        """
+        previous = self.files.get(file_path)
+        if previous is None:
+            self._size += 1
+        else:
+            self._bucket(previous).pop(file_path, None)
+        self.files[file_path] = status
+        self._bucket(status)[file_path] = None
+
+        if status == STATUS_UNPROCESSED:
+            for scheduler in self._schedulers.values():
+                scheduler.push(file_path, self.file_info.get(file_path, {}))
+
+    def add(self, file_path: str, info: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Adds a file as unprocessed (or re-queues it if it is already known).
+
+        Args:
+            file_path: The file path.
+            info: Optional file description stored in file_info.
+        """
+        if info is not None:
+            self.file_info[file_path] = info
+        self.set_status(file_path, STATUS_UNPROCESSED)
+
+    def remove(self, file_path: str) -> None:
+        """
+        Removes a file from the queue and the state["files"] map.
+
+        Args:
+            file_path: The file path.
+        """
+        status = self.files.pop(file_path, None)
+        self.file_info.pop(file_path, None)
+        if status is not None:
+            self._bucket(status).pop(file_path, None)
+            self._size -= 1
+
+    def peek(self, status: str = STATUS_UNPROCESSED) -> Optional[str]:
+        """
+        Returns the first file with a status without changing it.
+
+        Args:
+            status: The status to look up.
+
+        Returns:
+            Optional[str]: The file path, or None if no file has that status.
+        """
+        bucket = self._buckets.get(status)
+        while bucket:
+            file_path = next(iter(bucket))
+            actual = self.files.get(file_path)
+            if actual == status:
+                return file_path
+
+            # The map was changed directly; re-file the entry under its actual status
+            del bucket[file_path]
+            if actual is None:
+                self._size -= 1
+            else:
+                self._bucket(actual)[file_path] = None
+        return None
+
+    def _scheduler(self, policy: str) -> Any:
+        """Returns the index for a scheduling policy, seeding it with the unprocessed files."""
+        scheduler = self._schedulers.get(policy)
+        if scheduler is None:
+            scheduler = create_scheduler(policy)
+            for file_path in self.paths(STATUS_UNPROCESSED):
+                scheduler.push(file_path, self.file_info.get(file_path, {}))
+            self._schedulers[policy] = scheduler
+        return scheduler
+
+    def claim(self, policy: str = SCHEDULING_POLICY_FIFO) -> Optional[str]:
+        """
+        Marks the next unprocessed file as in-progress and returns it.
+
+        Args:
+            policy: Scheduling policy that picks the file ("fifo", "sjf" or "fair").
+
+        Returns:
+            Optional[str]: The claimed file path, or None if no file is unprocessed.
+
+        Raises:
+            ValueError: If the policy is unknown.
+        """
+        if policy == SCHEDULING_POLICY_FIFO:
+            file_path = self.peek(STATUS_UNPROCESSED)
+        else:
+            file_path = self._scheduler(policy).pop(
+                lambda path: self.files.get(path) == STATUS_UNPROCESSED
+            )
+        if file_path is not None:
+            self.set_status(file_path, STATUS_IN_PROGRESS)
+        return file_path
+
+    def claim_many(self, count: int, policy: str = SCHEDULING_POLICY_FIFO) -> List[str]:
+        """
+        Marks up to `count` unprocessed files as in-progress and returns them.
+
+        Args:
+            count: Maximum number of files to claim.
+            policy: Scheduling policy that picks the files ("fifo", "sjf" or "fair").
+
+        Returns:
+            List[str]: The claimed file paths in order (empty if no file is unprocessed).
+        """
+        claimed = []
+        while len(claimed) < count:
+            file_path = self.claim(policy)
+            if file_path is None:
+                break
+            claimed.append(file_path)
+        return claimed
+
+    def requeue(self, file_path: str) -> None:
+        """
+        Puts a file back at the end of the unprocessed bucket.
+
+        Args:
+            file_path: The file path.
+        """
+        self.set_status(file_path, STATUS_UNPROCESSED)
+
+    def paths(self, status: str) -> List[str]:
+        """
+        Returns the files with a status, in bucket order.
+        """
+        return [
+            file_path
+            for file_path in self._buckets.get(status, ())
+            if self.files.get(file_path) == status
+        ]
+
+
+_queues: "OrderedDict[int, FileQueue]" = OrderedDict()
+_queues_lock = threading.Lock()
+
+
+def get_file_queue(state: Any) -> FileQueue:
+    """
+    Returns the FileQueue indexing state["files"], creating state["files"] and
+    state["file_info"] if needed.
+
+    Queues are kept in memory per process, keyed by the state["files"] map object they index
+    (the session state itself must stay serialisable). A queue is built from the map in O(N)
+    the first time it is needed in a process, when the map was replaced (session services
+    hand back a copy of the state on every load), or when files were added or removed behind
+    the queue's back. A queue is only ever reused for the very map it is bound to: two maps
+    with equal contents (parallel split_pdf_batch workers, two sessions listing the same
+    folder) each get their own queue, so changes to one never leak into the other.
+
+    Args:
+        state: Session state (or any dict) that holds the "files" map.
+
+    Returns:
+        FileQueue: The queue for state["files"].
+    """
+    if "files" not in state:
+        state["files"] = {}
+    if "file_info" not in state:
+        state["file_info"] = {}
+    files = state["files"]
+    file_info = state["file_info"]
+
+    with _queues_lock:
+        queue = _queues.get(id(files))
+        if queue is not None and queue.is_current(files, file_info):
+            _queues.move_to_end(id(files))
+            return queue
+
+        queue = FileQueue(files, file_info)
+        _queues[id(files)] = queue
+        _queues.move_to_end(id(files))
+        while len(_queues) > MAX_TRACKED_QUEUES:
+            _queues.popitem(last=False)
+        return queue
+
+
+def enqueue_files(state: Any, file_paths: Iterable[str]) -> Dict[str, str]:
+    """
+    Describes newly discovered files and adds them to state["files"] as unprocessed.
+
+    Files over the PRD limits (or that disappeared before they could be inspected) are
+    rejected before any rendering or LLM work: they are recorded as failed instead of queued.
+
+    Args:
+        state: Session state (or any dict) that holds the "files" map.
+        file_paths: The discovered file paths, in listing order.
+
+    Returns:
+        Dict[str, str]: The rejected files (path as key, reason as value).
+    """
+    queue = get_file_queue(state)
+    rejected = {}
+    for file_path in file_paths:
+        try:
+            info = describe_file(file_path)
+            error = preflight_error(info)
+        except OSError as e:
+            info, error = None, f"Could not inspect file: {str(e)}"
+
+        if error is None:
+            queue.add(file_path, info)
+        else:
+            if info is not None:
+                queue.file_info[file_path] = info
+            queue.set_status(file_path, STATUS_FAILED)
+            rejected[file_path] = error
+    return rejected
+
+
+def admit_files(
+    state: Any, file_paths: Iterable[str], manifest: Optional[FileManifest] = None
+) -> Dict[str, str]:
+    """
+    Adds newly discovered files to the run, the same way for every way of finding them
+    (list_files, the input watcher).
+
+    The files are enqueued in state["files"] (see enqueue_files). Rejected files are settled
+    in `manifest`, so an incremental scan does not list them again. When a file ledger is
+    configured (FILE_LEDGER_PATH), the accepted files are registered there with their
+    descriptions and the rejected ones are registered as failed; files the ledger already
+    knows keep their status.
+
+    Args:
+        state: Session state (or any dict) that holds the "files" map.
+        file_paths: The discovered file paths, in listing order.
+        manifest: Manifest the files were checked against, if any.
+
+    Returns:
+        Dict[str, str]: The rejected files (path as key, reason as value).
+    """
+    file_paths = list(file_paths)
+    rejected = enqueue_files(state, file_paths)
+    if manifest is not None and rejected:
+        with manifest.locked() as locked_manifest:
+            locked_manifest.settle(rejected)
+
+    ledger = get_file_ledger()
+    if ledger is not None:
+        with ledger:
+            ledger.add(
+                [file_path for file_path in file_paths if file_path not in rejected],
+                state["file_info"],
+            )
+            ledger.add(rejected)
+            for file_path, reason in rejected.items():
+                ledger.fail(file_path, reason)
+    return rejected
@@ -0,0 +1,220 @@
+"""
+Utility for the Gemini (google.genai) connection.
+"""
+
+import asyncio
+import time
+from functools import cached_property
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, Optional
+
+from dotenv import load_dotenv
+from google import genai
+from google.adk.models import Gemini
+from google.genai import errors, types
+from pydantic import BaseModel
+
+from utils.record_replay import Cassette, get_service_cassette, to_json_value
+from utils.stage_cache import hash_value
+
+# Load environment variables
+load_dotenv()
+
+
+def get_genai_client() -> genai.Client:
+    """
+    Create and return a google.genai client.
+
+    The client reads its configuration from the environment: GOOGLE_API_KEY for the Gemini
+    API, or GOOGLE_GENAI_USE_VERTEXAI with GOOGLE_CLOUD_PROJECT and GOOGLE_CLOUD_LOCATION
+    for Vertex AI.
+
+    When SERVICE_CASSETTE_MODE is set, the client is a StandInGenaiClient that records
+    calls of the real client ("record") or answers them from the cassette without one
+    ("replay"); see utils.record_replay.
+
+    Returns:
+        genai.Client: A google.genai client instance (or its stand-in).
+    """
+    cassette = get_service_cassette()
+    if cassette is None:
+        return genai.Client()
+    if cassette.recording:
+        return StandInGenaiClient(cassette, genai.Client())
+    return StandInGenaiClient(cassette)
+
+
+def config_to_json(
+    config: Optional[types.GenerateContentConfig], exclude: Iterable[str] = ()
+) -> Dict[str, Any]:
+    """
+    Converts a generation config to plain JSON, e.g. for use in a cache key.
+
+    HTTP options are dropped since they do not affect the output, and a Pydantic
+    response_schema class is replaced by its JSON schema.
+
+    Args:
+        config (Optional[types.GenerateContentConfig]): The config, or None.
+        exclude (Iterable[str]): Further config fields to drop.
+
+    Returns:
+        Dict[str, Any]: The config's set fields as JSON values.
+    """
+    if config is None:
+        return {}
+
+    generation = config.model_dump(
+        mode="json",
+        exclude_none=True,
+        exclude={"http_options", "response_schema", *exclude},
+    )
+    schema = config.response_schema
+    if isinstance(schema, type) and issubclass(schema, BaseModel):
+        generation["response_schema"] = schema.model_json_schema()
+    elif schema is not None:
+        generation["response_schema"] = str(schema)
+    return generation
+
+
+def _request_key(model: str, contents: Any, config: Optional[types.GenerateContentConfig]) -> str:
+    """Hashes a generate_content request for the cassette."""
+    if isinstance(config, dict):
+        config = types.GenerateContentConfig.model_validate(config)
+    return hash_value(
+        {"model": model, "contents": to_json_value(contents), "config": config_to_json(config)}
+    )
+
+
+def _api_error(error: Dict[str, Any]) -> errors.APIError:
+    """Rebuilds a recorded (or injected) API error."""
+    code = int(error["code"])
+    error_class = errors.ClientError if 400 <= code < 500 else errors.ServerError
+    return error_class(code, {"error": {"code": code, "message": error["message"]}})
+
+
+class _StandInModels:
+    """
+    client.models / client.aio.models of StandInGenaiClient; only generate_content is served.
+    """
+
+    def __init__(self, cassette: Cassette, models: Any = None, is_async: bool = False):
+        self._cassette = cassette
+        self._models = models
+        self._is_async = is_async
+
+    def __getattr__(self, name: str) -> Any:
+        if self._models is None:
+            raise AttributeError(f"{name} is not available when replaying Gemini calls")
+        return getattr(self._models, name)
+
+    def generate_content(self, *, model: str, contents: Any, config: Any = None) -> Any:
+        key = _request_key(model, contents, config)
+        if self._is_async:
+            return self._generate_content_async(key, model, contents, config)
+
+        if self._cassette.recording:
+            start = time.perf_counter()
+            try:
+                response = self._models.generate_content(
+                    model=model, contents=contents, config=config
+                )
+            except errors.APIError as e:
+                self._record_error(key, model, start, e)
+                raise
+            self._record(key, model, start, response)
+            return response
+
+        entry = self._cassette.replay("gemini", key)
+        time.sleep(self._cassette.replay_latency(entry))
+        return self._replayed_response(entry)
+
+    async def _generate_content_async(
+        self, key: str, model: str, contents: Any, config: Any
+    ) -> types.GenerateContentResponse:
+        if self._cassette.recording:
+            start = time.perf_counter()
+            try:
+                response = await self._models.generate_content(
+                    model=model, contents=contents, config=config
+                )
+            except errors.APIError as e:
+                self._record_error(key, model, start, e)
+                raise
+            self._record(key, model, start, response)
+            return response
+
+        entry = self._cassette.replay("gemini", key)
+        await asyncio.sleep(self._cassette.replay_latency(entry))
+        return self._replayed_response(entry)
+
+    def _record(self, key: str, model: str, start: float, response: Any) -> None:
+        self._cassette.record(
+            "gemini",
+            key,
+            model,
+            time.perf_counter() - start,
+            response=to_json_value(response),
+        )
+
+    def _record_error(self, key: str, model: str, start: float, error: errors.APIError) -> None:
+        self._cassette.record(
+            "gemini",
+            key,
+            model,
+            time.perf_counter() - start,
+            error={"code": error.code, "message": error.message or str(error)},
+        )
+
+    def _replayed_response(self, entry: Dict[str, Any]) -> types.GenerateContentResponse:
+        if self._cassette.inject_error():
+            raise _api_error(
+                {"code": self._cassette.error_code, "message": "injected by replay"}
+            )
+        if "error" in entry:
+            raise _api_error(entry["error"])
+        return types.GenerateContentResponse.model_validate(entry["response"])
+
+
+class StandInGenaiClient:
+    """
+    google.genai.Client stand-in that records or replays generate_content calls.
+
+    With a client (record mode) calls are forwarded to it and written to the cassette, and
+    every other attribute is the client's own. Without one (replay mode) calls are answered
+    from the cassette; see utils.record_replay.
+    """
+
+    def __init__(self, cassette: Cassette, client: Optional[genai.Client] = None):
+        """
+        Args:
+            cassette: The cassette to record into or replay from.
+            client: The real client, in record mode.
+        """
+        self._client = client
+        self.models = _StandInModels(cassette, getattr(client, "models", None))
+        self.aio = SimpleNamespace(
+            models=_StandInModels(
+                cassette, getattr(getattr(client, "aio", None), "models", None), is_async=True
+            )
+        )
+
+    @property
+    def vertexai(self) -> bool:
+        return bool(self._client and self._client.vertexai)
+
+    def __getattr__(self, name: str) -> Any:
+        if self._client is None:
+            raise AttributeError(f"{name} is not available when replaying Gemini calls")
+        return getattr(self._client, name)
+
+
+class PipelineGemini(Gemini):
+    """
+    ADK Gemini model whose client comes from get_genai_client(), so agents built with it
+    record and replay their calls like the pipeline tools, e.g.
+    LlmAgent(model=PipelineGemini(model="gemini-2.5-flash-preview-05-20"), ...).
+    """
+
+    @cached_property
+    def api_client(self) -> Any:
+        return get_genai_client()
@@ -0,0 +1,26 @@
+"""
+Utility for hashing file contents.
+"""
+
+import hashlib
+from pathlib import Path
+from typing import Union
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path: Union[str, Path]) -> str:
+    """
+    Computes the SHA-256 hex digest of a file's content without loading it whole.
+
+    Args:
+        file_path: Path to the file to hash.
+
+    Returns:
+        str: The hex digest of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,368 @@
+"""
+Utility for continuously watching the input directory for new files.
+
+The watcher uses Linux inotify (through ctypes, no extra dependency) to learn about new
+or modified files as soon as they appear, and falls back to periodic os.scandir polling
+on other platforms or when inotify is unavailable. A file is only reported once its size
+and mtime have stayed the same for `debounce_seconds`, so partially written uploads are
+never handed to the pipeline.
+
+Usage:
+    python -m utils.input_watcher [directory]
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from utils.file_manifest import FileManifest
+from utils.file_queue import admit_files
+from utils.paths import INPUT_DIR
+from utils.scan import iter_files
+
+# inotify event flags (see inotify(7))
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+_EVENT_HEADER = struct.Struct("iIII")
+
+DEFAULT_DEBOUNCE_SECONDS = 2.0
+DEFAULT_POLL_INTERVAL_SECONDS = 1.0
+
+
+class _Inotify:
+    """
+    Minimal ctypes wrapper around the Linux inotify API.
+    """
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watch_dirs: Dict[int, str] = {}
+        # Set when the kernel's event queue overflowed and events were lost
+        self.overflowed = False
+
+    def add_watch(self, directory: str) -> None:
+        """Watches a directory for created, modified and moved-in entries."""
+        wd = self._add_watch(self.fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for '{directory}'")
+        self.watch_dirs[wd] = directory
+
+    def read_events(self, timeout: float) -> List[Tuple[str, bool]]:
+        """
+        Waits up to `timeout` seconds and returns the (path, is_dir) of every event.
+
+        An overflow of the kernel's event queue (wd -1, events lost) sets `overflowed`.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(buffer):
+            wd, mask, _, name_length = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            name = buffer[offset : offset + name_length].rstrip(b"\0")
+            offset += name_length
+
+            if mask & _IN_Q_OVERFLOW:
+                self.overflowed = True
+                continue
+            directory = self.watch_dirs.get(wd)
+            if directory is not None and name:
+                events.append((os.path.join(directory, os.fsdecode(name)), bool(mask & _IN_ISDIR)))
+        return events
+
+    def close(self) -> None:
+        """Releases the inotify file descriptor."""
+        os.close(self.fd)
+
+
+class InputWatcher:
+    """
+    Watches a directory and reports files once they are completely written.
+    """
+
+    def __init__(
+        self,
+        on_ready: Callable[[List[str]], Any],
+        directory: Union[str, Path] = INPUT_DIR,
+        recursive: bool = False,
+        pattern: str = "",
+        debounce_seconds: float = DEFAULT_DEBOUNCE_SECONDS,
+        poll_interval_seconds: float = DEFAULT_POLL_INTERVAL_SECONDS,
+        use_inotify: bool = True,
+        manifest: Optional[FileManifest] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            on_ready: Called with the absolute paths of files that finished arriving.
+            directory: Directory to watch.
+            recursive: Whether to watch nested subdirectories too.
+            pattern: fnmatch-style file name filter ("" accepts every file).
+            debounce_seconds: How long a file's size and mtime must stay unchanged.
+            poll_interval_seconds: Scan interval in polling mode, and the maximum wait per
+                                   inotify read.
+            use_inotify: Whether to try inotify before falling back to polling.
+            manifest: Optional FileManifest; files recorded unchanged and already processed
+                      in it are not reported, which keeps a restarted watcher from
+                      re-feeding old files.
+            clock: Monotonic time source (injectable for tests).
+        """
+        self.on_ready = on_ready
+        self.directory = str(Path(directory).absolute())
+        self.recursive = recursive
+        self.pattern = pattern
+        self.debounce_seconds = debounce_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.manifest = manifest
+        self.clock = clock
+
+        # path -> (size, mtime_ns, time the stat was last seen changing)
+        self._pending: Dict[str, Tuple[int, int, float]] = {}
+        # path -> (size, mtime_ns) of files already reported
+        self._reported: Dict[str, Tuple[int, int]] = {}
+
+        self._inotify: Optional[_Inotify] = None
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+                self._watch_tree(self.directory)
+            except OSError:
+                self._close_inotify()
+
+    @property
+    def mode(self) -> str:
+        """'inotify' or 'polling'."""
+        return "inotify" if self._inotify is not None else "polling"
+
+    def _close_inotify(self) -> None:
+        """Stops using inotify, e.g. after a setup failure or when the watcher exits."""
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def _watch_tree(self, directory: str) -> None:
+        """Adds inotify watches for a directory and, in recursive mode, its subdirectories."""
+        self._inotify.add_watch(directory)
+        if self.recursive:
+            for root, subdirectories, _ in os.walk(directory):
+                for name in subdirectories:
+                    self._inotify.add_watch(os.path.join(root, name))
+
+    def _matches(self, file_path: str) -> bool:
+        """Checks a file name against the watcher's pattern."""
+        return not self.pattern or fnmatch.fnmatch(os.path.basename(file_path), self.pattern)
+
+    def _touch(self, file_path: str) -> None:
+        """Records the current stat of a candidate file, restarting its debounce timer on change."""
+        try:
+            stat_result = os.stat(file_path)
+        except FileNotFoundError:
+            self._pending.pop(file_path, None)
+            return
+
+        signature = (stat_result.st_size, stat_result.st_mtime_ns)
+        if self._reported.get(file_path) == signature:
+            return
+
+        pending = self._pending.get(file_path)
+        if pending is None or pending[:2] != signature:
+            self._pending[file_path] = (*signature, self.clock())
+
+    def scan(self) -> None:
+        """
+        Scans the directory and queues every file that has not been reported in its current state.
+        """
+        for entry in iter_files(self.directory, self.recursive, self.pattern):
+            self._touch(entry.path)
+
+    def wait_for_changes(self) -> None:
+        """
+        Blocks for up to one poll interval and queues files that changed in the meantime.
+        """
+        if self._inotify is None:
+            time.sleep(self.poll_interval_seconds)
+            self.scan()
+            return
+
+        for path, is_dir in self._inotify.read_events(self.poll_interval_seconds):
+            if is_dir:
+                if self.recursive:
+                    # New subdirectory: watch it and pick up files that landed before the watch
+                    self._watch_tree(path)
+                    for entry in iter_files(path, True, self.pattern):
+                        self._touch(entry.path)
+            elif self._matches(path):
+                self._touch(path)
+
+        if self._inotify.overflowed:
+            # Events were dropped: rescan everything, and watch subdirectories created since
+            self._inotify.overflowed = False
+            if self.recursive:
+                self._watch_tree(self.directory)
+            self.scan()
+
+    def collect_ready(self) -> List[str]:
+        """
+        Returns queued files whose size and mtime have been stable for the debounce period.
+
+        Returns:
+            List[str]: Absolute paths of files that are ready, in path order.
+        """
+        now = self.clock()
+        ready = []
+        for file_path in sorted(self._pending):
+            size, mtime_ns, changed_at = self._pending[file_path]
+
+            # Re-stat so a file still being written keeps restarting its timer
+            self._touch(file_path)
+            if self._pending.get(file_path) != (size, mtime_ns, changed_at):
+                continue
+            if now - changed_at < self.debounce_seconds:
+                continue
+
+            del self._pending[file_path]
+            self._reported[file_path] = (size, mtime_ns)
+            ready.append(file_path)
+
+        if ready and self.manifest is not None:
+            # Files an earlier run left unfinished (still pending) are reported again
+            with self.manifest.locked() as manifest:
+                ready = [
+                    file_path
+                    for file_path in ready
+                    if manifest.refresh(file_path, os.stat(file_path))
+                    or manifest.is_pending(file_path)
+                ]
+        return ready
+
+    def run(self, stop_event: Optional[threading.Event] = None) -> None:
+        """
+        Watches until `stop_event` is set, calling on_ready with each batch of arrived files.
+
+        Files already present when the watcher starts are reported on the first pass.
+
+        Args:
+            stop_event: Event that ends the loop; runs forever if None.
+        """
+        stop_event = stop_event or threading.Event()
+        try:
+            self.scan()
+            while not stop_event.is_set():
+                ready = self.collect_ready()
+                if ready:
+                    self.on_ready(ready)
+                self.wait_for_changes()
+        finally:
+            self._close_inotify()
+
+
+class StateInbox:
+    """
+    on_ready callback that hands arrived files over to the thread that owns the session state.
+
+    The watcher runs in its own thread, while state["files"] and its FileQueue belong to the
+    thread (or event loop) running the pipeline, so the callback only queues each batch.
+    The owning thread admits the batches with drain(), or, when the inbox is bound to an
+    event loop, the loop drains them itself as soon as a batch arrives.
+    """
+
+    def __init__(
+        self,
+        state: Dict[str, Any],
+        manifest: Optional[FileManifest] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ):
+        """
+        Args:
+            state: Session state (or any dict) that holds the "files" map.
+            manifest: The watcher's manifest, in which rejected files are settled.
+            loop: Event loop owning the state, if any.
+        """
+        self.state = state
+        self.manifest = manifest
+        self.loop = loop
+        self._batches: List[List[str]] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, file_paths: List[str]) -> None:
+        with self._lock:
+            self._batches.append(list(file_paths))
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.drain)
+
+    def drain(self) -> Dict[str, str]:
+        """
+        Adds the files that arrived so far to the session, exactly as list_files does
+        (preflight size checks, manifest and ledger; see admit_files). Must be called from
+        the thread owning the state.
+
+        Returns:
+            Dict[str, str]: The rejected files (path as key, reason as value).
+        """
+        with self._lock:
+            batches, self._batches = self._batches, []
+        rejected = {}
+        for file_paths in batches:
+            rejected.update(admit_files(self.state, file_paths, self.manifest))
+        return rejected
+
+
+def enqueue_into_state(
+    state: Dict[str, Any],
+    manifest: Optional[FileManifest] = None,
+    loop: Optional[asyncio.AbstractEventLoop] = None,
+) -> StateInbox:
+    """
+    Builds an on_ready callback that adds arrived files to state["files"] as unprocessed,
+    exactly as list_files does, so they flow into the same pipeline. The files are added by
+    the thread owning the state, never by the watcher thread (see StateInbox).
+
+    Args:
+        state: Session state (or any dict) that holds the "files" map.
+        manifest: The watcher's manifest, in which rejected files are settled.
+        loop: Event loop owning the state; without one, call drain() on the returned inbox.
+
+    Returns:
+        StateInbox: Callback for InputWatcher.
+    """
+    return StateInbox(state, manifest, loop)
+
+
+if __name__ == "__main__":
+    watch_dir = sys.argv[1] if len(sys.argv) > 1 else INPUT_DIR
+    watcher = InputWatcher(
+        on_ready=lambda paths: print("\n".join(paths), flush=True), directory=watch_dir
+    )
+    print(f"Watching '{watcher.directory}' ({watcher.mode})", flush=True)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
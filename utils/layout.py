@@ -0,0 +1,97 @@
+"""
+Utility for finding question blocks on a page image.
+
+A TOEIC Part 5 page holds 8-10 independent questions, each a stem line followed by its
+choices. Projection profiles find them without a model call: the row profile (ink pixels
+per row) gives the text lines, lines are grouped into blocks wherever the vertical gap is
+clearly wider than the usual line spacing, and the column profile of each block gives its
+horizontal extent.
+"""
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Pixels darker than this count as ink
+_INK_THRESHOLD = 160
+# A row/column needs at least this fraction of ink pixels to count as content
+_MIN_INK_FRACTION = 0.005
+# A gap wider than this multiple of the median line gap separates two blocks
+_BLOCK_GAP_RATIO = 1.8
+_BLOCK_PADDING = 6
+
+BoundingBox = Tuple[int, int, int, int]  # (left, top, right, bottom), right/bottom exclusive
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the start and (exclusive) end indices of every run of True values.
+    """
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def find_text_lines(gray: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Finds the text lines of a page from its row projection profile.
+
+    Args:
+        gray (np.ndarray): Grayscale page (uint8, 2-D).
+
+    Returns:
+        List[Tuple[int, int]]: (top, bottom) of each line, bottom exclusive, top to bottom.
+    """
+    ink = gray < _INK_THRESHOLD
+    starts, ends = _runs(ink.sum(axis=1) > _MIN_INK_FRACTION * gray.shape[1])
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def find_question_blocks(
+    gray: np.ndarray, min_block_gap: Optional[int] = None
+) -> List[BoundingBox]:
+    """
+    Splits a page into question blocks.
+
+    Args:
+        gray (np.ndarray): Grayscale page (uint8, 2-D).
+        min_block_gap (Optional[int]): Smallest vertical gap in pixels that separates two
+                                       blocks. None derives it from the median line gap.
+
+    Returns:
+        List[BoundingBox]: (left, top, right, bottom) of each block, top to bottom. A page with
+                           no ink has no blocks; a page with no clear gaps is a single block.
+    """
+    lines = find_text_lines(gray)
+    if not lines:
+        return []
+
+    tops = np.array([top for top, _ in lines])
+    bottoms = np.array([bottom for _, bottom in lines])
+    gaps = tops[1:] - bottoms[:-1]
+    if min_block_gap is None:
+        min_block_gap = int(np.median(gaps) * _BLOCK_GAP_RATIO) + 1 if gaps.size else 0
+
+    # Line indices where a new block starts
+    block_starts = np.concatenate(([0], np.flatnonzero(gaps >= min_block_gap) + 1))
+    block_ends = np.concatenate((block_starts[1:], [len(lines)]))
+
+    ink = gray < _INK_THRESHOLD
+    height, width = gray.shape
+    blocks = []
+    for first, last in zip(block_starts.tolist(), block_ends.tolist()):
+        top = int(tops[first])
+        bottom = int(bottoms[last - 1])
+        columns = np.flatnonzero(
+            ink[top:bottom].sum(axis=0) > _MIN_INK_FRACTION * (bottom - top)
+        )
+        if columns.size == 0:
+            continue
+        blocks.append(
+            (
+                max(int(columns[0]) - _BLOCK_PADDING, 0),
+                max(top - _BLOCK_PADDING, 0),
+                min(int(columns[-1]) + 1 + _BLOCK_PADDING, width),
+                min(bottom + _BLOCK_PADDING, height),
+            )
+        )
+    return blocks
@@ -0,0 +1,204 @@
+"""
+Utility for running many page-level model calls concurrently.
+
+ModelCallExecutor runs coroutine-producing calls on one asyncio event loop with bounded
+concurrency, admits each call through its model's ModelRateLimiter (see utils.rate_limiter)
+before it takes one of the shared concurrency slots, and retries calls the API rejected with 429, waiting utils.backoff delays. While a model
+backs off, its limiter is paused so the other in-flight pages slow down too instead of
+hitting the quota again.
+
+An executor, like its asyncio primitives, belongs to the event loop it is first used on.
+"""
+
+import asyncio
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, TypeVar, Union
+
+from utils.backoff import backoff_delay
+from utils.rate_limiter import DEFAULT_BURST_SECONDS, ModelRateLimiter, get_model_rate_limits
+
+T = TypeVar("T")
+
+DEFAULT_MAX_CONCURRENCY = 16
+DEFAULT_MAX_RETRIES = 5
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """
+    Checks whether an API error is a 429 (quota or rate limit exceeded).
+
+    Works for google.genai.errors.APIError and google.api_core exceptions, which both carry
+    the HTTP status in `code`.
+    """
+    return getattr(error, "code", None) == 429
+
+
+def _used_tokens(response: Any) -> Optional[int]:
+    """Returns the tokens a generate_content response was billed, if it reports them."""
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None)
+
+
+class ModelCallExecutor:
+    """
+    Concurrent, rate-limited executor for model calls.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Dict[str, int]]] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_delay_seconds: float = 1.0,
+        max_delay_seconds: float = 60.0,
+        burst_seconds: float = DEFAULT_BURST_SECONDS,
+    ):
+        """
+        Args:
+            limits: Model name -> {"rpm": ..., "tpm": ...}; defaults to get_model_rate_limits().
+                    Models without an entry are not rate limited.
+            max_concurrency: Maximum number of calls in flight across all models.
+            max_retries: Retries of a call rejected with 429.
+            base_delay_seconds: Initial backoff delay after a 429.
+            max_delay_seconds: Maximum backoff delay.
+            burst_seconds: Seconds of traffic each rate limit lets through in a burst.
+        """
+        self.limits = get_model_rate_limits() if limits is None else limits
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay_seconds = base_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.burst_seconds = burst_seconds
+        self.rate_limited_retries = 0
+
+        self._limiters: Dict[str, Optional[ModelRateLimiter]] = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def limiter(self, model: str) -> Optional[ModelRateLimiter]:
+        """
+        Returns the rate limiter of a model, or None if the model has no limits.
+        """
+        if model not in self._limiters:
+            model_limits = self.limits.get(model)
+            self._limiters[model] = (
+                ModelRateLimiter(
+                    model_limits.get("rpm"), model_limits.get("tpm"), self.burst_seconds
+                )
+                if model_limits
+                else None
+            )
+        return self._limiters[model]
+
+    async def call(
+        self,
+        model: str,
+        make_call: Callable[[], Awaitable[T]],
+        estimated_tokens: int = 0,
+    ) -> T:
+        """
+        Runs one model call within the model's limits, retrying it on 429.
+
+        Args:
+            model: Model name the call goes to; selects the rate limits.
+            make_call: Zero-argument function returning a new call coroutine (called again
+                       for each retry), e.g. `lambda: client.aio.models.generate_content(...)`.
+            estimated_tokens: Tokens the call is expected to use (see estimate_request_tokens).
+
+        Returns:
+            The call's result.
+
+        Raises:
+            The call's exception if it is not a 429, or the last 429 once retries run out.
+        """
+        limiter = self.limiter(model)
+        attempt = 0
+        while True:
+            # Wait for the model's quota before taking a slot, so calls held back by one
+            # model's limits never keep another model's calls from running
+            if limiter is not None:
+                await limiter.acquire(estimated_tokens)
+            try:
+                async with self._semaphore:
+                    response = await make_call()
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, self.base_delay_seconds, self.max_delay_seconds)
+                if limiter is not None:
+                    limiter.pause(delay)
+                self.rate_limited_retries += 1
+            else:
+                # Charge the token bucket for usage beyond the estimate
+                used = _used_tokens(response)
+                if limiter is not None and limiter.tokens is not None and used:
+                    if used > estimated_tokens:
+                        limiter.tokens.debit(used - estimated_tokens)
+                return response
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def map(
+        self,
+        model: str,
+        make_calls: Iterable[Callable[[], Awaitable[T]]],
+        estimated_tokens: int = 0,
+    ) -> List[Union[T, BaseException]]:
+        """
+        Runs calls to one model concurrently.
+
+        Args:
+            model: Model name the calls go to.
+            make_calls: One zero-argument coroutine function per call, e.g. per page.
+            estimated_tokens: Tokens each call is expected to use.
+
+        Returns:
+            List[Union[T, BaseException]]: Each call's result, or the exception it raised,
+                                           in the order of `make_calls`.
+        """
+        return await asyncio.gather(
+            *(self.call(model, make_call, estimated_tokens) for make_call in make_calls),
+            return_exceptions=True,
+        )
+
+
+def generate_content_call(
+    client: Any, model: str, contents: Any, config: Any = None
+) -> Callable[[], Awaitable[Any]]:
+    """
+    Wraps a google.genai generate_content request for ModelCallExecutor.call().
+
+    Args:
+        client: A google.genai.Client.
+        model: Model name.
+        contents: Request contents (e.g. an image Part and the OCR prompt).
+        config: Optional types.GenerateContentConfig.
+
+    Returns:
+        Callable[[], Awaitable[Any]]: Starts a new request each time it is called.
+    """
+    return lambda: client.aio.models.generate_content(
+        model=model, contents=contents, config=config
+    )
+
+
+# One executor per event loop, so rate limits are shared by every call made on that loop
+_executors: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ModelCallExecutor]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_model_executor() -> ModelCallExecutor:
+    """
+    Returns the shared executor of the running event loop, creating it on first use.
+
+    Returns:
+        ModelCallExecutor: An executor with the configured per-model limits.
+
+    Raises:
+        RuntimeError: If called outside a running event loop.
+    """
+    loop = asyncio.get_running_loop()
+    executor = _executors.get(loop)
+    if executor is None:
+        executor = _executors[loop] = ModelCallExecutor()
+    return executor
@@ -0,0 +1,224 @@
+"""
+Utility for recognising pages that carry no question content.
+
+Exam PDFs contain blank pages, "this page intentionally left blank" notices, answer
+sheets and covers. Sending them through OCR and structuring costs a model call each and
+yields nothing, so pages are classified cheaply when they are split:
+
+1. ink density: the fraction of dark pixels inside the page border. Blank pages are
+   below BLANK_INK_DENSITY; pages below NEAR_BLANK_INK_DENSITY with at most
+   NEAR_BLANK_MAX_LINES text lines are notices or page numbers only.
+2. perceptual hash: a 64-bit difference hash (dHash) compared with reference images of
+   known non-question pages (answer sheets, covers ...). Any page within
+   DEFAULT_MAX_HASH_DISTANCE bits of a reference is skipped.
+
+Text-layer pages are classified from their text instead.
+"""
+
+import os
+import re
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
+from PIL import Image
+
+from utils.file_info import IMAGE_EXTENSIONS
+from utils.layout import find_text_lines
+from utils.paths import PROJECT_ROOT
+
+# Default location of the reference images; can be overridden with the
+# SKIP_PAGE_TEMPLATE_DIR environment variable. Each image's file stem is the skip reason.
+DEFAULT_SKIP_PAGE_TEMPLATE_DIR = PROJECT_ROOT / "skip_page_templates"
+
+BLANK_INK_DENSITY = 0.002
+NEAR_BLANK_INK_DENSITY = 0.01
+NEAR_BLANK_MAX_LINES = 2
+DEFAULT_MAX_HASH_DISTANCE = 6
+
+# Pixels darker than this count as ink
+_INK_THRESHOLD = 160
+# Fraction of each edge ignored, so scanner shadows and punch holes are not ink
+_BORDER_FRACTION = 0.03
+# Pages are classified at this long-edge size; the decision does not need full resolution
+_CLASSIFY_LONG_EDGE = 1000
+_BLANK_NOTICE_PATTERN = re.compile(
+    r"intentionally\s+(left\s+)?blank|no\s+test\s+material\s+on\s+this\s+page", re.IGNORECASE
+)
+# A text page with a blank-page notice and more words than this is still read
+_MAX_NOTICE_WORDS = 20
+
+
+def ink_density(gray: np.ndarray) -> float:
+    """
+    Computes the fraction of ink pixels inside the page border.
+
+    Args:
+        gray (np.ndarray): Grayscale page (uint8, 2-D).
+
+    Returns:
+        float: Ink pixels per pixel, between 0 and 1.
+    """
+    margin_y = int(gray.shape[0] * _BORDER_FRACTION)
+    margin_x = int(gray.shape[1] * _BORDER_FRACTION)
+    inner = gray[margin_y : gray.shape[0] - margin_y, margin_x : gray.shape[1] - margin_x]
+    if inner.size == 0:
+        return 0.0
+    return float(np.count_nonzero(inner < _INK_THRESHOLD)) / inner.size
+
+
+def difference_hash(gray: np.ndarray) -> int:
+    """
+    Computes the 64-bit difference hash of a page: whether each cell of a 9x8 thumbnail is
+    brighter than its left neighbour.
+
+    Args:
+        gray (np.ndarray): Grayscale page (uint8, 2-D).
+
+    Returns:
+        int: The hash; visually similar pages differ in few bits.
+    """
+    thumbnail = np.asarray(Image.fromarray(gray).resize((9, 8), Image.BILINEAR), dtype=np.int16)
+    bits = (thumbnail[:, 1:] > thumbnail[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hash_distance(first: int, second: int) -> int:
+    """Returns the number of bits in which two hashes differ."""
+    return bin(first ^ second).count("1")
+
+
+def _load_gray(image: Image.Image) -> np.ndarray:
+    """Converts a page to a grayscale array no larger than the classification size."""
+    if image.format == "JPEG":
+        # Let the decoder skip detail we are about to throw away
+        image.draft("L", (_CLASSIFY_LONG_EDGE, _CLASSIFY_LONG_EDGE))
+    gray = image.convert("L")
+    if max(gray.size) > _CLASSIFY_LONG_EDGE:
+        gray.thumbnail((_CLASSIFY_LONG_EDGE, _CLASSIFY_LONG_EDGE))
+    return np.asarray(gray)
+
+
+class PageClassifier:
+    """
+    Decides whether a page can skip the extraction pipeline, and why.
+    """
+
+    def __init__(
+        self,
+        templates: Optional[Dict[int, str]] = None,
+        max_hash_distance: int = DEFAULT_MAX_HASH_DISTANCE,
+    ):
+        """
+        Args:
+            templates: Difference hashes of known non-question pages, mapped to the reason.
+            max_hash_distance: Largest number of differing bits that still counts as a match.
+        """
+        self.templates = templates or {}
+        self.max_hash_distance = max_hash_distance
+
+    def classify_gray(self, gray: np.ndarray) -> Optional[str]:
+        """
+        Classifies a grayscale page.
+
+        Args:
+            gray (np.ndarray): Grayscale page (uint8, 2-D).
+
+        Returns:
+            Optional[str]: Why the page has no question content, or None if it should be read.
+        """
+        density = ink_density(gray)
+        if density < BLANK_INK_DENSITY:
+            return f"blank page (ink density {density:.4f})"
+        if density < NEAR_BLANK_INK_DENSITY:
+            num_lines = len(find_text_lines(gray))
+            if num_lines <= NEAR_BLANK_MAX_LINES:
+                return f"near-blank page ({num_lines} text lines, ink density {density:.4f})"
+
+        if self.templates:
+            page_hash = difference_hash(gray)
+            for template_hash, reason in self.templates.items():
+                if hash_distance(page_hash, template_hash) <= self.max_hash_distance:
+                    return reason
+        return None
+
+    def classify_image(self, image: Image.Image) -> Optional[str]:
+        """
+        Classifies a page image.
+
+        Args:
+            image (Image.Image): The page.
+
+        Returns:
+            Optional[str]: Why the page has no question content, or None if it should be read.
+        """
+        return self.classify_gray(_load_gray(image))
+
+    def classify_text(self, text: str) -> Optional[str]:
+        """
+        Classifies a text-layer page.
+
+        Args:
+            text (str): The page text.
+
+        Returns:
+            Optional[str]: Why the page has no question content, or None if it should be read.
+        """
+        if not text.strip():
+            return "blank page (empty text layer)"
+        if _BLANK_NOTICE_PATTERN.search(text) and len(text.split()) <= _MAX_NOTICE_WORDS:
+            return "blank page notice"
+        return None
+
+    def classify_file(self, file_path: Union[str, Path]) -> Optional[str]:
+        """
+        Classifies a page file: a page image, or a `.txt` text-layer page.
+
+        Args:
+            file_path (Union[str, Path]): Path to the page file.
+
+        Returns:
+            Optional[str]: Why the page has no question content, or None if it should be
+                           read (including files of any other type).
+        """
+        suffix = Path(file_path).suffix.lower()
+        if suffix == ".txt":
+            return self.classify_text(Path(file_path).read_text(encoding="utf-8"))
+        if suffix in IMAGE_EXTENSIONS:
+            with Image.open(file_path) as image:
+                return self.classify_image(image)
+        return None
+
+
+def load_templates(template_dir: Union[str, Path]) -> Dict[int, str]:
+    """
+    Hashes the reference images of known non-question pages.
+
+    Args:
+        template_dir (Union[str, Path]): Directory of reference images, e.g. `answer-sheet.png`.
+
+    Returns:
+        Dict[int, str]: Difference hash -> skip reason ("matches answer-sheet"). Empty if the
+                        directory does not exist.
+    """
+    template_dir = Path(template_dir)
+    if not template_dir.is_dir():
+        return {}
+
+    templates = {}
+    for path in sorted(template_dir.iterdir()):
+        if path.suffix.lower() in IMAGE_EXTENSIONS:
+            with Image.open(path) as image:
+                templates[difference_hash(_load_gray(image))] = f"matches {path.stem}"
+    return templates
+
+
+def get_page_classifier() -> PageClassifier:
+    """
+    Create a PageClassifier with the reference images in SKIP_PAGE_TEMPLATE_DIR.
+
+    Returns:
+        PageClassifier: A classifier using the configured (or default) reference images.
+    """
+    template_dir = os.getenv("SKIP_PAGE_TEMPLATE_DIR") or DEFAULT_SKIP_PAGE_TEMPLATE_DIR
+    return PageClassifier(load_templates(template_dir))
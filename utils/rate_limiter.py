@@ -0,0 +1,195 @@
+"""
+Utility for client-side rate limiting of model calls.
+
+The PRD requires the Flash and Pro QPS to be controlled on the Runner side, with different
+limits per model. Each model gets two asyncio token buckets: one for requests per minute
+(RPM) and one for tokens per minute (TPM). A call waits until both buckets have room, and
+a 429 from the API pauses the model's limiter so concurrent calls back off together.
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Callable, Dict, Optional
+
+# Default per-model limits; tune them to the project's quota. Can be overridden (per model,
+# merged over these) with a JSON object in the MODEL_RATE_LIMITS environment variable,
+# e.g. '{"gemini-2.5-pro-preview-05-06": {"rpm": 60, "tpm": 1000000}}'.
+DEFAULT_MODEL_RATE_LIMITS: Dict[str, Dict[str, int]] = {
+    "gemini-2.5-flash-preview-05-20": {"rpm": 1000, "tpm": 1_000_000},
+    "gemini-2.5-pro-preview-05-06": {"rpm": 150, "tpm": 2_000_000},
+}
+
+# Seconds of traffic a bucket lets through in a burst
+DEFAULT_BURST_SECONDS = 1.0
+
+# Gemini bills an image up to 384 px per side as 258 tokens; larger images are tiled
+IMAGE_TOKENS = 258
+# Rough characters per token for English prompt text
+CHARS_PER_TOKEN = 4
+
+
+def estimate_request_tokens(
+    text: str = "", num_images: int = 0, max_output_tokens: int = 0
+) -> int:
+    """
+    Estimates the tokens a request will be billed, before it is sent.
+
+    Args:
+        text (str): Prompt text.
+        num_images (int): Number of images in the request.
+        max_output_tokens (int): Upper bound on the response length.
+
+    Returns:
+        int: Estimated total tokens.
+    """
+    return len(text) // CHARS_PER_TOKEN + num_images * IMAGE_TOKENS + max_output_tokens
+
+
+class TokenBucket:
+    """
+    Asyncio token bucket: refills continuously at `rate` units per second up to `capacity`.
+
+    A request for more than `capacity` units waits for a full bucket and then takes it into
+    debt, so large requests are delayed instead of rejected. Waiters are served in order.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            rate: Units added per second.
+            capacity: Maximum units held (the burst size).
+            clock: Monotonic clock in seconds.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._level = capacity
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def level(self) -> float:
+        """Returns the units currently available (negative while in debt)."""
+        self._refill()
+        return self._level
+
+    def try_acquire(self, amount: float) -> float:
+        """
+        Takes `amount` units if the bucket has room.
+
+        Args:
+            amount: Units to take.
+
+        Returns:
+            float: 0 if the units were taken, otherwise the seconds to wait before retrying.
+        """
+        self._refill()
+        needed = min(amount, self.capacity)
+        if self._level >= needed:
+            self._level -= amount
+            return 0.0
+        return (needed - self._level) / self.rate
+
+    async def acquire(self, amount: float = 1) -> None:
+        """
+        Waits until `amount` units are available and takes them.
+
+        Args:
+            amount: Units to take.
+        """
+        async with self._lock:
+            while True:
+                wait_seconds = self.try_acquire(amount)
+                if wait_seconds <= 0:
+                    return
+                await asyncio.sleep(wait_seconds)
+
+    def debit(self, amount: float) -> None:
+        """Takes units without waiting, e.g. when a call used more tokens than estimated."""
+        self._refill()
+        self._level -= amount
+
+
+class ModelRateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limits of one model.
+    """
+
+    def __init__(
+        self,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        burst_seconds: float = DEFAULT_BURST_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            rpm: Requests per minute, or None for no request limit.
+            tpm: Tokens per minute, or None for no token limit.
+            burst_seconds: Seconds of traffic each bucket lets through in a burst.
+            clock: Monotonic clock in seconds.
+        """
+        self.requests = (
+            TokenBucket(rpm / 60, max(rpm / 60 * burst_seconds, 1), clock) if rpm else None
+        )
+        self.tokens = (
+            TokenBucket(tpm / 60, max(tpm / 60 * burst_seconds, 1), clock) if tpm else None
+        )
+        self._clock = clock
+        self._paused_until = 0.0
+
+    def pause(self, seconds: float) -> None:
+        """
+        Holds back every new call for `seconds`, e.g. after the API answered 429.
+        """
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """
+        Waits until one request with an estimated `tokens` fits within the limits.
+
+        Args:
+            tokens: Estimated tokens of the request.
+        """
+        while True:
+            wait_seconds = self._paused_until - self._clock()
+            if wait_seconds <= 0:
+                break
+            await asyncio.sleep(wait_seconds)
+
+        if self.requests is not None:
+            await self.requests.acquire(1)
+        if self.tokens is not None and tokens > 0:
+            await self.tokens.acquire(tokens)
+
+
+def get_model_rate_limits() -> Dict[str, Dict[str, int]]:
+    """
+    Returns the per-model limits, with the MODEL_RATE_LIMITS environment variable applied.
+
+    Returns:
+        Dict[str, Dict[str, int]]: Model name -> {"rpm": ..., "tpm": ...}.
+
+    Raises:
+        ValueError: If MODEL_RATE_LIMITS is not a JSON object.
+    """
+    limits = {model: dict(model_limits) for model, model_limits in DEFAULT_MODEL_RATE_LIMITS.items()}
+    overrides = os.getenv("MODEL_RATE_LIMITS")
+    if overrides:
+        parsed = json.loads(overrides)
+        if not isinstance(parsed, dict):
+            raise ValueError("MODEL_RATE_LIMITS must be a JSON object keyed by model name")
+        for model, model_limits in parsed.items():
+            limits.setdefault(model, {}).update(model_limits)
+    return limits
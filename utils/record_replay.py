@@ -0,0 +1,239 @@
+"""
+Utility for recording and replaying external service calls (Gemini, Supabase).
+
+In record mode the real clients are wrapped and every request is written to a JSONL
+cassette: a hash of the request, the response (or error) and the call's latency. In replay
+mode no real client is created. Each request is answered from the cassette after its
+recorded latency, which can be scaled, and a share of calls can fail with an injected
+error. A pipeline run can then be repeated offline and deterministically, e.g. to
+benchmark throughput without spending API quota or touching the production database.
+
+The mode is selected with SERVICE_CASSETTE_MODE ("record" or "replay"; unset means live
+clients). get_genai_client() and get_supabase_client() return the stand-in clients
+(utils.genai.StandInGenaiClient, utils.supabase.StandInSupabaseClient) accordingly.
+"""
+
+import base64
+import json
+import os
+import random
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from pydantic import BaseModel
+
+from utils.paths import PROJECT_ROOT
+
+SERVICE_CASSETTE_MODE_RECORD = "record"
+SERVICE_CASSETTE_MODE_REPLAY = "replay"
+SERVICE_CASSETTE_MODES = (SERVICE_CASSETTE_MODE_RECORD, SERVICE_CASSETTE_MODE_REPLAY)
+
+DEFAULT_SERVICE_CASSETTE_PATH = PROJECT_ROOT / ".cache" / "cassettes" / "services.jsonl"
+DEFAULT_INJECTED_ERROR_CODE = 503
+
+
+class ReplayMissError(LookupError):
+    """
+    Raised in replay mode for a request that is not in the cassette.
+    """
+
+
+def to_json_value(value: Any) -> Any:
+    """
+    Converts request arguments (Pydantic models, bytes, nested containers) to JSON values.
+
+    Args:
+        value (Any): The value to convert.
+
+    Returns:
+        Any: A JSON-serialisable equivalent.
+    """
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode("ascii")
+    if isinstance(value, (list, tuple)):
+        return [to_json_value(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): to_json_value(item) for key, item in value.items()}
+    return value
+
+
+class Cassette:
+    """
+    JSONL file of recorded service calls.
+
+    Each line holds service, key (request hash), label (model or table name, for reading
+    the file), latency_seconds and either response or error. Identical requests recorded
+    several times are replayed in recording order, repeating the last response once the
+    recordings are used up.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path] = DEFAULT_SERVICE_CASSETTE_PATH,
+        mode: str = SERVICE_CASSETTE_MODE_REPLAY,
+        latency_scale: float = 1.0,
+        error_rate: float = 0.0,
+        error_code: int = DEFAULT_INJECTED_ERROR_CODE,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            path: The cassette file.
+            mode: "record" (append calls) or "replay" (serve calls).
+            latency_scale: Factor applied to recorded latencies on replay (0 replays instantly).
+            error_rate: Share of replayed calls that fail with an injected error.
+            error_code: HTTP status of injected errors.
+            seed: Seed of the error injection, so failures hit the same calls on every run.
+
+        Raises:
+            ValueError: If mode is not "record" or "replay".
+        """
+        if mode not in SERVICE_CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode: {mode!r}")
+
+        self.path = Path(path)
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # (service, key) -> recorded entries, and the index of the next one to replay
+        self._entries: Dict[Tuple[str, str], List[Dict[str, Any]]] = defaultdict(list)
+        self._cursors: Dict[Tuple[str, str], int] = defaultdict(int)
+
+        if mode == SERVICE_CASSETTE_MODE_REPLAY and self.path.is_file():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[(entry["service"], entry["key"])].append(entry)
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == SERVICE_CASSETTE_MODE_RECORD
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def record(
+        self,
+        service: str,
+        key: str,
+        label: str,
+        latency_seconds: float,
+        response: Any = None,
+        error: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Appends one call to the cassette file.
+
+        Args:
+            service: Service name ("gemini" or "supabase").
+            key: Hash of the request.
+            label: Model or table name.
+            latency_seconds: How long the real call took.
+            response: The response as JSON values.
+            error: The error as {"code": ..., "message": ...} if the call failed.
+        """
+        entry = {
+            "service": service,
+            "key": key,
+            "label": label,
+            "latency_seconds": latency_seconds,
+        }
+        if error is not None:
+            entry["error"] = error
+        else:
+            entry["response"] = response
+
+        line = json.dumps(entry)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self._entries[(service, key)].append(entry)
+
+    def replay(self, service: str, key: str) -> Dict[str, Any]:
+        """
+        Returns the next recorded entry for a request.
+
+        Args:
+            service: Service name.
+            key: Hash of the request.
+
+        Returns:
+            Dict[str, Any]: The entry with latency_seconds and response or error.
+
+        Raises:
+            ReplayMissError: If the request was never recorded.
+        """
+        with self._lock:
+            entries = self._entries.get((service, key))
+            if not entries:
+                raise ReplayMissError(
+                    f"No recorded {service} call for request {key[:12]} in {self.path}"
+                )
+            index = min(self._cursors[(service, key)], len(entries) - 1)
+            self._cursors[(service, key)] += 1
+            return entries[index]
+
+    def replay_latency(self, entry: Dict[str, Any]) -> float:
+        """
+        Returns the seconds to wait before answering a replayed call.
+        """
+        return entry["latency_seconds"] * self.latency_scale
+
+    def inject_error(self) -> bool:
+        """
+        Decides whether the next replayed call fails with an injected error.
+        """
+        if self.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+
+_cassettes: Dict[Tuple[Any, ...], Cassette] = {}
+
+
+def get_service_cassette() -> Optional[Cassette]:
+    """
+    Return the cassette configured by the environment, or None for live clients.
+
+    Reads SERVICE_CASSETTE_MODE, SERVICE_CASSETTE_PATH, REPLAY_LATENCY_SCALE,
+    REPLAY_ERROR_RATE, REPLAY_ERROR_CODE and REPLAY_SEED. Clients created with the same
+    settings share one cassette, so replay order and recording are consistent across them.
+
+    Returns:
+        Optional[Cassette]: The shared cassette, or None if SERVICE_CASSETTE_MODE is unset.
+
+    Raises:
+        ValueError: If SERVICE_CASSETTE_MODE is not "record" or "replay".
+    """
+    mode = os.getenv("SERVICE_CASSETTE_MODE")
+    if not mode:
+        return None
+
+    path = os.getenv("SERVICE_CASSETTE_PATH") or str(DEFAULT_SERVICE_CASSETTE_PATH)
+    latency_scale = float(os.getenv("REPLAY_LATENCY_SCALE") or 1.0)
+    error_rate = float(os.getenv("REPLAY_ERROR_RATE") or 0.0)
+    error_code = int(os.getenv("REPLAY_ERROR_CODE") or DEFAULT_INJECTED_ERROR_CODE)
+    seed = int(os.getenv("REPLAY_SEED") or 0)
+
+    settings = (mode, path, latency_scale, error_rate, error_code, seed)
+    if settings not in _cassettes:
+        _cassettes[settings] = Cassette(path, mode, latency_scale, error_rate, error_code, seed)
+    return _cassettes[settings]
+
+
+def reset_service_cassettes() -> None:
+    """
+    Forgets the shared cassettes, so the next clients reload the file and replay it from
+    the start (e.g. between benchmark runs).
+    """
+    _cassettes.clear()
@@ -0,0 +1,151 @@
+"""
+Utility for caching rendered PDF page images on disk.
+
+Entries are keyed by the PDF's content hash plus the render parameters, so re-running
+ingestion on an unchanged PDF reuses the existing page images instead of calling
+poppler again. The cache is bounded in size and evicts least recently used entries.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from utils.hashing import hash_file
+from utils.paths import PROJECT_ROOT
+
+# Default location and size cap; both can be overridden with environment variables.
+DEFAULT_RENDER_CACHE_DIR = PROJECT_ROOT / ".cache" / "renders"
+DEFAULT_RENDER_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 2 GB
+
+
+class RenderCache:
+    """
+    On-disk LRU cache of rendered page files.
+
+    Each entry is a directory named after its key that holds the page files as
+    `page-{n}{suffix}`. An entry's modification time is refreshed on every hit and
+    is used as its recency for eviction.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path] = DEFAULT_RENDER_CACHE_DIR,
+        max_bytes: int = DEFAULT_RENDER_CACHE_MAX_BYTES,
+    ):
+        """
+        Args:
+            cache_dir: Directory that holds the cache entries.
+            max_bytes: Total size cap of all entries in bytes.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(file_path: Union[str, Path], render_params: Dict[str, Any]) -> str:
+        """
+        Builds a cache key from the file content hash and the render parameters.
+
+        Args:
+            file_path: Path to the source PDF.
+            render_params: Parameters that affect the rendered output (DPI, format, quality ...).
+
+        Returns:
+            str: The cache key.
+        """
+        payload = json.dumps(
+            {"content": hash_file(file_path), "params": render_params}, sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[int, Path]]:
+        """
+        Looks up an entry and marks it as recently used.
+
+        Args:
+            key: The cache key.
+
+        Returns:
+            Optional[Dict[int, Path]]: The cached page files keyed by page number in page order,
+                                       or None on a miss.
+        """
+        entry_dir = self.cache_dir / key
+        if not entry_dir.is_dir():
+            return None
+
+        # Refresh the entry's recency for LRU eviction
+        os.utime(entry_dir)
+
+        pages = {int(path.stem.split("-")[1]): path for path in entry_dir.glob("page-*")}
+        return dict(sorted(pages.items()))
+
+    def put(self, key: str, pages: Dict[int, Union[str, Path]]) -> None:
+        """
+        Stores page files under a key and evicts old entries beyond the size cap.
+
+        The entry is assembled in a temporary directory and renamed into place, so a
+        concurrent reader never sees a partially written entry.
+
+        Args:
+            key: The cache key.
+            pages: Page files (images or extracted text) keyed by page number.
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry_dir = self.cache_dir / key
+        if entry_dir.is_dir():
+            return
+
+        staging_dir = Path(tempfile.mkdtemp(dir=self.cache_dir, prefix=".staging-"))
+        try:
+            for page_number, page_path in pages.items():
+                page_path = Path(page_path)
+                shutil.copyfile(
+                    page_path, staging_dir / f"page-{page_number}{page_path.suffix}"
+                )
+            os.rename(staging_dir, entry_dir)
+        except OSError:
+            # Another writer stored the same entry first, or the copy failed
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return
+
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Removes least recently used entries until the cache fits within max_bytes.
+        """
+        if not self.cache_dir.is_dir():
+            return
+
+        entries = []
+        total_bytes = 0
+        for entry_dir in self.cache_dir.iterdir():
+            if not entry_dir.is_dir() or entry_dir.name.startswith("."):
+                continue
+            size = sum(f.stat().st_size for f in entry_dir.iterdir() if f.is_file())
+            entries.append((entry_dir.stat().st_mtime, size, entry_dir))
+            total_bytes += size
+
+        # Oldest first
+        for _, size, entry_dir in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total_bytes -= size
+
+
+def get_render_cache() -> RenderCache:
+    """
+    Create a RenderCache from the RENDER_CACHE_DIR and RENDER_CACHE_MAX_BYTES environment variables.
+
+    Returns:
+        RenderCache: A cache rooted at the configured (or default) directory.
+    """
+    cache_dir = os.getenv("RENDER_CACHE_DIR") or DEFAULT_RENDER_CACHE_DIR
+    max_bytes = int(
+        os.getenv("RENDER_CACHE_MAX_BYTES") or DEFAULT_RENDER_CACHE_MAX_BYTES
+    )
+    return RenderCache(cache_dir, max_bytes)
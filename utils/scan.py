@@ -0,0 +1,34 @@
+"""
+Utility for scanning directories for input files.
+"""
+
+import fnmatch
+import os
+from typing import Iterator
+
+
+def iter_files(directory: str, recursive: bool = False, pattern: str = "") -> Iterator[os.DirEntry]:
+    """
+    Yields the files under a directory using os.scandir.
+
+    Args:
+        directory (str): Path of the directory to scan.
+        recursive (bool): Whether to descend into subdirectories.
+        pattern (str): fnmatch-style pattern the file name must match ("" matches everything).
+
+    Yields:
+        os.DirEntry: One entry per matching file, directories sorted by name.
+    """
+    pending = [directory]
+    while pending:
+        current = pending.pop()
+        with os.scandir(current) as entries:
+            subdirectories = []
+            for entry in sorted(entries, key=lambda e: e.name):
+                if entry.is_file():
+                    if not pattern or fnmatch.fnmatch(entry.name, pattern):
+                        yield entry
+                elif recursive and entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+            # Reverse so subdirectories are visited in name order
+            pending.extend(reversed(subdirectories))
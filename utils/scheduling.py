@@ -0,0 +1,128 @@
+"""
+Scheduling policies that decide which unprocessed file is selected next.
+
+- "fifo": listing order (the FileQueue's unprocessed bucket itself).
+- "sjf": shortest job first, by page count then byte size, so small image jobs are not
+  stuck behind a large PDF.
+- "fair": round-robin across test forms, so every form makes progress.
+
+Policies keep their own index of unprocessed files and are told about each file that
+becomes unprocessed. Entries are invalidated lazily: pop() skips files that are no longer
+unprocessed, so each operation stays O(log N) ("sjf") or amortised O(1) ("fair").
+"""
+
+import heapq
+import itertools
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+SCHEDULING_POLICY_FIFO = "fifo"
+SCHEDULING_POLICY_SJF = "sjf"
+SCHEDULING_POLICY_FAIR = "fair"
+SCHEDULING_POLICIES = (SCHEDULING_POLICY_FIFO, SCHEDULING_POLICY_SJF, SCHEDULING_POLICY_FAIR)
+
+
+class ShortestJobFirst:
+    """
+    Min-heap of unprocessed files keyed by (pages, bytes, arrival order).
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[int, int, int, str]] = []
+        self._arrival = itertools.count()
+
+    def push(self, file_path: str, info: Dict[str, Any]) -> None:
+        """
+        Adds a file that became unprocessed.
+
+        Args:
+            file_path: The file path.
+            info: Its file_info description (missing fields count as one small page).
+        """
+        entry = (info.get("pages") or 1, info.get("bytes") or 0, next(self._arrival), file_path)
+        heapq.heappush(self._heap, entry)
+
+    def pop(self, is_unprocessed: Callable[[str], bool]) -> Optional[str]:
+        """
+        Removes and returns the smallest file that is still unprocessed.
+
+        Args:
+            is_unprocessed: Tells whether a file is still unprocessed.
+
+        Returns:
+            Optional[str]: The file path, or None if no unprocessed file is left.
+        """
+        while self._heap:
+            file_path = heapq.heappop(self._heap)[-1]
+            if is_unprocessed(file_path):
+                return file_path
+        return None
+
+
+class TestFormRoundRobin:
+    """
+    Per-test-form FIFO queues served in rotation.
+    """
+
+    __test__ = False  # Not a pytest test class
+
+    def __init__(self):
+        self._forms: "OrderedDict[str, Deque[str]]" = OrderedDict()
+
+    def push(self, file_path: str, info: Dict[str, Any]) -> None:
+        """
+        Adds a file that became unprocessed to its test form's queue.
+
+        Args:
+            file_path: The file path.
+            info: Its file_info description; "test_form" selects the queue.
+        """
+        form = info.get("test_form", "")
+        if form not in self._forms:
+            self._forms[form] = deque()
+        self._forms[form].append(file_path)
+
+    def pop(self, is_unprocessed: Callable[[str], bool]) -> Optional[str]:
+        """
+        Returns the next unprocessed file of the next test form in rotation.
+
+        Args:
+            is_unprocessed: Tells whether a file is still unprocessed.
+
+        Returns:
+            Optional[str]: The file path, or None if no unprocessed file is left.
+        """
+        while self._forms:
+            form, file_paths = next(iter(self._forms.items()))
+            # The form goes to the back of the rotation whether or not it has work left
+            self._forms.move_to_end(form)
+            while file_paths:
+                file_path = file_paths.popleft()
+                if is_unprocessed(file_path):
+                    if not file_paths:
+                        del self._forms[form]
+                    return file_path
+            del self._forms[form]
+        return None
+
+
+def create_scheduler(policy: str) -> Any:
+    """
+    Creates the index for a scheduling policy other than "fifo".
+
+    Args:
+        policy: "sjf" or "fair".
+
+    Returns:
+        The policy's scheduler, with push(file_path, info) and pop(is_unprocessed).
+
+    Raises:
+        ValueError: If the policy is unknown.
+    """
+    if policy == SCHEDULING_POLICY_SJF:
+        return ShortestJobFirst()
+    if policy == SCHEDULING_POLICY_FAIR:
+        return TestFormRoundRobin()
+    raise ValueError(
+        f"Unknown scheduling policy '{policy}'; expected one of {', '.join(SCHEDULING_POLICIES)}"
+    )
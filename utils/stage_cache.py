@@ -0,0 +1,169 @@
+"""
+Utility for caching model stage outputs on disk.
+
+The extractor, structure and tagging stages are pure functions of their input, the model,
+the prompt and the generation config. Their outputs are stored under a key built from all
+four, so re-running a folder after changing one stage's prompt only pays for that stage
+(and the stages whose input changes as a result). The cache is bounded in size and evicts
+least recently used entries.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from utils.paths import PROJECT_ROOT
+
+# Default location and size cap; both can be overridden with environment variables.
+DEFAULT_STAGE_CACHE_DIR = PROJECT_ROOT / ".cache" / "stages"
+DEFAULT_STAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024  # 256 MB
+
+
+class StageCache:
+    """
+    On-disk LRU cache of JSON stage outputs.
+
+    Each entry is a file `{key[:2]}/{key}.json`. An entry's modification time is refreshed
+    on every hit and is used as its recency for eviction.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path] = DEFAULT_STAGE_CACHE_DIR,
+        max_bytes: int = DEFAULT_STAGE_CACHE_MAX_BYTES,
+    ):
+        """
+        Args:
+            cache_dir: Directory that holds the cache entries.
+            max_bytes: Total size cap of all entries in bytes.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def make_key(
+        stage: str,
+        input_hash: str,
+        model: str,
+        prompt_version: str,
+        config: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """
+        Builds a cache key for one stage run.
+
+        Args:
+            stage: Stage name (e.g. "extractor").
+            input_hash: Hash of the stage input content.
+            model: Model name.
+            prompt_version: Version (or hash) of the stage's prompt/instruction.
+            config: Generation config that affects the output (temperature, schema ...).
+
+        Returns:
+            str: The cache key.
+        """
+        payload = json.dumps(
+            {
+                "stage": stage,
+                "input": input_hash,
+                "model": model,
+                "prompt": prompt_version,
+                "config": config or {},
+            },
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Looks up an entry and marks it as recently used.
+
+        Args:
+            key: The cache key.
+
+        Returns:
+            Optional[Any]: The cached output, or None on a miss.
+        """
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # Refresh the entry's recency for LRU eviction
+        os.utime(entry_path)
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        """
+        Stores a JSON-serialisable output under a key and evicts old entries beyond the size cap.
+
+        The entry is written to a temporary file and renamed into place, so a concurrent
+        reader never sees a partially written entry.
+
+        Args:
+            key: The cache key.
+            value: The stage output.
+        """
+        entry_path = self._entry_path(key)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, staging_path = tempfile.mkstemp(dir=entry_path.parent, prefix=".staging-")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(staging_path, entry_path)
+
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Removes least recently used entries until the cache fits within max_bytes.
+        """
+        if not self.cache_dir.is_dir():
+            return
+
+        entries = []
+        total_bytes = 0
+        for entry_path in self.cache_dir.glob("*/*.json"):
+            stat = entry_path.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+            total_bytes += stat.st_size
+
+        # Oldest first
+        for _, size, entry_path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            entry_path.unlink(missing_ok=True)
+            total_bytes -= size
+
+
+def hash_value(value: Any) -> str:
+    """
+    Hashes a JSON-serialisable stage input.
+
+    Args:
+        value: The input (text, dict of page hashes, structured test set ...).
+
+    Returns:
+        str: The SHA-256 hex digest of its canonical JSON form.
+    """
+    payload = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_stage_cache() -> StageCache:
+    """
+    Create a StageCache from the STAGE_CACHE_DIR and STAGE_CACHE_MAX_BYTES environment variables.
+
+    Returns:
+        StageCache: A cache rooted at the configured (or default) directory.
+    """
+    cache_dir = os.getenv("STAGE_CACHE_DIR") or DEFAULT_STAGE_CACHE_DIR
+    max_bytes = int(os.getenv("STAGE_CACHE_MAX_BYTES") or DEFAULT_STAGE_CACHE_MAX_BYTES)
+    return StageCache(cache_dir, max_bytes)
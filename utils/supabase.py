@@ -3,25 +3,120 @@ Utility for Supabase connection.
 """
 
 import os
-from typing import Optional
+import time
+from typing import Any, List, Optional
 
 from dotenv import load_dotenv
+from postgrest import APIResponse
+from postgrest.exceptions import APIError
 from supabase import create_client, Client
 
+from utils.record_replay import Cassette, get_service_cassette, to_json_value
+from utils.stage_cache import hash_value
+
 # Load environment variables
 load_dotenv()
 
 
+class _StandInQuery:
+    """
+    Query builder of StandInSupabaseClient: collects the chained calls and records or
+    replays them on execute().
+    """
+
+    def __init__(self, cassette: Cassette, table: str, builder: Any = None):
+        self._cassette = cassette
+        self._table = table
+        self._builder = builder
+        self._calls: List[List[Any]] = []
+
+    def __getattr__(self, name: str) -> Any:
+        def call(*args: Any, **kwargs: Any) -> "_StandInQuery":
+            self._calls.append([name, to_json_value(args), to_json_value(kwargs)])
+            if self._builder is not None:
+                self._builder = getattr(self._builder, name)(*args, **kwargs)
+            return self
+
+        return call
+
+    def execute(self) -> APIResponse:
+        key = hash_value({"table": self._table, "calls": self._calls})
+
+        if self._cassette.recording:
+            start = time.perf_counter()
+            try:
+                response = self._builder.execute()
+            except APIError as e:
+                self._cassette.record(
+                    "supabase",
+                    key,
+                    self._table,
+                    time.perf_counter() - start,
+                    error={"code": e.code, "message": e.message},
+                )
+                raise
+            self._cassette.record(
+                "supabase",
+                key,
+                self._table,
+                time.perf_counter() - start,
+                response={"data": response.data, "count": response.count},
+            )
+            return response
+
+        entry = self._cassette.replay("supabase", key)
+        time.sleep(self._cassette.replay_latency(entry))
+        if self._cassette.inject_error():
+            raise APIError(
+                {"code": str(self._cassette.error_code), "message": "injected by replay"}
+            )
+        if "error" in entry:
+            raise APIError(entry["error"])
+        return APIResponse(**entry["response"])
+
+
+class StandInSupabaseClient:
+    """
+    Supabase client stand-in that records or replays table queries.
+
+    With a client (record mode) queries run against it and are written to the cassette.
+    Without one (replay mode) they are answered from the cassette; see utils.record_replay.
+    """
+
+    def __init__(self, cassette: Cassette, client: Optional[Client] = None):
+        """
+        Args:
+            cassette: The cassette to record into or replay from.
+            client: The real client, in record mode.
+        """
+        self._cassette = cassette
+        self._client = client
+
+    def table(self, table_name: str) -> _StandInQuery:
+        builder = self._client.table(table_name) if self._client is not None else None
+        return _StandInQuery(self._cassette, table_name, builder)
+
+    from_ = table
+
+
 def get_supabase_client() -> Client:
     """
     Create and return a Supabase client using credentials from environment variables.
 
+    When SERVICE_CASSETTE_MODE is set, the client is a StandInSupabaseClient that records
+    queries of the real client ("record") or answers them from the cassette without
+    credentials ("replay"); see utils.record_replay.
+
     Returns:
-        Client: A Supabase client instance.
+        Client: A Supabase client instance (or its stand-in).
 
     Raises:
         ValueError: If SUPABASE_URL or SUPABASE_API_KEY environment variables are not set.
     """
+    cassette = get_service_cassette()
+    if cassette is not None and not cassette.recording:
+        return StandInSupabaseClient(cassette)
+
     supabase_url = os.getenv("SUPABASE_URL")
     supabase_key = os.getenv("SUPABASE_API_KEY")
 
@@ -30,4 +125,7 @@ def get_supabase_client() -> Client:
             "SUPABASE_URL and SUPABASE_API_KEY must be set in environment variables."
         )
 
-    return create_client(supabase_url, supabase_key)
\ No newline at end of file
+    client = create_client(supabase_url, supabase_key)
+    if cassette is not None:
+        return StandInSupabaseClient(cassette, client)
+    return client
@@ -0,0 +1,461 @@
+"""
+Utility for reusing the tags of similar, already-saved questions.
+
+Most new questions (Part 5 sentences in particular) closely resemble questions that are
+already tagged in the database. TagIndex keeps a local nearest-neighbour index over the
+saved question stems and their tags: each stem is a sparse TF-IDF vector of hashed
+character n-grams (NumPy CSR rows, no external service), so memory and search time grow with
+the n-grams a stem actually has rather than the number of buckets, and a new stem gets the
+tags its nearest neighbours agree on. When the neighbours agree with enough confidence for every question of a test
+set, the test set is tagged from the index and the Pro tagging call is skipped.
+
+The index is a JSONL file of (question id, stem, tags) entries, appended to after every
+save_test_set, so it grows incrementally; when a save replaces entries (a question saved
+again) the file is compacted instead, and the vectors are rebuilt from it on load. Appends
+and compactions hold an exclusive flock on a `.lock` file next to the index and first read
+what other processes saved, so indexes of concurrent runs never drop each other's entries.
+It is enabled by setting TAG_INDEX_PATH, and `python -m utils.tag_index` (rebuild_from_supabase)
+seeds it with the questions that are already in the database.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows: index files are only serialised within the process
+    fcntl = None
+
+import numpy as np
+
+TAG_LEVELS = ("level1", "level2", "level3")
+
+# Vector size (hashed n-gram buckets), n-gram length and neighbours consulted per question
+DEFAULT_DIM = 2048
+DEFAULT_NGRAM = 3
+DEFAULT_NEIGHBOURS = 3
+# Minimum confidence (see TagIndex.suggest) for tags to be used without the tagging model
+DEFAULT_CONFIDENCE_THRESHOLD = 0.7
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def tag_key(tag: Dict[str, Any]) -> str:
+    """
+    Returns the "{level1}_{level2}_{level3}" key of a tag, empty levels left empty.
+    """
+    return "_".join(tag.get(level) or "" for level in TAG_LEVELS)
+
+
+def question_key(question: Dict[str, Any]) -> Optional[str]:
+    """
+    Returns the key save_test_set links question_tags by: "{part_label}_{number}" for a
+    structured question, "{part_id}_{number}" for one that already has its part_id, or
+    None without either.
+    """
+    part = question.get("part_label")
+    if part is None:
+        part = question.get("part_id")
+    if part is None or question.get("number") is None:
+        return None
+    return f"{part}_{question['number']}"
+
+
+def _ngram_buckets(text: str, dim: int, ngram: int) -> np.ndarray:
+    """Returns the hashed bucket of every character n-gram of a normalized text."""
+    text = f" {_WHITESPACE.sub(' ', text.lower()).strip()} "
+    return np.fromiter(
+        (
+            zlib.crc32(text[start : start + ngram].encode()) % dim
+            for start in range(max(len(text) - ngram + 1, 1))
+        ),
+        dtype=np.int64,
+    )
+
+
+def ngram_counts(text: str, dim: int = DEFAULT_DIM, ngram: int = DEFAULT_NGRAM) -> np.ndarray:
+    """
+    Counts the character n-grams of a text into dim hashed buckets.
+
+    Args:
+        text (str): The text; case and runs of whitespace are normalized.
+        dim (int): Number of buckets.
+        ngram (int): N-gram length.
+
+    Returns:
+        np.ndarray: float32 counts of shape (dim,).
+    """
+    return np.bincount(_ngram_buckets(text, dim, ngram), minlength=dim).astype(np.float32)
+
+
+def _sparse_ngram_counts(text: str, dim: int, ngram: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the non-empty buckets of ngram_counts (ascending) and their counts."""
+    buckets, counts = np.unique(_ngram_buckets(text, dim, ngram), return_counts=True)
+    return buckets.astype(np.int32), counts.astype(np.float32)
+
+
+class TagIndex:
+    """
+    Nearest-neighbour index from question stems to their tags.
+
+    Entries are keyed by question id, so re-saving a question replaces its entry. All
+    methods are thread-safe (the page pipeline saves from worker threads).
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        dim: int = DEFAULT_DIM,
+        ngram: int = DEFAULT_NGRAM,
+    ):
+        """
+        Args:
+            path: JSONL file the entries are loaded from and appended to; None keeps the
+                  index in memory only.
+            dim: Number of hashed n-gram buckets per vector.
+            ngram: Character n-gram length.
+        """
+        self.path = Path(path) if path else None
+        self.dim = dim
+        self.ngram = ngram
+        self._lock = threading.Lock()
+        self._clear()
+        # Inode of the index file and bytes of it read so far
+        self._file_inode: Optional[int] = None
+        self._file_offset = 0
+
+        if self.path is not None and self.path.exists():
+            with self._locked_file():
+                if self._read_file():
+                    # Written by an index that appended replaced entries
+                    self._compact()
+
+    def _clear(self) -> None:
+        """Empties the in-memory index."""
+        self._rows: Dict[Any, int] = {}  # question id -> row
+        self._ids: List[Any] = []
+        self._stems: List[str] = []
+        self._tags: List[List[Dict[str, Any]]] = []
+        # Sparse n-gram counts per row: buckets (ascending) and their counts
+        self._buckets: List[np.ndarray] = []
+        self._counts: List[np.ndarray] = []
+        self._document_frequency = np.zeros(self.dim, dtype=np.float32)
+        # CSR TF-IDF rows (indptr, buckets, weights), rebuilt after changes
+        self._vectors: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, question_id: Any, stem: str, tags: List[Dict[str, Any]]) -> None:
+        """
+        Adds (or replaces) a saved question and its tags, and writes it to the index file.
+
+        Args:
+            question_id (Any): The question's database id.
+            stem (str): The question stem.
+            tags (List[Dict[str, Any]]): The question's tags (level1, level2, level3).
+        """
+        self.update([(question_id, stem, tags)])
+
+    def update(self, entries: Iterable[Tuple[Any, str, List[Dict[str, Any]]]]) -> None:
+        """
+        Adds (or replaces) saved questions and their tags, and writes them to the index file.
+
+        New entries are appended to the file. If any entry replaces a question that is
+        already indexed, the file is rewritten from the index instead, once for all entries,
+        so it keeps one line per question.
+
+        Args:
+            entries (Iterable[Tuple[Any, str, List[Dict[str, Any]]]]): (question id, stem,
+                                                                        tags) per question.
+        """
+        added = [
+            {
+                "question_id": question_id,
+                "stem": stem,
+                "tags": [{level: tag.get(level) for level in TAG_LEVELS} for tag in tags],
+            }
+            for question_id, stem, tags in entries
+        ]
+        with self._lock:
+            if self.path is None:
+                for entry in added:
+                    self._add(entry["question_id"], entry["stem"], entry["tags"])
+                return
+            if not added:
+                return
+
+            with self._locked_file():
+                # Catch up with the entries other processes saved first
+                replaced = self._read_file()
+                for entry in added:
+                    replaced |= self._add(entry["question_id"], entry["stem"], entry["tags"])
+                if replaced:
+                    self._compact()
+                    return
+                with open(self.path, "ab") as f:
+                    for entry in added:
+                        f.write(_encode_entry(entry))
+                    self._file_offset = f.tell()
+
+    @contextmanager
+    def _locked_file(self) -> Iterator[None]:
+        """Holds an exclusive flock on the `.lock` file next to the index file."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        lock_path = self.path.with_name(self.path.name + ".lock")
+        with open(lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _read_file(self) -> bool:
+        """
+        Indexes the entries saved to the index file since it was last read, re-reading the
+        whole file if it was compacted in the meantime. Called with the file locked.
+
+        Returns:
+            bool: True if an entry replaced an indexed question (the file needs compacting).
+        """
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        with f:
+            stat_result = os.fstat(f.fileno())
+            if stat_result.st_ino != self._file_inode or stat_result.st_size < self._file_offset:
+                self._clear()
+                self._file_inode = stat_result.st_ino
+                self._file_offset = 0
+            f.seek(self._file_offset)
+            data = f.read()
+
+        replaced = False
+        for line in data.decode("utf-8").splitlines():
+            if line.strip():
+                entry = json.loads(line)
+                replaced |= self._add(entry["question_id"], entry["stem"], entry["tags"])
+        self._file_offset += len(data)
+        return replaced
+
+    def _compact(self) -> None:
+        """Rewrites the index file with one line per indexed question."""
+        compacted = self.path.with_name(self.path.name + ".tmp")
+        with open(compacted, "wb") as f:
+            for question_id, stem, tags in zip(self._ids, self._stems, self._tags):
+                f.write(_encode_entry({"question_id": question_id, "stem": stem, "tags": tags}))
+        os.replace(compacted, self.path)
+        stat_result = os.stat(self.path)
+        self._file_inode = stat_result.st_ino
+        self._file_offset = stat_result.st_size
+
+    def _add(self, question_id: Any, stem: str, tags: List[Dict[str, Any]]) -> bool:
+        """Indexes a question and returns whether it replaced an indexed question."""
+        buckets, counts = _sparse_ngram_counts(stem, self.dim, self.ngram)
+        row = self._rows.get(question_id)
+        replaced = row is not None
+        if row is None:
+            self._rows[question_id] = len(self._tags)
+            self._ids.append(question_id)
+            self._stems.append(stem)
+            self._tags.append(tags)
+            self._buckets.append(buckets)
+            self._counts.append(counts)
+        else:
+            self._document_frequency[self._buckets[row]] -= 1
+            self._stems[row] = stem
+            self._tags[row] = tags
+            self._buckets[row] = buckets
+            self._counts[row] = counts
+        self._document_frequency[buckets] += 1
+        self._vectors = None
+        return replaced
+
+    def _idf(self) -> np.ndarray:
+        return np.log((1 + len(self._tags)) / (1 + self._document_frequency)) + 1
+
+    def _build_vectors(self, idf: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Weighs every row (sublinear TF-IDF, L2-normalized) into CSR arrays.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: Row offsets, buckets and weights.
+        """
+        lengths = np.fromiter((len(buckets) for buckets in self._buckets), dtype=np.int64)
+        indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        buckets = np.concatenate(self._buckets)
+        weights = (1 + np.log(np.concatenate(self._counts))) * idf[buckets]
+        # Every stem has at least one n-gram, so no row is empty
+        norms = np.sqrt(np.add.reduceat(weights * weights, indptr[:-1]))
+        weights /= np.repeat(np.maximum(norms, 1e-12), lengths)
+        return indptr, buckets, weights
+
+    def suggest(
+        self, stem: str, neighbours: int = DEFAULT_NEIGHBOURS
+    ) -> Tuple[List[Dict[str, Any]], float]:
+        """
+        Suggests tags for a question from its nearest saved questions.
+
+        The neighbours vote for their tag sets with their cosine similarity. The confidence
+        of the winning tag set is its votes divided by `neighbours`, so it is high only when
+        all nearest questions are very similar and share the same tags, and stays low while
+        the index holds fewer questions than `neighbours`.
+
+        Args:
+            stem (str): The new question's stem.
+            neighbours (int): Number of nearest questions consulted.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], float]: The suggested tags and their confidence in
+                                                [0, 1]; no tags and 0.0 for an empty index.
+        """
+        with self._lock:
+            if not self._tags:
+                return [], 0.0
+            idf = self._idf()
+            if self._vectors is None:
+                self._vectors = self._build_vectors(idf)
+            indptr, buckets, weights = self._vectors
+            query_buckets, query_counts = _sparse_ngram_counts(stem, self.dim, self.ngram)
+            query = np.zeros(self.dim, dtype=np.float32)
+            query[query_buckets] = (1 + np.log(query_counts)) * idf[query_buckets]
+            query /= max(float(np.linalg.norm(query)), 1e-12)
+            similarities = np.add.reduceat(weights * query[buckets], indptr[:-1])
+            tags = self._tags
+
+        count = min(neighbours, len(similarities))
+        nearest = np.argpartition(-similarities, count - 1)[:count]
+        votes: Dict[Tuple[str, ...], float] = {}
+        voted_tags: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        for row in nearest:
+            key = tuple(sorted(tag_key(tag) for tag in tags[row]))
+            votes[key] = votes.get(key, 0.0) + max(float(similarities[row]), 0.0)
+            voted_tags[key] = tags[row]
+        best = max(votes, key=votes.get)
+        return voted_tags[best], min(votes[best] / neighbours, 1.0)
+
+    def tag_test_set(
+        self,
+        test_set: Dict[str, Any],
+        threshold: float = DEFAULT_CONFIDENCE_THRESHOLD,
+        neighbours: int = DEFAULT_NEIGHBOURS,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Tags a structured test set from the index, in the tagging model's output format.
+
+        Args:
+            test_set (Dict[str, Any]): A structured (untagged) test set.
+            threshold (float): Minimum confidence required for every question.
+            neighbours (int): Number of nearest questions consulted per question.
+
+        Returns:
+            Optional[Dict[str, Any]]: The test set with tags and question_tags (linked by
+                                      tag_key and question_key, see question_key), or None
+                                      if a question has no confident suggestion or no
+                                      question_key, and the tagging model should be called.
+        """
+        questions = test_set.get("questions", [])
+        if not questions:
+            return None
+
+        tags: Dict[str, Dict[str, Any]] = {}
+        question_tags = []
+        for question in questions:
+            key = question_key(question)
+            suggested, confidence = self.suggest(question.get("stem", ""), neighbours)
+            if key is None or not suggested or confidence < threshold:
+                return None
+            for tag in suggested:
+                tags.setdefault(tag_key(tag), {k: v for k, v in tag.items() if v is not None})
+                question_tags.append({"question_key": key, "tag_key": tag_key(tag)})
+        return {**test_set, "tags": list(tags.values()), "question_tags": question_tags}
+
+
+def _encode_entry(entry: Dict[str, Any]) -> bytes:
+    """Returns the index file line of an entry."""
+    return (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def rebuild_from_supabase(index: TagIndex, client: Any, page_size: int = 1000) -> int:
+    """
+    Adds every tagged question in the database to the index.
+
+    Args:
+        index (TagIndex): The index to fill.
+        client (Any): A Supabase client.
+        page_size (int): Rows fetched per request.
+
+    Returns:
+        int: Number of questions added.
+    """
+
+    def fetch(table: str, columns: str) -> Iterable[Dict[str, Any]]:
+        start = 0
+        while True:
+            rows = (
+                client.table(table).select(columns).range(start, start + page_size - 1).execute()
+            ).data
+            yield from rows
+            if len(rows) < page_size:
+                return
+            start += page_size
+
+    tags = {row["id"]: row for row in fetch("tags", "id, level1, level2, level3")}
+    tags_by_question: Dict[Any, List[Dict[str, Any]]] = {}
+    for row in fetch("question_tags", "question_id, tag_id"):
+        if row["tag_id"] in tags:
+            tags_by_question.setdefault(row["question_id"], []).append(tags[row["tag_id"]])
+
+    entries = [
+        (question["id"], question["stem"], tags_by_question[question["id"]])
+        for question in fetch("questions", "id, stem")
+        if question["id"] in tags_by_question
+    ]
+    index.update(entries)
+    return len(entries)
+
+
+_indexes: Dict[str, TagIndex] = {}
+
+
+def get_tag_index() -> Optional[TagIndex]:
+    """
+    Return the tag index configured by the TAG_INDEX_PATH environment variable.
+
+    The index is loaded once per path and shared, so saves and suggestions in the same
+    process see each other's updates.
+
+    Returns:
+        Optional[TagIndex]: The index, or None when TAG_INDEX_PATH is not set and questions
+                            are always tagged by the model.
+    """
+    path = os.getenv("TAG_INDEX_PATH")
+    if not path:
+        return None
+    if path not in _indexes:
+        _indexes[path] = TagIndex(path)
+    return _indexes[path]
+
+
+def get_tag_confidence_threshold() -> float:
+    """
+    Return the TAG_INDEX_THRESHOLD environment variable, or the default threshold.
+    """
+    return float(os.getenv("TAG_INDEX_THRESHOLD") or DEFAULT_CONFIDENCE_THRESHOLD)
+
+
+if __name__ == "__main__":
+    from utils.supabase import get_supabase_client
+
+    index_path = sys.argv[1] if len(sys.argv) > 1 else os.getenv("TAG_INDEX_PATH")
+    if not index_path:
+        sys.exit("usage: python -m utils.tag_index INDEX_PATH (or set TAG_INDEX_PATH)")
+    added = rebuild_from_supabase(TagIndex(index_path), get_supabase_client())
+    print(f"Added {added} tagged questions to '{index_path}'")